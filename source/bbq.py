@@ -84,6 +84,10 @@ import lib_messageboxes as msg
 import lib_colourscheme as cs
 import lib_dbconnection as dbc
 import lib_progressdialog as prog
+import lib_tracing as trace
+import lib_journal as jnl
+import lib_tracestore as ts
+import lib_platestore as ps
 from lib_custombuttons import CustomBitmapButton, DBConnButton
 from lib_datafunctions import import_string_to_list
 # Import panels for notebook
@@ -159,6 +163,12 @@ class frm_Main (wx.Frame):
 
         self.ProjectTab = None
         self.db_connection = None
+        # Autosave journal of the open project. Only exists once the
+        # project has a file to sit next to.
+        self.Journal = None
+        self.tmr_Autosave = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.autosave, self.tmr_Autosave)
+        self.tmr_Autosave.Start(jnl.INTERVAL * 1000)
         
         # Required for window dragging:
         # Functions for window dragging taken from wxPython documentation:
@@ -513,6 +523,7 @@ class frm_Main (wx.Frame):
             # Clean up, then exit
             if not self.db_connection is None:
                 self.db_connection.close()
+            self.discard_journal()
             self.delete_temp_directory()
             self.icn_Taskbar.RemoveIcon()
             wx.Exit()
@@ -719,6 +730,7 @@ class frm_Main (wx.Frame):
             self.ProjectTab.ButtonBar.EnableButtons(False)
             self.sbk_WorkArea.DeletePage(self.ProjectTab.Index)
             self.ProjectTab = None
+            self.discard_journal()
             self.on_sidebar_button(None, button="Home")
             self.sbk_WorkArea.SetSelection(self.dic_WorkAreaPageIndices["Home"])
         self.Thaw()
@@ -862,15 +874,39 @@ class frm_Main (wx.Frame):
         self.new_project(None, details["Shorthand"])
         # Hand over loaded data to populate tab
         self.ProjectTab.populate_from_file(str_TempDir, details)
+        # Changes recorded by autosave after the file was last saved,
+        # e.g. before a crash
+        self.Journal = jnl.Journal(str_FilePath)
+        if self.Journal.pending() == True:
+            if msg.query_recover_autosave() == True:
+                self.ProjectTab.assay_data, int_Records = self.Journal.replay(self.ProjectTab.assay_data,
+                                                                              self.ProjectTab.details)
+                self.refresh_recovered_project()
+            else:
+                self.Journal.discard()
+        # Saved projects hold traces as lists, move them to the trace store
+        str_Category = str(details.get("AssayCategory", ""))
+        if ((str_Category == "thermal_shift" or str_Category.find("rate") != -1
+             or details.get("AssayType") == "nanoDSF")
+            and not getattr(self.ProjectTab, "assay_data", None) is None):
+            ts.spill_container(self.ProjectTab.assay_data, ts.get_store(self.ProjectTab))
+        # ... and per sample lists of endpoint plates into the plate store
+        elif ((str_Category.find("dose_response") != -1 or str_Category.find("single_dose") != -1)
+              and not getattr(self.ProjectTab, "assay_data", None) is None):
+            ps.pack_container(self.ProjectTab.assay_data)
+        self.Journal.baseline(self.ProjectTab.assay_data, self.ProjectTab.details)
         # Display file name on header
         self.ProjectTab.ButtonBar.lbl_Filename.SetLabel(str_FilePath)
         # Update py files:
         int_Slash = str(str_FilePath).rfind(chr(92))+1
         str_FileName = str_FilePath[int_Slash:]
-        self.tab_Home.UpdateRecent(str_FilePath,
+        # Projects saved before the catalogue existed get indexed when
+        # they are opened.
+        self.tab_Home.IndexProject(str_FilePath,
                                    str_FileName,
-                                   details["AssayCategory"],
-                                   details["Shorthand"])
+                                   details,
+                                   self.ProjectTab.assay_data,
+                                   bol_Saved = False)
         self.Thaw()
 
     def save_file(self, event = None, tabname = None, saveas = False):
@@ -938,17 +974,71 @@ class frm_Main (wx.Frame):
                 # Let the program know that the file has been saved previously
                 # -> Affects behaviour of "Save" button.
                 tabname.bol_PreviouslySaved = True
-                # Add file to recent files list
-                self.tab_Home.UpdateRecent(tabname.paths["SaveFile"],
+                # Everything is in the archive now, start a fresh journal
+                # (next to the new file, if saved under a new name).
+                if not self.Journal is None and not self.Journal.str_ProjectPath == tabname.paths["SaveFile"]:
+                    self.Journal.discard()
+                self.Journal = jnl.Journal(tabname.paths["SaveFile"])
+                self.Journal.clear(tabname.assay_data, tabname.details)
+                # Add file to project catalogue
+                self.tab_Home.IndexProject(tabname.paths["SaveFile"],
                                            str_FileName,
-                                           tabname.details["AssayCategory"],
-                                           tabname.details["Shorthand"])
+                                           tabname.details,
+                                           tabname.assay_data)
                 msg.info_save_success()
             else:
                 msg.warn_permission_denied()
         else:
             msg.warn_save_error_no_analysis()
 
+    def autosave(self, event = None):
+        """
+        Event handler for autosave timer. Works out the changes to the
+        open project here on the main thread, where the project gets
+        edited, and writes them to its journal on a worker thread.
+        Skipped while data is being analysed or if the project has not
+        been saved yet.
+        """
+        if self.ProjectTab is None or self.Journal is None:
+            return None
+        if hasattr(self, "thd_Analysis") and self.thd_Analysis.is_alive():
+            return None
+        try:
+            lst_Lines = self.Journal.changes(self.ProjectTab.assay_data, self.ProjectTab.details)
+        except TypeError as error:
+            # Something in the project the journal cannot write. Try again
+            # next time, the full save still works.
+            trace.event("autosave failed", "autosave", error = str(error))
+            return None
+        if len(lst_Lines) > 0:
+            threading.Thread(target = self.Journal.write,
+                             args = (lst_Lines, self.Journal.int_Generation),
+                             daemon = True).start()
+
+    def discard_journal(self):
+        """
+        Deletes the autosave journal of the open project, e.g. when the
+        user discards their changes.
+        """
+        if not self.Journal is None:
+            self.Journal.discard()
+            self.Journal = None
+
+    def refresh_recovered_project(self):
+        """
+        Redraws the tabs of the project that had been drawn from the
+        saved file before the journal was replayed.
+        """
+        tab = self.ProjectTab
+        if getattr(tab, "bol_ELNPlotsDrawn", False) == True:
+            tab.tab_ELNPlots.populate(tab.assay_data)
+        if getattr(tab, "bol_ExportPopulated", False) == True:
+            tab.populate_export_tab(noreturn = True)
+        if getattr(tab, "bol_ResultsDrawn", False) == True:
+            tab.populate_results_tab()
+        if getattr(tab, "bol_ReviewsDrawn", False) == True:
+            tab.tab_Review.populate(noreturn = True)
+
     def write_to_archive(self, str_SaveFilePath, assay_data,
                          details, lst_Boolean, dfr_Paths):
         """
@@ -1124,6 +1214,7 @@ class frm_Main (wx.Frame):
                     self.ProjectTab.ButtonBar.EnableButtons(False)
                     self.sbk_WorkArea.DeletePage(self.ProjectTab.Index)
                     self.ProjectTab = None
+                    self.discard_journal()
                     self.sbk_WorkArea.SetSelection(self.dic_WorkAreaPageIndices["New"])
                     bol_Cancelled = True
                 else:
@@ -1271,6 +1362,8 @@ def main():
     #logging.info("Go into main loop")
     app.MainLoop()
     #logging.info("We're in the main loop")
+    # Write stage timings if tracing was switched on via BBQ_TRACE
+    trace.write_on_exit()
 
 if __name__ == "__main__":
     # Uncomment the following line to catch user warnings as errors
@@ -1,7 +1,29 @@
 from scipy.optimize import curve_fit
 import numpy as np
-
-# Before using this, "function" HAS to be sanitised to avoid any exploits.
+import ast
+import hashlib
+
+# User functions are never handed to exec() or eval() as text. They get parsed
+# into a syntax tree, every node of the tree is checked against what is allowed
+# in a function (numbers, the independent variable, parameters, arithmetic and
+# the functions below) and only then compiled, with nothing but these functions
+# available to the compiled code.
+
+# Functions that can be used in user functions and their numpy equivalents.
+dic_Functions = {"exp":np.exp,
+                 "sqrt":np.sqrt,
+                 "log":np.log,
+                 "ln":np.log,
+                 "log10":np.log10,
+                 "sin":np.sin,
+                 "cos":np.cos,
+                 "tan":np.tan}
+
+lst_Operators = [ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow]
+
+# Compiled functions, keyed by hash of function, independent variable and
+# parameters (see CompileFunction).
+dic_Compiled = {}
 
 def CalcParsValues(xdata, ydata, independent, funcpars, function):
     """
@@ -17,15 +39,13 @@ def CalcParsValues(xdata, ydata, independent, funcpars, function):
         function -> string; function of the curve which is to be
                     fitted to the experimental data.
     """
+    TheFunction, TheJacobian = CompileFunction(function, independent, funcpars,
+                                               jacobian = True)
 
-    str_Funcpars = ListToString(funcpars)
-
-    # Define the function with exec()
-    exec("def TheFunction(" + independent + ", " + str_Funcpars
-         + "):\n    return " + function )
-
-    # call the function with eval()
-    lst_Parameters, lst_Covariance = eval("curve_fit(TheFunction, xdata, ydata)")
+    lst_Parameters, lst_Covariance = curve_fit(TheFunction,
+                                               np.asarray(xdata, dtype=float),
+                                               np.asarray(ydata, dtype=float),
+                                               jac = TheJacobian)
 
     return list(lst_Parameters)
 
@@ -44,16 +64,11 @@ def CalculateCurve(xdata, parvalues, independent, funcpars, function):
     """
     Calculates values for fitted curve based on function and parameters.
     """
-    str_Funcpars = ListToString(funcpars)
-    str_ParValues = ListToString(parvalues)
-
-    # Define the function with exec()
-    exec("def TheFunction(" + independent + ", " + str_Funcpars
-         + "):\n    return " + function )
-    fit = []
-    for datapoint in xdata:
-        fit.append(eval("TheFunction(datapoint, " + str_ParValues + ")"))
-    return fit
+    TheFunction = CompileFunction(function, independent, funcpars)
+    arr_X = np.asarray(xdata, dtype=float)
+    # The whole curve in one call. Functions that do not depend on the
+    # independent variable (e.g. constant) still give one value per datapoint.
+    return list(np.broadcast_to(TheFunction(arr_X, *parvalues), arr_X.shape))
 
 def FunctionToList(funcstring):
     """
@@ -224,6 +239,13 @@ def VerifyFunction(str_Function, lst_EnteredPars, independent):
         print(lst_NotInList)
         return False
 
+    # Finally, the function must only contain what can be compiled
+    try:
+        ParseFunction(str_Function, independent, lst_EnteredPars)
+    except ValueError as error:
+        print(error)
+        return False
+
     # If we get to this point, all is well
     return True
 
@@ -289,6 +311,232 @@ def MatchingParentheses(function):
     else:
         return True
 
+def ParseFunction(function, independent, funcpars):
+    """
+    Parses a function into a syntax tree and validates every node.
+
+    Allowed are numbers, the independent variable, the parameters, the
+    operators +, -, *, /, ** and the functions in dic_Functions (with
+    or without "np." in front, see AddNumpyToFunction).
+
+    Arguments:
+        function -> string. Function, e.g. "ybot + (ytop-ybot)/(1+(i/x)**h)"
+        independent -> string. Independent variable.
+        funcpars -> list of strings. Parameters of the function.
+
+    Returns the expression node of the tree, with "np." removed from
+    function calls. Raises ValueError if the function is not allowed.
+    """
+    try:
+        tree = ast.parse(function.strip(), mode="eval")
+    except SyntaxError:
+        raise ValueError("Function cannot be parsed: " + function)
+
+    lst_Names = [independent] + list(funcpars)
+
+    def check(node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) in [int, float]:
+                return node
+            raise ValueError("Constant is not a number: " + repr(node.value))
+        elif isinstance(node, ast.Name):
+            if node.id in lst_Names:
+                return node
+            raise ValueError("Unknown parameter: " + node.id)
+        elif isinstance(node, ast.BinOp):
+            if not type(node.op) in lst_Operators:
+                raise ValueError("Operator not allowed: " + type(node.op).__name__)
+            return ast.BinOp(left=check(node.left), op=node.op, right=check(node.right))
+        elif isinstance(node, ast.UnaryOp):
+            if not type(node.op) in [ast.USub, ast.UAdd]:
+                raise ValueError("Operator not allowed: " + type(node.op).__name__)
+            return ast.UnaryOp(op=node.op, operand=check(node.operand))
+        elif isinstance(node, ast.Call):
+            func = node.func
+            # np.exp(x) -> exp(x)
+            if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+                and func.value.id in ["np","numpy"]):
+                str_Name = func.attr
+            elif isinstance(func, ast.Name):
+                str_Name = func.id
+            else:
+                raise ValueError("Function not allowed")
+            if not str_Name in dic_Functions:
+                raise ValueError("Function not allowed: " + str_Name)
+            if len(node.args) != 1 or len(node.keywords) > 0:
+                raise ValueError(str_Name + " takes exactly one argument")
+            return ast.Call(func=ast.Name(id=str_Name, ctx=ast.Load()),
+                            args=[check(node.args[0])], keywords=[])
+        raise ValueError("Not allowed in a function: " + type(node).__name__)
+
+    return check(tree.body)
+
+def Depends(node, variable):
+    """
+    Returns True if the expression node contains the variable.
+    """
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and child.id == variable:
+            return True
+    return False
 
+def IsNumber(node, value):
+    """
+    Returns True if the node is the constant value.
+    """
+    return isinstance(node, ast.Constant) and node.value == value
 
+def Operation(left, op, right):
+    """
+    Builds the node "left op right", leaving out terms that are 0 or
+    factors that are 1.
+    """
+    if isinstance(op, ast.Add):
+        if IsNumber(left, 0): return right
+        if IsNumber(right, 0): return left
+    elif isinstance(op, ast.Sub):
+        if IsNumber(right, 0): return left
+        if IsNumber(left, 0): return ast.UnaryOp(op=ast.USub(), operand=right)
+    elif isinstance(op, ast.Mult):
+        if IsNumber(left, 0) or IsNumber(right, 0): return ast.Constant(value=0)
+        if IsNumber(left, 1): return right
+        if IsNumber(right, 1): return left
+    elif isinstance(op, ast.Div):
+        if IsNumber(left, 0): return ast.Constant(value=0)
+        if IsNumber(right, 1): return left
+    return ast.BinOp(left=left, op=op, right=right)
+
+def CallNode(name, argument):
+    """
+    Builds the node "name(argument)".
+    """
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[argument], keywords=[])
+
+def Differentiate(node, variable):
+    """
+    Symbolic derivative of a validated expression (see ParseFunction)
+    with respect to one variable.
+
+    Arguments:
+        node -> expression node.
+        variable -> string. Parameter to differentiate for.
+
+    Returns expression node of the derivative or None if there is no
+    rule for a function in the expression.
+    """
+    if not Depends(node, variable):
+        return ast.Constant(value=0)
+    if isinstance(node, ast.Name):
+        return ast.Constant(value=1)
+    if isinstance(node, ast.UnaryOp):
+        d = Differentiate(node.operand, variable)
+        if d is None or isinstance(node.op, ast.UAdd):
+            return d
+        return Operation(ast.Constant(value=0), ast.Sub(), d)
+    if isinstance(node, ast.BinOp):
+        u, v = node.left, node.right
+        du = Differentiate(u, variable)
+        dv = Differentiate(v, variable)
+        if du is None or dv is None:
+            return None
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return Operation(du, node.op, dv)
+        if isinstance(node.op, ast.Mult):
+            return Operation(Operation(du, ast.Mult(), v), ast.Add(), Operation(u, ast.Mult(), dv))
+        if isinstance(node.op, ast.Div):
+            # (du*v - u*dv)/v**2
+            return Operation(Operation(Operation(du, ast.Mult(), v), ast.Sub(), Operation(u, ast.Mult(), dv)),
+                             ast.Div(), ast.BinOp(left=v, op=ast.Pow(), right=ast.Constant(value=2)))
+        if isinstance(node.op, ast.Pow):
+            if not Depends(v, variable):
+                # v * u**(v-1) * du
+                return Operation(Operation(v, ast.Mult(), ast.BinOp(left=u, op=ast.Pow(),
+                    right=Operation(v, ast.Sub(), ast.Constant(value=1)))), ast.Mult(), du)
+            # u**v * (dv*log(u) + v*du/u)
+            return Operation(node, ast.Mult(), Operation(Operation(dv, ast.Mult(), CallNode("log", u)),
+                ast.Add(), Operation(Operation(v, ast.Mult(), du), ast.Div(), u)))
+    if isinstance(node, ast.Call):
+        u = node.args[0]
+        du = Differentiate(u, variable)
+        if du is None:
+            return None
+        str_Name = node.func.id
+        if str_Name == "exp":
+            outer = node
+        elif str_Name in ["log","ln"]:
+            return Operation(du, ast.Div(), u)
+        elif str_Name == "log10":
+            return Operation(du, ast.Div(), Operation(u, ast.Mult(), ast.Constant(value=float(np.log(10)))))
+        elif str_Name == "sqrt":
+            return Operation(du, ast.Div(), Operation(ast.Constant(value=2), ast.Mult(), node))
+        elif str_Name == "sin":
+            outer = CallNode("cos", u)
+        elif str_Name == "cos":
+            outer = ast.UnaryOp(op=ast.USub(), operand=CallNode("sin", u))
+        elif str_Name == "tan":
+            outer = Operation(ast.Constant(value=1), ast.Div(),
+                ast.BinOp(left=CallNode("cos", u), op=ast.Pow(), right=ast.Constant(value=2)))
+        else:
+            return None
+        return Operation(outer, ast.Mult(), du)
+    return None
+
+def StackColumns(x, *columns):
+    """
+    Stacks the partial derivatives into the Jacobian matrix curve_fit
+    expects (one row per datapoint, one column per parameter).
+    """
+    shape = np.shape(x)
+    return np.stack([np.broadcast_to(column, shape) for column in columns], axis=-1)
+
+def CompileFunction(function, independent, funcpars, jacobian = False):
+    """
+    Compiles a function into a vectorised python function that takes
+    the independent variable (number or numpy array) followed by the
+    parameters, like the eq_ functions in lib_fittingfunctions.
+
+    Compiled functions are cached, each function only gets compiled once.
+
+    Arguments:
+        function -> string. Function.
+        independent -> string. Independent variable.
+        funcpars -> list of strings. Parameters of the function.
+        jacobian -> boolean. If True, also return a function that
+                    calculates the Jacobian matrix for curve_fit.
+
+    Returns the compiled function or, if jacobian is True, a tuple of
+    the compiled function and the Jacobian function (None if the
+    function cannot be differentiated). Raises ValueError if the
+    function is not allowed.
+    """
+    str_Key = hashlib.sha256(repr((function.strip(), independent,
+                                   tuple(funcpars))).encode()).hexdigest()
+    if not str_Key in dic_Compiled:
+        expression = ParseFunction(function, independent, funcpars)
+        dic_Namespace = {"__builtins__":{}, "StackColumns":StackColumns}
+        dic_Namespace.update(dic_Functions)
+        lst_Arguments = [ast.arg(arg=name) for name in [independent] + list(funcpars)]
+
+        def define(name, body):
+            # def name(independent, par1, par2, ...): return body
+            module = ast.Module(body=[ast.FunctionDef(name=name,
+                args=ast.arguments(posonlyargs=[], args=lst_Arguments, kwonlyargs=[],
+                                   kw_defaults=[], defaults=[]),
+                body=[ast.Return(value=body)], decorator_list=[], type_params=[])],
+                type_ignores=[])
+            exec(compile(ast.fix_missing_locations(module), "<function>", "exec"), dic_Namespace)
+            return dic_Namespace[name]
+
+        TheFunction = define("TheFunction", expression)
+        # Jacobian: partial derivatives for all parameters
+        lst_Derivatives = [Differentiate(expression, par) for par in funcpars]
+        if len(lst_Derivatives) > 0 and not None in lst_Derivatives:
+            TheJacobian = define("TheJacobian", ast.Call(func=ast.Name(id="StackColumns", ctx=ast.Load()),
+                args=[ast.Name(id=independent, ctx=ast.Load())] + lst_Derivatives, keywords=[]))
+        else:
+            TheJacobian = None
+        dic_Compiled[str_Key] = (TheFunction, TheJacobian)
 
+    if jacobian == True:
+        return dic_Compiled[str_Key]
+    return dic_Compiled[str_Key][0]
@@ -946,6 +946,11 @@ class RawDataRules (wx.Panel):
         
         # Example File And Verification Wizard Page
         self.fpk_RawDataFile.Bind(wx.EVT_FILEPICKER_CHANGED, self.FileSelected)
+        # Keep workbooks open while the editor is open, so the example file
+        # gets parsed once for its worksheets and all reads of them (see
+        # lib_excelfunctions.ImportSession).
+        self.import_session = ef.ImportSession().open()
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
         self.btn_ParseFile.Bind(wx.EVT_BUTTON, self.ParseRawDataFile)
         self.chk_Verification.Bind(wx.EVT_CHECKBOX, self.OnChkVerification)
         self.rad_VerificationKeywordColumn.Bind(wx.EVT_CHECKBOX, self.OnChkVerificationKWCol)
@@ -1506,10 +1511,23 @@ class RawDataRules (wx.Panel):
         self.grd_ExampleFile.SetCellBackgroundColour(int_NewRow,int_NewCol,(255,255,0))
         self.grd_ExampleFile.SelectBlock(int_NewRow,int_NewCol,int_NewRow,int_NewCol)
 
+    def on_destroy(self, event):
+        """
+        Event handler. Ends the editor's import session when the editor
+        gets closed.
+        """
+        if event.GetEventObject() is self:
+            self.import_session.close()
+        event.Skip()
+
     def FileSelected(self, event):
 
         self.btn_ParseFile.Enable(True)
 
+        # Start a new session, so that the previous file gets closed
+        self.import_session.close()
+        self.import_session = ef.ImportSession().open()
+
         str_FilePath = self.fpk_RawDataFile.GetPath()
         # Determine file extension to get most likely candidate for file reader:
         str_Extension = os.path.splitext(str_FilePath)[1][1:]
@@ -650,6 +650,11 @@ class TransferRules(wx.Panel):
 
         # Bindings ##################################################################################################################################
         self.fpk_TransferFile.Bind(wx.EVT_FILEPICKER_CHANGED, self.FileSelected)
+        # Keep workbooks open while the editor is open, so the example file
+        # gets parsed once for its worksheets and all reads of them (see
+        # lib_excelfunctions.ImportSession).
+        self.import_session = ef.ImportSession().open()
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
         self.btn_ParseFile.Bind(wx.EVT_BUTTON, self.parse_transfer_file)
         # Verification keyword
         self.chk_Verification.Bind(wx.EVT_CHECKBOX, self.on_chk_verification)
@@ -1012,10 +1017,23 @@ class TransferRules(wx.Panel):
         """
         self.txt_ColumnsHints.SetValue("")
 
+    def on_destroy(self, event):
+        """
+        Event handler. Ends the editor's import session when the editor
+        gets closed.
+        """
+        if event.GetEventObject() is self:
+            self.import_session.close()
+        event.Skip()
+
     def FileSelected(self, event):
 
         self.btn_ParseFile.Enable(True)
 
+        # Start a new session, so that the previous file gets closed
+        self.import_session.close()
+        self.import_session = ef.ImportSession().open()
+
         str_FilePath = self.fpk_TransferFile.GetPath()
         # Determine file extension to get most likely candidate for file reader:
         str_Extension = os.path.splitext(str_FilePath)[1][1:]
@@ -0,0 +1,491 @@
+"""
+Vectorised curve fitting.
+
+lib_fittingfunctions fits one dataset at a time with scipy's curve_fit.
+The functions in this module fit many datasets at once: a
+Levenberg-Marquardt least squares solver runs on all rows of a 2D array
+together, with one damping factor per row, so a plate's worth of kinetic
+traces or a stack of dose response curves is fitted in a few dozen
+array operations instead of one curve_fit call per dataset.
+
+Datapoints that are np.nan are ignored, rows can therefore have
+different numbers of datapoints (see lib_fitstatistics.pad).
+
+Functions:
+    eq_onephase
+    jac_onephase
+    eq_sigmoidal
+    jac_sigmoidal
+    eq_logsigmoidal
+    jac_logsigmoidal
+    least_squares
+    fit_results
+    guess_onephase
+    guess_sigmoidal
+    fit_onephase
+    fit_sigmoidal
+    refit_sigmoidal
+    fit_DRTC
+
+"""
+
+import warnings
+import numpy as np
+from scipy.optimize import curve_fit, OptimizeWarning
+
+import lib_fitstatistics as fs
+
+def eq_onephase(arr_X, arr_Pars):
+    """
+    One phase association (see lib_fittingfunctions.eq_OnePhaseAssociation)
+    for rows of datasets. One phase decay (eq_OnePhaseDecay) is the same
+    function: Y0*exp(-K*t) + YP*(1-exp(-K*t)), only with YP < Y0.
+
+    Arguments:
+        arr_X -> 2D array of floats. Timepoints, one row per dataset (or
+                 one row for all).
+        arr_Pars -> 2D array of floats. Y0, YP, K, one row per dataset.
+    """
+    Y0, YP, K = [arr_Pars[:,[p]] for p in range(3)]
+    with np.errstate(all = "ignore"):
+        return Y0 + (YP-Y0)*(1-np.exp(-K*arr_X))
+
+def jac_onephase(arr_X, arr_Pars):
+    """
+    Partial derivatives of eq_onephase after Y0, YP and K.
+
+    Returns 3D array (datasets, datapoints, parameters).
+    """
+    Y0, YP, K = [arr_Pars[:,[p]] for p in range(3)]
+    with np.errstate(all = "ignore"):
+        arr_Exp = np.exp(-K*arr_X)
+        return np.stack(np.broadcast_arrays(arr_Exp, 1-arr_Exp,
+                                            (YP-Y0)*arr_X*arr_Exp), axis = 2)
+
+def eq_sigmoidal(arr_X, arr_Pars):
+    """
+    Sigmoidal dose response curve (see lib_fittingfunctions.eq_sigmoidal)
+    for rows of datasets.
+
+    Arguments:
+        arr_X -> 2D array of floats. Concentrations in uM.
+        arr_Pars -> 2D array of floats. ytop, ybot, h, i, one row per
+                    dataset.
+    """
+    return fs.eq_sigmoidal(arr_X, *[arr_Pars[:,[p]] for p in range(4)])
+
+def jac_sigmoidal(arr_X, arr_Pars):
+    """
+    Partial derivatives of eq_sigmoidal after ytop, ybot, h and i.
+
+    Returns 3D array (datasets, datapoints, parameters).
+    """
+    ytop, ybot, h, i = [arr_Pars[:,[p]] for p in range(4)]
+    with np.errstate(all = "ignore"):
+        arr_Ratio = i/arr_X
+        arr_U = arr_Ratio**h
+        arr_D = 1 + arr_U
+        arr_Top = 1/arr_D
+        arr_Scale = -(ytop - ybot)*arr_U/arr_D**2
+        return np.stack(np.broadcast_arrays(arr_Top, 1-arr_Top,
+                                            arr_Scale*np.log(arr_Ratio),
+                                            arr_Scale*h/i), axis = 2)
+
+def eq_logsigmoidal(arr_X, arr_Pars):
+    """
+    eq_sigmoidal with the natural logarithm of the inflection point as
+    fourth parameter. Fitting ln(i) keeps i positive without a bound
+    and makes steps in i relative, so an inflection point near the top
+    of the dose range cannot collapse towards zero.
+
+    Arguments:
+        arr_X -> 2D array of floats. Concentrations in uM.
+        arr_Pars -> 2D array of floats. ytop, ybot, h, ln(i), one row
+                    per dataset.
+    """
+    with np.errstate(all = "ignore"):
+        return eq_sigmoidal(arr_X, np.column_stack([arr_Pars[:,:3], np.exp(arr_Pars[:,3])]))
+
+def jac_logsigmoidal(arr_X, arr_Pars):
+    """
+    Partial derivatives of eq_logsigmoidal after ytop, ybot, h and ln(i).
+
+    Returns 3D array (datasets, datapoints, parameters).
+    """
+    with np.errstate(all = "ignore"):
+        arr_I = np.exp(arr_Pars[:,3])
+        arr_J = jac_sigmoidal(arr_X, np.column_stack([arr_Pars[:,:3], arr_I]))
+        # d/d ln(i) = i * d/di
+        arr_J[:,:,3] = arr_J[:,:,3] * arr_I[:,None]
+    return arr_J
+
+def least_squares(model, jacobian, arr_X, arr_Y, arr_Guess, arr_Lower = None,
+                  arr_Upper = None, arr_KeepSign = None, int_MaxIter = 200,
+                  flt_Tolerance = 1e-10, flt_StepTolerance = 1e-8,
+                  flt_GradientTolerance = 1e-8):
+    """
+    Levenberg-Marquardt least squares fit of model to every row of arr_Y.
+
+    Arguments:
+        model -> function(arr_X, arr_Pars). Returns 2D array of model
+                 values.
+        jacobian -> function(arr_X, arr_Pars). Returns 3D array of
+                    partial derivatives (rows, datapoints, parameters).
+        arr_X -> 2D array of floats. x values, one row per dataset or a
+                 single row shared by all datasets.
+        arr_Y -> 2D array of floats. Datapoints, np.nan where missing.
+        arr_Guess -> 2D array of floats. Starting parameters, one row
+                     per dataset.
+        arr_Lower -> array of floats. Optional lower bound per parameter.
+        arr_Upper -> array of floats. Optional upper bound per parameter.
+        arr_KeepSign -> array of integers. Optional indices of parameters
+                        whose sign a step must not change (e.g. the Hill
+                        slope). Steps that do are rejected like steps
+                        that do not improve the fit.
+        int_MaxIter -> integer. Maximum number of iterations.
+        flt_Tolerance -> float. A row has converged when an accepted step
+                         improves its sum of squares by less than this
+                         fraction,
+        flt_StepTolerance -> float. or when an accepted step changes the
+                             parameters by less than this fraction,
+        flt_GradientTolerance -> float. or when the gradient is (almost)
+                                 orthogonal to the residuals, i.e. the
+                                 cosine between the residuals and every
+                                 column of the jacobian is below this.
+
+    Returns dictionary:
+        "Pars" -> 2D array of fitted parameters.
+        "Covar" -> 3D array of covariance matrices.
+        "Points" -> array of number of datapoints per row.
+        "Success" -> array of booleans.
+    """
+    arr_X = np.atleast_2d(np.asarray(arr_X, dtype = float))
+    arr_Y = np.atleast_2d(np.asarray(arr_Y, dtype = float))
+    arr_Pars = np.array(arr_Guess, dtype = float)
+    int_Rows, int_Parameters = arr_Pars.shape
+    arr_Mask = np.isfinite(arr_Y) & np.isfinite(arr_X)
+    arr_Y = np.where(arr_Mask, arr_Y, 0)
+    arr_Points = arr_Mask.sum(axis = 1)
+    if arr_Lower is None:
+        arr_Lower = np.full(int_Parameters, -np.inf)
+    if arr_Upper is None:
+        arr_Upper = np.full(int_Parameters, np.inf)
+    arr_Pars = np.clip(arr_Pars, arr_Lower, arr_Upper)
+
+    def x_rows(rows):
+        # Shared x values or the rows' own
+        return arr_X if arr_X.shape[0] == 1 else arr_X[rows]
+
+    def residuals(arr_Pars, rows):
+        with np.errstate(all = "ignore"):
+            return np.where(arr_Mask[rows], arr_Y[rows] - model(x_rows(rows), arr_Pars), 0)
+
+    def sum_of_squares(arr_Residuals):
+        with np.errstate(all = "ignore"):
+            arr_SSQ = (arr_Residuals**2).sum(axis = 1)
+        arr_SSQ[~np.isfinite(arr_SSQ)] = np.inf
+        return arr_SSQ
+
+    arr_Residuals = residuals(arr_Pars, np.arange(int_Rows))
+    arr_SSQ = sum_of_squares(arr_Residuals)
+    arr_Lambda = np.full(int_Rows, 1e-3)
+    # Rows without enough datapoints or without a finite start are not fitted
+    arr_Active = (arr_Points >= int_Parameters) & np.isfinite(arr_SSQ) & np.isfinite(arr_Pars).all(axis = 1)
+    arr_Converged = np.zeros(int_Rows, dtype = bool)
+    arr_Identity = np.eye(int_Parameters)
+    for iteration in range(int_MaxIter):
+        if not arr_Active.any():
+            break
+        rows = np.flatnonzero(arr_Active)
+        arr_J = jacobian(x_rows(rows), arr_Pars[rows])
+        arr_J = np.where(arr_Mask[rows][:,:,None], arr_J, 0)
+        with np.errstate(all = "ignore"):
+            arr_JTJ = np.einsum("rmp,rmq->rpq", arr_J, arr_J)
+            arr_Gradient = np.einsum("rmp,rm->rp", arr_J, arr_Residuals[rows])
+        arr_Diagonal = np.diagonal(arr_JTJ, axis1 = 1, axis2 = 2)
+        # Gradient test: at a minimum the residuals are orthogonal to the
+        # jacobian. Rows that are there are finished without a step.
+        with np.errstate(all = "ignore"):
+            arr_Cosine = np.where(arr_Diagonal > 0, np.abs(arr_Gradient)
+                                  / np.sqrt(arr_Diagonal * arr_SSQ[rows,None]), 0).max(axis = 1)
+        arr_Flat = (arr_Cosine <= flt_GradientTolerance) | (arr_SSQ[rows] == 0)
+        arr_Converged[rows[arr_Flat]] = True
+        arr_Active[rows[arr_Flat]] = False
+        if arr_Flat.all():
+            continue
+        rows = rows[~arr_Flat]
+        arr_JTJ = arr_JTJ[~arr_Flat]
+        arr_Gradient = arr_Gradient[~arr_Flat]
+        arr_Diagonal = arr_Diagonal[~arr_Flat]
+        # Diagonals can be inf, which gives nan off the diagonal. Those
+        # rows get caught below.
+        with np.errstate(all = "ignore"):
+            arr_Damped = arr_JTJ + arr_Identity * (arr_Lambda[rows,None]
+                * np.maximum(arr_Diagonal, 1e-12 * arr_Diagonal.max(axis = 1, initial = 0)[:,None]))[:,:,None]
+        # Rows whose system cannot be solved are finished
+        arr_Finite = (np.isfinite(arr_Damped).all(axis = (1,2))
+                      & np.isfinite(arr_Gradient).all(axis = 1)
+                      & (arr_Diagonal.max(axis = 1, initial = 0) > 0))
+        arr_Step = np.zeros_like(arr_Gradient)
+        if arr_Finite.any():
+            with np.errstate(all = "ignore"):
+                try:
+                    arr_Step[arr_Finite] = np.linalg.solve(arr_Damped[arr_Finite],
+                        arr_Gradient[arr_Finite][:,:,None])[:,:,0]
+                except np.linalg.LinAlgError:
+                    arr_Step[arr_Finite] = (np.linalg.pinv(arr_Damped[arr_Finite])
+                        @ arr_Gradient[arr_Finite][:,:,None])[:,:,0]
+        arr_Active[rows[~arr_Finite]] = False
+        arr_Trial = np.clip(arr_Pars[rows] + arr_Step, arr_Lower, arr_Upper)
+        arr_TrialResiduals = residuals(arr_Trial, rows)
+        arr_TrialSSQ = sum_of_squares(arr_TrialResiduals)
+        arr_Better = arr_Finite & (arr_TrialSSQ < arr_SSQ[rows])
+        if not arr_KeepSign is None:
+            arr_Better &= (np.sign(arr_Trial[:,arr_KeepSign])
+                           == np.sign(arr_Pars[rows][:,arr_KeepSign])).all(axis = 1)
+        # Converged: accepted step with (almost) no improvement in the sum
+        # of squares or the parameters, or no step improves any more
+        # (damping has grown huge).
+        with np.errstate(all = "ignore"):
+            arr_Small = (arr_SSQ[rows] - arr_TrialSSQ) <= flt_Tolerance * arr_SSQ[rows]
+            arr_Still = (np.linalg.norm(arr_Trial - arr_Pars[rows], axis = 1)
+                         <= flt_StepTolerance * (flt_StepTolerance + np.linalg.norm(arr_Pars[rows], axis = 1)))
+        arr_Done = ((arr_Better & (arr_Small | arr_Still | (arr_TrialSSQ == 0)))
+                    | (arr_Lambda[rows] > 1e12)) & arr_Finite
+        arr_Pars[rows[arr_Better]] = arr_Trial[arr_Better]
+        arr_Residuals[rows[arr_Better]] = arr_TrialResiduals[arr_Better]
+        arr_SSQ[rows[arr_Better]] = arr_TrialSSQ[arr_Better]
+        arr_Lambda[rows] = np.where(arr_Better, arr_Lambda[rows]/10, arr_Lambda[rows]*10)
+        arr_Converged[rows[arr_Done]] = True
+        arr_Active[rows[arr_Done]] = False
+
+    # Covariance as curve_fit: inverse of J^T J, scaled by the residual
+    # variance.
+    arr_Covar = np.full((int_Rows, int_Parameters, int_Parameters), np.nan)
+    rows = np.flatnonzero(arr_Converged)
+    if len(rows) > 0:
+        arr_J = jacobian(x_rows(rows), arr_Pars[rows])
+        arr_J = np.where(arr_Mask[rows][:,:,None], arr_J, 0)
+        with np.errstate(all = "ignore"):
+            arr_JTJ = np.einsum("rmp,rmq->rpq", arr_J, arr_J)
+        # No covariance without a finite jacobian: the fit failed.
+        arr_Fine = np.isfinite(arr_JTJ).all(axis = (1,2))
+        arr_Converged[rows[~arr_Fine]] = False
+        with np.errstate(all = "ignore"):
+            arr_DoF = (arr_Points[rows] - int_Parameters).astype(float)
+            arr_DoF[arr_DoF <= 0] = np.nan
+            arr_Variance = arr_SSQ[rows]/arr_DoF
+            arr_Inverse = np.full_like(arr_JTJ, np.inf)
+            if arr_Fine.any():
+                arr_Inverse[arr_Fine] = np.linalg.pinv(arr_JTJ[arr_Fine])
+            arr_Covar[rows] = arr_Inverse * arr_Variance[:,None,None]
+    arr_Success = arr_Converged & np.isfinite(arr_Pars).all(axis = 1)
+    arr_Pars[~arr_Success] = np.nan
+    return {"Pars": arr_Pars, "Covar": arr_Covar, "Points": arr_Points,
+            "Success": arr_Success}
+
+def fit_results(model, arr_X, arr_Y, dic_Fit):
+    """
+    Adds the fitted curves and the usual statistics to the result of
+    least_squares.
+
+    Returns dictionary with the keys of dic_Fit and "Fit", "StdErr",
+    "Confidence" and "RSquare".
+    """
+    arr_Y = np.atleast_2d(np.asarray(arr_Y, dtype = float))
+    dic_Fit["Fit"] = np.broadcast_to(model(np.atleast_2d(arr_X), dic_Fit["Pars"]),
+                                     arr_Y.shape).copy()
+    dic_Fit["StdErr"] = fs.standard_errors(dic_Fit["Covar"])
+    dic_Fit["Confidence"] = fs.confidence(dic_Fit["Points"], dic_Fit["StdErr"])
+    dic_Fit["RSquare"] = fs.rsquare(arr_Y, dic_Fit["Fit"])
+    return dic_Fit
+
+def first_last(arr_Y):
+    """
+    Returns the first and last non-nan value of each row of arr_Y.
+    """
+    arr_Finite = np.isfinite(arr_Y)
+    arr_Rows = np.arange(arr_Y.shape[0])
+    int_Last = arr_Y.shape[1] - 1
+    arr_First = arr_Y[arr_Rows, np.argmax(arr_Finite, axis = 1)]
+    arr_Last = arr_Y[arr_Rows, int_Last - np.argmax(arr_Finite[:,::-1], axis = 1)]
+    return arr_First, arr_Last
+
+def guess_onephase(arr_X, arr_Y):
+    """
+    Starting parameters for eq_onephase: first and last datapoints as Y0
+    and YP, K from the time at which half the change has happened.
+    """
+    arr_X = np.broadcast_to(np.atleast_2d(np.asarray(arr_X, dtype = float)), arr_Y.shape)
+    arr_Y0, arr_YP = first_last(arr_Y)
+    with np.errstate(all = "ignore"):
+        arr_Progress = (arr_Y - arr_Y0[:,None])/(arr_YP - arr_Y0)[:,None]
+        arr_Half = np.argmax(np.nan_to_num(arr_Progress, nan = -np.inf) >= 0.5, axis = 1)
+        arr_THalf = arr_X[np.arange(arr_Y.shape[0]), arr_Half] - np.nanmin(arr_X, axis = 1)
+        arr_Span = np.nanmax(arr_X, axis = 1) - np.nanmin(arr_X, axis = 1)
+        arr_THalf = np.where(arr_THalf > 0, arr_THalf, arr_Span/3)
+        arr_K = np.log(2)/arr_THalf
+    return np.column_stack([arr_Y0, arr_YP, arr_K])
+
+def guess_sigmoidal(arr_X, arr_Y):
+    """
+    Starting parameters for eq_sigmoidal: responses at the highest and
+    lowest concentration as ytop and ybot, Hill slope of 1, geometric
+    mean of the concentrations as inflection point.
+    """
+    arr_X = np.broadcast_to(np.atleast_2d(np.asarray(arr_X, dtype = float)), arr_Y.shape)
+    arr_Order = np.argsort(np.where(np.isfinite(arr_Y), arr_X, np.nan), axis = 1)
+    arr_Sorted = np.take_along_axis(arr_Y, arr_Order, axis = 1)
+    # Sorting puts nan last, so the first value is at the lowest dose
+    arr_Bottom, arr_Top = first_last(arr_Sorted)
+    # Rows without any datapoint get nan (their fit fails)
+    with warnings.catch_warnings(), np.errstate(all = "ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        arr_I = np.exp(np.nanmean(np.where(np.isfinite(arr_Y) & (arr_X > 0),
+                                           np.log(arr_X), np.nan), axis = 1))
+    return np.column_stack([arr_Top, arr_Bottom, np.ones(arr_Y.shape[0]), arr_I])
+
+def fit_onephase(arr_Time, arr_Signal):
+    """
+    Fits one phase association/decay to all kinetic traces at once, e.g.
+    every well of a plate.
+
+    Arguments:
+        arr_Time -> 1D or 2D array of floats. Timepoints, shared by all
+                    traces or one row per trace.
+        arr_Signal -> 2D array of floats. One trace per row.
+
+    Returns dictionary of arrays, one row per trace (see fit_results).
+    Parameters are Y0, YP, K. The rate constant is kept >= 0.
+    """
+    arr_Time = np.atleast_2d(np.asarray(arr_Time, dtype = float))
+    arr_Signal = np.atleast_2d(np.asarray(arr_Signal, dtype = float))
+    dic_Fit = least_squares(eq_onephase, jac_onephase, arr_Time, arr_Signal,
+                            guess_onephase(arr_Time, arr_Signal),
+                            arr_Lower = np.array([-np.inf,-np.inf,0]))
+    return fit_results(eq_onephase, arr_Time, arr_Signal, dic_Fit)
+
+def fit_sigmoidal(arr_Doses, arr_Responses):
+    """
+    Fits sigmoidal dose response curves to all rows at once, without
+    constraints (apart from a positive inflection point), like
+    lib_fittingfunctions.fit_sigmoidal_free.
+
+    The inflection point gets fitted as ln(i) (see eq_logsigmoidal) and
+    steps may not change the sign of the Hill slope. Rows the batched
+    fit does not converge on get fitted one by one with curve_fit (see
+    refit_sigmoidal).
+
+    Arguments:
+        arr_Doses -> 1D or 2D array of floats. Concentrations in Molar,
+                     shared by all rows or one row per dataset.
+        arr_Responses -> 2D array of floats. One dataset per row.
+
+    Returns dictionary of arrays, one row per dataset (see fit_results).
+    Parameters are ytop, ybot, h, i with i in uM, as in fit_sigmoidal_free.
+    """
+    arr_Doses = np.atleast_2d(np.asarray(arr_Doses, dtype = float)) * 1000000
+    arr_Responses = np.atleast_2d(np.asarray(arr_Responses, dtype = float))
+    arr_Guess = guess_sigmoidal(arr_Doses, arr_Responses)
+    arr_LogGuess = arr_Guess.copy()
+    with np.errstate(all = "ignore"):
+        arr_LogGuess[:,3] = np.log(arr_Guess[:,3])
+    dic_Fit = least_squares(eq_logsigmoidal, jac_logsigmoidal, arr_Doses, arr_Responses,
+                            arr_LogGuess, arr_KeepSign = np.array([2]))
+    # Back from ln(i) to i. The covariance changes with the derivative
+    # of i after ln(i), which is i.
+    with np.errstate(all = "ignore"):
+        arr_I = np.exp(dic_Fit["Pars"][:,3])
+        arr_Scale = np.ones_like(dic_Fit["Pars"])
+        arr_Scale[:,3] = arr_I
+        arr_Covar = dic_Fit["Covar"] * arr_Scale[:,:,None] * arr_Scale[:,None,:]
+    dic_Fit["Pars"][:,3] = arr_I
+    # Rows where i or its variance overflowed have failed (and get
+    # refitted below).
+    arr_Overflow = (~np.isfinite(arr_I)
+                    | (np.isfinite(dic_Fit["Covar"]).all(axis = (1,2))
+                       & ~np.isfinite(arr_Covar).all(axis = (1,2))))
+    arr_Covar[arr_Overflow] = np.nan
+    dic_Fit["Pars"][arr_Overflow] = np.nan
+    dic_Fit["Success"][arr_Overflow] = False
+    dic_Fit["Covar"] = arr_Covar
+    refit_sigmoidal(arr_Doses, arr_Responses, arr_Guess, dic_Fit)
+    return fit_results(eq_sigmoidal, arr_Doses, arr_Responses, dic_Fit)
+
+def refit_sigmoidal(arr_Doses, arr_Responses, arr_Guess, dic_Fit):
+    """
+    Fits the rows the batched fit failed on one by one with curve_fit,
+    from the same starting parameters. Changes dic_Fit in place.
+
+    Arguments:
+        arr_Doses -> 2D array of floats. Concentrations in uM, shared by
+                     all rows or one row per dataset.
+        arr_Responses -> 2D array of floats. One dataset per row.
+        arr_Guess -> 2D array of floats. Starting parameters, with i in
+                     uM.
+        dic_Fit -> dictionary. Result of least_squares.
+
+    Returns number of rows fitted with curve_fit.
+    """
+    int_Refitted = 0
+    for row in np.flatnonzero(~dic_Fit["Success"] & (dic_Fit["Points"] >= 4)):
+        arr_X = arr_Doses[0] if arr_Doses.shape[0] == 1 else arr_Doses[row]
+        arr_Mask = np.isfinite(arr_Responses[row]) & np.isfinite(arr_X)
+        if not np.isfinite(arr_Guess[row]).all():
+            continue
+        try:
+            with warnings.catch_warnings(), np.errstate(all = "ignore"):
+                warnings.simplefilter("ignore", OptimizeWarning)
+                arr_Pars, arr_Covar = curve_fit(fs.eq_sigmoidal, arr_X[arr_Mask],
+                                                arr_Responses[row][arr_Mask],
+                                                p0 = arr_Guess[row])
+        except (RuntimeError, ValueError):
+            continue
+        if not np.isfinite(arr_Pars).all() or arr_Pars[3] <= 0:
+            continue
+        dic_Fit["Pars"][row] = arr_Pars
+        dic_Fit["Covar"][row] = arr_Covar
+        dic_Fit["Success"][row] = True
+        int_Refitted += 1
+    return int_Refitted
+
+def fit_DRTC(arr_Doses, arr_Time, arr_Signal, bol_Kinetics = True):
+    """
+    Fits a dose response time course experiment in two batched passes:
+
+        1. One phase association/decay for every trace (every sample,
+           concentration and replicate/well) at once.
+        2. Sigmoidal dose response for every sample at every timepoint at
+           once, giving the (sample x timepoint) IC50 surface.
+
+    Arguments:
+        arr_Doses -> 2D array of floats. Concentrations in Molar, one row
+                     per sample, np.nan padded.
+        arr_Time -> 1D array of floats. Timepoints.
+        arr_Signal -> 3D array of floats. Readings with shape (samples,
+                      concentrations, timepoints), np.nan where missing.
+        bol_Kinetics -> boolean. If False, skips the kinetic fits.
+
+    Returns dictionary:
+        "Kinetics" -> fit_onephase results with one row per
+                      (sample, concentration), or None.
+        "DoseResponse" -> fit_sigmoidal results with one row per
+                          (sample, timepoint).
+        "IC50" -> 2D array (samples x timepoints) of IC50s in Molar.
+    """
+    arr_Doses = np.atleast_2d(np.asarray(arr_Doses, dtype = float))
+    arr_Time = np.asarray(arr_Time, dtype = float).ravel()
+    arr_Signal = np.asarray(arr_Signal, dtype = float)
+    int_Samples, int_Concentrations, int_Timepoints = arr_Signal.shape
+    if bol_Kinetics == True:
+        dic_Kinetics = fit_onephase(arr_Time,
+            arr_Signal.reshape(int_Samples*int_Concentrations, int_Timepoints))
+    else:
+        dic_Kinetics = None
+    # (samples, timepoints, concentrations) -> one dose response per row
+    arr_Responses = arr_Signal.transpose(0,2,1).reshape(int_Samples*int_Timepoints,
+                                                         int_Concentrations)
+    arr_RowDoses = np.repeat(arr_Doses, int_Timepoints, axis = 0)
+    dic_DoseResponse = fit_sigmoidal(arr_RowDoses, arr_Responses)
+    arr_IC50 = dic_DoseResponse["Pars"][:,3].reshape(int_Samples, int_Timepoints) / 1000000
+    return {"Kinetics": dic_Kinetics, "DoseResponse": dic_DoseResponse, "IC50": arr_IC50}
@@ -0,0 +1,353 @@
+"""
+Project catalogue: a local SQLite database in the user's home directory
+that indexes every saved or opened .bbq file by assay, plate IDs, sample
+IDs, dates and summary results, so past projects can be searched without
+extracting their archives.
+
+Replaces bbq_recent.csv. Entries from an existing bbq_recent.csv are
+imported the first time the catalogue is created.
+
+Nothing in here depends on wx.
+
+    Functions
+        catalogue_path
+        connect
+        import_recent_csv
+        text_or_none
+        result_value
+        project_contents
+        touch_project
+        index_project
+        remove_project
+        search_projects
+        catalogue_shorthands
+"""
+
+import os
+import sqlite3
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Columns of the recent files list. Same as the old bbq_recent.csv so
+# the home screen's FileList can take rows as they are.
+lst_RecentColumns = ["FileName","AssayCategory","Shorthand","FullPath","DateTime"]
+
+# Summary results to index per sample: (name in catalogue, column in the
+# "Processed" dataframe, index into the column's value or None if the
+# value is a number already). Columns that a workflow does not have are
+# skipped.
+lst_SummaryResults = [("IC50","NormFitFreePars",3),
+                      ("RawIC50","RawFitPars",3),
+                      ("Tm","NormTm",None),
+                      ("DTm","NormDTm",None),
+                      ("vi","vi",None)]
+
+str_Schema = """
+CREATE TABLE IF NOT EXISTS projects (
+    FullPath TEXT PRIMARY KEY,
+    FileName TEXT,
+    AssayCategory TEXT,
+    Shorthand TEXT,
+    AssayType TEXT,
+    ELN TEXT,
+    AssayDate TEXT,
+    Saved TEXT,
+    DateTime TEXT);
+CREATE TABLE IF NOT EXISTS plates (
+    FullPath TEXT REFERENCES projects(FullPath) ON DELETE CASCADE,
+    Destination TEXT,
+    PlateID TEXT);
+CREATE TABLE IF NOT EXISTS samples (
+    FullPath TEXT REFERENCES projects(FullPath) ON DELETE CASCADE,
+    Destination TEXT,
+    SampleID TEXT);
+CREATE TABLE IF NOT EXISTS results (
+    FullPath TEXT REFERENCES projects(FullPath) ON DELETE CASCADE,
+    Destination TEXT,
+    SampleID TEXT,
+    Result TEXT,
+    Value REAL);
+CREATE INDEX IF NOT EXISTS idx_projects_datetime ON projects(DateTime);
+CREATE INDEX IF NOT EXISTS idx_plates_path ON plates(FullPath);
+CREATE INDEX IF NOT EXISTS idx_plates_plateid ON plates(PlateID);
+CREATE INDEX IF NOT EXISTS idx_samples_path ON samples(FullPath);
+CREATE INDEX IF NOT EXISTS idx_samples_sampleid ON samples(SampleID);
+CREATE INDEX IF NOT EXISTS idx_results_path ON results(FullPath);
+CREATE INDEX IF NOT EXISTS idx_results_sampleid ON results(SampleID);
+"""
+
+def catalogue_path():
+    """
+    Returns the path of the catalogue database in the user's home
+    directory.
+    """
+    return os.path.join(Path.home(),"bbq_catalogue.db")
+
+def connect(str_Path = None):
+    """
+    Opens the catalogue and creates the tables if they do not exist yet.
+    A new catalogue gets populated from bbq_recent.csv, if there is one
+    next to it.
+
+    Arguments:
+        str_Path -> string. Path of the database file. Defaults to
+                    catalogue_path(). Use ":memory:" for a throwaway
+                    catalogue.
+
+    Returns sqlite3 connection.
+    """
+    if str_Path is None:
+        str_Path = catalogue_path()
+    conn = sqlite3.connect(str_Path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    bol_New = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                           + "AND name = 'projects'").fetchone() is None
+    conn.executescript(str_Schema)
+    if bol_New == True and not str_Path == ":memory:":
+        import_recent_csv(conn, os.path.join(os.path.dirname(os.path.abspath(str_Path)),
+                                             "bbq_recent.csv"))
+    return conn
+
+def import_recent_csv(conn, str_RecentPath):
+    """
+    Copies the entries of an old style recent files list into the
+    catalogue. The csv file itself is left alone.
+
+    Arguments:
+        conn -> sqlite3 connection to the catalogue.
+        str_RecentPath -> string. Path of bbq_recent.csv
+
+    Returns number of imported entries.
+    """
+    if not os.path.isfile(str_RecentPath):
+        return 0
+    try:
+        dfr_Recent = pd.read_csv(str_RecentPath, sep=",", header=0,
+                                 index_col=0, engine="python")
+    except:
+        return 0
+    int_Imported = 0
+    for idx in dfr_Recent.index:
+        if pd.isna(dfr_Recent.loc[idx,"FullPath"]) == True:
+            continue
+        touch_project(conn, str(dfr_Recent.loc[idx,"FullPath"]),
+                      str(dfr_Recent.loc[idx,"FileName"]),
+                      text_or_none(dfr_Recent.loc[idx,"AssayCategory"]),
+                      text_or_none(dfr_Recent.loc[idx,"Shorthand"]),
+                      text_or_none(dfr_Recent.loc[idx,"DateTime"]))
+        int_Imported += 1
+    return int_Imported
+
+def text_or_none(value):
+    """
+    Returns value as string, or None for empty values (NaN, None, "").
+    """
+    if value is None:
+        return None
+    if not type(value) == str and pd.isna(value) == True:
+        return None
+    value = str(value)
+    if value == "":
+        return None
+    return value
+
+def result_value(value, index):
+    """
+    Pulls a single number out of a "Processed" dataframe cell.
+
+    Arguments:
+        value -> cell content. Number or list/array of fit parameters.
+        index -> int or None. Position of the number if value is a
+                 list/array.
+
+    Returns float or None if there is no finite number.
+    """
+    try:
+        if not index is None:
+            value = value[index]
+        value = float(value)
+    except:
+        return None
+    if not np.isfinite(value):
+        return None
+    return value
+
+def project_contents(assay_data):
+    """
+    Collects what gets indexed from a project's assay data: plate
+    (destination) names and IDs, sample IDs per plate and the summary
+    results listed in lst_SummaryResults.
+
+    Arguments:
+        assay_data -> pandas dataframe. One row per plate with (at least)
+                      "Destination" and "Processed" columns.
+
+    Returns three lists of tuples:
+        plates -> (Destination, PlateID)
+        samples -> (Destination, SampleID)
+        results -> (Destination, SampleID, Result, Value)
+    """
+    lst_Plates = []
+    lst_Samples = []
+    lst_Results = []
+    if not type(assay_data) == pd.DataFrame:
+        return lst_Plates, lst_Samples, lst_Results
+    for plate in assay_data.index:
+        if "Destination" in assay_data.columns:
+            str_Destination = text_or_none(assay_data.loc[plate,"Destination"])
+        else:
+            str_Destination = None
+        if "PlateID" in assay_data.columns:
+            str_PlateID = text_or_none(assay_data.loc[plate,"PlateID"])
+        else:
+            str_PlateID = None
+        lst_Plates.append((str_Destination, str_PlateID))
+        if not "Processed" in assay_data.columns:
+            continue
+        dfr_Processed = assay_data.loc[plate,"Processed"]
+        if not type(dfr_Processed) == pd.DataFrame or not "SampleID" in dfr_Processed.columns:
+            continue
+        lst_Present = [result for result in lst_SummaryResults
+                       if result[1] in dfr_Processed.columns]
+        for smpl in dfr_Processed.index:
+            str_SampleID = text_or_none(dfr_Processed.loc[smpl,"SampleID"])
+            if str_SampleID is None:
+                continue
+            lst_Samples.append((str_Destination, str_SampleID))
+            for name, column, index in lst_Present:
+                flt_Value = result_value(dfr_Processed.loc[smpl,column], index)
+                if not flt_Value is None:
+                    lst_Results.append((str_Destination, str_SampleID, name, flt_Value))
+    # Samples can occur more than once per plate (e.g. DSF replicates)
+    lst_Samples = list(dict.fromkeys(lst_Samples))
+    return lst_Plates, lst_Samples, lst_Results
+
+def touch_project(conn, str_FilePath, str_FileName, str_AssayCategory,
+                  str_Shorthand, str_DateTime = None):
+    """
+    Adds a project to the catalogue or, if it is there already, updates
+    the time it was last used. Indexed contents are left as they are.
+
+    Arguments:
+        conn -> sqlite3 connection to the catalogue.
+        str_FilePath -> string. Complete path to the file.
+        str_FileName -> string. File name to be displayed.
+        str_AssayCategory -> string. Long form assay category.
+        str_Shorthand -> string. Shorthand code for the assay.
+        str_DateTime -> string. Time stamp. Defaults to now.
+    """
+    if str_DateTime is None:
+        str_DateTime = str(datetime.datetime.now())
+    with conn:
+        conn.execute("INSERT INTO projects (FullPath, FileName, AssayCategory, Shorthand, DateTime) "
+                     + "VALUES (?, ?, ?, ?, ?) ON CONFLICT(FullPath) DO UPDATE SET "
+                     + "FileName = excluded.FileName, AssayCategory = excluded.AssayCategory, "
+                     + "Shorthand = excluded.Shorthand, DateTime = excluded.DateTime",
+                     (str_FilePath, str_FileName, str_AssayCategory, str_Shorthand, str_DateTime))
+
+def index_project(conn, str_FilePath, str_FileName, details, assay_data, bol_Saved = True):
+    """
+    Writes a project's details and contents into the catalogue. Anything
+    indexed for this file before gets replaced.
+
+    Arguments:
+        conn -> sqlite3 connection to the catalogue.
+        str_FilePath -> string. Complete path to the file.
+        str_FileName -> string. File name to be displayed.
+        details -> dictionary. Meta data of experiment.
+        assay_data -> pandas dataframe holding all assay data.
+        bol_Saved -> boolean. False if the project was opened rather
+                     than saved. Keeps the previous save time.
+    """
+    str_Now = str(datetime.datetime.now())
+    if bol_Saved == True:
+        str_Saved = str_Now
+    else:
+        str_Saved = None
+    lst_Plates, lst_Samples, lst_Results = project_contents(assay_data)
+    with conn:
+        conn.execute("INSERT INTO projects (FullPath, FileName, AssayCategory, Shorthand, "
+                     + "AssayType, ELN, AssayDate, Saved, DateTime) "
+                     + "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(FullPath) DO UPDATE SET "
+                     + "FileName = excluded.FileName, AssayCategory = excluded.AssayCategory, "
+                     + "Shorthand = excluded.Shorthand, AssayType = excluded.AssayType, "
+                     + "ELN = excluded.ELN, AssayDate = excluded.AssayDate, "
+                     + "Saved = COALESCE(excluded.Saved, projects.Saved), DateTime = excluded.DateTime",
+                     (str_FilePath, str_FileName,
+                      text_or_none(details.get("AssayCategory")),
+                      text_or_none(details.get("Shorthand")),
+                      text_or_none(details.get("AssayType")),
+                      text_or_none(details.get("ELN")),
+                      text_or_none(details.get("Date")),
+                      str_Saved, str_Now))
+        for table in ["plates","samples","results"]:
+            conn.execute(f"DELETE FROM {table} WHERE FullPath = ?", (str_FilePath,))
+        conn.executemany("INSERT INTO plates VALUES (?, ?, ?)",
+                         [(str_FilePath,) + plate for plate in lst_Plates])
+        conn.executemany("INSERT INTO samples VALUES (?, ?, ?)",
+                         [(str_FilePath,) + sample for sample in lst_Samples])
+        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?)",
+                         [(str_FilePath,) + result for result in lst_Results])
+
+def remove_project(conn, str_FilePath):
+    """
+    Removes a project and everything indexed for it from the catalogue.
+
+    Arguments:
+        conn -> sqlite3 connection to the catalogue.
+        str_FilePath -> string. Complete path to the file.
+    """
+    with conn:
+        conn.execute("DELETE FROM projects WHERE FullPath = ?", (str_FilePath,))
+
+def search_projects(conn, str_Search = "", str_Shorthand = None, int_Limit = None):
+    """
+    Finds projects in the catalogue, most recently used first.
+
+    Every word of the search text has to match (case insensitive, as part
+    of the text) at least one of: file name, ELN page, assay date, assay
+    type, destination plate name, plate ID or sample ID.
+
+    Arguments:
+        conn -> sqlite3 connection to the catalogue.
+        str_Search -> string. Search text. Empty string matches all.
+        str_Shorthand -> string. Only return projects of this assay.
+                         None returns all assays.
+        int_Limit -> integer. Maximum number of projects to return.
+
+    Returns pandas dataframe with columns as lst_RecentColumns.
+    """
+    lst_Where = []
+    lst_Parameters = []
+    for word in str_Search.split():
+        str_Like = "%" + word.replace("\\","\\\\").replace("%","\\%").replace("_","\\_") + "%"
+        lst_Where.append("(p.FileName LIKE ? ESCAPE '\\' OR p.ELN LIKE ? ESCAPE '\\' "
+                         + "OR p.AssayDate LIKE ? ESCAPE '\\' OR p.AssayType LIKE ? ESCAPE '\\' "
+                         + "OR EXISTS (SELECT 1 FROM plates AS pl WHERE pl.FullPath = p.FullPath "
+                         + "AND (pl.Destination LIKE ? ESCAPE '\\' OR pl.PlateID LIKE ? ESCAPE '\\')) "
+                         + "OR EXISTS (SELECT 1 FROM samples AS s WHERE s.FullPath = p.FullPath "
+                         + "AND s.SampleID LIKE ? ESCAPE '\\'))")
+        lst_Parameters.extend([str_Like] * 7)
+    if not str_Shorthand is None:
+        lst_Where.append("p.Shorthand = ?")
+        lst_Parameters.append(str_Shorthand)
+    str_Query = "SELECT " + ", ".join(["p." + column for column in lst_RecentColumns]) + " FROM projects AS p"
+    if len(lst_Where) > 0:
+        str_Query += " WHERE " + " AND ".join(lst_Where)
+    str_Query += " ORDER BY p.DateTime DESC"
+    if not int_Limit is None:
+        str_Query += " LIMIT ?"
+        lst_Parameters.append(int(int_Limit))
+    return pd.DataFrame(conn.execute(str_Query, lst_Parameters).fetchall(),
+                        columns = lst_RecentColumns)
+
+def catalogue_shorthands(conn):
+    """
+    Returns sorted list of the assay shorthands that occur in the
+    catalogue.
+    """
+    return [row[0] for row in conn.execute("SELECT DISTINCT Shorthand FROM projects "
+                                           + "WHERE Shorthand IS NOT NULL ORDER BY Shorthand")]
@@ -0,0 +1,217 @@
+"""
+Checkpoints for processing runs.
+
+complete_container processes one plate after the other. As each plate is
+finished, its row of the container (parsed raw data, samples, layout,
+references and processed data) gets written to a checkpoint file in a run
+directory. If the run is interrupted (an exception in a reader, a crash,
+a closed laptop), starting it again picks up the finished plates from
+their checkpoints and only processes the rest.
+
+A checkpoint is only used if it was written for exactly the same inputs:
+its key is a hash (see lib_journal.fingerprint) of
+    - the processing settings: assay details that affect processing,
+      processed transfer file, layout, raw data rules and exceptions,
+    - the plate's entry in the transfer file, data file and plate format,
+    - the contents of the plate's raw data file(s).
+Changing any of them means the plate gets processed again. Checkpoints
+are written to a temporary file first and renamed into place, so a
+checkpoint is either complete or not there.
+
+Checkpoints are numpy .npz archives: the row gets written as JSON (see
+lib_journal.encode), numeric arrays in it as arrays of their own. They
+are read with allow_pickle=False, so loading a checkpoint cannot run any
+code.
+
+Run directories that have not been used for KEEPDAYS days get deleted.
+
+Nothing in here depends on wx.
+
+    Classes
+        Checkpoints
+
+    Functions
+        run_key
+        plate_key
+        input_files
+        file_hash
+        prune
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from time import time
+
+import numpy as np
+
+import lib_journal as jnl
+import lib_tracing as trace
+
+# Parent directory of the run directories
+RUNDIRECTORY = os.path.join(os.path.expanduser("~"), "bbqruns")
+# Days after which unused run directories get deleted
+KEEPDAYS = 14
+# Change when the contents of the container change, so that older
+# checkpoints are not used
+VERSION = 2
+# Assay details that change how plates get processed
+lst_Settings = ["AssayType","AssayCategory","AssayVolume","SampleSource","Device"]
+
+# (path, size, modification time) -> hash, so files only get read once
+# per session
+dic_FileHashes = {}
+
+def run_key(ProjectTab):
+    """
+    Returns hash of the processing settings of a project.
+    """
+    details = ProjectTab.details
+    return jnl.fingerprint([VERSION,
+                            [(key, details.get(key)) for key in lst_Settings],
+                            ProjectTab.dfr_TransferFile,
+                            ProjectTab.dfr_Layout,
+                            ProjectTab.rawdata_rules,
+                            ProjectTab.dfr_Exceptions])
+
+def plate_key(str_RunKey, data_path, plate, plate_assignment):
+    """
+    Returns hash of everything that goes into processing a plate.
+
+    Arguments:
+        str_RunKey -> string. See run_key.
+        data_path -> string. Data directory or file of the project.
+        plate -> index of the plate in plate_assignment.
+        plate_assignment -> pandas dataframe with columns TransferEntry,
+                            DataFile and Wells.
+    """
+    datafile = plate_assignment.loc[plate,"DataFile"]
+    return jnl.fingerprint([str_RunKey,
+                            plate,
+                            str(plate_assignment.loc[plate,"TransferEntry"]),
+                            str(datafile),
+                            str(plate_assignment.loc[plate,"Wells"]),
+                            [file_hash(str_Path) for str_Path in input_files(data_path, datafile)]])
+
+def input_files(data_path, datafile):
+    """
+    Returns sorted list of the files a reader could read for a plate. The
+    readers put data directory and file together in different ways and
+    some get the data file as data_path itself.
+    """
+    dic_Files = {}
+    for str_Path in [os.path.join(str(data_path), str(datafile)),
+                     str(data_path) + chr(92) + str(datafile),
+                     str(data_path) + str(datafile),
+                     str(data_path)]:
+        if os.path.isfile(str_Path):
+            dic_Files[os.path.normcase(os.path.abspath(str_Path))] = str_Path
+    return [dic_Files[key] for key in sorted(dic_Files.keys())]
+
+def file_hash(str_Path):
+    """
+    Returns hash of the contents of a file.
+    """
+    stat = os.stat(str_Path)
+    tpl_Key = (os.path.abspath(str_Path), stat.st_size, stat.st_mtime)
+    if not tpl_Key in dic_FileHashes:
+        obj_Hash = hashlib.blake2b(digest_size = 16)
+        with open(str_Path, "rb") as file:
+            for bytes_Chunk in iter(lambda: file.read(1024 * 1024), b""):
+                obj_Hash.update(bytes_Chunk)
+        dic_FileHashes[tpl_Key] = obj_Hash.hexdigest()
+    return dic_FileHashes[tpl_Key]
+
+def prune(str_Directory = RUNDIRECTORY, int_Days = KEEPDAYS):
+    """
+    Deletes run directories that have not been changed for int_Days
+    days.
+    """
+    if not os.path.isdir(str_Directory):
+        return
+    flt_Oldest = time() - int_Days * 24 * 60 * 60
+    for str_Run in os.listdir(str_Directory):
+        str_Path = os.path.join(str_Directory, str_Run)
+        try:
+            if os.path.isdir(str_Path) and os.path.getmtime(str_Path) < flt_Oldest:
+                shutil.rmtree(str_Path)
+        except OSError:
+            continue
+
+class Checkpoints:
+    """
+    Per-plate checkpoints of one processing run.
+
+        checkpoints = Checkpoints(run_key(ProjectTab))
+        dic_Row = checkpoints.load(str_PlateKey)   # None if not there
+        ...
+        checkpoints.save(str_PlateKey, dic_Row)
+
+    Methods:
+        path
+        load
+        save
+    """
+
+    def __init__(self, str_RunKey, str_Directory = RUNDIRECTORY):
+        """
+        Arguments:
+            str_RunKey -> string. See run_key.
+            str_Directory -> string. Parent directory of the run
+                             directories.
+        """
+        self.str_Directory = os.path.join(str_Directory, str_RunKey)
+
+    def path(self, str_PlateKey):
+        """
+        Returns path of the checkpoint of a plate.
+        """
+        return os.path.join(self.str_Directory, str_PlateKey + ".checkpoint")
+
+    def load(self, str_PlateKey):
+        """
+        Returns the container row (dictionary of column -> value) saved
+        for the plate, or None if there is no usable checkpoint.
+        """
+        try:
+            with np.load(self.path(str_PlateKey), allow_pickle = False) as npz_Checkpoint:
+                dic_Checkpoint = json.loads(str(npz_Checkpoint["Checkpoint"]))
+                if not dic_Checkpoint.get("Key") == str_PlateKey or not dic_Checkpoint.get("Version") == VERSION:
+                    return None
+                lst_Arrays = [npz_Checkpoint[f"Array{idx}"] for idx in range(dic_Checkpoint["Arrays"])]
+            dic_Row = jnl.decode(dic_Checkpoint["Row"], lst_Arrays)
+        except Exception:
+            # Missing, or written by a different version of the program
+            return None
+        # Mark the run as used, see prune
+        os.utime(self.str_Directory)
+        return dic_Row
+
+    def save(self, str_PlateKey, dic_Row):
+        """
+        Writes the checkpoint of a plate. Failing to write a checkpoint
+        does not stop processing.
+
+        Returns True if the checkpoint was written.
+        """
+        try:
+            lst_Arrays = []
+            str_Checkpoint = json.dumps({"Key":str_PlateKey, "Version":VERSION,
+                                         "Row":jnl.encode(dic_Row, lst_Arrays),
+                                         "Arrays":len(lst_Arrays)})
+            os.makedirs(self.str_Directory, exist_ok = True)
+            int_Handle, str_Temp = tempfile.mkstemp(suffix = ".part", dir = self.str_Directory)
+            with os.fdopen(int_Handle, "wb") as file:
+                np.savez(file, Checkpoint = np.array(str_Checkpoint),
+                         **{f"Array{idx}":arr for idx, arr in enumerate(lst_Arrays)})
+            os.replace(str_Temp, self.path(str_PlateKey))
+        except Exception as error:
+            trace.event("checkpoint not written", "checkpoint", error = str(error))
+            try:
+                os.remove(str_Temp)
+            except Exception:
+                pass
+            return False
+        return True
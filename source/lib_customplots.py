@@ -11,6 +11,8 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib.figure import Figure
 from matplotlib.backend_bases import MouseButton
 from matplotlib import patches
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 
 # Import for copying to clipboard
 from PIL import Image
@@ -48,7 +50,13 @@ class CurvePlotPanel(wx.Panel):
         it an interactive plot, namely
         
         Methods
+            create_artists
             draw
+            set_errorbars
+            log_limits
+            linear_limits
+            dynamic_artists
+            refresh
             destroy_tooltip
             on_right_click
             on_mouse_move
@@ -71,13 +79,64 @@ class CurvePlotPanel(wx.Panel):
         self.SetSizer(self.szr_Surround)
         self.Fit()
         self.axes = self.figure.add_subplot()
+        self.figure.subplots_adjust(left=0.11, right=0.99,
+                                    top=self.Top , bottom=self.Bottom)
         self.Confidence = False
         self.data = None
         self.plate = None
         self.sample = None
         self.SummaryPlot = summaryplot
         self.outside_warning = True
+        self.normalised = True
         self.figure.set_facecolor(cs.BgUltraLightHex)
+        self.create_artists()
+        # Bind/connect events once. Connecting them on every draw would
+        # add another copy of each handler each time a sample is shown.
+        self.canvas.mpl_connect("pick_event", self.on_pick)
+        self.canvas.mpl_connect("button_press_event", self.on_right_click)
+        self.canvas.mpl_connect("motion_notify_event", self.on_mouse_move)
+        self.canvas.mpl_connect("axes_leave_event", self.destroy_tooltip)
+        self.canvas.mpl_connect("figure_leave_event", self.destroy_tooltip)
+        self.Bind(wx.EVT_KILL_FOCUS, self.destroy_tooltip)
+
+    def create_artists(self):
+        """
+        Creates all artists of the plot once. Subsequent calls of draw
+        only update their data, so browsing through samples does not
+        rebuild the axes each time.
+        """
+        self.axes.set_xscale("log")
+        self.axes.set_autoscale_on(False)
+        self.axes.set_xlabel("Concentration (" + chr(181) +"M)")
+        self.dic_ErrorBars = {}
+        for series in ["Data","Excluded"]:
+            bars = LineCollection([], colors=cs.TMBlue_Hex, linewidths=0.3)
+            self.axes.add_collection(bars, autolim=False)
+            caps = Line2D([], [], linestyle="none", marker="_",
+                          markersize=4, color=cs.TMBlue_Hex)
+            self.axes.add_line(caps)
+            self.dic_ErrorBars[series] = (bars, caps)
+        self.dic_Scatter = {"Data":self.axes.scatter([], [], marker="o",
+                                label="Data", color=cs.TMBlue_Hex, picker=5),
+                            "Excluded":self.axes.scatter([], [], marker="o",
+                                label="Excluded", color=cs.WhiteHex, picker=5,
+                                edgecolors=cs.TMBlue_Hex, linewidths=0.8)}
+        self.FitLine = self.axes.plot([], [], label="Fit", color=cs.TMRose_Hex)[0]
+        self.FitError = None
+        self.lst_NormLines = [self.axes.axhline(y=0, xmin=0, xmax=1, linestyle="--",
+                                                color="grey", linewidth=0.5), # horizontal line at y=0
+                              self.axes.axhline(y=100, xmin=0, xmax=1, linestyle="--",
+                                                color="grey", linewidth=0.5)] # horizontal line at y=100
+        # these are matplotlib.patch.Patch properties
+        props = dict(boxstyle='square', facecolor='wheat', alpha=0.5)
+        # place a text box in upper left in axes coords
+        self.OutsideNote = self.axes.text(0.05, 0.95, "",
+                                          transform=self.axes.transAxes,
+                                          fontsize=12,
+                                          verticalalignment='top',
+                                          bbox=props, visible=False)
+        self.Background = None
+        self.BackgroundKey = None
 
     def draw(self,virtualonly=False):
         """
@@ -91,10 +150,6 @@ class CurvePlotPanel(wx.Panel):
         self.SampleID = self.data["SampleID"]
         # Convert dose to micromoles
         self.dose = df.moles_to_micromoles(self.data["Concentrations"])
-        self.figure.clear() # clear and re-draw function
-        self.axes = self.figure.add_subplot()
-        self.figure.subplots_adjust(left=0.11, right=0.99,
-                                    top=self.Top , bottom=self.Bottom)
         # Actual Plot
         if self.data["Show"] == 0:
             str_Show = "Raw"
@@ -110,61 +165,62 @@ class CurvePlotPanel(wx.Panel):
         # numpy version (date:2022-05-04)!
         plotting  = self.include_exclude(str_Show)
         self.dic_Doses = {"Data":plotting["dose_incl"],"Excluded":plotting["dose_excl"]}
-        if len(plotting["dose_incl"]) > 0:
-            self.axes.errorbar(plotting["dose_incl"], plotting["resp_incl"],
-                             yerr=plotting["sem_incl"], fmt="none",
-                             color=cs.TMBlue_Hex, elinewidth=0.3, capsize=2)
-            self.axes.scatter(plotting["dose_incl"], plotting["resp_incl"],
-                            marker="o", label="Data",
-                            color=cs.TMBlue_Hex, picker=5)
-        if len(plotting["dose_excl"]) > 0:
-            self.axes.errorbar(plotting["dose_excl"], plotting["resp_excl"],
-                             yerr=plotting["sem_excl"], fmt="none",
-                             color=cs.TMBlue_Hex, elinewidth=0.3, capsize=2)
-            self.axes.scatter(plotting["dose_excl"], plotting["resp_excl"],
-                            marker="o", label="Excluded",
-                            color=cs.WhiteHex, picker=5, edgecolors=cs.TMBlue_Hex,
-                            linewidths=0.8)
+        lst_YValues = []
+        lst_Handles = []
+        for series, suffix in [("Data","incl"),("Excluded","excl")]:
+            arr_Dose = np.asarray(plotting["dose_"+suffix], dtype=float)
+            arr_Resp = np.asarray(plotting["resp_"+suffix], dtype=float)
+            arr_SEM = np.nan_to_num(np.asarray(plotting["sem_"+suffix], dtype=float))
+            self.set_errorbars(series, arr_Dose, arr_Resp, arr_SEM)
+            self.dic_Scatter[series].set_offsets(np.column_stack((arr_Dose, arr_Resp)))
+            if len(arr_Dose) > 0:
+                lst_Handles.append(self.dic_Scatter[series])
+                lst_YValues.extend([arr_Resp - arr_SEM, arr_Resp + arr_SEM])
+        if not self.FitError is None:
+            self.FitError.remove()
+            self.FitError = None
         if self.data["DoFit"+str_Fit] == True:
-            self.axes.plot(self.dose, self.data[str_Show+"Fit"+str_Fit],
-                         label="Fit", color=cs.TMRose_Hex)
+            self.FitLine.set_data(self.dose, self.data[str_Show+"Fit"+str_Fit])
+            self.FitLine.set_visible(True)
+            lst_Handles.append(self.FitLine)
+            lst_YValues.append(np.asarray(self.data[str_Show+"Fit"+str_Fit], dtype=float))
             if self.Confidence == True:
                 upper, lower = ff.draw_sigmoidal_fit_error(self.data["Concentrations"],
                     self.data[str_Show+"Fit"+str_Fit+"Pars"],
                     self.data[str_Show+"Fit"+str_Fit+"CI"]) # Plot 95%CI of fit
-                self.axes.fill_between(self.dose, upper, lower, color="red", alpha=0.15)
+                self.FitError = self.axes.fill_between(self.dose, upper, lower, color="red", alpha=0.15)
+                lst_YValues.extend([np.asarray(upper, dtype=float), np.asarray(lower, dtype=float)])
+        else:
+            self.FitLine.set_data([], [])
+            self.FitLine.set_visible(False)
         self.axes.set_title(self.SampleID)
-        self.axes.set_xlabel("Concentration (" + chr(181) +"M)")
-        self.axes.set_xscale("log")
+        self.axes.set_xlim(self.log_limits(self.dose))
         # Set Y axis label and scale according to what's being displayed
         if str_Show == "Norm":
             self.normalised = True
             self.axes.set_ylabel("Per-cent inhibition")
             self.axes.set_ylim([-20,120])
-            self.axes.axhline(y=0, xmin=0, xmax=1, linestyle="--", color="grey", linewidth=0.5) # horizontal line at y=0
-            self.axes.axhline(y=100, xmin=0, xmax=1, linestyle="--", color="grey", linewidth=0.5) # horizontal line at y=100
             self.axes.ticklabel_format(axis="y", style="plain")
+            outside = 0
             if self.outside_warning == True:
                 outside = self.points_outside(120, 20)
-                if outside > 0:
-                    # these are matplotlib.patch.Patch properties
-                    props = dict(boxstyle='square', facecolor='wheat', alpha=0.5)
-                    # place a text box in upper left in axes coords
-                    if outside > 1:
-                        note = str(outside) + u" datapoints lie outside boundaries."
-                    else:
-                        note = u"1 datapoint lies outside boundaries."
-                    self.axes.text(0.05, 0.95,
-                                   note,
-                                   transform=self.axes.transAxes,
-                                   fontsize=12,
-                                   verticalalignment='top',
-                                   bbox=props)
+            if outside > 1:
+                self.OutsideNote.set_text(str(outside) + u" datapoints lie outside boundaries.")
+            elif outside == 1:
+                self.OutsideNote.set_text(u"1 datapoint lies outside boundaries.")
+            self.OutsideNote.set_visible(outside > 0)
         else:
             self.normalised = False
             self.axes.set_ylabel("Signal in AU")
+            self.axes.set_ylim(self.linear_limits(lst_YValues))
             self.axes.ticklabel_format(axis="y", style="scientific", scilimits=(-1,1))
-        self.axes.legend()
+            self.OutsideNote.set_visible(False)
+        for line in self.lst_NormLines:
+            line.set_visible(self.normalised)
+        if len(lst_Handles) > 0:
+            self.axes.legend(handles=lst_Handles)
+        elif not self.axes.get_legend() is None:
+            self.axes.get_legend().remove()
         # Test if the summary graph needs to be redrawn, too.
         # Does not apply if the plot is just used virtually for exporting of image file
         if virtualonly == False:
@@ -181,15 +237,112 @@ class CurvePlotPanel(wx.Panel):
                     self.tabname.plt_MultiPlot.Normalised = self.tabname.MultiPlotNormalised()
                     self.tabname.plt_MultiPlot.draw()
                     break
-            # Bind/connect events
-            self.canvas.mpl_connect("pick_event", self.on_pick)
-            self.canvas.mpl_connect("button_press_event", self.on_right_click)
-            self.canvas.mpl_connect("motion_notify_event", self.on_mouse_move)
-            self.canvas.mpl_connect("axes_leave_event", self.destroy_tooltip)
-            self.canvas.mpl_connect("figure_leave_event", self.destroy_tooltip)
-            self.Bind(wx.EVT_KILL_FOCUS, self.destroy_tooltip)
-        # Draw the plot!
-        self.canvas.draw()
+            # Draw the plot!
+            self.refresh()
+        # Plots used for exporting get rendered in full by savefig or
+        # shared_plot_to_clipboard, nothing to do here.
+
+    def set_errorbars(self, series, arr_Dose, arr_Resp, arr_SEM):
+        """
+        Updates the error bars of one series in place.
+
+        Arguments:
+            series -> string. "Data" or "Excluded"
+            arr_Dose -> numpy array. Doses in micromoles.
+            arr_Resp -> numpy array. Responses.
+            arr_SEM -> numpy array. Standard errors of the responses.
+        """
+        bars, caps = self.dic_ErrorBars[series]
+        arr_Lower = arr_Resp - arr_SEM
+        arr_Upper = arr_Resp + arr_SEM
+        bars.set_segments(np.stack((np.column_stack((arr_Dose, arr_Lower)),
+                                    np.column_stack((arr_Dose, arr_Upper))), axis=1))
+        caps.set_data(np.concatenate((arr_Dose, arr_Dose)),
+                      np.concatenate((arr_Lower, arr_Upper)))
+
+    def log_limits(self, dose):
+        """
+        Returns x axis limits for the log scaled concentration axis with
+        the same 5% margin matplotlib's autoscaling would give.
+
+        Arguments:
+            dose -> list or array of doses in micromoles.
+        """
+        arr_Dose = np.asarray(dose, dtype=float)
+        arr_Dose = np.log10(arr_Dose[np.isfinite(arr_Dose) & (arr_Dose > 0)])
+        if len(arr_Dose) == 0:
+            return (0.1, 10)
+        flt_Min, flt_Max = arr_Dose.min(), arr_Dose.max()
+        flt_Margin = (flt_Max - flt_Min) * 0.05 if flt_Max > flt_Min else 0.5
+        return (10**(flt_Min - flt_Margin), 10**(flt_Max + flt_Margin))
+
+    def linear_limits(self, lst_Values):
+        """
+        Returns y axis limits covering all values with the same 5% margin
+        matplotlib's autoscaling would give.
+
+        Arguments:
+            lst_Values -> list of arrays with the values on the plot.
+        """
+        if len(lst_Values) > 0:
+            arr_Values = np.concatenate([np.ravel(values) for values in lst_Values])
+            arr_Values = arr_Values[np.isfinite(arr_Values)]
+        else:
+            arr_Values = np.array([])
+        if len(arr_Values) == 0:
+            return (0, 1)
+        flt_Min, flt_Max = arr_Values.min(), arr_Values.max()
+        if flt_Max > flt_Min:
+            flt_Margin = (flt_Max - flt_Min) * 0.05
+        else:
+            flt_Margin = abs(flt_Max) * 0.05 if not flt_Max == 0 else 1
+        return (flt_Min - flt_Margin, flt_Max + flt_Margin)
+
+    def dynamic_artists(self):
+        """
+        Returns the artists that change from one sample to the next.
+        Everything else (axes, ticks, labels, lines at 0 and 100) is
+        part of the cached background.
+        """
+        lst_Artists = []
+        for series in ["Data","Excluded"]:
+            lst_Artists.extend(self.dic_ErrorBars[series])
+        lst_Artists.extend([self.dic_Scatter["Data"], self.dic_Scatter["Excluded"]])
+        if not self.FitError is None:
+            lst_Artists.append(self.FitError)
+        lst_Artists.extend([self.FitLine, self.axes.title, self.OutsideNote])
+        if not self.axes.get_legend() is None:
+            lst_Artists.append(self.axes.get_legend())
+        return lst_Artists
+
+    def refresh(self):
+        """
+        Puts the current state of the artists on screen.
+
+        If axis limits, labels and canvas size are the same as for the
+        previous sample, the cached background gets restored and only
+        the changed artists get drawn on top of it (blitting). Otherwise
+        the whole figure is drawn once without them to make a new
+        background.
+        """
+        lst_Artists = self.dynamic_artists()
+        key = (self.axes.get_xlim(), self.axes.get_ylim(), self.normalised,
+               self.canvas.get_width_height(), self.figure.get_facecolor())
+        if self.Background is None or not key == self.BackgroundKey:
+            lst_Visible = [artist.get_visible() for artist in lst_Artists]
+            for artist in lst_Artists:
+                artist.set_visible(False)
+            self.canvas.draw()
+            self.Background = self.canvas.copy_from_bbox(self.figure.bbox)
+            self.BackgroundKey = key
+            for artist, visible in zip(lst_Artists, lst_Visible):
+                artist.set_visible(visible)
+        else:
+            self.canvas.restore_region(self.Background)
+        for artist in lst_Artists:
+            if artist.get_visible() == True:
+                self.axes.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
 
     def destroy_tooltip(self, event):
         """
@@ -924,6 +1077,177 @@ class ScatterPlotPanel(wx.Panel):
 ##                                                              ##
 ##################################################################
 
+class TraceRenderer:
+    """
+    Draws any number of traces that share one x axis as a single
+    LineCollection on an existing axes.
+
+    Each trace is decimated to the pixel width of the axes with
+    lttb_indices, and again for the visible range whenever the x limits
+    change. Showing/hiding and highlighting traces only updates the
+    colours and line widths of the collection, nothing gets re-plotted.
+
+    Methods:
+        set_data
+        set_display
+        highlight
+        decimate
+        update_styles
+        autoscale
+        legend_handles
+        on_xlim_changed
+    """
+
+    def __init__(self, axes, linewidth = 0.5, highlightwidth = 2, fade = 0.2):
+        """
+        Arguments:
+            axes -> matplotlib axes to draw on.
+            linewidth -> float. Line width of the traces.
+            highlightwidth -> float. Line width of the highlighted trace.
+            fade -> float. Alpha of traces that are not highlighted while
+                    another trace is.
+        """
+        self.axes = axes
+        self.linewidth = linewidth
+        self.highlightwidth = highlightwidth
+        self.fade = fade
+        self.collection = LineCollection([])
+        self.axes.add_collection(self.collection, autolim=False)
+        self.X = np.array([])
+        self.Y = np.empty((0,0))
+        self.Keys = []
+        self.Labels = []
+        self.Colours = np.empty((0,4))
+        self.Display = np.array([], dtype=bool)
+        self.Highlight = None
+        self.Visible = np.array([], dtype=int)
+        self.Busy = False
+        self.axes.callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+    def set_data(self, arr_X, arr_Y, lst_Labels, lst_Colours = None):
+        """
+        Hands new traces to the renderer, shows all of them and scales
+        the axes to fit.
+
+        Arguments:
+            arr_X -> array like, shape (points,). Shared x values.
+            arr_Y -> array like, shape (points, traces).
+            lst_Labels -> list of trace labels, used for legend and
+                          highlighting.
+            lst_Colours -> list of RGBA tuples, one per trace. If None,
+                           the colour scheme gets repeated.
+        """
+        self.X = np.asarray(arr_X, dtype=float)
+        self.Y = np.asarray(arr_Y, dtype=float).reshape(len(self.X), -1)
+        self.Keys = list(lst_Labels)
+        self.Labels = [str(label) for label in lst_Labels]
+        if lst_Colours is None:
+            lst_Colours = [cs.TM_RGBA_List[i % len(cs.TM_RGBA_List)] for i in range(len(self.Labels))]
+        self.Colours = np.array([matplotlib.colors.to_rgba(colour) for colour in lst_Colours]).reshape(-1,4)
+        self.Display = np.ones(len(self.Labels), dtype=bool)
+        self.Highlight = None
+        self.autoscale()
+        self.decimate()
+
+    def set_display(self, dic_Display):
+        """
+        Shows or hides traces.
+
+        Arguments:
+            dic_Display -> dictionary. Keys are trace labels, values
+                           booleans.
+        """
+        arr_Display = np.array([dic_Display.get(key, True) == True for key in self.Keys], dtype=bool)
+        if not np.array_equal(arr_Display, self.Display):
+            self.Display = arr_Display
+            self.decimate()
+
+    def highlight(self, label):
+        """
+        Highlights one trace and fades all others.
+
+        Arguments:
+            label -> string or None. Label of the trace to highlight.
+                     None removes the highlight.
+        """
+        if not label == self.Highlight:
+            self.Highlight = label
+            self.update_styles()
+
+    def decimate(self):
+        """
+        Builds the line segments for the visible traces within the
+        current x limits, decimated to the pixel width of the axes.
+        """
+        self.Visible = np.flatnonzero(self.Display)
+        if len(self.X) == 0 or len(self.Visible) == 0:
+            self.collection.set_segments([])
+            self.update_styles()
+            return
+        # Restrict to the visible range (plus one point either side so
+        # the lines run to the edge) if the x values are sorted.
+        int_Start, int_End = 0, len(self.X)
+        if np.all(np.diff(self.X) >= 0):
+            flt_Left, flt_Right = sorted(self.axes.get_xlim())
+            int_Start = max(0, np.searchsorted(self.X, flt_Left, side="left") - 1)
+            int_End = min(len(self.X), np.searchsorted(self.X, flt_Right, side="right") + 1)
+        arr_X = self.X[int_Start:int_End]
+        arr_Y = self.Y[int_Start:int_End][:,self.Visible]
+        int_Pixels = max(3, int(self.axes.get_window_extent().width))
+        arr_Indices = lttb_indices(arr_X, arr_Y, int_Pixels)
+        arr_Segments = np.stack((arr_X[arr_Indices],
+                                 np.take_along_axis(arr_Y, arr_Indices, axis=0)), axis=-1)
+        self.collection.set_segments(list(arr_Segments.transpose(1,0,2)))
+        self.update_styles()
+
+    def update_styles(self):
+        """
+        Sets colour and line width per segment according to the current
+        highlight.
+        """
+        arr_Colours = self.Colours[self.Visible].copy()
+        arr_Widths = np.full(len(self.Visible), self.linewidth, dtype=float)
+        if not self.Highlight is None:
+            arr_Highlighted = np.array([self.Labels[idx] == self.Highlight for idx in self.Visible], dtype=bool)
+            arr_Colours[~arr_Highlighted,3] *= self.fade
+            arr_Widths[arr_Highlighted] = self.highlightwidth
+        self.collection.set_color(arr_Colours)
+        self.collection.set_linewidth(arr_Widths)
+
+    def autoscale(self):
+        """
+        Sets the axes limits to the full range of the shown traces with
+        matplotlib's default 5% margin.
+        """
+        arr_Y = self.Y[:,self.Display]
+        if len(self.X) == 0 or not np.isfinite(arr_Y).any():
+            return
+        lst_Limits = []
+        for flt_Min, flt_Max in [(np.nanmin(self.X), np.nanmax(self.X)),
+                                 (np.nanmin(arr_Y), np.nanmax(arr_Y))]:
+            flt_Margin = (flt_Max - flt_Min) * 0.05 if flt_Max > flt_Min else 0.5
+            lst_Limits.append((flt_Min - flt_Margin, flt_Max + flt_Margin))
+        self.Busy = True
+        self.axes.set_xlim(lst_Limits[0])
+        self.axes.set_ylim(lst_Limits[1])
+        self.Busy = False
+
+    def legend_handles(self):
+        """
+        Returns one proxy line per shown trace for axes.legend, since a
+        LineCollection only has one legend entry.
+        """
+        return [Line2D([], [], color=self.Colours[idx], linewidth=self.linewidth,
+                       label=self.Labels[idx]) for idx in self.Visible]
+
+    def on_xlim_changed(self, axes):
+        """
+        Event handler. Re-decimates for the new visible range, e.g.
+        after zooming.
+        """
+        if self.Busy == False:
+            self.decimate()
+
 class SpectrumPlotPanel(wx.Panel):
     def __init__(self, parent, size, tabname, title,
                  titlepos = 1.075, titlefontsize = 14,
@@ -942,6 +1266,8 @@ class SpectrumPlotPanel(wx.Panel):
         self.figure.subplots_adjust(left=0.12, right=0.99, top=0.90 , bottom=0.15)
         self.figure.set_facecolor(cs.BgUltraLightHex)
         self.title = title
+        self.Renderer = TraceRenderer(self.axes, linewidth=1.5, highlightwidth=3)
+        self.lst_RefLines = []
 
         # Arranging GUI elements
         self.szr_Surround = wx.BoxSizer(wx.HORIZONTAL)
@@ -959,35 +1285,33 @@ class SpectrumPlotPanel(wx.Panel):
             self.szr_Plot.Add(self.szr_ExportButtons, 0, wx.EXPAND, 0)
         self.szr_Surround.Add(self.szr_Plot, 0, wx.ALL, 0)
         self.data = None
+        # Connect event handlers
+        self.canvas.mpl_connect("button_press_event", self.on_right_click)
+        if self.detailplot == True:
+            self.canvas.mpl_connect("pick_event", self.on_click)
 
     def draw(self):
         # Initialise - some redundancy with init because this function is reused when re-drawing the graph for a new dtaset
         self.lst_Wavelengths = [int(wl) for wl in self.data.columns.tolist()]
-        self.figure.clear()
-        self.axes = self.figure.add_subplot()
         self.axes.set_title(self.title)
         self.axes.set_ylabel(self.ylabel)
         self.axes.set_xlabel("Wavelength (nm)")
-        
-        for sample in self.data.index:
-            self.axes.plot(self.lst_Wavelengths,
-                           self.data.loc[sample],
-                           label=sample)
-
+        # All spectra go into one decimated line collection
+        self.Renderer.set_data(self.lst_Wavelengths,
+                               self.data.to_numpy(dtype=float).T,
+                               self.data.index.tolist())
+
+        for line in self.lst_RefLines:
+            line.remove()
+        self.lst_RefLines = []
         if len(self.lines) > 0:
             for line in self.lines:
-                self.axes.axvline(x=line, linestyle="--", color="black", linewidth=0.5) # horizontal line
-        self.axes.set_ylabel(self.ylabel)
+                self.lst_RefLines.append(self.axes.axvline(x=line, linestyle="--", color="black", linewidth=0.5)) # vertical line
         if len(self.limits) > 0:
             self.axes.set_ylim(self.limits)
-        self.axes.legend()
         if not 0 in self.axes.get_ylim():
-            self.axes.axhline(y=0, linestyle = "--", color="black", linewidth=0.5)
-        self.axes.legend()
-        # Connect event handlers
-        self.canvas.mpl_connect("button_press_event", self.on_right_click)
-        if self.detailplot == True:
-            self.canvas.mpl_connect("pick_event", self.on_click)
+            self.lst_RefLines.append(self.axes.axhline(y=0, linestyle = "--", color="black", linewidth=0.5))
+        self.axes.legend(handles=self.Renderer.legend_handles())
         self.canvas.draw()
 
     def on_right_click(self, event):
@@ -1046,6 +1370,9 @@ class TracePlotPanel(wx.Panel):
         self.Highlight = None
         self.StepBorders = []
         self.StepNames = []
+        self.Renderer = TraceRenderer(self.axes)
+        self.lst_RefLines = []
+        self.Legend = None
 
         # Arranging GUI elements
         self.szr_Surround = wx.BoxSizer(wx.HORIZONTAL)
@@ -1063,74 +1390,66 @@ class TracePlotPanel(wx.Panel):
             self.szr_Plot.Add(self.szr_ExportButtons, 0, wx.EXPAND, 0)
         self.szr_Surround.Add(self.szr_Plot, 0, wx.ALL, 0)
         self.data = pd.DataFrame()
+        # Connect event handlers
+        self.canvas.mpl_connect("button_press_event", self.on_click)
+        self.canvas.mpl_connect("button_release_event", self.OnRelease)
+        self.canvas.mpl_connect("figure_leave_event", self.leave_figure)
+        self.canvas.mpl_connect("axes_leave_event", self.leave_figure)
+        self.Bind(wx.EVT_KILL_FOCUS, self.leave_figure)
+        self.canvas.mpl_connect("motion_notify_event", self.on_mouse_move)
 
     def draw(self, redraw = False):
+        """
+        Draws the plot.
+
+        Arguments:
+            redraw -> boolean. If True, only display and highlight of
+                      the traces already on the plot get updated.
+        """
+        if redraw == True:
+            self.Renderer.set_display(self.Display)
+            self.Renderer.highlight(self.Highlight)
+            self.canvas.draw_idle()
+            return None
+
         # Initialise - some redundancy with init because this function is reused when re-drawing the graph for a new dtaset
         self.Traces = self.data.columns.tolist()
         self.Time = self.data.index.tolist()
-        self.figure.clear()
-        self.axes = self.figure.add_subplot()
         self.axes.set_title(self.title)
         self.axes.set_xlabel(self.XLabel)
         self.axes.set_ylabel(self.ylabel)
 
-        if redraw == False:
-            self.Display = dict(zip(self.Traces, [True] * self.data.shape[1]))
-            colours = self.ColourOptions
-            multiples = len(self.Traces) // len(self.ColourOptions)
-            for m in range(multiples):
-                colours += self.ColourOptions
-            self.Colours = dict(zip(self.Traces,colours))
-
-        for trace in self.Traces:
-            if self.Display[trace] == True:
-                alpha = 1
-                linewidth = 0.5
-                if not self.Highlight == None:
-                    if not self.Highlight == trace:
-                        alpha = 0.2
-                    else:
-                        linewidth = 2
-                self.axes.plot(self.Time,
-                               self.data.loc[:,trace].tolist(),
-                               label = trace,
-                               color = self.Colours[trace],
-                               linewidth = linewidth,
-                               alpha = alpha)
-        
+        self.Display = dict(zip(self.Traces, [True] * self.data.shape[1]))
+        self.Colours = dict(zip(self.Traces,
+                                [self.ColourOptions[i % len(self.ColourOptions)]
+                                 for i in range(len(self.Traces))]))
+        # All traces go into one decimated line collection
+        self.Renderer.set_data(self.data.index.to_numpy(dtype=float),
+                               self.data.to_numpy(dtype=float),
+                               self.Traces,
+                               [self.Colours[trace] for trace in self.Traces])
+        self.Renderer.highlight(self.Highlight)
+
         # Zero lines
+        for line in self.lst_RefLines:
+            line.remove()
+        self.lst_RefLines = []
         xlims = self.axes.get_xlim()
-        ylims = self.axes.get_ylim()
-        
-        self.axes.axhline(y=0, xmin=xlims[0], xmax=xlims[1],
-                          linestyle="--", color="black", linewidth=0.5) # horizontal line
-        self.axes.axvline(x=0, ymin=ylims[0], ymax=ylims[1],
-                          linestyle="--", color="black", linewidth=0.5) # horizontal line
+        self.lst_RefLines.append(self.axes.axhline(y=0, linestyle="--",
+                                                   color="black", linewidth=0.5)) # horizontal line
+        self.lst_RefLines.append(self.axes.axvline(x=0, linestyle="--",
+                                                   color="black", linewidth=0.5)) # vertical line
         # Mark assay steps
         if len(self.StepBorders) > 0:
             for vline in self.StepBorders:
                 if not vline > xlims[1]:
-                    self.axes.axvline(x=vline, ymin=ylims[0], ymax=ylims[1], linestyle="--",
-                                      color="grey", linewidth=0.5) # horizontal line
+                    self.lst_RefLines.append(self.axes.axvline(x=vline, linestyle="--",
+                                                               color="grey", linewidth=0.5)) # vertical line
                 else:
                     break
 
-        self.Legend = self.axes.legend(bbox_to_anchor=(1.025, 1), loc='upper left', borderaxespad=0.)
-
-        if redraw == False:
-            # Connect event handlers
-            self.canvas.mpl_connect("button_press_event", self.on_click)
-            self.canvas.mpl_connect("button_release_event", self.OnRelease)
-            self.canvas.mpl_connect("figure_leave_event", self.leave_figure)
-            self.canvas.mpl_connect("axes_leave_event", self.leave_figure)
-            self.Bind(wx.EVT_KILL_FOCUS, self.leave_figure)
-            self.canvas.mpl_connect("motion_notify_event", self.on_mouse_move)
-            #if self.detailplot == True:
-            #    self.canvas.mpl_connect("pick_event", self.on_click)
-            # The on_click has been removed!
-            if self.Highlight == None:
-                self.Backup = self.canvas.copy_from_bbox(self.figure.bbox)
-        
+        self.Legend = self.axes.legend(handles=self.Renderer.legend_handles(),
+                                       bbox_to_anchor=(1.025, 1), loc='upper left', borderaxespad=0.)
         self.canvas.draw()
 
     def on_click(self, event):
@@ -1159,65 +1478,23 @@ class TracePlotPanel(wx.Panel):
         except: None
 
     def on_mouse_move(self, event):
+        if self.Legend is None:
+            return None
         if self.Legend.get_window_extent().contains(event.x, event.y):
             for text in self.Legend.get_texts():
                 if text.get_window_extent().contains(event.x, event.y):
-                    self.Highlight = str(text.get_text())
-                    self.draw(redraw = True)
+                    if not str(text.get_text()) == self.Highlight:
+                        self.Highlight = str(text.get_text())
+                        self.draw(redraw = True)
                     break
         else:
             self.MouseLeavesLegend(event)
 
     def MouseLeavesLegend(self, event):
-        self.Highlight = None
-        self.canvas.blit()
-        self.canvas.restore_region(self.Backup)
-        self.draw(redraw = True)
-        
-
-
-    def on_mouse_move(self, event):
-        """
-        Custom function I wrote to get tool tips working with matplotlib backend plots in wxPython.
-        First implementation in panel_Dose (dose response)
-        The way this works is as follows:
-            - x and y coordinates of the mouse get handed to the function from a "motion_notify_event" from the plot.
-            - The function pulls the plot data from the global dataframe (by looking up the sample ID)
-            - Coordinates get then compared to the x and y coordinates of the graph (for loop going through the datapoints).
-            - If the mouse coordinates are within a certain range of a datapoint (remember to take scale of axes into account),
-              wx.Dialog dlg_ToolTip gets called. Before each call, the function will try to destry it (the neccessary "except:"
-              just goes to None). If the mouse coordinates are not within range of a datapoint, the function will also try to
-              destroy the dialog. This way, it is ensured that the dialog gets always closed when the mouse moves away from a
-              datapoint.
-        """
-        if event.inaxes:
-            # Get coordinates on plot
-            evt_x, evt_y = event.xdata, event.ydata
-            lst_XLimits = self.axes.get_xlim()
-            within_x = (lst_XLimits[1] - lst_XLimits[0])/100 * 0.5
-            lst_YLimits = self.axes.get_ylim()
-            within_y = (lst_YLimits[1] - lst_YLimits[0])/100 * 1.5
-            for x in range(self.int_Samples):
-                # For the x axis (log scale), we have to adjust relative
-                if evt_x >= (x - within_x) and evt_x <= (x + within_x) and pd.isna(self.lst_Value[x]) == False:
-                    # for the y axis, we have to adjust absolute
-                    y = round(self.lst_Value[x])
-                    str_SampleID = self.lst_SampleIDs[x]
-                    if evt_y >= (y - within_y) and evt_y <= (y + within_y):
-                        try: self.tltp.Destroy()
-                        except: None
-                        str_Tooltip = str_SampleID + "\n%I: " + str(y)
-                        self.tltp = tt.dlg_ToolTip(self, str_Tooltip)
-                        self.tltp.Show()
-                        break
-                    else:
-                        try: self.tltp.Destroy()
-                        except: None
-                else:
-                    try: self.tltp.Destroy()
-                    except: None
+        if not self.Highlight is None:
+            self.Highlight = None
+            self.draw(redraw = True)
 
-    
 
     def data_to_clipboard(self, event):
         pass
@@ -1266,6 +1543,7 @@ class ReplicateCorrelation(wx.Panel):
         self.Extremes = []
         self.RSquare = None
         self.Pearson = None
+        self.Spearman = None
 
     def draw(self):
         # Initialise - some redundancy with init because this function is reused when
@@ -1290,6 +1568,11 @@ class ReplicateCorrelation(wx.Panel):
             self.axes.annotate(str_Pearson,
                 xy=(0,0), xycoords="data", # datapoint that is annotated
                 xytext=(440,10), textcoords="axes pixels") # position of annotation
+        if not self.Spearman == None:
+            str_Spearman = u"SCC = " + str(round(self.Spearman,3))
+            self.axes.annotate(str_Spearman,
+                xy=(0,0), xycoords="data", # datapoint that is annotated
+                xytext=(440,50), textcoords="axes pixels") # position of annotation
 
         # Connect event handlers
         self.canvas.mpl_connect("pick_event", self.on_click)
@@ -1943,6 +2226,51 @@ def shared_plot_to_png(Plot):
     else:
         return
 
+def lttb_indices(arr_X, arr_Y, int_Threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling for many traces that
+    share the same x values. Keeps first and last point and, for each
+    bucket in between, the point spanning the largest triangle with the
+    previously kept point and the average of the next bucket. Peaks and
+    steps survive, unlike with plain striding.
+
+    Arguments:
+        arr_X -> numpy array, shape (points,). Sorted x values.
+        arr_Y -> numpy array, shape (points, traces). NaN values are
+                 never picked unless a whole bucket is NaN.
+        int_Threshold -> integer. Number of points to keep per trace.
+
+    Returns numpy array of row indices into arr_Y, shape
+    (int_Threshold, traces).
+    """
+    int_Points, int_Traces = arr_Y.shape
+    if int_Threshold >= int_Points or int_Threshold < 3:
+        return np.repeat(np.arange(int_Points)[:,None], int_Traces, axis=1)
+    # Bucket borders, the first and last point are buckets of their own.
+    arr_Edges = (np.arange(int_Threshold - 1) * (int_Points - 2)) // (int_Threshold - 2) + 1
+    arr_Edges = np.append(arr_Edges, int_Points)
+    arr_Finite = np.isfinite(arr_Y)
+    arr_Zeroed = np.where(arr_Finite, arr_Y, 0)
+    arr_Traces = np.arange(int_Traces)
+    arr_Indices = np.empty((int_Threshold, int_Traces), dtype=int)
+    arr_Indices[0] = 0
+    arr_Indices[-1] = int_Points - 1
+    arr_Previous = arr_Indices[0]
+    for bucket in range(int_Threshold - 2):
+        int_Start, int_End, int_Next = arr_Edges[bucket], arr_Edges[bucket+1], arr_Edges[bucket+2]
+        # Average of the next bucket, ignoring NaN
+        flt_AvgX = arr_X[int_End:int_Next].mean()
+        arr_Count = arr_Finite[int_End:int_Next].sum(axis=0)
+        arr_AvgY = arr_Zeroed[int_End:int_Next].sum(axis=0) / np.maximum(arr_Count, 1)
+        arr_PrevX = arr_X[arr_Previous]
+        arr_PrevY = arr_Zeroed[arr_Previous, arr_Traces]
+        arr_Area = np.abs((arr_PrevX - flt_AvgX) * (arr_Zeroed[int_Start:int_End] - arr_PrevY)
+                          - (arr_PrevX - arr_X[int_Start:int_End,None]) * (arr_AvgY - arr_PrevY))
+        arr_Area[~arr_Finite[int_Start:int_End]] = -1
+        arr_Previous = int_Start + np.argmax(arr_Area, axis=0)
+        arr_Indices[bucket+1] = arr_Previous
+    return arr_Indices
+
 def zooming(Plot, event):
     Plot.in_zoom = True
 
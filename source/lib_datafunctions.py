@@ -7,16 +7,31 @@ import os
 import numpy as np
 import pandas as pd
 from multiprocessing import Pool
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import peakutils as pu
 import scipy.signal as scsi
 import copy as copy
+from itertools import combinations
 
 # Import my own libraries
 import lib_platefunctions as pf
 import lib_resultreadouts as ro
 import lib_fittingfunctions as ff
+import lib_fitstatistics as fs
 import lib_messageboxes as msg
 import lib_excelfunctions as ef
+import lib_tracing as trace
+import lib_progresschannel as pch
+import lib_prefetch as pre
+import lib_exporttemplates as et
+import lib_tracestore as ts
+import lib_platestore as ps
+import lib_checkpoint as chk
+
+# Default for raw_data in complete_plate: the file has not been read yet.
+# None means it has been read and could not be parsed.
+NOTREAD = object()
 
 ########################################################################################################
 ##                                                                                                    ##
@@ -214,11 +229,11 @@ def read_transfer(transfer_file, extension, engine, header = None, worksheet = N
             return None
     elif "xls" in extension:
         try:
-            return pd.read_excel(transfer_file,
+            # The engine is chosen from the file's actual type
+            return ef.read_sheet(transfer_file,
                                  sheet_name=worksheet,
                                  header=header,
-                                 index_col=None,
-                                 engine=engine)
+                                 index_col=None)
         except:
             # Couldn't parse, return empty dataframe and no success
             return None
@@ -321,6 +336,92 @@ def get_destination_plates(transfer):
     # Return result
     return destinations
 
+def convert_wells(ser_Wells, wells):
+    """
+    Converts a column of well coordinates into sortable coordinates and
+    integer well indices. Each distinct coordinate only gets converted
+    once, which makes this independent of the number of transfers.
+
+    Arguments:
+        ser_Wells -> pandas series of well coordinates, e.g. "A1".
+        wells -> integer. Plate format.
+
+    Returns numpy arrays of sortable coordinates and well indices.
+    """
+    arr_Codes, arr_Unique = pd.factorize(ser_Wells)
+    arr_Sortable = np.array([pf.sortable_well(well, wells) for well in arr_Unique], dtype = object)
+    arr_Index = np.array([pf.well_to_index(well, wells) for well in arr_Sortable], dtype = int)
+    return arr_Sortable[arr_Codes], arr_Index[arr_Codes]
+
+def assemble_samples(processed,plate_name,wells):
+    """
+    Works out which wells belong to which sample and concentration on a
+    destination plate with one grouping and one stable sort instead of
+    searching the transfers of each sample for repeated concentrations.
+
+    Samples and their concentrations are in order of first appearance in
+    the transfer file, wells of one concentration in transfer order (same
+    as before).
+
+    Arguments:
+        processed -> pandas dataframe. Processed transfer file.
+        plate_name -> string. Destination plate.
+        wells -> integer. Plate format.
+
+    Returns dictionary of compact arrays. Series (one concentration of
+    one sample) are stored back to back, "SampleStart" and "SeriesStart"
+    hold the offsets, i.e. the series of sample n are
+    SampleStart[n]:SampleStart[n+1], the wells of series m are
+    SeriesStart[m]:SeriesStart[m+1]:
+        "Samples" -> dataframe with Destination, SampleID and
+                     SourceConcentration of each sample.
+        "SampleStart" -> array of offsets into the series arrays.
+        "Concentration" -> array, concentration of each series.
+        "SeriesStart" -> array of offsets into the well arrays.
+        "WellIndex" -> array of well indices (raw data rows).
+        "TransferVolume" -> array of transfer volumes.
+        "Wells" -> array of sortable well coordinates.
+        "Row" -> array, position of each well's transfer in the
+                 plate's transfers.
+    """
+    processed = processed[processed["Destination"]==plate_name].reset_index(drop=True)
+    # Same selection of samples as always: first entry of each sample, no
+    # empties, no controls.
+    dfr_Samples = processed[["Destination","SampleID","SourceConcentration"]].drop_duplicates(subset=["SampleID"], keep="first",
+        ignore_index=True).dropna().reset_index(drop=True)
+    dfr_Samples = dfr_Samples.drop(dfr_Samples.index[dfr_Samples["SampleID"]=="Control"]).reset_index(drop=True)
+
+    arr_Sortable, arr_WellIndex = convert_wells(processed["DestinationWell"], wells)
+    # Integer codes for samples in the order of dfr_Samples, -1 for
+    # transfers that do not belong to a sample.
+    arr_Sample = pd.Index(dfr_Samples["SampleID"]).get_indexer(processed["SampleID"])
+    arr_Keep = np.flatnonzero(arr_Sample >= 0)
+    dfr_Keep = pd.DataFrame({"Sample":arr_Sample[arr_Keep],
+                             "Concentration":processed["DestinationConcentration"].to_numpy()[arr_Keep]})
+    # Series numbers in order of first appearance within each sample.
+    arr_Series = dfr_Keep.groupby(["Sample","Concentration"], sort=False, dropna=False).ngroup().to_numpy()
+    arr_First = pd.Series(np.arange(arr_Series.size)).groupby(arr_Series).transform("min").to_numpy()
+    # One stable sort: by sample, then by first appearance of the
+    # concentration, then by transfer order.
+    arr_Order = np.lexsort((arr_First, dfr_Keep["Sample"].to_numpy()))
+    arr_Rows = arr_Keep[arr_Order]
+    arr_Series = arr_Series[arr_Order]
+    arr_SampleOfRow = arr_Sample[arr_Rows]
+
+    arr_Boundaries = np.flatnonzero(np.diff(arr_Series)) + 1
+    arr_SeriesStart = np.concatenate([[0], arr_Boundaries, [arr_Rows.size]])
+    arr_SeriesSample = arr_SampleOfRow[arr_SeriesStart[:-1]]
+    arr_SampleStart = np.searchsorted(arr_SeriesSample, np.arange(dfr_Samples.shape[0]+1))
+
+    return {"Samples":dfr_Samples,
+            "SampleStart":arr_SampleStart,
+            "Concentration":processed["DestinationConcentration"].to_numpy()[arr_Rows[arr_SeriesStart[:-1]]],
+            "SeriesStart":arr_SeriesStart,
+            "WellIndex":arr_WellIndex[arr_Rows],
+            "TransferVolume":processed["TransferVolume"].to_numpy()[arr_Rows],
+            "Wells":arr_Sortable[arr_Rows],
+            "Row":arr_Rows}
+
 def get_samples(processed,plate_name,wells):
     """
     Get sample locations and concentrations from processed transfer file and write into data frame/
@@ -328,61 +429,86 @@ def get_samples(processed,plate_name,wells):
     second column: list lists of locations
     third column: list of concentrations
     """
-    # Get list of samples, drop duplicates, drop emtpies, reset index
-    processed = processed[processed["Destination"]==plate_name]
-    dfr_Samples = processed[["Destination","SampleID","SourceConcentration"]].drop_duplicates(subset=["SampleID"], keep="first",
-        ignore_index=True).dropna().reset_index(drop=True)
-    dfr_Samples = dfr_Samples.drop(dfr_Samples.index[dfr_Samples["SampleID"]=="Control"]).reset_index(drop=True)
+    dic_Assembly = assemble_samples(processed, plate_name, wells)
+    dfr_Samples = dic_Assembly["Samples"]
     dfr_Samples.insert(2,"Locations","")
     dfr_Samples.insert(3,"Concentrations","")
     dfr_Samples.insert(4,"TransferVolumes","")
     dfr_Samples.insert(5,"Wells","")
-    # Convert wells
-    indices = processed.DestinationWell.apply(lambda x: pf.sortable_well(x, wells)).apply(lambda x: pf.well_to_index(x, wells)).tolist()
-    lst_Wells = processed.DestinationWell.apply(lambda x: pf.sortable_well(x, wells)).tolist()
-    processed.insert(3,"WellsIndex",indices) # Column position three is chosen randomly.
-    processed.insert(5,"Wells",lst_Wells)
-    # Create columns for Locations and Concentration, write placeholders, change data type to enable holding lists
+    arr_SampleStart = dic_Assembly["SampleStart"]
+    arr_SeriesStart = dic_Assembly["SeriesStart"]
+    lst_WellIndex = dic_Assembly["WellIndex"].tolist()
+    lst_Volume = dic_Assembly["TransferVolume"].tolist()
     for smpl in dfr_Samples.index:
-        current = processed[processed.SampleID == dfr_Samples.loc[smpl, "SampleID"]]
-
-        # Pull list of concentrations for current sample
-        lst_cnc = current.DestinationConcentration.reset_index(drop=True)
-        lst_loc = current.WellsIndex.reset_index(drop=True)
-        lst_vol = current.TransferVolume.reset_index(drop=True)
-        #lstRaw = dfr_Processed.loc[i, "RawData"]
-        # Create list of lists:
-        lstlst_cnc = [] # list of lists for concentrations
-        lstlst_loc = [] # list of lists for locations
-        lstlst_vol = []
-        # Go through list of concentrations
-        for conc in range(len(lst_cnc)):
-            lst_cnc_temp = []
-            lst_loc_temp = []
-            lst_vol_temp = []
-            # Check to only use unique concentrations
-            if lst_cnc[conc] != "found":
-                # assign current conc/loc to temporary lists
-                lst_cnc_temp = lst_cnc[conc] # simple list
-                lst_loc_temp = [lst_loc[conc]] # list of lists, one concentration can be in many locations
-                lst_vol_temp = [lst_vol[conc]]
-                for k in range(conc+1,len(lst_cnc)):
-                    if lst_cnc[conc] == lst_cnc[k]:
-                        lst_cnc[k] = "found" # flag concentrations that are not unique
-                        lst_loc_temp.append(lst_loc[k])
-                        lst_vol_temp.append(lst_vol[k])
-                # append temporary list to list of lists
-                lstlst_cnc.append(lst_cnc_temp)
-                lstlst_loc.append(lst_loc_temp)
-                lstlst_vol.append(lst_vol_temp)
-
-        dfr_Samples.at[smpl,"Concentrations"] = lstlst_cnc
-        dfr_Samples.at[smpl,"Locations"] = lstlst_loc
-        dfr_Samples.at[smpl,"TransferVolumes"] = lstlst_vol
-        dfr_Samples.at[smpl,"Wells"] = current.Wells.reset_index(drop=True)
-
+        lst_Series = range(arr_SampleStart[smpl], arr_SampleStart[smpl+1])
+        dfr_Samples.at[smpl,"Concentrations"] = [dic_Assembly["Concentration"][srs] for srs in lst_Series]
+        dfr_Samples.at[smpl,"Locations"] = [lst_WellIndex[arr_SeriesStart[srs]:arr_SeriesStart[srs+1]] for srs in lst_Series]
+        dfr_Samples.at[smpl,"TransferVolumes"] = [lst_Volume[arr_SeriesStart[srs]:arr_SeriesStart[srs+1]] for srs in lst_Series]
+        # Wells in transfer order
+        int_Start = arr_SeriesStart[arr_SampleStart[smpl]]
+        int_End = arr_SeriesStart[arr_SampleStart[smpl+1]]
+        arr_Order = np.argsort(dic_Assembly["Row"][int_Start:int_End], kind="stable")
+        dfr_Samples.at[smpl,"Wells"] = pd.Series(dic_Assembly["Wells"][int_Start:int_End][arr_Order])
     return dfr_Samples
 
+def synthetic_transfer(samples = 96, concentrations = 8, replicates = 2, plates = 1):
+    """
+    Creates a processed transfer file for 1536 well plates with dose
+    response series of synthetic samples, for benchmarking.
+
+    Arguments:
+        samples -> int. Samples per plate.
+        concentrations -> int. Concentrations per sample.
+        replicates -> int. Wells per concentration.
+        plates -> int. Number of destination plates.
+
+    Returns pandas dataframe.
+    """
+    lst_Rows = [chr(65+row) for row in range(26)] + ["A"+chr(65+row) for row in range(6)]
+    lst_AllWells = [row + str(col) for row in lst_Rows for col in range(1,49)]
+    int_PerPlate = samples * concentrations * replicates
+    if int_PerPlate > len(lst_AllWells):
+        return None
+    rng = np.random.default_rng(0)
+    lst_Frames = []
+    for plate in range(plates):
+        arr_Sample = np.repeat(np.arange(samples), concentrations * replicates)
+        arr_Conc = np.tile(np.repeat(10.0**(-5 - np.arange(concentrations)/2), replicates), samples)
+        # Transfer files are not necessarily in well order
+        arr_Wells = rng.permutation(len(lst_AllWells))[:int_PerPlate]
+        lst_Frames.append(pd.DataFrame({"Destination":f"Plate_{plate+1}",
+            "SampleID":[f"BBQ-{smpl:06d}" for smpl in arr_Sample],
+            "SourceConcentration":0.01,
+            "DestinationWell":[lst_AllWells[well] for well in arr_Wells],
+            "DestinationConcentration":arr_Conc,
+            "TransferVolume":2.5}))
+    return pd.concat(lst_Frames, ignore_index=True)
+
+def benchmark_get_samples(samples = (24, 48, 96), concentrations = 8, replicates = 2, repeats = 3):
+    """
+    Times get_samples() on synthetic 1536 well transfer files.
+
+    Arguments:
+        samples -> tuple of ints. Samples per plate to test.
+        concentrations -> int. Concentrations per sample.
+        replicates -> int. Wells per concentration.
+        repeats -> int. Runs per size, the fastest one counts.
+
+    Returns dictionary of number of transfers -> seconds per plate.
+    """
+    dic_Times = {}
+    for int_Samples in samples:
+        dfr_Transfer = synthetic_transfer(int_Samples, concentrations, replicates)
+        if dfr_Transfer is None:
+            continue
+        lst_Times = []
+        for run in range(repeats):
+            start = perf_counter()
+            get_samples(dfr_Transfer, "Plate_1", 1536)
+            lst_Times.append(perf_counter() - start)
+        dic_Times[dfr_Transfer.shape[0]] = min(lst_Times)
+    return dic_Times
+
 def get_samples_lightcycler(current_plate,raw_data,wells):
     plate_name = []
     sample_id = []
@@ -790,6 +916,7 @@ def get_layout(processed_transfer,str_TransferEntry,raw_data):
 ##########################################################
 
 def complete_container(ProjectTab, dlg_progress):
+    progress = pch.get_channel(dlg_progress)
 
     plate_assignment = ProjectTab.dfr_PlateAssignment
     data_path = ProjectTab.paths["Data"]
@@ -808,59 +935,160 @@ def complete_container(ProjectTab, dlg_progress):
 
     # Assay category is broad: single_dose, IC50 (or dose response), DSF_384...
     # Count how many rows we need:
-    dlg_progress.lbx_Log.InsertItems([f"Assay category: {assay_category}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+    progress.message(f"Assay category: {assay_category}")
+    progress.message("")
     container = pd.DataFrame(columns=["Destination","Samples","Wells","DataFile",
         "RawData","Processed","PlateID","Layout","References"], index=range(plate_assignment.shape[0]))
-    # Iterate through the plate_assignment frame
-    for plate in plate_assignment.index:
-        container.loc[plate,"Destination"] = plate_assignment.loc[plate,"TransferEntry"]
-        dest = container.loc[plate,"Destination"]
-        dlg_progress.lbx_Log.InsertItems([f"Processing plate {plate+1}: {dest}"], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems(["==============================================================="], dlg_progress.lbx_Log.Count)
-        container.loc[plate,"Wells"] = int(plate_assignment.loc[plate,"Wells"])
-        container.loc[plate,"DataFile"] = plate_assignment.loc[plate,"DataFile"]
-        # Get raw data
-        datafile = container.loc[plate,"DataFile"]
-        dlg_progress.lbx_Log.InsertItems([F"Read raw data file: {datafile}"], dlg_progress.lbx_Log.Count)
+    # Plates finished by an earlier, interrupted run with the same inputs
+    # and settings get restored from their checkpoints.
+    chk.prune()
+    str_RunKey = chk.run_key(ProjectTab)
+    checkpoints = chk.Checkpoints(str_RunKey)
+    dic_Keys = {}
+    lst_Todo = []
+    with trace.span("checkpoints", plates = len(plate_assignment.index)):
+        for plate in plate_assignment.index:
+            dic_Keys[plate] = chk.plate_key(str_RunKey, data_path, plate, plate_assignment)
+            dic_Row = checkpoints.load(dic_Keys[plate])
+            if dic_Row is None:
+                lst_Todo.append(plate)
+                continue
+            for col, value in dic_Row.items():
+                container.at[plate,col] = value
+            spill_plate(ProjectTab, container, plate)
+            progress.message(f"Plate {plate+1} ({dic_Row['Destination']}) restored from checkpoint")
+    if len(lst_Todo) < len(plate_assignment.index):
+        progress.message(f"{len(plate_assignment.index) - len(lst_Todo)} plate(s) restored, "
+                         + f"{len(lst_Todo)} to process")
+        progress.message("")
+    # Iterate through the plate_assignment frame. Keep workbooks open until all
+    # plates are done, several plates can come from the same file.
+    # The next few raw data files get read on worker threads while the
+    # current plate is processed. The prefetcher waits for reads still
+    # running before the session closes the workbooks.
+    bol_Failed = False
+    with ef.ImportSession():
+        with pre.Prefetcher(lambda plate: read_plate(ProjectTab, plate, plate_assignment),
+                            lst_Todo) as prefetcher:
+            for plate, raw_data in prefetcher:
+                if complete_plate(ProjectTab, container, plate, plate_assignment,
+                                  dlg_progress, raw_data) == False:
+                    bol_Failed = True
+                    break
+                checkpoints.save(dic_Keys[plate], container.loc[plate].to_dict())
+    if bol_Failed == True:
+        msg.warn_not_datafile("self")
+        return None
+    dic_Timing = prefetcher.timing()
+    progress.message(f"Reading files: {round(dic_Timing['Read'],2)} s, "
+                     + f"waited for files: {round(dic_Timing['Wait'],2)} s, "
+                     + f"processing: {round(dic_Timing['Compute'],2)} s")
+    trace.event("prefetch", plates = len(plate_assignment.index), **dic_Timing)
+
+    return container
+
+def read_plate(ProjectTab, plate, plate_assignment):
+    """
+    Reads the raw data file of a single plate with the reader the assay
+    needs. Does not touch the GUI or the container, so it can run on a
+    worker thread (see complete_container).
+
+    Arguments:
+        ProjectTab -> project tab with paths and assay details.
+        plate -> index of the plate in plate_assignment.
+        plate_assignment -> pandas dataframe with columns TransferEntry,
+                            DataFile and Wells.
+
+    Returns raw data as pandas dataframe or None if the file could not
+    be read.
+    """
+    data_path = ProjectTab.paths["Data"]
+    assay_name = ProjectTab.details["AssayType"]
+    assay_category = ProjectTab.details["AssayCategory"]
+    datafile = plate_assignment.loc[plate,"DataFile"]
+    wells = int(plate_assignment.loc[plate,"Wells"])
+    raw_data = None
+    with trace.span("read", plate = plate_assignment.loc[plate,"TransferEntry"],
+                    datafile = datafile, assay = assay_category):
         if assay_category.find("dose_response") != -1:
-            container.at[plate,"RawData"] = ro.get_bmg_plate_readout(data_path,
-                                                                          container.loc[plate,"DataFile"],
-                                                                          container.loc[plate,"Wells"],
-                                                                          assay_name)
-            #container.at[plate,"RawData"], rawdataread = ro.get_readout(data_path,
-            #                                                            container.loc[plate,"DataFile"],
-            #                                                            data_rules)
+            raw_data = ro.get_bmg_plate_readout(data_path, datafile, wells, assay_name)
         elif assay_category.find("single_dose") != -1:
             # All plates will be the same plate type!
-            raw_data = ro.get_bmg_list_readout(data_path, int(plate_assignment.loc[0,"Wells"]))
-            container.at[plate,"RawData"] = raw_data[["Well",container.loc[plate,"DataFile"]]]
-            #container.at[plate,"RawData"], rawdataread = ro.get_readout(data_path,
-            #                                                            container["DataFile"].to_list(),
-            #                                                            data_rules)
+            raw_data = ro.get_bmg_list_readout(data_path, int(plate_assignment.loc[plate_assignment.index[0],"Wells"]))
+            if not raw_data is None:
+                raw_data = raw_data[["Well",datafile]]
         elif assay_category == "thermal_shift":
             if "Agilent" in assay_name and "96" in assay_name:
-                container.at[plate,"RawData"] = ro.get_mxp_readout(data_path + chr(92) + container.loc[plate,"DataFile"], 24) # last argument is NOT number of wells but starting temperature!
+                raw_data = ro.get_mxp_readout(data_path + chr(92) + datafile, 24) # last argument is NOT number of wells but starting temperature!
             elif "LightCycler" in assay_name and "96" in assay_name:
-                container.at[plate,"RawData"] = ro.get_lightcycler_readout(data_path + chr(92) + container.loc[plate,"DataFile"], 96)
+                raw_data = ro.get_lightcycler_readout(data_path + chr(92) + datafile, 96)
             elif "LightCycler" in assay_name and "384" in assay_name:
-                container.at[plate,"RawData"] = ro.get_lightcycler_readout(data_path + chr(92) + container.loc[plate,"DataFile"], 384)
+                raw_data = ro.get_lightcycler_readout(data_path + chr(92) + datafile, 384)
             elif "QuantStudio" in assay_name and "384" in assay_name:
-                container.at[plate,"RawData"] = ro.get_quantstudio_readout(data_path + chr(92) + container.loc[plate,"DataFile"], 384)
+                raw_data = ro.get_quantstudio_readout(data_path + chr(92) + datafile, 384)
         elif assay_category == "rate":
-            container.at[plate,"RawData"] = ro.get_bmg_timecourse_readout(data_path + container.loc[plate,"DataFile"])
-        # Test whether a correct file was loaded:
-        if container.loc[plate,"RawData"] is None: # == False:
-            msg.warn_not_datafile("self")
-            return None
-        # Get samples
+            raw_data = ro.get_bmg_timecourse_readout(data_path + datafile)
+    return raw_data
+
+def complete_plate(ProjectTab, container, plate, plate_assignment, dlg_progress, raw_data = NOTREAD):
+    """
+    Reads and processes a single plate and writes the results into
+    row "plate" of the container. Called for each plate by
+    complete_container and for plates arriving one by one in watch mode
+    (see process_plate).
+
+    Arguments:
+        ProjectTab -> project tab with paths, transfer file, layout and
+                      assay details.
+        container -> pandas dataframe. Container to write into.
+        plate -> index of the plate in container and plate_assignment.
+        plate_assignment -> pandas dataframe with columns TransferEntry,
+                            DataFile and Wells.
+        dlg_progress -> progress dialog or None.
+        raw_data -> pandas dataframe. Raw data if it has been read
+                    already (see read_plate), None if reading it failed.
+                    If not given (NOTREAD), the file gets read here.
+
+    Returns True on success, False if the raw data file could not be read
+    (see msg.warn_not_datafile).
+    """
+    progress = pch.get_channel(dlg_progress)
+
+    data_path = ProjectTab.paths["Data"]
+    transfer_file = ProjectTab.dfr_TransferFile
+    layout = ProjectTab.dfr_Layout
+    details = ProjectTab.details
+
+    assay_name = details["AssayType"]
+    assay_category = details["AssayCategory"]
+    assay_volume = details["AssayVolume"]
+    sample_source = details["SampleSource"]
+
+    container.loc[plate,"Destination"] = plate_assignment.loc[plate,"TransferEntry"]
+    dest = container.loc[plate,"Destination"]
+    progress.stage(f"Processing plate {plate+1}: {dest}")
+    progress.message("===============================================================")
+    container.loc[plate,"Wells"] = int(plate_assignment.loc[plate,"Wells"])
+    container.loc[plate,"DataFile"] = plate_assignment.loc[plate,"DataFile"]
+    # Get raw data
+    datafile = container.loc[plate,"DataFile"]
+    progress.message(F"Read raw data file: {datafile}")
+    if raw_data is NOTREAD:
+        raw_data = read_plate(ProjectTab, plate, plate_assignment)
+    container.at[plate,"RawData"] = raw_data
+    # Test whether a correct file was loaded. The caller shows the
+    # warning, this may run on a worker thread.
+    if container.loc[plate,"RawData"] is None: # == False:
+        return False
+    # Get samples
+    with trace.span("samples", plate = dest, source = sample_source):
         if sample_source == "echo":
-            dlg_progress.lbx_Log.InsertItems(["Extract sample IDs from transfer file"], dlg_progress.lbx_Log.Count)
+            progress.message("Extract sample IDs from transfer file")
             container.at[plate,"Samples"] = get_samples(transfer_file,
                                                         container.loc[plate,"Destination"],
                                                         container.loc[plate,"Wells"])
         elif sample_source == "lightcycler":
-            dlg_progress.lbx_Log.InsertItems(["Extract sample IDs from raw data file"], dlg_progress.lbx_Log.Count)
+            progress.message("Extract sample IDs from raw data file")
             container.at[plate,"Samples"] = get_samples_lightcycler(container.loc[plate,"Destination"],
                                                                     container.at[plate,"RawData"],
                                                                     len(layout.loc[plate,"ProteinNumerical"]))
@@ -868,62 +1096,139 @@ def complete_container(ProjectTab, dlg_progress):
             container.at[plate,"Samples"] = get_samples_wellonly(container.loc[plate,"Destination"],
                                                                  container.at[plate,"RawData"],
                                                                  len(layout.loc[plate,"ProteinNumerical"]))
-        if assay_category == "thermal_shift":
-            # References get handled differently here
-            if layout.shape[0] > 1:
-                idx_Layout = plate
-            else:
-                idx_Layout = 0
-            container.at[plate,"PlateID"] = layout.loc[idx_Layout,"PlateID"]
-            container.at[plate,"Layout"] = layout.loc[idx_Layout,"Layout"]
-            # Create dataframe for data processing
-            container.at[plate,"Processed"], container.at[plate,"References"] = create_dataframe_DSF(container.at[plate,"RawData"],
-                                                                                                              container.loc[plate,"Samples"],
-                                                                                                              layout.loc[idx_Layout,"Layout"],
-                                                                                                              dlg_progress)
-        elif assay_category.find("rate") != -1:
-            # References get handled differently here
-            container.at[plate,"Layout"] = get_layout(transfer_file,
-                                                      container.loc[plate,"Destination"],
-                                                      container.loc[plate,"RawData"].rename(columns={"Signal":"Reading"}))
-            # Create dataframe for data processing
-            container.at[plate,"Processed"], container.at[plate,"References"] = create_dataframe_rate(container.at[plate,"RawData"],
-                container.loc[plate,"Samples"],container.loc[plate,"Layout"],dlg_progress)
+    if assay_category == "thermal_shift":
+        # References get handled differently here
+        if layout.shape[0] > 1:
+            idx_Layout = plate
         else:
-            # Endpoint assays
-            # Get controls and references
-            container.at[plate,"Layout"] = get_layout(transfer_file,
-                                                      container.loc[plate,"Destination"],
-                                                      container.loc[plate,"RawData"].rename(columns={datafile:"Reading"}))
+            idx_Layout = 0
+        container.at[plate,"PlateID"] = layout.loc[idx_Layout,"PlateID"]
+        container.at[plate,"Layout"] = layout.loc[idx_Layout,"Layout"]
+        # Create dataframe for data processing
+        container.at[plate,"Processed"], container.at[plate,"References"] = create_dataframe_DSF(container.at[plate,"RawData"],
+                                                                                                          container.loc[plate,"Samples"],
+                                                                                                          layout.loc[idx_Layout,"Layout"],
+                                                                                                          dlg_progress)
+    elif assay_category.find("rate") != -1:
+        # References get handled differently here
+        container.at[plate,"Layout"] = get_layout(transfer_file,
+                                                  container.loc[plate,"Destination"],
+                                                  container.loc[plate,"RawData"].rename(columns={"Signal":"Reading"}))
+        # Create dataframe for data processing
+        container.at[plate,"Processed"], container.at[plate,"References"] = create_dataframe_rate(container.at[plate,"RawData"],
+            container.loc[plate,"Samples"],container.loc[plate,"Layout"],dlg_progress)
+    else:
+        # Endpoint assays
+        # Get controls and references
+        container.at[plate,"Layout"] = get_layout(transfer_file,
+                                                  container.loc[plate,"Destination"],
+                                                  container.loc[plate,"RawData"].rename(columns={datafile:"Reading"}))
+        with trace.span("references", plate = dest):
             container.at[plate,"References"] = get_references(container.at[plate,"Layout"],
                                                               datafile,
                                                               container.loc[plate,"RawData"])
-            if pd.isna(container.loc[plate,"References"].loc["SolventMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No Solvent wells"], dlg_progress.lbx_Log.Count)
-            if pd.isna(container.loc[plate,"References"].loc["ControlMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No control wells"], dlg_progress.lbx_Log.Count)
-            if pd.isna(container.loc[plate,"References"].loc["BufferMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No buffer wells"], dlg_progress.lbx_Log.Count)
-            # Create dataframe for data processing
-            if assay_category.find("dose_response") != -1:
-                container.at[plate,"Processed"] = create_dataframe_EPDR(container.at[plate,"RawData"],
-                    container.loc[plate,"Samples"],container.loc[plate,"References"],assay_name,assay_volume,dlg_progress)
-            elif assay_category.find("single_dose") != -1:
-                container.at[plate,"Processed"] = create_dataframe_EPSD(container.at[plate,"RawData"],
-                    container.loc[plate,"Samples"],container.loc[plate,"References"],assay_name,assay_volume,dlg_progress)
-        dlg_progress.lbx_Log.InsertItems(["Plate "+ str(plate+1) + " completed"], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+        if pd.isna(container.loc[plate,"References"].loc["SolventMean",0]) == True:
+            progress.warning("No Solvent wells")
+        if pd.isna(container.loc[plate,"References"].loc["ControlMean",0]) == True:
+            progress.warning("No control wells")
+        if pd.isna(container.loc[plate,"References"].loc["BufferMean",0]) == True:
+            progress.warning("No buffer wells")
+        # Create dataframe for data processing
+        if assay_category.find("dose_response") != -1:
+            container.at[plate,"Processed"] = create_dataframe_EPDR(container.at[plate,"RawData"],
+                container.loc[plate,"Samples"],container.loc[plate,"References"],assay_name,assay_volume,dlg_progress)
+        elif assay_category.find("single_dose") != -1:
+            container.at[plate,"Processed"] = create_dataframe_EPSD(container.at[plate,"RawData"],
+                container.loc[plate,"Samples"],container.loc[plate,"References"],assay_name,assay_volume,dlg_progress)
+    spill_plate(ProjectTab, container, plate)
+    progress.message("Plate "+ str(plate+1) + " completed")
+    progress.message("")
 
-    return container
+
+    return True
+
+def spill_plate(ProjectTab, container, plate):
+    """
+    Moves the raw traces of a DSF or rate plate out of the python heap
+    into the project's trace store, see lib_tracestore. For endpoint
+    plates, the per sample lists of the processed data go into the plate
+    store, see lib_platestore.
+    """
+    assay_category = ProjectTab.details["AssayCategory"]
+    if assay_category == "thermal_shift" or assay_category.find("rate") != -1:
+        with trace.span("spill", plate = container.loc[plate,"Destination"]):
+            dic_Seen = {}
+            for col in ["RawData","Processed"]:
+                ts.spill_frame(container.at[plate,col], ts.get_store(ProjectTab),
+                               dic_Seen = dic_Seen)
+    elif assay_category.find("dose_response") != -1 or assay_category.find("single_dose") != -1:
+        with trace.span("pack", plate = container.loc[plate,"Destination"]):
+            container.at[plate,"Processed"] = ps.pack_frame(container.at[plate,"Processed"])
+
+def process_plate(ProjectTab, transfer_entry, datafile, wells, plate, dlg_progress = None):
+    """
+    Processes one newly arrived plate on its own, without touching the
+    project's container, so it can run on a worker thread (see
+    FileSelection.on_watched_file). Hand the result to append_plate on
+    the main thread.
+
+    Arguments:
+        ProjectTab -> project tab.
+        transfer_entry -> string. Destination plate in the transfer file.
+        datafile -> string. Name of the raw data file.
+        wells -> int. Plate format.
+        plate -> int. Index of the transfer entry in the plate
+                 assignment, i.e. the plate's row in the project's
+                 layout.
+        dlg_progress -> progress dialog or None for headless processing.
+
+    Returns the plate's container row as dictionary of column -> value or
+    None if the raw data file could not be read. Showing the warning is
+    left to the caller (on the main thread).
+    """
+    container = pd.DataFrame(columns=["Destination","Samples","Wells","DataFile",
+        "RawData","Processed","PlateID","Layout","References"], index=[plate])
+    plate_assignment = pd.DataFrame({"TransferEntry":[transfer_entry],
+                                     "DataFile":[datafile],
+                                     "Wells":[wells]}, index=[plate])
+    if complete_plate(ProjectTab, container, plate, plate_assignment, dlg_progress) == False:
+        return None
+    return container.loc[plate].to_dict()
+
+def append_plate(ProjectTab, dic_Row):
+    """
+    Appends a plate processed by process_plate to the project's
+    container (ProjectTab.assay_data). Creates the container if no plate
+    has been processed yet. Must be called on the main thread, as the
+    review tabs read the container there.
+
+    Arguments:
+        ProjectTab -> project tab.
+        dic_Row -> dictionary of column -> value. See process_plate.
+
+    Returns index of the new plate in the container.
+    """
+    if getattr(ProjectTab, "assay_data", None) is None or ProjectTab.assay_data.shape[0] == 0:
+        container = pd.DataFrame(columns=list(dic_Row.keys()))
+    else:
+        container = ProjectTab.assay_data
+    # Next free index label, the container's index need not be 0...n-1
+    # (e.g. after plates without data file were left out).
+    lst_Numeric = [idx for idx in container.index
+                   if isinstance(idx, (int, np.integer))]
+    plate = max(lst_Numeric) + 1 if len(lst_Numeric) > 0 else 0
+    container = container.reindex(container.index.to_list() + [plate])
+    for col, value in dic_Row.items():
+        container.at[plate,col] = value
+    ProjectTab.assay_data = container
+    return plate
 
 def ProgressGauge(current,total):
-    int_Length = 20
-    int_Full = int(round(current/total * int_Length,0))
-    int_Blank = int_Length - int_Full
-    str_Full = chr(9646)
-    str_Blank = chr(9647)
-    str_Gauge = "[" + int_Full*str_Full + int_Blank*str_Blank + "]"
-    return str_Gauge
+    """
+    Text based progress bar. Kept for compatibility, see
+    lib_progresschannel.gauge.
+    """
+    return pch.gauge(current,total)
 
 def blankfornan(fnord):
     """
@@ -1225,6 +1530,7 @@ def create_dataframe_EPDR(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
     and the array with sample IDs, locations and concentrations and creates the data dataframe that will be used
     to calculate values based on the assay type.
     """
+    progress = pch.get_channel(dlg_progress)
     # Get number of samples:
     int_Samples = dfr_Samples.shape[0]
     # Create new dataframe
@@ -1238,26 +1544,29 @@ def create_dataframe_EPDR(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
     # Check each concentration if it occurs more than once, then write it into a new list and add the corresponding locations
     # to a list and add that list to a list. Once finished, overwrite columns Locations and Concentration with the new list.
     # dfr_Samples must have been sorted for Concentration for this to work properly.
-    dlg_progress.lbx_Log.InsertItems([f"Number of samples to process: {int_Samples}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"Processed 0 out of {int_Samples} samples"], dlg_progress.lbx_Log.Count)
+    progress.message(f"Number of samples to process: {int_Samples}")
+    progress.count(0, int_Samples, "samples")
+    arr_Readings = dfr_RawData.iloc[:,1].to_numpy()
     for smpl in range(int_Samples):
         # Assign list of lists to dataframe
-        dfr_Processed.loc[smpl,"Destination"] = dfr_Samples.loc[smpl,"Destination"]
-        dfr_Processed.loc[smpl,"SampleID"] = dfr_Samples.loc[smpl,"SampleID"]
+        str_Plate = dfr_Samples.loc[smpl,"Destination"]
+        str_Sample = dfr_Samples.loc[smpl,"SampleID"]
+        dfr_Processed.loc[smpl,"Destination"] = str_Plate
+        dfr_Processed.loc[smpl,"SampleID"] = str_Sample
         dfr_Processed.loc[smpl,"SourceConcentration"] = dfr_Samples.loc[smpl,"SourceConcentration"]
         dfr_Processed.loc[smpl,"Concentrations"] = dfr_Samples.loc[smpl,"Concentrations"]
         dfr_Processed.loc[smpl,"AssayVolume"] = fltAssayVolume
         dfr_Processed.loc[smpl,"Locations"] = dfr_Samples.loc[smpl,"Locations"]
-        lstlstRaw = []
-        for conc in range(len(dfr_Processed.loc[smpl,"Concentrations"])):
-            lstlstRaw.append([dfr_RawData.iloc[rep,1] for rep in dfr_Processed.loc[smpl,"Locations"][conc]])
+        # Locations are well indices, i.e. rows of the raw data
+        lstlstRaw = [arr_Readings[loc].tolist() for loc in dfr_Processed.loc[smpl,"Locations"]]
         dfr_Processed.loc[smpl,"RawData"] = lstlstRaw
         dfr_Processed.loc[smpl,"Raw"], dfr_Processed.loc[smpl,"RawSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstRaw)
         dfr_Processed.loc[smpl,"RawExcluded"] = [np.nan] * len(dfr_Processed.loc[smpl,"Concentrations"])
 
         # Normalisation needs to happen before datafitting is attempted
-        lstlstNorm = [Normalise(raw, str_AssayType, dfr_References) for raw in lstlstRaw]
-        dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstNorm)
+        with trace.span("normalise", plate = str_Plate, sample = str_Sample):
+            lstlstNorm = [Normalise(raw, str_AssayType, dfr_References) for raw in lstlstRaw]
+            dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstNorm)
         dfr_Processed.loc[smpl,"NormExcluded"] = [np.nan] * len(dfr_Processed.loc[smpl,"Concentrations"])
 
         # Fitting criteria
@@ -1275,10 +1584,20 @@ def create_dataframe_EPDR(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
         dfr_Processed.loc[smpl,"DoFit"] = get_DoFit(dfr_Processed.loc[smpl,"Norm"],dfr_Processed.loc[smpl,"NormSEM"])
         # Perform fit -> Check if fitting criteria are met in the first instance
         if dfr_Processed.loc[smpl,"DoFit"] == True:
-            dfr_Processed.loc[smpl,"RawFit"], dfr_Processed.loc[smpl,"RawFitPars"], dfr_Processed.loc[smpl,"RawFitCI"], dfr_Processed.loc[smpl,"RawFitErrors"], dfr_Processed.loc[smpl,"RawFitR2"], dfr_Processed.loc[smpl,"DoFitRaw"] = ff.fit_sigmoidal_free(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Raw"])
-            dfr_Processed.loc[smpl,"NormFitFree"], dfr_Processed.loc[smpl,"NormFitFreePars"], dfr_Processed.loc[smpl,"NormFitFreeCI"], dfr_Processed.loc[smpl,"NormFitFreeErrors"], dfr_Processed.loc[smpl,"NormFitFreeR2"], dfr_Processed.loc[smpl,"DoFitFree"] = ff.fit_sigmoidal_free(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Norm"])
-            # Constrained fit needs SEM for fit
-            dfr_Processed.loc[smpl,"NormFitConst"], dfr_Processed.loc[smpl,"NormFitConstPars"], dfr_Processed.loc[smpl,"NormFitConstCI"], dfr_Processed.loc[smpl,"NormFitConstErrors"], dfr_Processed.loc[smpl,"NormFitConstR2"], dfr_Processed.loc[smpl,"DoFitConst"] = ff.fit_sigmoidal_const(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"])
+            with trace.span("fit", plate = str_Plate, sample = str_Sample) as spn_Fit:
+                # Only get the parameters here, the fits themselves and their R square
+                # values get calculated for the whole plate at once further down.
+                dfr_Processed.loc[smpl,"RawFitPars"], dfr_Processed.loc[smpl,"RawFitCI"], dfr_Processed.loc[smpl,"RawFitErrors"] = ff.fit_sigmoidal_free(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Raw"], parsonly = True)
+                dfr_Processed.loc[smpl,"NormFitFreePars"], dfr_Processed.loc[smpl,"NormFitFreeCI"], dfr_Processed.loc[smpl,"NormFitFreeErrors"] = ff.fit_sigmoidal_free(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Norm"], parsonly = True)
+                # Constrained fit needs SEM for fit
+                dfr_Processed.loc[smpl,"NormFitConstPars"], dfr_Processed.loc[smpl,"NormFitConstCI"], dfr_Processed.loc[smpl,"NormFitConstErrors"] = ff.fit_sigmoidal_const(dfr_Processed.loc[smpl,"Concentrations"], dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"], parsonly = True)
+                # Failed fits return np.nan for all parameters
+                dfr_Processed.loc[smpl,"DoFitRaw"] = not np.isnan(dfr_Processed.loc[smpl,"RawFitPars"]).any()
+                bol_Free = not np.isnan(dfr_Processed.loc[smpl,"NormFitFreePars"]).any()
+                bol_Const = not np.isnan(dfr_Processed.loc[smpl,"NormFitConstPars"]).any()
+                dfr_Processed.loc[smpl,"DoFitFree"] = bol_Free
+                dfr_Processed.loc[smpl,"DoFitConst"] = bol_Const
+                spn_Fit.set(free = bol_Free, constrained = bol_Const)
             # If both the free and constrained fit fail, set check variable to False
             if dfr_Processed.loc[smpl,"DoFitFree"] == False and dfr_Processed.loc[smpl,"DoFitConst"] == False:
                 dfr_Processed.loc[smpl,"DoFit"] = False
@@ -1298,7 +1617,19 @@ def create_dataframe_EPDR(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
             dfr_Processed.loc[smpl,"DoFitConst"] = False
 
         dfr_Processed.loc[smpl,"Show"] = 1
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, f"{ProgressGauge(smpl+1,int_Samples)} {smpl+1} out of {int_Samples} samples.")
+        progress.count(smpl+1, int_Samples, "samples")
+
+    # Draw fits and calculate R square values for all samples in one go.
+    # Samples without (successful) fit have np.nan parameters and get
+    # np.nan fits and R square values.
+    with trace.span("statistics", samples = int_Samples):
+        lst_Doses = dfr_Processed["Concentrations"].tolist()
+        for str_Fit, str_Data in [["RawFit","Raw"],["NormFitFree","Norm"],["NormFitConst","Norm"]]:
+            dic_Statistics = fs.plate_statistics(lst_Doses,
+                                                 dfr_Processed[str_Data].tolist(),
+                                                 dfr_Processed[str_Fit+"Pars"].tolist())
+            dfr_Processed[str_Fit] = dic_Statistics["Fit"]
+            dfr_Processed[str_Fit+"R2"] = dic_Statistics["RSquare"]
 
     # Return
     return dfr_Processed
@@ -1441,6 +1772,7 @@ def create_dataframe_EPSD(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
     and the array with sample IDs, locations and concentrations and creates the data dataframe that will be used
     to calculate values based on the assay type.
     """
+    progress = pch.get_channel(dlg_progress)
     # Get number of samples:
     int_Samples = dfr_Samples.shape[0]
     # Create new dataframe
@@ -1454,29 +1786,32 @@ def create_dataframe_EPSD(dfr_RawData, dfr_Samples, dfr_References, str_AssayTyp
     # Check each concentration if it occurs more than once, then write it into a new list and add the corresponding locations
     # to a list and add that list to a list. Once finished, overwrite columns Locations and Concentration with the new list.
     # dfr_Samples must have been sorted for Concentration for this to work properly.
-    dlg_progress.lbx_Log.InsertItems([f"Number of samples to process: {int_Samples}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"Processed 0 out of {int_Samples} samples"], dlg_progress.lbx_Log.Count)
+    progress.message(f"Number of samples to process: {int_Samples}")
+    progress.count(0, int_Samples, "samples")
+    arr_Readings = dfr_RawData.iloc[:,1].to_numpy()
     for smpl in range(int_Samples):
         # Assign list of lists to dataframe
-        dfr_Processed.loc[smpl,"Destination"] = dfr_Samples.loc[smpl,"Destination"]
-        dfr_Processed.loc[smpl,"SampleID"] = dfr_Samples.loc[smpl,"SampleID"]
+        str_Plate = dfr_Samples.loc[smpl,"Destination"]
+        str_Sample = dfr_Samples.loc[smpl,"SampleID"]
+        dfr_Processed.loc[smpl,"Destination"] = str_Plate
+        dfr_Processed.loc[smpl,"SampleID"] = str_Sample
         dfr_Processed.loc[smpl,"SourceConcentration"] = dfr_Samples.loc[smpl,"SourceConcentration"]
         dfr_Processed.loc[smpl,"Concentrations"] = dfr_Samples.loc[smpl,"Concentrations"]
         dfr_Processed.loc[smpl,"AssayVolume"] = fltAssayVolume
         dfr_Processed.loc[smpl,"Locations"] = dfr_Samples.loc[smpl,"Locations"]
-        lstlstRaw = []
-        for conc in range(len(dfr_Processed.loc[smpl,"Concentrations"])):
-            lstlstRaw.append([dfr_RawData.iloc[rep,1] for rep in dfr_Processed.loc[smpl,"Locations"][conc]])
+        # Locations are well indices, i.e. rows of the raw data
+        lstlstRaw = [arr_Readings[loc].tolist() for loc in dfr_Processed.loc[smpl,"Locations"]]
         dfr_Processed.loc[smpl,"RawData"] = lstlstRaw
         dfr_Processed.loc[smpl,"Raw"], dfr_Processed.loc[smpl,"RawSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstRaw)
         dfr_Processed.loc[smpl,"RawExcluded"] = [np.nan] * len(dfr_Processed.loc[smpl,"Concentrations"])
 
-        lstlstNorm = [Normalise(raw, str_AssayType, dfr_References) for raw in lstlstRaw]
-        dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstNorm)
+        with trace.span("normalise", plate = str_Plate, sample = str_Sample):
+            lstlstNorm = [Normalise(raw, str_AssayType, dfr_References) for raw in lstlstRaw]
+            dfr_Processed.loc[smpl,"Norm"], dfr_Processed.loc[smpl,"NormSEM"], fnord = Mean_SEM_STDEV_ListList(lstlstNorm)
         dfr_Processed.loc[smpl,"NormExcluded"] = [np.nan] * len(dfr_Processed.loc[smpl,"Concentrations"])
 
         dfr_Processed.loc[smpl,"Show"] = 1
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, f"{ProgressGauge(smpl+1,int_Samples)} {smpl+1} out of {int_Samples} samples.")
+        progress.count(smpl+1, int_Samples, "samples")
     # Return
     return dfr_Processed
 
@@ -1496,6 +1831,7 @@ def create_dataframe_DSF(dfr_RawData, dfr_Samples, dfr_Layout, dlg_progress):
     and the array with sample IDs, locations and concentrations and creates the data dataframe that will be used
     to calculate values based on the assay type.
     """
+    progress = pch.get_channel(dlg_progress)
     wells = dfr_RawData.shape[0]
     # This function is called per plate, so there will only be one plate name
     str_PlateName = dfr_Samples.loc[0,"Destination"]
@@ -1527,8 +1863,8 @@ def create_dataframe_DSF(dfr_RawData, dfr_Samples, dfr_Layout, dlg_progress):
     processed = pd.DataFrame(columns=lst_Columns, index=range(int_Samples))
     #flt_AssayVolume = float(assay_volume)
     k = -1
-    dlg_progress.lbx_Log.InsertItems([f"Number of samples to process: {int_Samples}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["Processed 0 out of {int_Samples} samples"], dlg_progress.lbx_Log.Count)
+    progress.message(f"Number of samples to process: {int_Samples}")
+    progress.count(0, int_Samples, "samples")
     
     for sample in lst_SampleIDs:
         if type(sample) == str:
@@ -1609,10 +1945,11 @@ def create_dataframe_DSF(dfr_RawData, dfr_Samples, dfr_Layout, dlg_progress):
                         tmguess = processed.loc[k,"Temp"][inf_max]
                     else:
                         tmguess = middle_of_list(processed.loc[k,"Temp"])
-                    pars, confidence, stderr, success = ff.fit_tm_boltzmann(processed.loc[k,"Temp"],
-                                                                           processed.loc[k,fit],
-                                                                           tmguess,
-                                                                           transition)
+                    with trace.span("fit", plate = str_PlateName, sample = sample, series = fit):
+                        pars, confidence, stderr, success = ff.fit_tm_boltzmann(processed.loc[k,"Temp"],
+                                                                               processed.loc[k,fit],
+                                                                               tmguess,
+                                                                               transition)
                     if pars[0] > np.nanmax(processed.loc[k,"Temp"]):
                         pars = [np.nan] * 4
                         drawn = [np.nan] * len(processed.loc[k,"Temp"])
@@ -1635,7 +1972,7 @@ def create_dataframe_DSF(dfr_RawData, dfr_Samples, dfr_Layout, dlg_progress):
                 #    processed.at[k,"Fit"] = ff.draw_tm_thompson(processed.loc[k,"Temp"],pars)
 
             processed.loc[k,"Show"] = 0
-            dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, f"{ProgressGauge(k+1,int_Samples)} {k+1} out of {int_Samples} samples.")
+            progress.count(k+1, int_Samples, "samples")
     # Calculate DTms:
     # Make dataframe to calculate average Tm of references
     lst_Proteins = list(set(dfr_Layout["ProteinID"]))
@@ -1689,32 +2026,31 @@ def create_dataframe_DSF(dfr_RawData, dfr_Samples, dfr_Layout, dlg_progress):
                 if not pd.isna(tm_Norm):
                     processed.at[proc,"NormDTm"] = round(tm_Norm - references.loc[int(dfr_Layout.loc[well,"ProteinNumerical"]),"AverageTmNorm"],2)
         else:
-            dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, "No reference wells have been defined for protein " + lst_Proteins[i] + ". Only melting temperatures, not Tm shifts, were calculated.")
+            progress.warning("No reference wells have been defined for protein " + lst_Proteins[i] + ". Only melting temperatures, not Tm shifts, were calculated.")
 
     return processed, references
 
 def create_Database_frame_DSF_Platemap(details, lstHeaders, dfr_PlateData, dfr_Layout):
-        # Filter out controls:
-    dfr_PlateData = dfr_PlateData[dfr_PlateData["SampleID"] != "Control"]
-    # Create partial Database frame
-    dfr_PlateMap = pd.DataFrame(columns=lstHeaders,index=range(dfr_PlateData.shape[0]))
-    # Go through dfr_PlateData and write into dfPatial
-    for i in range(len(dfr_PlateData)):
-
-        dfr_PlateMap.iloc[i,0] = dfr_Layout.loc["PlateID"] #"PlateID"
-        if details["AssayType"] == "nanoDSF":
-            dfr_PlateMap.iloc[i,1] = dfr_Layout.loc["PlateID"] + pf.index_to_well(dfr_PlateData.loc[i,"CapIndex"]+1,96) #"PlateWell ID"
-        else:
-            dfr_PlateMap.iloc[i,1] = str(dfr_Layout.loc["PlateID"]) + dfr_PlateData.loc[i,"Well"] #"PlateWell ID"
-        dfr_PlateMap.iloc[i,2] = "Plate Parent"
-        dfr_PlateMap.iloc[i,3] = dfr_PlateData.loc[i,"SampleID"] # "SGC Global Compound ID"
-        dfr_PlateMap.iloc[i,4] = "Well concentration(mM)"
-        dfr_PlateMap.iloc[i,5] = "Neccesary additive"
-        dfr_PlateMap.iloc[i,6] = "Plate well: plate active"
-        dfr_PlateMap.iloc[i,7] = "Plate well purpose"
-        dfr_PlateMap.iloc[i,8] = "Plate well comments"
-    
-    return dfr_PlateMap
+    """
+    Creates the plate map for database upload for one plate from the
+    export template (lib_exporttemplates).
+
+    Arguments:
+        details -> dictionary. Assay details.
+        lstHeaders -> list. Column headers of the plate map.
+        dfr_PlateData -> pandas dataframe. Processed data of the plate.
+        dfr_Layout -> pandas series. Layout of the plate.
+
+    Returns pandas dataframe.
+    """
+    # Filter out controls:
+    dfr_PlateData = dfr_PlateData[dfr_PlateData["SampleID"] != "Control"].reset_index(drop=True)
+    if details["AssayType"] == "nanoDSF":
+        template = et.NANODSF_PLATEMAP
+    else:
+        template = et.DSF_PLATEMAP
+    return et.apply_template(template, dfr_PlateData, lst_Headers = lstHeaders,
+                             context = {"PlateID":dfr_Layout.loc["PlateID"]})
 
 def recalculate_fit_DSF(sample):
 
@@ -1777,14 +2113,15 @@ def write_Enthalpy(flt_H, bol_DoFit, flt_PlusMinus):
 ##########################################################################
 
 def complete_container_nanoDSF(data_path,assay_category,bol_PlateID,dfr_Capillaries,dfr_Layout,dlg_progress):
-    dlg_progress.lbx_Log.InsertItems(["Assay category: " + assay_category], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+    progress = pch.get_channel(dlg_progress)
+    progress.message("Assay category: " + assay_category)
+    progress.message("")
 
     dfr_Container = pd.DataFrame(columns=["Destination","Samples","Capillaries","DataFile",
         "RawData","Processed","Layout","References"], index=range(1))
 
     for idx_Set in dfr_Container.index:
-        dlg_progress.lbx_Log.InsertItems([f"Processing capillary set {idx_Set + 1}"], dlg_progress.lbx_Log.Count)
+        progress.stage(f"Processing capillary set {idx_Set + 1}")
         dfr_Container.loc[idx_Set,"Destination"] = f"CapillarySet_{idx_Set+1}"
         dfr_Container.loc[idx_Set,"DataFile"] = data_path
         dfr_Container.at[idx_Set,"RawData"] = ro.get_prometheus_readout(data_path)
@@ -1799,6 +2136,7 @@ def complete_container_nanoDSF(data_path,assay_category,bol_PlateID,dfr_Capillar
     return dfr_Container
 
 def create_dataframe_nanoDSF(raw_data, capillaries, layout, dlg_progress):
+    progress = pch.get_channel(dlg_progress)
     # raw_data is dfr_Prometheus
     raw_data = raw_data[raw_data["CapillaryName"] != "no capillary"]
     int_Samples = raw_data.shape[0]
@@ -1823,47 +2161,60 @@ def create_dataframe_nanoDSF(raw_data, capillaries, layout, dlg_progress):
     processed["350nm"] = raw_data["350nm"]
     processed["Scattering"] = raw_data["Scattering"]
 
-    dlg_progress.lbx_Log.InsertItems([f"Number of samples to process: {int_Samples}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"Processed 0 out of {int_Samples} samples"], dlg_progress.lbx_Log.Count)
-
-    k = -1
-    for cap in range(int_Samples):
-        k += 1
-        processed.at[cap,"RatioDeriv"],processed.at[cap,"RatioInflections"],processed.at[cap,"RatioSlopes"] = ff.derivative(raw_data.loc[cap,"Temp"], raw_data.loc[cap,"Ratio"],2,2,"both")
-        processed.at[cap,"330nmDeriv"],processed.at[cap,"330nmInflections"],processed.at[cap,"330nmSlopes"] = ff.derivative(raw_data.loc[cap,"Temp"], raw_data.loc[cap,"330nm"],2,2,"both")
-        processed.at[cap,"350nmDeriv"],processed.at[cap,"350nmInflections"],processed.at[cap,"350nmSlopes"] = ff.derivative(raw_data.loc[cap,"Temp"], raw_data.loc[cap,"350nm"],2,2,"both")
-        processed.at[cap,"ScatteringDeriv"],processed.at[cap,"ScatteringInflections"],processed.at[cap,"ScatteringSlopes"] = ff.derivative(raw_data.loc[cap,"Temp"], raw_data.loc[cap,"Scattering"],2,2,"both")
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, f"{ProgressGauge(k+1,int_Samples)} {k+1} out of {int_Samples} samples.")
+    progress.message(f"Number of samples to process: {int_Samples}")
+    progress.count(0, int_Samples, "samples")
+
+    # Stack all channels of all capillaries into one (channel x capillary
+    # x temperature) array and take the derivatives in one go.
+    # Capillaries normally have the same number of temperature points;
+    # if not, each length gets its own stack.
+    lst_Channels = ["Ratio","330nm","350nm","Scattering"]
+    lst_Temps = raw_data["Temp"].tolist()
+    arr_Lengths = np.array([len(temp) for temp in lst_Temps])
+    for int_Length in np.unique(arr_Lengths):
+        arr_Caps = np.flatnonzero(arr_Lengths == int_Length)
+        arr_Temp = np.array([lst_Temps[cap] for cap in arr_Caps], dtype=float)
+        arr_Stack = np.array([[raw_data[channel].iloc[cap] for cap in arr_Caps]
+                              for channel in lst_Channels], dtype=float)
+        arr_Deriv, lst_Inflections, lst_Slopes = ff.derivatives(
+            np.tile(arr_Temp, (len(lst_Channels),1)),
+            arr_Stack.reshape(-1, int_Length), 2, 2, "both")
+        arr_Deriv = arr_Deriv.reshape(len(lst_Channels), len(arr_Caps), int_Length)
+        for chnl, channel in enumerate(lst_Channels):
+            for idx, cap in enumerate(arr_Caps):
+                row = chnl*len(arr_Caps) + idx
+                processed.at[cap,channel+"Deriv"] = arr_Deriv[chnl,idx].tolist()
+                processed.at[cap,channel+"Inflections"] = lst_Inflections[row]
+                processed.at[cap,channel+"Slopes"] = lst_Slopes[row]
+    progress.count(int_Samples, int_Samples, "samples")
 
     # Calculate DTms:
-    # Make dataframe to calculate average Tm of references
-    lst_Proteins = list(set(layout.loc["ProteinID"]))
-    references = pd.DataFrame(columns=["TmSum","n","AverageTm"], index=(range(len(lst_Proteins))))
-    # Since the protein assignment works differently here (at least at the moment), we will have to iterate through to assign the numerical:
-    for cap in processed.index:
-        for prot in range(len(lst_Proteins)):
-            if layout.loc["ProteinID"][cap] == lst_Proteins[prot]:
-                layout.loc["ProteinNumerical"][cap] = prot+1
-    # Need to initialise these with 0 to make the += work later.
-    for i in range(len(lst_Proteins)):
-        references.at[i,"TmSum"] = 0
-        references.at[i,"n"] = 0
-        references.at[i,"AverageTm"] = 0
-    # Sum up Tms of references
-    for cap in processed.index:
-        if layout["WellType"][cap] == "r":
-            references.at[int(layout["ProteinNumerical"][cap])-1,"TmSum"] += processed.loc[cap,"RatioInflections"][0]
-            references.at[int(layout["ProteinNumerical"][cap])-1,"n"] += 1
-    # Average Tms of references
-    for ref in references.index:
-        if references.loc[ref,"n"] > 0:
-            references.at[ref,"AverageTm"] = round(references.loc[ref,"TmSum"]/references.loc[ref,"n"],2)
-            # get DTms of samples
-            for cap in processed.index:
-                processed.at[cap,"NormDTm"] = round(processed.loc[cap,"RatioInflections"][0] - references.loc[int(layout["ProteinNumerical"][cap])-1,"AverageTm"],2)
-        else:
-            dlg_progress.lbx_Log.InsertItems(["No reference capillaries have been defined for protein " + lst_Proteins[i] + ". Only melting temperatures, not Tm shifts, were calculated."],
-                dlg_progress.lbx_Log.Count)
+    # Tm of each capillary is the first inflection of the ratio
+    arr_Tm = np.array([inflections[0] if len(inflections) > 0 else np.nan
+                       for inflections in processed["RatioInflections"]], dtype=float)
+    # Protein numericals start at 1. Since the protein assignment works
+    # differently here (at least at the moment), assign them here.
+    arr_Proteins, lst_Proteins = pd.factorize(pd.Series(list(layout.loc["ProteinID"]))[:int_Samples],
+                                              sort=True, use_na_sentinel=False)
+    for cap in range(int_Samples):
+        layout.loc["ProteinNumerical"][cap] = arr_Proteins[cap] + 1
+    # Average Tms of references per protein
+    arr_Reference = ((np.array(list(layout["WellType"]))[:int_Samples] == "r")
+                     & ~np.isnan(arr_Tm))
+    arr_TmSum = np.bincount(arr_Proteins[arr_Reference], weights=arr_Tm[arr_Reference],
+                            minlength=len(lst_Proteins))
+    arr_n = np.bincount(arr_Proteins[arr_Reference], minlength=len(lst_Proteins))
+    arr_AverageTm = np.round(np.divide(arr_TmSum, arr_n, out=np.zeros(len(lst_Proteins)),
+                                       where=arr_n > 0), 2)
+    references = pd.DataFrame({"TmSum":arr_TmSum,"n":arr_n,"AverageTm":arr_AverageTm},
+                              index=range(len(lst_Proteins)))
+    for prot in np.flatnonzero(arr_n == 0):
+        progress.warning("No reference capillaries have been defined for protein "
+                         + str(lst_Proteins[prot]) + ". Only melting temperatures, not Tm shifts, were calculated.")
+    # DTms of capillaries whose protein has references
+    arr_DTm = np.where(arr_n[arr_Proteins] > 0,
+                       np.round(arr_Tm - arr_AverageTm[arr_Proteins], 2), np.nan)
+    processed["NormDTm"] = arr_DTm
 
     return processed, references
 
@@ -1883,12 +2234,13 @@ def create_dataframe_rate(raw_data, dfr_Samples, dfr_Layout, dlg_progress):
         and the array with sample IDs, locations and concentrations and creates the data dataframe that will be used
         to calculate values based on the assay type.
     """
+    progress = pch.get_channel(dlg_progress)
     # This function is called per plate, so there will only be one plate name
     str_PlateName = dfr_Samples.loc[0,"Destination"]
     #fltAssayVolume = float(assay_volume)
     k = 0
-    dlg_progress.lbx_Log.InsertItems([f"Number of samples to process: {dfr_Samples.shape[0]}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"Processed 0 out of {dfr_Samples.shape[0]} samples"], dlg_progress.lbx_Log.Count)
+    progress.message(f"Number of samples to process: {dfr_Samples.shape[0]}")
+    progress.count(0, dfr_Samples.shape[0], "samples")
 
     dfr_Processed = pd.DataFrame(columns = ["Destination",
                                             "Concentrations",
@@ -2038,7 +2390,7 @@ def create_dataframe_rate(raw_data, dfr_Samples, dfr_Layout, dlg_progress):
                                             "RSquare":vi_r_square}
 
         
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, f"{ProgressGauge(k+1,dfr_Samples.shape[0])} {k+1} out of {dfr_Samples.shape[0]} samples.")
+        progress.count(k+1, dfr_Samples.shape[0], "samples")
         k += 1
 
     # Return
@@ -2199,31 +2551,41 @@ def write_Rate(flt_Rate, bol_DoFit, flt_PlusMinus):
 ##########################################
 
 def complete_container_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Concentrations, lst_Conditions, str_ReferenceCondition, lst_Replicates, str_DataProcessor):
+    progress = pch.get_channel(dlg_progress)
 
     #assay_data = pd.DataFrame(index=[0],columns=["Column"])
 
     #assay_data.at[0,"Column"] = create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Concentrations, lst_Conditions, lst_Replicates)
     # read raw data
     int_Plates = dfr_DataStructure.shape[0]
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["Reading raw data files:"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"0 out of {int_Plates} files read."], dlg_progress.lbx_Log.Count)
+    progress.message("")
+    progress.message("Reading raw data files:")
+    progress.count(0, int_Plates, "files read")
     k = 0
     dlg_progress.currentitems = int_Plates
-    for idx in dfr_DataStructure.index:
-        dfr_DataStructure.at[idx,"RawData"] = ro.get_operetta_readout(dfr_DataStructure.loc[idx,"FilePath"], str_DataProcessor)
-        if dfr_DataStructure.at[idx,"RawData"] is None:
-            msg.warn_files_not_loaded()
-            dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-            dlg_progress.lbx_Log.InsertItems(["Processing aborted, could not load files."], dlg_progress.lbx_Log.Count)
-            return None, None, None
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, ProgressGauge(k+1,int_Plates) + " " + str(k+1) + " out of " + str(int_Plates) + " files read.")
-        k += 1
+    # Reading the files is mostly waiting for the disk or network share,
+    # so several files are read at the same time.
+    with ThreadPoolExecutor(max_workers = max(1, min(4, int_Plates))) as pool:
+        dic_Futures = {pool.submit(ro.get_operetta_readout,
+                                   dfr_DataStructure.loc[idx,"FilePath"],
+                                   str_DataProcessor):idx for idx in dfr_DataStructure.index}
+        for future in as_completed(dic_Futures):
+            dfr_DataStructure.at[dic_Futures[future],"RawData"] = future.result()
+            if dfr_DataStructure.at[dic_Futures[future],"RawData"] is None:
+                for waiting in dic_Futures:
+                    waiting.cancel()
+                msg.warn_files_not_loaded()
+                progress.message("")
+                progress.message("Processing aborted, could not load files.")
+                return None, None, None
+            progress.count(k+1, int_Plates, "files read")
+            k += 1
 
     return create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Concentrations, lst_Conditions, str_ReferenceCondition, lst_Replicates)
 
 
 def create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Concentrations, lst_Conditions, str_ReferenceCondition, lst_Replicates):
+    progress = pch.get_channel(dlg_progress)
 
     dfr_ReferenceLocations = CBCS_get_references(dfr_Layout)
     str_ZPrimeControl = CBCS_find_ZPrime(dfr_Layout)
@@ -2232,14 +2594,14 @@ def create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Conce
 
     # Normalise data and determine control values:
     int_Plates = dfr_DataStructure.shape[0]
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["Normalising plates:"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"0 out of {int_Plates} plates normalised."], dlg_progress.lbx_Log.Count)
+    progress.message("")
+    progress.message("Normalising plates:")
+    progress.count(0, int_Plates, "plates normalised")
 
     k = 0
     for idx in dfr_DataStructure.index:
         dfr_DataStructure.at[idx,"Normalised"], dfr_DataStructure.at[idx,"Controls"] = CBCS_normalise_plate(dfr_DataStructure.loc[idx,"RawData"], dfr_ReferenceLocations)
-        dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, ProgressGauge(k+1,int_Plates) + " " + str(k+1) + " out of " + str(int_Plates) + " plates normalised.")
+        progress.count(k+1, int_Plates, "plates normalised")
         k += 1
 
     lst_ConcIndices = []
@@ -2250,15 +2612,18 @@ def create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Conce
             lst_CondIndices.append(cond)
     lst_Indices = [lst_ConcIndices, lst_CondIndices]
     dfr_Processed = pd.DataFrame(index=lst_Indices,columns=["Data","PerCent","Controls",
-                                                            "m","c","RSquare","Pearson",
+                                                            "m","c","RSquare","Pearson","Spearman",
                                                             "ZPrimeMean","ZPrimeMedian"])
 
+    # Replicate correlation for all plates in one go
+    dfr_Correlation = CBCS_replicate_correlation(dfr_DataStructure, lst_Replicates)
+
     # process normalised data
     int_Conditions = len(lst_CondIndices)
     k = 0
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["Processing conditions:"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([f"0 out of {int_Conditions} conditions processed."], dlg_progress.lbx_Log.Count)
+    progress.message("")
+    progress.message("Processing conditions:")
+    progress.count(0, int_Conditions, "conditions processed")
     for conc in lst_Concentrations:
         for cond in lst_Conditions:
             # Prepare empty lists:
@@ -2293,8 +2658,9 @@ def create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Conce
                     lst_NormSTDEV[well] = np.nanstd(lst_NormValues)
                     lst_NormMAD[well] = mad(lst_NormValues)
 
-            dfr_Processed.loc[(conc,cond),"m"], dfr_Processed.loc[(conc,cond),"c"], dfr_Processed.loc[(conc,cond),"RSquare"], dfr_Processed.loc[(conc,cond),"Pearson"] = ff.calculate_repcorr(dfr_DataStructure.loc[(conc,cond,"R1"),"Normalised"]["PerCent"],
-                dfr_DataStructure.loc[(conc,cond,"R2"),"Normalised"]["PerCent"])
+            if (conc,cond,"R1","R2") in dfr_Correlation.index:
+                for col in ["m","c","RSquare","Pearson","Spearman"]:
+                    dfr_Processed.loc[(conc,cond),col] = dfr_Correlation.loc[(conc,cond,"R1","R2"),col]
 
             dfr_Processed.at[(conc,cond),"Controls"] = CBCS_calculate_controls(lst_RawMean, dfr_ReferenceLocations)
             #dfr_Processed.at[(conc,cond),"Controls"] = CBCS_calculate_controls(lst_NormMean, dfr_ReferenceLocations)
@@ -2322,20 +2688,20 @@ def create_dataframe_CBCS(dfr_DataStructure, dfr_Layout, dlg_progress, lst_Conce
                                                                       "DeltaZScore":lst_DeltaZScore,
                                                                       "NormMeanPerCent":lst_NormMeanPerCent})
 
-            dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, ProgressGauge(k+1,int_Conditions) + " " + str(k+1) + " out of " + str(int_Conditions) + " conditions processed.")
+            progress.count(k+1, int_Conditions, "conditions processed")
             k += 1
 
     # get Delta Z Score:
     if not str_ReferenceCondition == None:
         k = 0
-        dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems(["Calculating DeltaZScores for each condition:"], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems([f"0 out of {int_Conditions} conditions processed."], dlg_progress.lbx_Log.Count)
+        progress.message("")
+        progress.message("Calculating DeltaZScores for each condition:")
+        progress.count(0, int_Conditions, "conditions processed")
         for conc in lst_Concentrations:
             for cond in lst_Conditions:
                 for well in range(wells):
                     dfr_Processed.loc[(conc,cond),"Data"].loc[well,"DeltaZScore"] = dfr_Processed.loc[(conc,cond),"Data"].loc[well,"ZScore"] - dfr_Processed.loc[(conc,str_ReferenceCondition),"Data"].loc[well,"ZScore"]
-                dlg_progress.lbx_Log.SetString(dlg_progress.lbx_Log.Count - 1, ProgressGauge(k+1,int_Conditions) + " " + str(k+1) + " out of " + str(int_Conditions) + " conditions processed.")
+                progress.count(k+1, int_Conditions, "conditions processed")
                 k += 1
 
     dfr_SampleInfo = pd.DataFrame(columns=["MaxDeltaZScore"],index=range(wells))
@@ -2421,6 +2787,43 @@ def CBCS_normalise_plate(dfr_RawData, dfr_ReferenceLocations):
 
     return dfr_Return, dfr_Controls
 
+def CBCS_replicate_correlation(dfr_DataStructure, lst_Replicates):
+    """
+    Calculates replicate correlation (linear fit, Pearson's and Spearman's
+    correlation coefficients) for every pair of replicates of every
+    concentration and condition in one vectorised call, based on the
+    normalised data (per-cent of solvent reference).
+
+    Arguments:
+        dfr_DataStructure -> pandas dataframe. Indexed by (concentration,
+                             condition, replicate), after normalisation.
+        lst_Replicates -> list of replicate indices, e.g. ["R1","R2"].
+
+    Returns pandas dataframe indexed by (concentration, condition,
+    replicate, replicate) with columns "Points", "m", "c", "RSquare",
+    "Pearson" and "Spearman".
+    """
+    lst_Pairs = []
+    lst_Rep1 = []
+    lst_Rep2 = []
+    for (conc,cond) in dict.fromkeys([idx[:2] for idx in dfr_DataStructure.index]):
+        for rep1, rep2 in combinations(lst_Replicates, 2):
+            if (not (conc,cond,rep1) in dfr_DataStructure.index or
+                not (conc,cond,rep2) in dfr_DataStructure.index):
+                continue
+            lst_Pairs.append((conc,cond,rep1,rep2))
+            lst_Rep1.append(dfr_DataStructure.at[(conc,cond,rep1),"Normalised"]["PerCent"].to_numpy(dtype = float))
+            lst_Rep2.append(dfr_DataStructure.at[(conc,cond,rep2),"Normalised"]["PerCent"].to_numpy(dtype = float))
+    if len(lst_Pairs) == 0:
+        return pd.DataFrame(columns = ["Points","m","c","RSquare","Pearson","Spearman"])
+    arr_Rep1 = fs.pad(lst_Rep1)
+    arr_Rep2 = fs.pad(lst_Rep2, arr_Rep1.shape[1])
+
+    dic_Correlation = fs.replicate_correlation(arr_Rep1, arr_Rep2)
+    return pd.DataFrame(index = pd.MultiIndex.from_tuples(lst_Pairs,
+                            names = ["Concentration","Condition","Rep1","Rep2"]),
+                        data = dic_Correlation)
+
 def CBCS_get_references(dfr_Layout):
     
     lst_ControlNumericals = []
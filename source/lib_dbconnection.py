@@ -18,6 +18,7 @@ import os
 import lib_custombuttons as btn
 import lib_colourscheme as cs
 import oracledb as odb
+import lib_dbpool as dbp
 
 import pandas as pd
 
@@ -28,9 +29,12 @@ class OXFSCARABdb:
     
     Originally, this included "admin" as a usertype and a lot of other tings.
     This was omitted from this class since it is not required for this application.
-    
+
+    Connections come from a pool (lib_dbpool.ConnectionPool), self.pool.
+    Verification and upload threads each borrow one from it (see
+    lib_dbpool.ConnectionPool.connection).
     """
-    def __init__(self, username, password):
+    def __init__(self, username, password, pool_size = 4):
         
         self.connected = False
         self.error = ""
@@ -51,9 +55,12 @@ class OXFSCARABdb:
                 self.error = u"client_not_initialised"
                 return
             try:
-                self.conn = odb.connect(user = username,
-                                        password = password,
-                                        dsn = "delphi.cmd.ox.ac.uk/CMDpdb")
+                self.pool = dbp.ConnectionPool(dbp.OracleDriver(username = username,
+                                                                password = password,
+                                                                dsn = "delphi.cmd.ox.ac.uk/CMDpdb"),
+                                               size = pool_size)
+                # Open the first connection to check the credentials
+                self.pool.release(self.pool.acquire())
                 self.connected = True
             except odb.Error as err:
                 error_obj, = err.args
@@ -73,7 +80,7 @@ class OXFSCARABdb:
 
         if self.connected == True:
             try:
-                self.conn.close()
+                self.pool.close()
                 #print("Connection closed")
                 return "closed"
             except:
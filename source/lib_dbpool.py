@@ -0,0 +1,463 @@
+"""
+Database access layer for bulk uploads: pluggable drivers, a connection
+pool, batched inserts and set based existence checks.
+
+Nothing in here depends on wx or on a particular database. The Oracle
+driver imports oracledb only when it is used, the SQLite driver can
+stand in for it to test and benchmark the upload path locally.
+
+    Classes
+        Driver
+        OracleDriver
+        SQLiteDriver
+        ConnectionPool
+
+    Functions
+        python_value
+        dataframe_rows
+        insert_rows
+        existing_values
+        missing_values
+        upload_dataframe
+        benchmark_upload
+"""
+
+import queue
+import threading
+import sqlite3
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+##########################################################################
+##                                                                      ##
+##    #####   #####   ##  ##  ##  ######  #####    #####                ##
+##    ##  ##  ##  ##  ##  ##  ##  ##      ##  ##  ##                    ##
+##    ##  ##  #####   ##  ##  ##  ####    #####    ####                 ##
+##    ##  ##  ##  ##  ##   ####   ##      ##  ##      ##                ##
+##    #####   ##  ##  ##    ##    ######  ##  ##  #####                 ##
+##                                                                      ##
+##########################################################################
+
+class Driver:
+    """
+    Interface for database drivers. A driver knows how to open a DB-API
+    connection and how to write bind variables for its database.
+    """
+
+    name = "generic"
+    # Maximum number of bind variables in one IN (...) clause
+    max_in = 999
+
+    def connect(self):
+        """
+        Returns a new DB-API 2.0 connection.
+        """
+        raise NotImplementedError
+
+    def placeholder(self, position):
+        """
+        Returns the bind variable for the given (zero based) position.
+        """
+        raise NotImplementedError
+
+    def placeholders(self, count):
+        """
+        Returns a comma separated string of count bind variables.
+        """
+        return ", ".join([self.placeholder(i) for i in range(count)])
+
+class OracleDriver(Driver):
+    """
+    Driver for the CMD-Oxford Scarab (Oracle) database via oracledb.
+    """
+
+    name = "oracle"
+    max_in = 1000
+
+    def __init__(self, username, password,
+                 dsn = "delphi.cmd.ox.ac.uk/CMDpdb",
+                 client_dir = None):
+        """
+        Arguments:
+            username -> string.
+            password -> string.
+            dsn -> string. Data source name of the database.
+            client_dir -> string. Path of the Oracle instant client.
+                          If given, the client gets initialised
+                          (thick mode).
+        """
+        import oracledb as odb
+        self.odb = odb
+        self.username = username
+        self.password = password
+        self.dsn = dsn
+        if client_dir is not None:
+            try:
+                odb.init_oracle_client(lib_dir = client_dir)
+            except odb.ProgrammingError:
+                # Client has already been initialised in this session
+                pass
+
+    def connect(self):
+        return self.odb.connect(user = self.username,
+                                password = self.password,
+                                dsn = self.dsn)
+
+    def placeholder(self, position):
+        return ":" + str(position + 1)
+
+class SQLiteDriver(Driver):
+    """
+    Local stand-in for the Oracle database. By default, all connections
+    share one in-memory database for as long as one of them is open.
+    """
+
+    name = "sqlite"
+    max_in = 999
+
+    def __init__(self, path = None):
+        """
+        Arguments:
+            path -> string. Path of the database file. If None, a
+                    shared in-memory database is used.
+        """
+        if path is None:
+            self.path = f"file:bbq_{id(self)}?mode=memory&cache=shared"
+            self.uri = True
+        else:
+            self.path = path
+            self.uri = False
+
+    def connect(self):
+        return sqlite3.connect(self.path,
+                               uri = self.uri,
+                               check_same_thread = False)
+
+    def placeholder(self, position):
+        return "?"
+
+##########################################################################
+##                                                                      ##
+##    #####    ####    ####   ##                                        ##
+##    ##  ##  ##  ##  ##  ##  ##                                        ##
+##    #####   ##  ##  ##  ##  ##                                        ##
+##    ##      ##  ##  ##  ##  ##                                        ##
+##    ##       ####    ####   ######                                    ##
+##                                                                      ##
+##########################################################################
+
+class ConnectionPool:
+    """
+    Thread safe pool of database connections. Connections are opened
+    when needed, up to a maximum, and re-used afterwards.
+    """
+
+    def __init__(self, driver, size = 4, timeout = 30):
+        """
+        Arguments:
+            driver -> Driver instance.
+            size -> int. Maximum number of open connections.
+            timeout -> float. Seconds to wait for a free connection
+                       before raising queue.Empty.
+        """
+        self.driver = driver
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def acquire(self):
+        """
+        Returns an idle connection, opens a new one if the pool is not
+        full yet or waits for one to be released.
+        """
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                bol_Open = True
+            else:
+                bol_Open = False
+        if bol_Open == True:
+            try:
+                return self.driver.connect()
+            except:
+                with self.lock:
+                    self.opened -= 1
+                raise
+        return self.idle.get(timeout = self.timeout)
+
+    def release(self, conn, broken = False):
+        """
+        Hands a connection back to the pool.
+
+        Arguments:
+            conn -> connection from acquire().
+            broken -> boolean. If True, the connection gets closed and
+                      not re-used.
+        """
+        if broken == True or self.closed == True:
+            try:
+                conn.close()
+            except:
+                pass
+            with self.lock:
+                self.opened -= 1
+        else:
+            self.idle.put(conn)
+
+    def connection(self):
+        """
+        Context manager around acquire() and release():
+
+            with pool.connection() as conn:
+                ...
+        """
+        return _PooledConnection(self)
+
+    def close(self):
+        """
+        Closes all idle connections. Connections still in use get closed
+        when they are released.
+        """
+        self.closed = True
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except:
+                pass
+            with self.lock:
+                self.opened -= 1
+
+class _PooledConnection:
+    """
+    Context manager returned by ConnectionPool.connection()
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.acquire()
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # A connection that raised a database error may be in an
+        # unknown state, do not hand it to the next user.
+        self.pool.release(self.conn, broken = exc_type is not None)
+        return False
+
+##########################################################################
+##                                                                      ##
+##    #####   ##  ##  ##      ##  ##                                    ##
+##    ##  ##  ##  ##  ##      ## ##                                     ##
+##    #####   ##  ##  ##      ####                                      ##
+##    ##  ##  ##  ##  ##      ## ##                                     ##
+##    #####    ####   ######  ##  ##                                    ##
+##                                                                      ##
+##########################################################################
+
+def python_value(value):
+    """
+    Turns numpy and pandas values into python natives that DB-API
+    drivers accept. NaN and NA become None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, dict, np.ndarray)):
+        return str(value)
+    try:
+        if pd.isna(value):
+            return None
+    except:
+        pass
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+def dataframe_rows(dfr, columns = None):
+    """
+    Returns a dataframe as list of tuples of python values, ready to be
+    handed to executemany().
+
+    Arguments:
+        dfr -> pandas dataframe.
+        columns -> list of column names. Defaults to all columns.
+    """
+    if columns is None:
+        columns = dfr.columns.to_list()
+    return [tuple(python_value(value) for value in row)
+            for row in dfr[columns].itertuples(index = False, name = None)]
+
+def insert_rows(conn, driver, table, columns, rows, batch_size = 500):
+    """
+    Inserts rows with executemany() in batches. Does not commit.
+
+    Arguments:
+        conn -> DB-API connection.
+        driver -> Driver the connection came from.
+        table -> string. Name of the database table.
+        columns -> list of column names.
+        rows -> list of tuples, one per row.
+        batch_size -> int. Rows per executemany() call.
+
+    Returns number of inserted rows.
+    """
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+           + f"VALUES ({driver.placeholders(len(columns))})")
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start+batch_size])
+    finally:
+        cursor.close()
+    return len(rows)
+
+def existing_values(conn, driver, table, column, values):
+    """
+    Set based existence check: finds which of the values exist in a
+    column of a table with one query per block of values instead of one
+    query per value.
+
+    Arguments:
+        conn -> DB-API connection.
+        driver -> Driver the connection came from.
+        table -> string. Name of the database table.
+        column -> string. Name of the column to look in.
+        values -> collection of values to look for.
+
+    Returns set of values that exist.
+    """
+    lst_Values = list(set(python_value(value) for value in values) - {None})
+    set_Found = set()
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(lst_Values), driver.max_in):
+            lst_Block = lst_Values[start:start+driver.max_in]
+            cursor.execute(f"SELECT DISTINCT {column} FROM {table} "
+                           + f"WHERE {column} IN ({driver.placeholders(len(lst_Block))})",
+                           lst_Block)
+            set_Found.update(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+    return set_Found
+
+def missing_values(pool, dfr, dependencies):
+    """
+    Verifies foreign key style dependencies of a dataframe before upload.
+
+    Arguments:
+        pool -> ConnectionPool.
+        dfr -> pandas dataframe to upload.
+        dependencies -> dictionary. Keys are columns in dfr, values are
+                        tuples of (table, column) in the database the
+                        values have to exist in.
+
+    Returns dictionary with a set of missing values for each dependent
+    column. All sets empty means the dataframe is verified.
+    """
+    dic_Missing = {}
+    with pool.connection() as conn:
+        for str_Column, (str_Table, str_DBColumn) in dependencies.items():
+            set_Values = set(python_value(value) for value in dfr[str_Column]) - {None}
+            set_Found = existing_values(conn, pool.driver, str_Table,
+                                        str_DBColumn, set_Values)
+            dic_Missing[str_Column] = set_Values - set_Found
+    return dic_Missing
+
+def upload_dataframe(pool, table, dfr, plate_column = None, key_column = None,
+                     batch_size = 500, columns = None, progress = None):
+    """
+    Uploads a dataframe into a database table. Each plate is inserted in
+    its own transaction: it gets committed completely or, on error,
+    rolled back completely.
+
+    Arguments:
+        pool -> ConnectionPool.
+        table -> string. Name of the database table.
+        dfr -> pandas dataframe. Column names must match the table.
+        plate_column -> string. Column to group rows into plates by.
+                        If None, the whole dataframe is one transaction.
+        key_column -> string. Optional unique key column. Rows whose key
+                      already exists in the table are skipped.
+        batch_size -> int. Rows per executemany() call.
+        columns -> list of columns to upload. Defaults to all.
+        progress -> optional ProgressChannel (lib_progresschannel).
+
+    Returns number of inserted rows, or a string with the error message
+    if a plate could not be uploaded (earlier plates stay committed).
+    """
+    if columns is None:
+        columns = dfr.columns.to_list()
+    if plate_column is None:
+        lst_Plates = [(None, dfr)]
+    else:
+        lst_Plates = list(dfr.groupby(plate_column, sort = False))
+
+    int_Inserted = 0
+    for idx, (plate, dfr_Plate) in enumerate(lst_Plates):
+        with pool.connection() as conn:
+            try:
+                if key_column is not None:
+                    set_Existing = existing_values(conn, pool.driver, table,
+                                                   key_column, dfr_Plate[key_column])
+                    if len(set_Existing) > 0:
+                        dfr_Plate = dfr_Plate[~dfr_Plate[key_column].map(python_value).isin(set_Existing)]
+                int_Inserted += insert_rows(conn, pool.driver, table, columns,
+                                            dataframe_rows(dfr_Plate, columns),
+                                            batch_size)
+                conn.commit()
+            except Exception as ex:
+                try:
+                    conn.rollback()
+                except:
+                    pass
+                return f"Upload of plate {plate} failed: {ex}"
+        if progress is not None:
+            progress.count(idx+1, len(lst_Plates), "plates uploaded")
+    return int_Inserted
+
+def benchmark_upload(rows = 100000, plates = 20, batch_sizes = (1, 100, 500, 2000)):
+    """
+    Times upload_dataframe() against a fresh SQLite stand-in for
+    different batch sizes.
+
+    Arguments:
+        rows -> int. Number of rows in the synthetic dataframe.
+        plates -> int. Number of plates the rows are spread over.
+        batch_sizes -> tuple of ints.
+
+    Returns dictionary of batch size -> seconds.
+    """
+    rng = np.random.default_rng(0)
+    dfr = pd.DataFrame({"PLATE": [f"Plate_{i % plates}" for i in range(rows)],
+                        "SAMPLE_ID": [f"BBQ-{i:07d}" for i in range(rows)],
+                        "WELL": rng.integers(0, 1536, rows),
+                        "IC50": rng.random(rows)})
+    dic_Times = {}
+    for batch in batch_sizes:
+        pool = ConnectionPool(SQLiteDriver(), size = 2)
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE RESULTS (PLATE TEXT, SAMPLE_ID TEXT PRIMARY KEY, "
+                         + "WELL INTEGER, IC50 REAL)")
+            # Keep this connection open so the in-memory database survives
+            start = perf_counter()
+            upload_dataframe(pool, "RESULTS", dfr, plate_column = "PLATE",
+                             key_column = "SAMPLE_ID", batch_size = batch)
+            dic_Times[batch] = perf_counter() - start
+        pool.close()
+    return dic_Times
@@ -17,90 +17,285 @@
     In this module:
 
     Functions to deal with MS Excel files
+
+    Files are identified by their first bytes rather than their extension
+    and read with exactly one engine. Open workbooks are kept for the
+    length of an import session (see ImportSession), so that the sheet
+    list, the rule editors and the readers do not parse the same workbook
+    more than once. Outside of an import session, workbooks are closed
+    as soon as they have been read, so no file handles are held.
+
+    Classes:
+        ImportSession
+
+    Functions:
+        sniff_filetype
+        get_engine
+        GetWorksheets
+        workbook_key
+        open_workbook
+        cached_workbook
+        close_workbooks
+        read_sheet
+        direct_read
 """
 
 
 # Imports #####################################################################################################################################################
 
-import xlrd
 import pandas as pd
 import os
-import xmltodict
+import threading
 import zipfile as zf
-from pathlib import Path
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import contextmanager
 
 ###############################################################################################################################################################
 
+# Magic bytes at the start of the file
+MAGIC_ZIP = b"PK\x03\x04"
+MAGIC_OLE2 = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Open workbooks (pandas ExcelFile objects, each with a lock for reading
+# from it), keyed by path, size and modification time so that a changed
+# file gets read again. Only used while an import session is active.
+_workbooks = OrderedDict()
+_lock = threading.Lock()
+_sessions = 0
+
+def sniff_filetype(str_FilePath):
+    """
+    Determines the actual type of a file from its first bytes.
+
+    Arguments:
+        str_FilePath -> string. File path.
+
+    Returns
+        "xlsx" for Office Open XML workbooks (.xlsx, .xlsm),
+        "xls" for legacy binary workbooks,
+        "csv" for anything else (i.e. text files, some of which come
+        with an Excel extension),
+        None if the file cannot be read.
+    """
+    try:
+        with open(str_FilePath, "rb") as file:
+            bytes_Start = file.read(8)
+    except:
+        return None
+    if bytes_Start.startswith(MAGIC_ZIP):
+        try:
+            with zf.ZipFile(str_FilePath, "r") as zip_Excel:
+                if "xl/workbook.xml" in zip_Excel.namelist():
+                    return "xlsx"
+        except:
+            None
+        return None
+    if bytes_Start == MAGIC_OLE2:
+        return "xls"
+    return "csv"
+
+def get_engine(str_FileType):
+    """
+    Returns the pandas engine to read a file of the given type with
+    (see sniff_filetype).
+    """
+    return {"xlsx":"openpyxl", "xls":"xlrd", "csv":"python"}.get(str_FileType, None)
+
 def GetWorksheets(str_FilePath, str_Extension):
     """
     Takes the file path (str_FilePath as string) and file extension (str_Extension as string) of an MS Excel file
     and returns the names of the worksheets therein as a list.
 
+    For .xlsx files, the sheet names are read from xl/workbook.xml inside the zip
+    archive without extracting anything or loading the workbook.
+
     Includes contingency in case the file is not a true Excel file: Returns empty list.
     """
+    str_FileType = sniff_filetype(str_FilePath)
+    if str_FileType == "xlsx":
+        try:
+            with zf.ZipFile(str_FilePath, "r") as zip_Excel:
+                xml_Workbook = ET.fromstring(zip_Excel.read("xl/workbook.xml"))
+            # Tags carry the namespace, e.g. "{http://...}sheet". Sheets are
+            # listed in the order they appear in the workbook.
+            return [element.get("name") for element in xml_Workbook.iter()
+                    if element.tag.split("}")[-1] == "sheet"]
+        except:
+            return []
+    elif str_FileType == "xls":
+        with open_workbook(str_FilePath) as tpl_Workbook:
+            if not tpl_Workbook is None:
+                return list(tpl_Workbook[0].sheet_names)
+    # If file can't be parsed, it's a different file type masquerading as an Excel file. Return empty list.
+    return []
+
+def workbook_key(str_FilePath):
+    """
+    Returns key for the workbook cache: absolute path, size and
+    modification time of the file.
+    """
+    stat = os.stat(str_FilePath)
+    return (os.path.abspath(str_FilePath), stat.st_size, stat.st_mtime)
+
+@contextmanager
+def open_workbook(str_FilePath):
+    """
+    Context manager for an open workbook, parsing it only if it is not
+    open already:
+
+        with ef.open_workbook(str_FilePath) as tpl_Workbook:
+            wbk, lck_Workbook = tpl_Workbook
+
+    Inside an import session, the workbook stays open in the cache until
+    the session ends. Outside of one, it gets closed when the with block
+    is left.
+
+    Arguments:
+        str_FilePath -> string. File path.
+
+    Yields tuple of pandas ExcelFile and its lock, or None if the file is
+    not an Excel file.
+    """
+    tpl_Workbook = cached_workbook(str_FilePath)
+    try:
+        if tpl_Workbook is None:
+            yield None
+        else:
+            yield tpl_Workbook[:2]
+    finally:
+        if not tpl_Workbook is None and not tpl_Workbook[2]:
+            tpl_Workbook[0].close()
+
+def cached_workbook(str_FilePath):
+    """
+    Returns tuple of open workbook, its lock and whether it is in the
+    cache, opening the workbook if required. None if the file is not an
+    Excel file.
 
-    # Approach for "old" Excel files
+    Workbooks only get cached while an import session is active. A
+    workbook that is not in the cache has to be closed by the caller
+    (see open_workbook).
+    """
     try:
-    # if str_Extension == "xls":
-        # Load Excel file with xlrd such that worksheet contents will only be loaded when accessed:
-        wbk = xlrd.open_workbook(str_FilePath, on_demand=True)
-        return wbk.sheet_names()
+        tpl_Key = workbook_key(str_FilePath)
     except:
-        None
-    
-    # Approach for "new" Excel files
-    # elif str_Extension == "xlsx":
+        return None
+    with _lock:
+        if tpl_Key in _workbooks:
+            _workbooks.move_to_end(tpl_Key)
+            return _workbooks[tpl_Key] + (True,)
+    str_Engine = get_engine(sniff_filetype(str_FilePath))
+    if not str_Engine in ["openpyxl","xlrd"]:
+        return None
     try:
-        lst_Worksheets = []
-        dic_Worksheets = {}
-        bool_SingleSheet = False
-        zip_Excel = zf.ZipFile(str_FilePath, "r")
-        zip_Excel.extract(r"xl/workbook.xml",os.path.join(Path.home(),"bbqtempdir"))
-        str_Path = os.path.join(Path.home(),"bbqtempdir","xl","workbook.xml")
-        dic_XML = xmltodict.parse(open(str_Path).read())
-        # Go to correct level based on .xlsx file format definition
-        for sheet in dic_XML["workbook"]["sheets"]["sheet"]:
-            int_Numerical = None
-            str_Name = None
-            if hasattr(sheet, "keys") == True:
-                # There is more than one sheet in the file
-                for key in sheet.keys():
-                    # Find the key that has the numerical sheet ID and the key that has the sheet name
-                    if key.find("sheetId") != -1:
-                        int_Numerical = int(sheet[key]) -1
-                    if key.find("name") != -1:
-                        str_Name = sheet[key]
-                    if not int_Numerical == None and not str_Name == None:
-                        dic_Worksheets[int_Numerical] = str_Name
-            else:
-                # There is only one sheet in this workbook, break the for loop
-                bool_SingleSheet = True
-                break
-        if bool_SingleSheet == True:
-            # Temporarily assign dic_XML["workbook"]["sheets"]["sheet"] to variable singlesheet to make code easier to write
-            singlesheet = dic_XML["workbook"]["sheets"]["sheet"]
-            for key in singlesheet.keys():
-            # Find the key that has the numerical sheet ID and the key that has the sheet name
-                if key.find("sheetId") != -1:
-                    int_Numerical = int(singlesheet[key]) -1
-                if key.find("name") != -1:
-                    str_Name = singlesheet[key]
-                if not int_Numerical == None and not str_Name == None:
-                    dic_Worksheets[int_Numerical] = str_Name
-            # set singlesheet to None to break link
-            singlesheet = None
-        for sheet in dic_Worksheets.keys():
-            lst_Worksheets.append(dic_Worksheets[sheet])
-        return lst_Worksheets
+        wbk = pd.ExcelFile(str_FilePath, engine=str_Engine)
     except:
-        None
+        return None
+    with _lock:
+        # Another thread may have opened it in the meantime
+        if tpl_Key in _workbooks:
+            wbk.close()
+            return _workbooks[tpl_Key] + (True,)
+        if _sessions == 0:
+            return (wbk, threading.Lock(), False)
+        _workbooks[tpl_Key] = (wbk, threading.Lock())
+        return _workbooks[tpl_Key] + (True,)
 
-    # If file can't be parsed, it's a different file type masquerading as an Excel file. Return empty list.
-    return []
+def close_workbooks():
+    """
+    Closes all open workbooks.
+    """
+    with _lock:
+        while len(_workbooks) > 0:
+            try:
+                _workbooks.popitem(last=False)[1][0].close()
+            except:
+                None
+
+class ImportSession:
+    """
+    Context manager for reading files. Workbooks opened inside the
+    session stay open until the (outermost) session ends:
+
+        with ef.ImportSession():
+            ...
+
+    Windows that read the same files over and over (e.g. the rule
+    editors) can hold a session for as long as they are open:
+
+        self.import_session = ef.ImportSession().open()
+        ...
+        self.import_session.close()
+
+    Methods:
+        open
+        close
+    """
+
+    def __init__(self):
+        self.bol_Open = False
+
+    def open(self):
+        """
+        Starts the session. Returns the session.
+        """
+        global _sessions
+        with _lock:
+            if self.bol_Open == False:
+                self.bol_Open = True
+                _sessions += 1
+        return self
+
+    def close(self):
+        """
+        Ends the session. Closes all workbooks if this was the last open
+        session. Calling it again does nothing.
+        """
+        global _sessions
+        with _lock:
+            if self.bol_Open == False:
+                return None
+            self.bol_Open = False
+            _sessions -= 1
+            int_Open = _sessions
+        if int_Open == 0:
+            close_workbooks()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def read_sheet(str_FilePath, sheet_name = 0, **kwargs):
+    """
+    Reads a worksheet from a workbook (see open_workbook).
+
+    Arguments:
+        str_FilePath -> string. File path.
+        sheet_name -> string or integer. Worksheet to read.
+        kwargs -> further keyword arguments for pandas.ExcelFile.parse,
+                  e.g. header.
+
+    Returns pandas dataframe. Raises an exception if the file or sheet
+    cannot be read, like pandas.read_excel.
+    """
+    with open_workbook(str_FilePath) as tpl_Workbook:
+        if tpl_Workbook is None:
+            raise ValueError(f"{str_FilePath} is not an Excel file")
+        wbk, lck_Workbook = tpl_Workbook
+        # A workbook must not be read from two threads at the same time
+        with lck_Workbook:
+            return wbk.parse(sheet_name=sheet_name, **kwargs)
 
 def direct_read(str_FilePath, str_Extension, str_SheetToOpen):
     """
     Takes information about file and returns all contents, which function was used to open it and which engine was used.
+
+    The engine is chosen based on the actual file type (see sniff_filetype), so
+    the file only gets parsed once.
     
     Arguments:
     str_FilePath -> string
@@ -112,24 +307,15 @@ def direct_read(str_FilePath, str_Extension, str_SheetToOpen):
         str_FileType,
         str_Engine
     """
-
-    # Select correct parser based on file extension
-    if str_Extension == "csv" or str_Extension == "txt":
+    str_FileType = sniff_filetype(str_FilePath)
+    if str_FileType == "csv":
         try:
             return pd.read_csv(str_FilePath, sep=None, header=None, index_col=False, engine="python"),"csv", "python"
         except:
             return None, None, None
-    elif str_Extension[0:3] == "xls":
+    elif str_FileType in ["xlsx","xls"]:
         try:
-            # Try first engine: openpyxl
-            return pd.read_excel(str_FilePath, sheet_name=str_SheetToOpen, header=None, index_col=None, engine="openpyxl"), "xls", "openpyxl"
+            return read_sheet(str_FilePath, sheet_name=str_SheetToOpen, header=None, index_col=None), "xls", get_engine(str_FileType)
         except:
-            try:
-                # Try second engine: xlrd
-                return pd.read_excel(str_FilePath, sheet_name=str_SheetToOpen, header=None, index_col=None, engine="xlrd"), "xls", "xlrd"
-            except:
-                try:
-                    # Assume file extension is incorrect: Try to read it as a .csv or .txt file:
-                    return pd.read_csv(str_FilePath, sep=None, header=None, index_col=False, engine="python"), "csv", "python"
-                except:
-                    return None, None, None
\ No newline at end of file
+            return None, None, None
+    return None, None, None
@@ -0,0 +1,279 @@
+"""
+Streaming export of results tables to Excel and CSV files.
+
+Tables get written in chunks, so neither a complete copy of the table as
+text nor a complete workbook has to be held in memory, and on a worker
+thread (ExportJob), so the GUI stays responsive. Progress gets posted to a
+lib_progresschannel.ProgressChannel and the export can be cancelled
+between chunks.
+
+Everything gets written to a temporary file next to the destination which
+is renamed into place once it is complete. An existing file is therefore
+only ever replaced by a complete export, never by a partial one.
+
+Nothing in here depends on wx.
+
+    Classes
+        ExportJob
+
+    Functions
+        temp_path
+        write_csv
+        write_excel
+        split_table
+        sheet_name
+        excel_values
+        cell_value
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime, date, time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+import lib_tracing as trace
+
+# Rows written between progress updates/checks for cancellation
+CHUNK = 5000
+
+class ExportJob(threading.Thread):
+    """
+    Runs write_csv or write_excel on a worker thread.
+
+        job = ExportJob(write_excel, dfr_Table, str_Path, channel,
+                        on_finished = finished, str_SplitBy = "PlateID")
+        job.start()
+        ...
+        job.cancel()
+
+    After the thread has finished, job.status is "done", "cancelled" or
+    "failed". For "failed", job.error holds the exception. on_finished
+    gets called with the job as the last thing the thread does; it runs
+    on the worker thread, so GUI code has to hand it on (wx.CallAfter).
+
+    Methods:
+        run
+        cancel
+    """
+
+    def __init__(self, function, dfr_Table, str_Path, progress = None,
+                 on_finished = None, **kwargs):
+        """
+        Arguments:
+            function -> function. write_csv or write_excel.
+            dfr_Table -> pandas dataframe to export.
+            str_Path -> string. Destination file.
+            progress -> ProgressChannel or None.
+            on_finished -> function or None. Gets called with the job
+                           once it has finished.
+            kwargs -> further keyword arguments for function.
+        """
+        threading.Thread.__init__(self, daemon = True)
+        self.function = function
+        self.dfr_Table = dfr_Table
+        self.str_Path = str_Path
+        self.progress = progress
+        self.on_finished = on_finished
+        self.kwargs = kwargs
+        self.cancelled = threading.Event()
+        self.status = None
+        self.error = None
+
+    def run(self):
+        try:
+            with trace.span("export", "export", function = self.function.__name__,
+                            rows = self.dfr_Table.shape[0]):
+                bol_Done = self.function(self.dfr_Table, self.str_Path,
+                                         progress = self.progress,
+                                         cancel = self.cancelled,
+                                         **self.kwargs)
+            self.status = "done" if bol_Done == True else "cancelled"
+        except Exception as error:
+            self.error = error
+            self.status = "failed"
+        if not self.on_finished is None:
+            self.on_finished(self)
+
+    def cancel(self):
+        """
+        Asks the export to stop after the current chunk. The destination
+        file is left untouched.
+        """
+        self.cancelled.set()
+
+def temp_path(str_Path):
+    """
+    Creates an empty temporary file in the same directory as str_Path,
+    so that it can be renamed into place without copying.
+
+    Returns path of temporary file.
+    """
+    str_Directory, str_File = os.path.split(os.path.abspath(str_Path))
+    int_Handle, str_Temp = tempfile.mkstemp(prefix = "." + str_File + ".",
+                                            suffix = ".part", dir = str_Directory)
+    os.close(int_Handle)
+    return str_Temp
+
+def write_csv(dfr_Table, str_Path, progress = None, cancel = None,
+              int_Chunk = CHUNK, index = True):
+    """
+    Writes dataframe to csv in chunks of rows. Output is the same as
+    dfr_Table.to_csv(str_Path, index = index).
+
+    Arguments:
+        dfr_Table -> pandas dataframe.
+        str_Path -> string. Destination file.
+        progress -> ProgressChannel or None.
+        cancel -> threading.Event or None. Checked between chunks.
+        int_Chunk -> integer. Rows per chunk.
+        index -> boolean. Whether to write the index.
+
+    Returns True if the file was written, False if cancelled.
+    """
+    int_Rows = dfr_Table.shape[0]
+    str_Temp = temp_path(str_Path)
+    try:
+        with open(str_Temp, "w", newline = "", encoding = "utf-8") as file:
+            # Header only
+            dfr_Table.iloc[:0].to_csv(file, index = index)
+            for int_Start in range(0, int_Rows, int_Chunk):
+                if not cancel is None and cancel.is_set():
+                    os.remove(str_Temp)
+                    return False
+                dfr_Table.iloc[int_Start:int_Start+int_Chunk].to_csv(file, index = index,
+                                                                     header = False)
+                if not progress is None:
+                    progress.count(min(int_Start + int_Chunk, int_Rows), int_Rows, "rows")
+        os.replace(str_Temp, str_Path)
+    except:
+        if os.path.exists(str_Temp):
+            os.remove(str_Temp)
+        raise
+    return True
+
+def write_excel(dfr_Table, str_Path, progress = None, cancel = None,
+                int_Chunk = CHUNK, index = True, str_SplitBy = None):
+    """
+    Writes dataframe to an Excel workbook using openpyxl's write-only
+    mode, which streams rows to disk instead of building the workbook in
+    memory.
+
+    Arguments:
+        dfr_Table -> pandas dataframe.
+        str_Path -> string. Destination file.
+        progress -> ProgressChannel or None.
+        cancel -> threading.Event or None. Checked between chunks.
+        int_Chunk -> integer. Rows per chunk.
+        index -> boolean. Whether to write the index as first column.
+        str_SplitBy -> string or None. If a column name is given, each
+                       value of this column (e.g. each plate) gets its
+                       own worksheet.
+
+    Returns True if the file was written, False if cancelled.
+    """
+    int_Rows = dfr_Table.shape[0]
+    int_Done = 0
+    lst_Header = [str(col) for col in dfr_Table.columns]
+    if index == True:
+        lst_Header.insert(0, "" if dfr_Table.index.name is None else str(dfr_Table.index.name))
+    wbk_Export = Workbook(write_only = True)
+    lst_Names = []
+    for str_Sheet, dfr_Sheet in split_table(dfr_Table, str_SplitBy):
+        wks_Sheet = wbk_Export.create_sheet(sheet_name(str_Sheet, lst_Names))
+        wks_Sheet.append(lst_Header)
+        for int_Start in range(0, dfr_Sheet.shape[0], int_Chunk):
+            if not cancel is None and cancel.is_set():
+                wbk_Export.close()
+                return False
+            for row in excel_values(dfr_Sheet.iloc[int_Start:int_Start+int_Chunk], index):
+                wks_Sheet.append(row)
+            int_Done += dfr_Sheet.iloc[int_Start:int_Start+int_Chunk].shape[0]
+            if not progress is None:
+                progress.count(int_Done, int_Rows, "rows")
+    if len(lst_Names) == 0:
+        # Empty table, still write the header
+        wbk_Export.create_sheet("Sheet1").append(lst_Header)
+    str_Temp = temp_path(str_Path)
+    try:
+        wbk_Export.save(str_Temp)
+        os.replace(str_Temp, str_Path)
+    except:
+        if os.path.exists(str_Temp):
+            os.remove(str_Temp)
+        raise
+    return True
+
+def split_table(dfr_Table, str_SplitBy = None):
+    """
+    Generator. Yields (sheet name, dataframe) pairs: one per value of
+    column str_SplitBy in order of first appearance, or the whole table
+    as "Sheet1" if str_SplitBy is None or not a column of the table.
+    Empty tables yield nothing.
+    """
+    if dfr_Table.shape[0] == 0:
+        return
+    if str_SplitBy is None or not str_SplitBy in dfr_Table.columns:
+        yield "Sheet1", dfr_Table
+        return
+    for value, dfr_Group in dfr_Table.groupby(str_SplitBy, sort = False, dropna = False):
+        yield ("None" if pd.isna(value) else str(value)), dfr_Group
+
+def sheet_name(str_Name, lst_Names):
+    """
+    Turns str_Name into a valid, unique Excel worksheet name (at most 31
+    characters, none of []:*?/\\) and adds it to lst_Names.
+
+    Returns the worksheet name.
+    """
+    for char in "[]:*?/\\":
+        str_Name = str_Name.replace(char, "_")
+    str_Name = str_Name.strip("'")[:31]
+    if str_Name == "":
+        str_Name = "Sheet"
+    str_Unique = str_Name
+    int_Copy = 1
+    while str_Unique.lower() in [name.lower() for name in lst_Names]:
+        int_Copy += 1
+        str_Suffix = " (" + str(int_Copy) + ")"
+        str_Unique = str_Name[:31-len(str_Suffix)] + str_Suffix
+    lst_Names.append(str_Unique)
+    return str_Unique
+
+def excel_values(dfr_Chunk, index = True):
+    """
+    Converts a chunk of a dataframe into rows of values openpyxl can
+    write: NaN becomes an empty cell, numpy scalars become python
+    numbers, anything that is not a number, text or date (e.g. lists)
+    becomes text.
+
+    Returns list of lists.
+    """
+    dfr_Chunk = dfr_Chunk.reset_index() if index == True else dfr_Chunk
+    lst_Columns = []
+    for col in range(dfr_Chunk.shape[1]):
+        ser_Column = dfr_Chunk.iloc[:,col]
+        if pd.api.types.is_bool_dtype(ser_Column.dtype) or pd.api.types.is_numeric_dtype(ser_Column.dtype):
+            # Casting to object gives python numbers
+            lst_Values = ser_Column.astype(object).where(ser_Column.notna(), None).tolist()
+        else:
+            lst_Values = [cell_value(value) for value in ser_Column.tolist()]
+        lst_Columns.append(lst_Values)
+    return [list(row) for row in zip(*lst_Columns)]
+
+def cell_value(value):
+    """
+    Returns value in a form openpyxl can write into a cell.
+    """
+    if isinstance(value, (list, tuple, dict, set, np.ndarray)):
+        return str(value)
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool, datetime, date, time)):
+        return value
+    return str(value)
@@ -0,0 +1,281 @@
+"""
+Declarative export templates.
+
+An export template describes the columns of an export as data: a list of
+(header, expression) pairs. Expressions get evaluated on whole columns of
+the source dataframe (e.g. dfr_Database), so the time an export takes does
+not grow with a python loop over the rows.
+
+An expression is one of
+    - an integer: column of the source dataframe by position
+    - a string: column of the source dataframe by name
+    - a list ["operation", arguments...], see OPERATIONS. Arguments that
+      are expressions themselves can be nested.
+
+Example:
+    ["pEC50", ["negate", 13]] -> column "pEC50" is minus column 13.
+
+Templates only use lists, strings and numbers, so they could equally be
+read from JSON files.
+
+    Functions
+        apply_template
+        evaluate
+        row_values
+        op_column
+        op_number
+        op_constant
+        op_context
+        op_now
+        op_negate
+        op_difference
+        op_rowmin
+        op_rowmax
+        op_bins
+        op_concat
+        op_well
+
+    Templates
+        DOTMATICS
+        DSF_PLATEMAP
+        NANODSF_PLATEMAP
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import lib_platefunctions as pf
+
+def apply_template(template, dfr_Source, lst_Headers = None, context = {}):
+    """
+    Builds the export dataframe for a template.
+
+    Arguments:
+        template -> dictionary with key "Columns": list of
+                    [header, expression] pairs.
+        dfr_Source -> pandas dataframe the expressions refer to.
+        lst_Headers -> list of strings or None. If given, replaces the
+                       headers of the template, by position. Headers
+                       beyond the columns of the template become empty
+                       columns.
+        context -> dictionary. Values for "context" expressions, e.g.
+                   the plate ID.
+
+    Returns pandas dataframe with the same index as dfr_Source.
+    """
+    # Values that should be the same for every row, e.g. the time of export
+    context = dict(context)
+    context.setdefault("Now", datetime.now())
+    dic_Columns = {}
+    lst_Names = []
+    for idx, (str_Header, expression) in enumerate(template["Columns"]):
+        if not lst_Headers is None:
+            str_Header = lst_Headers[idx]
+        lst_Names.append(str_Header)
+        dic_Columns[idx] = evaluate(expression, dfr_Source, context)
+    if not lst_Headers is None:
+        for idx in range(len(template["Columns"]), len(lst_Headers)):
+            lst_Names.append(lst_Headers[idx])
+            dic_Columns[idx] = np.nan
+    dfr_Export = pd.DataFrame(dic_Columns, index = dfr_Source.index)
+    # Headers do not have to be unique (e.g. several empty columns)
+    dfr_Export.columns = lst_Names
+    return dfr_Export
+
+def evaluate(expression, dfr_Source, context):
+    """
+    Evaluates an expression on dfr_Source.
+
+    Returns pandas series (or scalar, which gets broadcast).
+    """
+    if isinstance(expression, (int, np.integer)):
+        return op_column(dfr_Source, context, expression)
+    if isinstance(expression, str):
+        return op_column(dfr_Source, context, expression)
+    return OPERATIONS[expression[0]](dfr_Source, context, *expression[1:])
+
+def op_column(dfr_Source, context, column):
+    """
+    Column of the source dataframe, by position (integer) or name.
+    """
+    if isinstance(column, (int, np.integer)):
+        return dfr_Source.iloc[:,column]
+    return dfr_Source[column]
+
+def op_number(dfr_Source, context, expression):
+    """
+    Expression converted to numbers. Anything that is not a number
+    (e.g. empty strings) becomes NaN.
+    """
+    values = evaluate(expression, dfr_Source, context)
+    if isinstance(values, pd.Series):
+        return pd.to_numeric(values, errors = "coerce").astype(float)
+    return pd.Series(pd.to_numeric(values, errors = "coerce"),
+                     index = dfr_Source.index, dtype = float)
+
+def op_constant(dfr_Source, context, value):
+    """
+    The same value in every row.
+    """
+    return pd.Series([value] * dfr_Source.shape[0], index = dfr_Source.index, dtype = object)
+
+def op_context(dfr_Source, context, key):
+    """
+    Value from the context handed to apply_template, in every row.
+    """
+    return op_constant(dfr_Source, context, context[key])
+
+def op_now(dfr_Source, context):
+    """
+    Date and time of the export, in every row.
+    """
+    return op_constant(dfr_Source, context, context["Now"])
+
+def op_negate(dfr_Source, context, expression):
+    """
+    Expression times -1.
+    """
+    return -op_number(dfr_Source, context, expression)
+
+def op_difference(dfr_Source, context, minuend, subtrahend):
+    """
+    First expression minus second expression.
+    """
+    return op_number(dfr_Source, context, minuend) - op_number(dfr_Source, context, subtrahend)
+
+def row_values(dfr_Source, context, lst_Expressions):
+    """
+    Returns 2D numpy array with one column per expression.
+    """
+    return np.column_stack([op_number(dfr_Source, context, expression).to_numpy()
+                            for expression in lst_Expressions])
+
+def op_rowmin(dfr_Source, context, lst_Expressions):
+    """
+    Smallest value of several expressions per row, ignoring NaN.
+    """
+    return pd.Series(np.fmin.reduce(row_values(dfr_Source, context, lst_Expressions), axis = 1),
+                     index = dfr_Source.index)
+
+def op_rowmax(dfr_Source, context, lst_Expressions):
+    """
+    Largest value of several expressions per row, ignoring NaN.
+    """
+    return pd.Series(np.fmax.reduce(row_values(dfr_Source, context, lst_Expressions), axis = 1),
+                     index = dfr_Source.index)
+
+def op_bins(dfr_Source, context, expression, lst_Bins, default):
+    """
+    Label for the first [threshold, label] pair in lst_Bins the value of
+    expression is greater than or equal to. Sort lst_Bins by descending
+    threshold. Values below all thresholds and NaN get default.
+    """
+    arr_Values = op_number(dfr_Source, context, expression).to_numpy()
+    with np.errstate(invalid = "ignore"):
+        lst_Conditions = [arr_Values >= threshold for threshold, label in lst_Bins]
+    return pd.Series(np.select(lst_Conditions, [label for threshold, label in lst_Bins],
+                               default = default),
+                     index = dfr_Source.index, dtype = object)
+
+def op_concat(dfr_Source, context, lst_Expressions):
+    """
+    Text of several expressions joined together.
+    """
+    ser_Text = pd.Series([""] * dfr_Source.shape[0], index = dfr_Source.index, dtype = object)
+    for expression in lst_Expressions:
+        values = evaluate(expression, dfr_Source, context)
+        if isinstance(values, pd.Series):
+            ser_Text = ser_Text + values.astype(str).astype(object)
+        else:
+            ser_Text = ser_Text + str(values)
+    return ser_Text
+
+def op_well(dfr_Source, context, expression, int_PlateFormat):
+    """
+    Well coordinates (e.g. "A01") for well indices (starting at 0) on a
+    plate with int_PlateFormat wells.
+    """
+    arr_Wells = np.array(pf.write_well_list(int_PlateFormat), dtype = object)
+    arr_Index = op_number(dfr_Source, context, expression).to_numpy().astype(int)
+    return pd.Series(arr_Wells[arr_Index], index = dfr_Source.index, dtype = object)
+
+# Operations available to expressions. Customer specific formats should
+# only need new templates, not new operations.
+OPERATIONS = {"column":op_column,
+              "number":op_number,
+              "constant":op_constant,
+              "context":op_context,
+              "now":op_now,
+              "negate":op_negate,
+              "difference":op_difference,
+              "rowmin":op_rowmin,
+              "rowmax":op_rowmax,
+              "bins":op_bins,
+              "concat":op_concat,
+              "well":op_well}
+
+##########################################################################
+##                                                                      ##
+##    Templates                                                         ##
+##                                                                      ##
+##########################################################################
+
+# Dose response results for Dotmatics. Column numbers refer to
+# dfr_Database of the dose response workflow.
+# % inhibition at each of the 16 concentrations:
+lst_DotmaticsInhibitions = [28, 31, 34, 37, 40, 43, 46, 49, 52, 55, 58, 61, 64, 67, 70, 73]
+lst_DotmaticsActivity = [[80, "ACTMax >= 80%"], [50, "50% =< ACTMax < 80%"]]
+
+DOTMATICS = {"Name":"Dotmatics",
+             "Columns":[["Global Compound ID", 4],
+                        ["Purification ID", 1],
+                        ["Compound comments", 27],
+                        ["", ["constant", ""]],
+                        ["Result_ID", ["constant", ""]],
+                        ["Evotec Compound ID", ["constant", ""]],
+                        ["Evotec Batch ID", ["constant", ""]],
+                        ["Validation", ["bins", ["rowmax", lst_DotmaticsInhibitions],
+                                        [[50, "A"]], "NA"]],
+                        ["ACTMin", ["rowmin", lst_DotmaticsInhibitions]],
+                        ["ACTMax", ["rowmax", lst_DotmaticsInhibitions]],
+                        ["Operator", ["constant", ""]],
+                        ["EC50", 15],
+                        ["CI-Lower", 17],
+                        ["CI-Upper", 16],
+                        ["Operator negative", ["constant", ""]],
+                        ["pEC50", ["negate", 13]],
+                        ["Bottom", 20],
+                        ["Top", 21],
+                        ["Hill Slope", 18],
+                        ["Span", ["difference", 21, 20]],
+                        ["R2", 22],
+                        ["Comment", ["bins", ["rowmax", lst_DotmaticsInhibitions],
+                                     lst_DotmaticsActivity, "ACTMax < 50%"]],
+                        ["ZPrime", 79],
+                        ["ZPrimeRobust", 80],
+                        ["BufferToControl", 81],
+                        ["DMSOToControl", 82],
+                        ["DateOfReport", ["now"]]]}
+
+# Plate map for database upload, from the processed data of one plate.
+# Headers come from the workflow (lst_PlateMapHeaders), the plate ID
+# from the context.
+DSF_PLATEMAP = {"Name":"DSF plate map",
+                "Columns":[["PlateID", ["context", "PlateID"]],
+                           ["PlateWell ID", ["concat", [["context", "PlateID"], "Well"]]],
+                           ["Plate Parent", ["constant", "Plate Parent"]],
+                           ["SGC Global Compound ID", "SampleID"],
+                           ["Well concentration(mM)", ["constant", "Well concentration(mM)"]],
+                           ["Neccesary additive", ["constant", "Neccesary additive"]],
+                           ["Plate well: plate active", ["constant", "Plate well: plate active"]],
+                           ["Plate well purpose", ["constant", "Plate well purpose"]],
+                           ["Plate well comments", ["constant", "Plate well comments"]]]}
+
+# nanoDSF capillaries have no well, the well comes from the capillary index
+NANODSF_PLATEMAP = {"Name":"nanoDSF plate map",
+                    "Columns":[column if not column[0] == "PlateWell ID" else
+                               ["PlateWell ID", ["concat", [["context", "PlateID"],
+                                                            ["well", "CapIndex", 96]]]]
+                               for column in DSF_PLATEMAP["Columns"]]}
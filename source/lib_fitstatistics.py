@@ -0,0 +1,364 @@
+"""
+Vectorised statistics for curve fits.
+
+The functions in lib_fittingfunctions work on one dataset at a time. The
+functions in this module take all samples of a plate at once: datapoints,
+fitted curves and parameters are arrays with one row per sample, covariance
+matrices are stacked along the first axis. Samples with fewer datapoints
+than others are padded with np.nan (see pad).
+
+Everything is nan aware in the same way as the single dataset functions:
+missing datapoints are ignored, but a fit that is np.nan where there is a
+datapoint results in np.nan (e.g. a failed fit has an R square of np.nan).
+
+Functions:
+    pad
+    unpad
+    moles_to_micromoles
+    eq_sigmoidal
+    draw_sigmoidal
+    rsquare
+    residual_statistics
+    standard_errors
+    confidence
+    sigmoidal_envelope
+    plate_statistics
+    rank
+    replicate_correlation
+
+"""
+
+import numpy as np
+from itertools import product
+from scipy.stats import rankdata
+from scipy.stats.distributions import t
+
+# All combinations of +/- standard error for the four parameters of the
+# sigmoidal dose response curve (ytop, ybot, h, i).
+arr_Combinations = np.array(list(product([1,-1], repeat = 4)), dtype = float)
+
+def pad(lst_Lists, int_Width = None):
+    """
+    Turns a list of lists of different lengths into a 2D array, padded
+    with np.nan.
+
+    Arguments:
+        lst_Lists -> list of lists (or arrays) of numbers.
+        int_Width -> integer. Optional. Minimum width of the array.
+
+    Returns 2D numpy array with one row per list.
+    """
+    int_Rows = len(lst_Lists)
+    lst_Lengths = [np.size(lst) for lst in lst_Lists]
+    int_Cols = max(lst_Lengths + [0 if int_Width is None else int_Width])
+    arr_Padded = np.full((int_Rows, int_Cols), np.nan)
+    for row, lst in enumerate(lst_Lists):
+        if lst_Lengths[row] > 0:
+            arr_Padded[row,:lst_Lengths[row]] = np.asarray(lst, dtype = float).ravel()
+    return arr_Padded
+
+def unpad(arr_Padded, lst_Lengths):
+    """
+    Turns a padded 2D array back into a list of lists.
+
+    Arguments:
+        arr_Padded -> 2D numpy array.
+        lst_Lengths -> list of integers. Length of each row.
+    """
+    return [arr_Padded[row,:length].tolist() for row, length in enumerate(lst_Lengths)]
+
+def eq_sigmoidal(x, ytop, ybot, h, i):
+    """
+    Sigmoidal dose response curve (see lib_fittingfunctions.eq_sigmoidal)
+    for arrays. Parameters broadcast against x, so a column of parameters
+    (one row per sample) gives one curve per sample.
+
+    Arguments:
+        x -> array of floats. Concentrations.
+        ytop -> array of floats. Theoretical top of curve.
+        ybot -> array of floats. Theoretical bottom of curve.
+        h -> array of floats. Hill slope.
+        i -> array of floats. Inflection point.
+    """
+    with np.errstate(all = "ignore"):
+        return ybot + (ytop - ybot)/(1 + (i/x)**h)
+
+def moles_to_micromoles(arr_Conc):
+    """
+    Turns moles/molar into micromoles/micromolar, cutting off beyond the
+    5th decimal like lib_datafunctions.moles_to_micromoles, so that curves
+    get drawn at the concentrations they were fitted at. np.nan stays
+    np.nan.
+    """
+    with np.errstate(all = "ignore"):
+        return np.trunc(np.asarray(arr_Conc, dtype = float)*1000000*100000)/100000
+
+def draw_sigmoidal(arr_Doses, arr_Pars):
+    """
+    Draws sigmoidal dose response curves for a whole plate.
+
+    Arguments:
+        arr_Doses -> 2D array of floats. Concentrations in Molar, one
+                     row per sample.
+        arr_Pars -> 2D array of floats. Parameters (ytop, ybot, h, i),
+                    one row per sample.
+
+    Returns 2D array of responses.
+    """
+    arr_Doses = moles_to_micromoles(arr_Doses)
+    arr_Pars = np.asarray(arr_Pars, dtype = float)
+    return eq_sigmoidal(arr_Doses, *[arr_Pars[:,[p]] for p in range(4)])
+
+def rsquare(arr_Data, arr_Fit):
+    """
+    Calculates R square for each row of datapoints and fits.
+
+    Rsquare = 1 - ((residual sum of squares)/(total sum of squares))
+
+    Arguments:
+        arr_Data -> 2D array of floats. Datapoints, np.nan where missing.
+        arr_Fit -> 2D array of floats. Fits to be assessed for quality.
+
+    Returns array of R square values rounded to 4 decimals. np.nan for
+    rows without datapoints or failed fits.
+    """
+    arr_Data = np.atleast_2d(np.asarray(arr_Data, dtype = float))
+    arr_Fit = np.atleast_2d(np.asarray(arr_Fit, dtype = float))
+    arr_Mask = ~np.isnan(arr_Data)
+    arr_Points = arr_Mask.sum(axis = 1)
+    with np.errstate(all = "ignore"):
+        arr_Mean = np.where(arr_Mask, arr_Data, 0).sum(axis = 1) / arr_Points
+        # Residuals are only counted where there is a datapoint, but a
+        # missing fit value stays np.nan.
+        arr_RSS = np.where(arr_Mask, (arr_Data - arr_Fit)**2, 0).sum(axis = 1)
+        arr_TSS = np.where(arr_Mask, (arr_Data - arr_Mean[:,None])**2, 0).sum(axis = 1)
+        arr_RSquare = 1 - (arr_RSS/arr_TSS)
+    arr_RSquare[arr_Points == 0] = np.nan
+    return np.round(arr_RSquare, 4)
+
+def residual_statistics(arr_Data, arr_Fit, int_Parameters = 4):
+    """
+    Calculates residual statistics for each row of datapoints and fits.
+
+    Arguments:
+        arr_Data -> 2D array of floats. Datapoints, np.nan where missing.
+        arr_Fit -> 2D array of floats. Fits.
+        int_Parameters -> integer. Number of fitted parameters, used for
+                          the degrees of freedom.
+
+    Returns dictionary of arrays, one value per row:
+        "Points" -> number of datapoints
+        "DoF" -> degrees of freedom
+        "RSS" -> residual sum of squares
+        "RMSE" -> root mean square error
+        "SigmaResidual" -> standard deviation of residuals, based on DoF
+        "MeanResidual" -> mean residual (bias)
+        "MaxResidual" -> largest absolute residual
+    """
+    arr_Data = np.atleast_2d(np.asarray(arr_Data, dtype = float))
+    arr_Fit = np.atleast_2d(np.asarray(arr_Fit, dtype = float))
+    arr_Mask = ~np.isnan(arr_Data)
+    arr_Points = arr_Mask.sum(axis = 1)
+    arr_DoF = np.maximum(0, arr_Points - int_Parameters)
+    with np.errstate(all = "ignore"):
+        arr_Residuals = np.where(arr_Mask, arr_Data - arr_Fit, 0)
+        arr_RSS = (arr_Residuals**2).sum(axis = 1)
+        arr_Return = {"Points": arr_Points,
+                      "DoF": arr_DoF,
+                      "RSS": arr_RSS,
+                      "RMSE": np.sqrt(arr_RSS/arr_Points),
+                      "SigmaResidual": np.sqrt(arr_RSS/np.where(arr_DoF > 0, arr_DoF, np.nan)),
+                      "MeanResidual": arr_Residuals.sum(axis = 1)/arr_Points,
+                      "MaxResidual": np.abs(arr_Residuals).max(axis = 1,
+                          initial = 0)}
+    for key in ["RSS","RMSE","MeanResidual","MaxResidual"]:
+        arr_Return[key] = np.where(arr_Points > 0, arr_Return[key], np.nan)
+    return arr_Return
+
+def standard_errors(arr_Covar):
+    """
+    Standard errors of the parameters from a stack of covariance matrices.
+
+    Arguments:
+        arr_Covar -> 3D array of floats. One covariance matrix per sample.
+
+    Returns 2D array, one row per sample. np.nan where the variance could
+    not be estimated.
+    """
+    arr_Variance = np.diagonal(np.asarray(arr_Covar, dtype = float), axis1 = 1, axis2 = 2)
+    with np.errstate(invalid = "ignore"):
+        arr_StdErr = np.sqrt(arr_Variance)
+    arr_StdErr[np.isinf(arr_StdErr)] = np.nan
+    return arr_StdErr
+
+def confidence(arr_Points, arr_StdErr, flt_Alpha = 0.05):
+    """
+    Calculates confidence intervals for the parameters of all fits based
+    on the standard errors of the parameters. Looks up the student-t
+    values for all degrees of freedom in one go.
+
+    Arguments:
+        arr_Points -> array of integers. Number of datapoints per fit.
+        arr_StdErr -> 2D array of floats. Standard errors, one row per
+                      fit, one column per parameter (see standard_errors).
+        flt_Alpha -> float. 0.05 for 95% confidence interval.
+
+    Returns 2D array of +/- values, np.nan where the variance is infinite.
+    """
+    arr_StdErr = np.atleast_2d(np.asarray(arr_StdErr, dtype = float))
+    arr_DoF = np.maximum(0, np.asarray(arr_Points) - arr_StdErr.shape[1])
+    arr_TValues = t.ppf(1.0-flt_Alpha/2., arr_DoF)
+    arr_Confidence = arr_StdErr * np.reshape(arr_TValues, (-1,1))
+    arr_Confidence[np.isinf(arr_StdErr)] = np.nan
+    return arr_Confidence
+
+def sigmoidal_envelope(arr_Doses, arr_Pars, arr_Errors):
+    """
+    Draws the area covered by the fits with every combination of the
+    parameters +/- their error, for all samples at once.
+
+    Arguments:
+        arr_Doses -> 2D array of floats. Concentrations in Molar.
+        arr_Pars -> 2D array of floats. Parameters (ytop, ybot, h, i).
+        arr_Errors -> 2D array of floats. Error for each parameter
+                      (standard error or confidence interval).
+
+    Returns 2D arrays of upper and lower bounds.
+    """
+    arr_Doses = moles_to_micromoles(arr_Doses)
+    arr_Pars = np.asarray(arr_Pars, dtype = float)
+    arr_Errors = np.asarray(arr_Errors, dtype = float)
+    # (samples, combinations + 1, parameters), the first "combination"
+    # being the fit itself.
+    arr_Varied = np.concatenate([arr_Pars[:,None,:],
+        arr_Pars[:,None,:] + arr_Errors[:,None,:] * arr_Combinations[None,:,:]],
+        axis = 1)
+    # (samples, combinations + 1, datapoints)
+    arr_Curves = eq_sigmoidal(arr_Doses[:,None,:],
+        *[arr_Varied[:,:,[p]] for p in range(4)])
+    # Ignore combinations that cannot be drawn, but keep np.nan if the
+    # fit itself cannot be drawn.
+    arr_Fit = arr_Curves[:,0,:]
+    arr_Curves = np.where(np.isnan(arr_Curves), arr_Fit[:,None,:], arr_Curves)
+    return arr_Curves.max(axis = 1), arr_Curves.min(axis = 1)
+
+def plate_statistics(lst_Doses, lst_Data, lst_Pars, lst_Covar = None):
+    """
+    Computes fits and their statistics for all samples of a plate in one
+    call.
+
+    Arguments:
+        lst_Doses -> list of lists of concentrations in Molar.
+        lst_Data -> list of lists of datapoints, np.nan where excluded.
+        lst_Pars -> list of lists of parameters (ytop, ybot, h, i),
+                    np.nan if the fit failed.
+        lst_Covar -> list of covariance matrices. Optional.
+
+    Returns dictionary:
+        "Fit" -> list of lists. Fitted curves.
+        "RSquare" -> array of R square values.
+        "Residuals" -> dictionary, see residual_statistics.
+        and, if covariances were given:
+        "StdErr" -> 2D array of standard errors.
+        "CI" -> 2D array of 95% confidence intervals.
+        "Upper", "Lower" -> lists of lists. Envelope of the fits
+                            +/- standard error.
+    """
+    lst_Lengths = [len(doses) for doses in lst_Doses]
+    arr_Doses = pad(lst_Doses)
+    arr_Data = pad(lst_Data, arr_Doses.shape[1])
+    arr_Pars = pad(lst_Pars, 4)
+    arr_Fit = draw_sigmoidal(arr_Doses, arr_Pars)
+    dic_Return = {"Fit": unpad(arr_Fit, lst_Lengths),
+                  "RSquare": rsquare(arr_Data, arr_Fit),
+                  "Residuals": residual_statistics(arr_Data, arr_Fit)}
+    if not lst_Covar is None:
+        arr_StdErr = standard_errors(np.stack(lst_Covar))
+        arr_Upper, arr_Lower = sigmoidal_envelope(arr_Doses, arr_Pars, arr_StdErr)
+        dic_Return["StdErr"] = arr_StdErr
+        dic_Return["CI"] = confidence(dic_Return["Residuals"]["Points"], arr_StdErr)
+        dic_Return["Upper"] = unpad(arr_Upper, lst_Lengths)
+        dic_Return["Lower"] = unpad(arr_Lower, lst_Lengths)
+    return dic_Return
+
+def rank(arr_Data):
+    """
+    Ranks the values in each row, ties get the average of their ranks.
+    np.nan values are not ranked and stay np.nan.
+
+    Arguments:
+        arr_Data -> 2D array of floats.
+
+    Returns 2D array of ranks (starting at 1).
+    """
+    arr_Data = np.atleast_2d(np.asarray(arr_Data, dtype = float))
+    arr_Mask = np.isnan(arr_Data)
+    # np.inf sorts after every number, so missing values do not change
+    # the ranks of the others.
+    arr_Ranks = rankdata(np.where(arr_Mask, np.inf, arr_Data), axis = 1)
+    arr_Ranks[arr_Mask] = np.nan
+    return arr_Ranks
+
+def replicate_correlation(arr_Rep1, arr_Rep2):
+    """
+    Replicate correlation for many pairs of replicates at once. Each row
+    of arr_Rep1 is paired with the same row of arr_Rep2, e.g. one row per
+    plate and condition. Only wells with a value in both replicates are
+    used.
+
+    The linear fit (rep1 xdata, rep2 ydata) is an ordinary least squares
+    fit, so slope and intercept follow directly from the sums of squares
+    and the R square of the fit is the square of Pearson's correlation
+    coefficient. Spearman's correlation coefficient is Pearson's
+    correlation coefficient of the ranks.
+
+    Arguments:
+        arr_Rep1 -> 2D array of floats. Replicate datasets 1.
+        arr_Rep2 -> 2D array of floats. Replicate datasets 2.
+
+    Returns dictionary of arrays, one value per pair:
+        "Points" -> number of wells used
+        "m" -> slope of linear fit
+        "c" -> offset of linear fit
+        "RSquare" -> R square of linear fit, rounded to 4 decimals
+        "Pearson" -> Pearson's correlation coefficient, rounded to 4 decimals
+        "Spearman" -> Spearman's correlation coefficient, rounded to 4 decimals
+    """
+    arr_Rep1 = np.atleast_2d(np.asarray(arr_Rep1, dtype = float))
+    arr_Rep2 = np.atleast_2d(np.asarray(arr_Rep2, dtype = float))
+    arr_Mask = ~(np.isnan(arr_Rep1) | np.isnan(arr_Rep2))
+    arr_X = np.where(arr_Mask, arr_Rep1, np.nan)
+    arr_Y = np.where(arr_Mask, arr_Rep2, np.nan)
+    arr_Points = arr_Mask.sum(axis = 1)
+
+    def moments(arr_A, arr_B):
+        # Centred sums of squares and cross products per row
+        with np.errstate(all = "ignore"):
+            arr_MeanA = np.where(arr_Mask, arr_A, 0).sum(axis = 1) / arr_Points
+            arr_MeanB = np.where(arr_Mask, arr_B, 0).sum(axis = 1) / arr_Points
+        arr_DevA = np.where(arr_Mask, arr_A - arr_MeanA[:,None], 0)
+        arr_DevB = np.where(arr_Mask, arr_B - arr_MeanB[:,None], 0)
+        return (arr_MeanA, arr_MeanB, (arr_DevA**2).sum(axis = 1),
+                (arr_DevB**2).sum(axis = 1), (arr_DevA*arr_DevB).sum(axis = 1))
+
+    arr_MeanX, arr_MeanY, arr_SXX, arr_SYY, arr_SXY = moments(arr_X, arr_Y)
+    arr_RankX = rank(arr_X)
+    arr_RankY = rank(arr_Y)
+    _, _, arr_RXX, arr_RYY, arr_RXY = moments(arr_RankX, arr_RankY)
+    with np.errstate(all = "ignore"):
+        arr_Slope = arr_SXY / arr_SXX
+        arr_Intercept = arr_MeanY - arr_Slope * arr_MeanX
+        arr_Pearson = arr_SXY / np.sqrt(arr_SXX * arr_SYY)
+        arr_Spearman = arr_RXY / np.sqrt(arr_RXX * arr_RYY)
+    # A line needs two points
+    arr_Valid = arr_Points > 1
+    arr_Slope = np.where(arr_Valid, arr_Slope, np.nan)
+    arr_Intercept = np.where(arr_Valid, arr_Intercept, np.nan)
+    arr_Pearson = np.where(arr_Valid, arr_Pearson, np.nan)
+    arr_Spearman = np.where(arr_Valid, arr_Spearman, np.nan)
+    return {"Points": arr_Points,
+            "m": arr_Slope,
+            "c": arr_Intercept,
+            "RSquare": np.round(arr_Pearson**2, 4),
+            "Pearson": np.round(arr_Pearson, 4),
+            "Spearman": np.round(arr_Spearman, 4)}
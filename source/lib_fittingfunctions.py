@@ -45,6 +45,9 @@ Functions:
     fit_tm_boltzmann
     fit_logMM_free
 
+    derivative
+    derivatives
+
 """
 
 import os
@@ -59,6 +62,7 @@ from scipy.stats.distributions import t
 from scipy.signal import savgol_filter
 from math import isinf
 import lib_datafunctions as df
+import lib_fitstatistics as fs
 import inspect as ins
 
 #####  ###  #   #  ###  ##### #  ###  #   #  ####
@@ -330,21 +334,7 @@ def calculate_rsquare(data,fit):
     result of the fit at i and Ymean is the mean of all datapoints.
     """
 
-    # remove any errant np.nan values from data
-    data_trim = []
-    fit_trim = []
-    for i in range(len(fit)):
-        if np.isnan(data[i]) == False:
-            data_trim.append(data[i])
-            fit_trim.append(fit[i])
-
-    mean = sum(data_trim)/len(data_trim)
-    RSS = 0 # residual sum of squares
-    TSS = 0 # total sum of squares
-    for i in range(len(data_trim)):
-        RSS += ((data_trim[i]-fit_trim[i])**2)
-        TSS += ((data_trim[i]-mean)**2)
-    return round(float(1 - (RSS/TSS)),4)
+    return float(fs.rsquare([data],[fit])[0])
 
 def calculate_repcorr(rep1, rep2):
     """
@@ -361,24 +351,12 @@ def calculate_repcorr(rep1, rep2):
                    datasets (rep1 xdata, rep2 ydata)
         Pearson -> float. Pearson's correlation coefficient.
     """
-    # Trim any errant np.nan values:
-    #rep1_trimmed = []
-    #rep2_trimmed = []
-    #for i in range(len(rep1)):
-    #    if pd.isna(rep1[i]) == False and pd.isna(rep2[i]) == False:
-    #        rep1_trimmed.append(rep1[i])
-    #        rep2_trimmed.append(rep2[i])
-    # Sort along "x" axis
-    dfr_Temp = pd.DataFrame(data={"rep1":rep1,"rep2":rep2}).dropna(axis = 0).sort_values(by=["rep1"],ascending=[True]).reset_index(drop=True)
-
-    # Perform linear fit
-    pars, covar = curve_fit(eq_linear, dfr_Temp["rep1"], dfr_Temp["rep2"])
-    # get values for linear fit
-    Rsquare = calculate_rsquare(data = dfr_Temp["rep2"],
-                                fit = draw_linear(dfr_Temp["rep1"], pars))
-    pearson = round(dfr_Temp.corr().loc["rep1","rep2"],4)
-
-    return pars[0], pars[1], Rsquare, pearson
+    # Closed form least squares fit, see fs.replicate_correlation
+    dic_Correlation = fs.replicate_correlation([np.asarray(rep1, dtype = float)],
+                                               [np.asarray(rep2, dtype = float)])
+
+    return (float(dic_Correlation["m"][0]), float(dic_Correlation["c"][0]),
+            float(dic_Correlation["RSquare"][0]), float(dic_Correlation["Pearson"][0]))
 
 def calculate_confidence(n,pars,covar):
     """
@@ -391,27 +369,8 @@ def calculate_confidence(n,pars,covar):
         covar -> list of floats. Covariances for each parameter
     """
     # http://kitchingroup.cheme.cmu.edu/blog/2013/02/12/Nonlinear-curve-fitting-with-parameter-confidence-intervals/
-
-    confidence = []
-    p = len(pars)
-
-    alpha = 0.05 # 95% confidence interval = 100*(1-alpha)
-
-    # number of degrees of freedom
-    dof = max(0, n - p) 
-
-    # student-t value for the dof and confidence level
-    tval = t.ppf(1.0-alpha/2., dof) 
-
-    for i, p, flt_Variance in zip(range(n), pars, np.diag(covar)):
-        if isinf(flt_Variance) == False:
-            sigma = flt_Variance**0.5
-            plusminus = sigma*tval
-            confidence.append(plusminus)
-        else:
-            confidence.append(np.nan)
-    
-    return confidence
+    # 95% confidence interval = 100*(1-alpha), with alpha = 0.05
+    return list(fs.confidence([n], fs.standard_errors([covar]))[0])
 
 ##### # ##### ##### # #   #  #####
 #     #   #     #   # ##  # #
@@ -639,45 +598,9 @@ def draw_sigmoidal_fit_error(doses, pars, stderr):
                   for each parameter.
     """
     # parameters for IC50 in order: ytop,ybot,h,i
-
-    rng_Datapoints = range(len(doses))
-    
-    upper = draw_any(eq_sigmoidal,df.moles_to_micromoles(doses),pars)
-    lower = draw_any(eq_sigmoidal,df.moles_to_micromoles(doses),pars)
-    
-    lst_Combinations = [[1,1,1,1], #1
-        [1,-1,1,1], #2
-        [1,-1,-1,1], #3
-        [1,-1,-1,-1], #4
-        [1,1,1,-1], #5
-        [1,1,-1,-1], #6
-        [1,1,-1,1], #7
-        [1,1,1,-1], #8
-        [-1,1,1,1], #9
-        [-1,-1,1,1], #10
-        [-1,-1,-1,1], #11
-        [-1,-1,-1,1], #12
-        [-1,1,1,-1], #13
-        [-1,1,-1,-1], #14
-        [-1,1,-1,1], #15
-        [-1,1,-1,-1]] #16
-
-    # Go through possible combinations:
-    for i in range(16):
-        lst_Temp = draw_any(eq_sigmoidal,
-                            df.moles_to_micromoles(doses),
-                            [pars[0]+(stderr[0]*lst_Combinations[i][0]),
-                             pars[1]+(stderr[1]*lst_Combinations[i][1]),
-                             pars[2]+(stderr[2]*lst_Combinations[i][2]),
-                             pars[3]+(stderr[3]*lst_Combinations[i][3])])
-        # Compare and assign the highest/lowest values
-        for k in rng_Datapoints:
-            if lst_Temp[k] > upper[k]:
-                upper[k] = lst_Temp[k]
-            if lst_Temp[k] < lower[k]:
-                lower[k] = lst_Temp[k]
-
-    return upper, lower
+    # All 16 combinations of +/- stderr are drawn in one go.
+    upper, lower = fs.sigmoidal_envelope([doses], [pars], [stderr])
+    return list(upper[0]), list(lower[0])
     
 
 def fit_tm_thompson(temp, fluo, tmguess, parsonly = False):
@@ -1109,6 +1032,59 @@ def derivative(xdata, ydata, SavGolIn, SavGolOut, minmaxboth):
     return derivative.tolist(), lst_Inflections, lst_Slopes
 
 
+def derivatives(arr_X, arr_Y, SavGolIn, SavGolOut, minmaxboth):
+    """
+    Same as derivative, but for many datasets at once. All rows are
+    filtered, differentiated and searched for their extremes in single
+    array operations.
+
+    Arguments:
+        arr_X -> 2D numpy array of floats. Data on x axis, one dataset
+                 per row. All rows need the same number of points.
+        arr_Y -> 2D numpy array of floats. Data on y axis, same shape
+                 as arr_X.
+        SavGolIn -> integer. How many times to apply Savitsky-Golay
+                    filter to ydata. Max is 2.
+        SavGolOut -> integer. How many times to apply SavGol filter
+                     once derivative is calculated.
+        minmaxboth -> string. "min", "max" or "both"
+
+    Returns 2D numpy array of derivatives and, per row, lists of
+    inflection points and slopes.
+    """
+    arr_X = np.asarray(arr_X, dtype=float)
+    arr_Y = np.asarray(arr_Y, dtype=float)
+    # Repeat last point, as in derivative
+    arr_XFitting = np.concatenate((arr_X, arr_X[:,-1:]), axis=1)
+    arr_YFitting = np.concatenate((arr_Y, arr_Y[:,-1:]), axis=1)
+    if SavGolIn > 0:
+        arr_YFitting = savgol_filter(arr_YFitting, 31, 3, axis=1)
+        if SavGolIn > 1:
+            arr_YFitting = savgol_filter(arr_YFitting, 31, 3, axis=1)
+
+    arr_Derivative = np.diff(arr_YFitting, axis=1)
+    # Last x difference is always 0 (repeated point), so it is left out.
+    arr_Derivative[:,:-1] = arr_Derivative[:,:-1]/np.diff(arr_XFitting, axis=1)[:,:-1]
+    if SavGolOut > 0:
+        arr_Derivative = savgol_filter(arr_Derivative, 11, 3, axis=1)
+        if SavGolOut > 1:
+            arr_Derivative = savgol_filter(arr_Derivative, 21, 3, axis=1)
+
+    if minmaxboth == "max":
+        arr_Extreme = np.nanmax(arr_Derivative[:,10:-10], axis=1)
+    elif minmaxboth == "min":
+        arr_Extreme = np.nanmin(arr_Derivative[:,10:-10], axis=1)
+    elif minmaxboth == "both":
+        arr_Max = np.nanmax(arr_Derivative[:,20:-20], axis=1)
+        arr_Min = np.nanmin(arr_Derivative[:,20:-20], axis=1)
+        arr_Extreme = np.where(np.abs(arr_Max) > np.abs(arr_Min), arr_Max, arr_Min)
+    arr_Hits = arr_Derivative == arr_Extreme[:,np.newaxis]
+    lst_Inflections = [arr_X[row,arr_Hits[row]].tolist() for row in range(arr_X.shape[0])]
+    lst_Slopes = [arr_Derivative[row,arr_Hits[row]].tolist() for row in range(arr_X.shape[0])]
+
+    return arr_Derivative, lst_Inflections, lst_Slopes
+
+
 def fit_OnePhaseAssociation(time, signal, parsonly = False):
 
     try:
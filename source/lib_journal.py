@@ -0,0 +1,513 @@
+"""
+Autosave journal for open projects.
+
+Saving a project writes the complete .bbq archive. The journal instead
+records only what changed since the last save (or autosave) and appends
+it to a file next to the project ("project.bbq.journal"):
+    - per-sample state of processed data (exclusions, Show/DoFit flags,
+      refitted parameters, ...), one record per changed sample,
+    - whole plates, if anything other than the processed data of the
+      plate changed,
+    - the assay details.
+
+Each autosave only costs hashing the project and writing the changed
+records. On explicit save the full archive gets written and the journal
+is deleted ("compaction"). If the program crashes, the journal is still
+there the next time the project is opened and can be replayed on top of
+the saved file.
+
+Records are lines of JSON. Dataframes, series, arrays and the other
+values in the container are written as tagged JSON objects (see encode)
+and read back with decode, which only ever builds data, so opening a
+journal someone else has written cannot run any code. A line that was
+only half written when the program crashed gets skipped on replay.
+
+Working out what changed (Journal.changes) reads the project and has to
+run on the thread that changes it, i.e. the main thread. Only writing
+the file (Journal.write) may happen on a worker thread.
+
+Nothing in here depends on wx.
+
+    Classes
+        Journal
+
+    Functions
+        journal_path
+        fingerprint
+        cell_token
+        encode
+        decode
+        series
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from time import time, perf_counter
+
+import numpy as np
+import pandas as pd
+
+import lib_tracing as trace
+import lib_tracestore as ts
+import lib_platestore as ps
+
+# Seconds between autosaves
+INTERVAL = 30
+# Format of the journal file. Journals in another format get discarded.
+VERSION = 2
+# Columns of the container that do not get changed after processing, only
+# replaced. They get hashed once per dataframe (see Journal.snapshot).
+lst_Static = ["RawData"]
+
+def journal_path(str_ProjectPath):
+    """
+    Returns path of the journal file for a project file.
+    """
+    return str_ProjectPath + ".journal"
+
+def fingerprint(item):
+    """
+    Returns a short hash of anything encode can write. The hash is taken
+    over the JSON text, so the same content always gets the same hash,
+    whatever the program version or the objects' history.
+    """
+    str_Canonical = json.dumps(encode(item), sort_keys = True, separators = (",",":"))
+    return hashlib.blake2b(str_Canonical.encode("utf-8"), digest_size = 16).hexdigest()
+
+def cell_token(value):
+    """
+    Returns what gets hashed for a cell of a dataframe. Traces in the trace
+    store and rows in the plate store cannot be changed, only replaced, so
+    their key stands in for the values (encoding them would read them
+    back from the store).
+    """
+    if isinstance(value, ts.Trace):
+        return ("Trace", id(value.store), value.key)
+    if isinstance(value, ps.Row):
+        return ("Row", value.block.key, value.pos)
+    return value
+
+def encode(value, lst_Arrays = None):
+    """
+    Turns a value of the container into something json can write.
+    Numbers, strings, booleans, None and lists stay as they are (np.nan
+    gets written as NaN), everything else becomes a dictionary with a
+    single key naming the type.
+
+    Arguments:
+        value -> the value to write.
+        lst_Arrays -> list or None. If given, numeric arrays get appended
+                      to it instead of written out and only their
+                      position in the list gets written (see
+                      lib_checkpoint).
+
+    Raises TypeError for anything else.
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    if isinstance(value, list):
+        return [encode(item, lst_Arrays) for item in value]
+    if isinstance(value, tuple):
+        return {"Tuple":[encode(item, lst_Arrays) for item in value]}
+    if isinstance(value, (ts.Trace, ps.Row)):
+        # Read back as the list it replaced, see lib_tracestore and
+        # lib_platestore
+        return value.tolist()
+    if isinstance(value, dict):
+        return {"Dict":[[encode(key, lst_Arrays), encode(item, lst_Arrays)] for key, item in value.items()]}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in "biuf":
+            if not lst_Arrays is None:
+                lst_Arrays.append(value)
+                return {"Stored":len(lst_Arrays) - 1}
+            return {"Array":value.tolist(), "DType":value.dtype.str}
+        return {"Array":[encode(item, lst_Arrays) for item in value.ravel().tolist()],
+                "DType":"object", "Shape":list(value.shape)}
+    if isinstance(value, pd.DataFrame):
+        return {"DataFrame":{"Columns":encode(list(value.columns), lst_Arrays),
+                             "Index":encode(list(value.index), lst_Arrays),
+                             "DTypes":[str(dtype) for dtype in value.dtypes],
+                             "Data":[encode(value.iloc[:,col].tolist(), lst_Arrays) for col in range(value.shape[1])]}}
+    if isinstance(value, pd.Series):
+        return {"Series":{"Index":encode(list(value.index), lst_Arrays),
+                          "Name":encode(value.name, lst_Arrays),
+                          "DType":str(value.dtype),
+                          "Data":encode(value.tolist(), lst_Arrays)}}
+    if value is pd.NaT:
+        return {"DateTime":None}
+    if isinstance(value, datetime):
+        return {"DateTime":value.isoformat()}
+    raise TypeError(f"Cannot write {type(value).__name__} to the journal")
+
+def decode(value, lst_Arrays = None):
+    """
+    Turns what encode wrote back into the value.
+
+    Arguments:
+        value -> what encode wrote.
+        lst_Arrays -> list of the arrays encode stored separately, if
+                      any.
+    """
+    if isinstance(value, list):
+        return [decode(item, lst_Arrays) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "Tuple" in value:
+        return tuple(decode(item, lst_Arrays) for item in value["Tuple"])
+    if "Dict" in value:
+        return {decode(key, lst_Arrays):decode(item, lst_Arrays) for key, item in value["Dict"]}
+    if "Stored" in value:
+        if lst_Arrays is None:
+            raise ValueError("Array stored separately, but no arrays given")
+        return lst_Arrays[value["Stored"]]
+    if "Array" in value:
+        if value["DType"] == "object":
+            arr_Values = np.empty(len(value["Array"]), dtype = object)
+            for idx, item in enumerate(value["Array"]):
+                arr_Values[idx] = decode(item, lst_Arrays)
+            return arr_Values.reshape(value["Shape"])
+        dtype = np.dtype(value["DType"])
+        if not dtype.kind in "biuf":
+            raise ValueError(f"Unexpected array type in journal: {value['DType']}")
+        return np.array(value["Array"], dtype = dtype)
+    if "DataFrame" in value:
+        dic_Frame = value["DataFrame"]
+        index = pd.Index(decode(dic_Frame["Index"], lst_Arrays), tupleize_cols = False)
+        dfr_Frame = pd.DataFrame(index = index)
+        for col, dtype, lst_Values in zip(decode(dic_Frame["Columns"], lst_Arrays), dic_Frame["DTypes"], dic_Frame["Data"]):
+            dfr_Frame[col] = series(decode(lst_Values, lst_Arrays), index, dtype)
+        return dfr_Frame
+    if "Series" in value:
+        dic_Series = value["Series"]
+        return series(decode(dic_Series["Data"], lst_Arrays),
+                      pd.Index(decode(dic_Series["Index"], lst_Arrays), tupleize_cols = False),
+                      dic_Series["DType"], decode(dic_Series["Name"], lst_Arrays))
+    if "DateTime" in value:
+        return pd.NaT if value["DateTime"] is None else pd.Timestamp(value["DateTime"])
+    raise ValueError(f"Unknown record in journal: {list(value.keys())}")
+
+def series(lst_Values, index, str_DType, name = None):
+    """
+    Returns pandas series of the values, keeping lists in cells as
+    lists, with the dtype it had when it was written if possible.
+    """
+    arr_Values = np.empty(len(lst_Values), dtype = object)
+    for idx, item in enumerate(lst_Values):
+        arr_Values[idx] = item
+    ser_Values = pd.Series(arr_Values, index = index, name = name, dtype = object)
+    if not str_DType == "object":
+        try:
+            ser_Values = ser_Values.astype(str_DType)
+        except (TypeError, ValueError):
+            pass
+    return ser_Values
+
+class Journal:
+    """
+    Append-only journal of changes to an open project.
+
+        journal = Journal(str_ProjectPath)
+        journal.baseline(assay_data, details)        # after opening/saving
+        lst_Lines = journal.changes(assay_data, details)   # every INTERVAL
+        journal.write(lst_Lines)                     # seconds, may run on
+                                                     # a worker thread
+        journal.clear(assay_data, details)           # after explicit save
+
+    Methods:
+        project_stamp
+        read
+        pending
+        snapshot
+        baseline
+        changes
+        record
+        write
+        ends_with_newline
+        replay
+        clear
+        discard
+    """
+
+    def __init__(self, str_ProjectPath):
+        """
+        Arguments:
+            str_ProjectPath -> string. Path of the .bbq file.
+        """
+        self.str_ProjectPath = str_ProjectPath
+        self.str_Path = journal_path(str_ProjectPath)
+        # Guards the file. The fingerprints are only used on the main
+        # thread.
+        self.lock = threading.Lock()
+        # Goes up whenever the file gets deleted, so that lines worked out
+        # before do not get written afterwards.
+        self.int_Generation = 0
+        self.dic_Plates = {}
+        self.dic_Samples = {}
+        self.str_Details = None
+        self.tpl_Plates = None
+        # (plate, column) -> (dataframe, fingerprint) for lst_Static
+        self.dic_Static = {}
+        # plate -> fingerprint of all rows of the processed data
+        self.dic_Processed = {}
+
+    def project_stamp(self):
+        """
+        Returns size and modification time of the project file, so that
+        a journal written for an older version of the file is not
+        replayed on a newer one.
+        """
+        try:
+            stat = os.stat(self.str_ProjectPath)
+            return [stat.st_size, stat.st_mtime]
+        except OSError:
+            return None
+
+    def read(self):
+        """
+        Returns list of records in the journal. Lines that cannot be
+        read, e.g. because writing them was interrupted, get skipped.
+        """
+        lst_Records = []
+        try:
+            with open(self.str_Path, "r", encoding = "utf-8") as file:
+                for line in file:
+                    try:
+                        lst_Records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            return []
+        return lst_Records
+
+    def pending(self):
+        """
+        Returns True if there is a journal with changes for the current
+        version of the project file. A journal that belongs to an older
+        version of the file or is in another format gets deleted.
+        """
+        lst_Records = self.read()
+        if len(lst_Records) == 0:
+            return False
+        if (not isinstance(lst_Records[0], dict)
+            or not lst_Records[0].get("Kind") == "Header"
+            or not lst_Records[0].get("Version") == VERSION
+            or not lst_Records[0].get("Stamp") == self.project_stamp()):
+            self.discard()
+            return False
+        return len(lst_Records) > 1
+
+    def snapshot(self, assay_data, details):
+        """
+        Returns fingerprints of the project: assay details, plate index,
+        each plate except for its processed data, each row of the
+        processed data of each plate and the processed data of each
+        plate as a whole.
+
+        Dataframes in the columns in lst_Static only get hashed when they
+        are new, traces only by their key (see cell_token). Rows of the
+        processed data only get hashed one by one if the plate's
+        processed data has changed as a whole.
+        """
+        str_Details = fingerprint(sorted(details.items(), key = lambda item: str(item[0])))
+        tpl_Plates = tuple(assay_data.index)
+        dic_Plates = {}
+        dic_Samples = {}
+        dic_Static = {}
+        dic_Processed = {}
+        for plate in assay_data.index:
+            ser_Plate = assay_data.loc[plate]
+            dfr_Processed = ser_Plate["Processed"]
+            lst_Plate = []
+            for col in ser_Plate.index:
+                if col == "Processed":
+                    continue
+                value = ser_Plate[col]
+                if col in lst_Static:
+                    tpl_Cached = self.dic_Static.get((plate,col))
+                    if tpl_Cached is None or not tpl_Cached[0] is value:
+                        tpl_Cached = (value, fingerprint(value))
+                    # Keep the dataframe, so that its id is not reused
+                    dic_Static[(plate,col)] = tpl_Cached
+                    value = tpl_Cached[1]
+                lst_Plate.append((col, value))
+            dic_Plates[plate] = fingerprint(lst_Plate + [tuple(dfr_Processed.columns),
+                                                         tuple(dfr_Processed.index)])
+            # Rows only get hashed one by one if anything in the plate's
+            # processed data has changed.
+            lst_Rows = [tuple(cell_token(value) for value in row)
+                        for row in dfr_Processed.itertuples(index = True, name = None)]
+            dic_Processed[plate] = fingerprint(lst_Rows)
+            if dic_Processed[plate] == self.dic_Processed.get(plate) and plate in self.dic_Samples:
+                dic_Samples[plate] = self.dic_Samples[plate]
+            else:
+                dic_Samples[plate] = {row[0]:fingerprint(row) for row in lst_Rows}
+        self.dic_Static = dic_Static
+        return str_Details, tpl_Plates, dic_Plates, dic_Samples, dic_Processed
+
+    def baseline(self, assay_data, details):
+        """
+        Takes the current state of the project as the state the next
+        autosave gets compared to. Nothing gets written.
+        """
+        (self.str_Details, self.tpl_Plates, self.dic_Plates,
+         self.dic_Samples, self.dic_Processed) = self.snapshot(assay_data, details)
+
+    def changes(self, assay_data, details):
+        """
+        Works out everything that changed since the last baseline/changes
+        and takes the current state as the new baseline. Reads the
+        project, so it must run on the thread that changes it.
+
+        Returns list of journal lines for write.
+        """
+        flt_Start = perf_counter()
+        tpl_Snapshot = self.snapshot(assay_data, details)
+        str_Details, tpl_Plates, dic_Plates, dic_Samples, dic_Processed = tpl_Snapshot
+        lst_Records = []
+        if not str_Details == self.str_Details:
+            lst_Records.append(("Details", dict(details)))
+        if not tpl_Plates == self.tpl_Plates:
+            # Plates added or removed: record the whole container
+            lst_Records.append(("Container", assay_data))
+        else:
+            for plate in tpl_Plates:
+                if not dic_Plates[plate] == self.dic_Plates.get(plate):
+                    lst_Records.append(("Plate", (plate, assay_data.loc[plate].to_dict())))
+                    continue
+                dfr_Processed = assay_data.loc[plate,"Processed"]
+                dic_Old = self.dic_Samples.get(plate, {})
+                for sample, str_Hash in dic_Samples[plate].items():
+                    if not str_Hash == dic_Old.get(sample):
+                        lst_Records.append(("Sample", (plate, sample, dfr_Processed.loc[sample])))
+        # Encoding copies the data, the lines can be written later.
+        lst_Lines = [json.dumps({"Kind":str_Kind, "Time":time(), "Data":encode(data)})
+                     for str_Kind, data in lst_Records]
+        (self.str_Details, self.tpl_Plates, self.dic_Plates,
+         self.dic_Samples, self.dic_Processed) = tpl_Snapshot
+        trace.event("autosave", "autosave", records = len(lst_Records),
+                    seconds = perf_counter() - flt_Start)
+        return lst_Lines
+
+    def record(self, assay_data, details):
+        """
+        Works out the changes and writes them right away, see changes and
+        write.
+
+        Returns number of records written.
+        """
+        lst_Lines = self.changes(assay_data, details)
+        self.write(lst_Lines)
+        return len(lst_Lines)
+
+    def write(self, lst_Lines, int_Generation = None):
+        """
+        Appends lines from changes to the journal file in one go. Starts
+        the file with a header identifying the version of the project
+        file. Safe to call from a worker thread.
+
+        Arguments:
+            lst_Lines -> list of strings. See changes.
+            int_Generation -> integer. int_Generation at the time the lines
+                              were worked out. If the journal has been
+                              deleted since, nothing gets written. None to
+                              always write.
+        """
+        if len(lst_Lines) == 0:
+            return None
+        with self.lock:
+            if not int_Generation is None and not int_Generation == self.int_Generation:
+                return None
+            lst_Header = []
+            if not os.path.exists(self.str_Path):
+                lst_Header.append(json.dumps({"Kind":"Header", "Version":VERSION,
+                                              "Project":self.str_ProjectPath,
+                                              "Stamp":self.project_stamp(), "Time":time()}))
+            elif not self.ends_with_newline():
+                # Close off a line left half written by a crash
+                lst_Header.append("")
+            with open(self.str_Path, "a", encoding = "utf-8") as file:
+                file.write("\n".join(lst_Header + lst_Lines) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def ends_with_newline(self):
+        """
+        Returns True if the journal file is empty or its last line is
+        complete.
+        """
+        with open(self.str_Path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return True
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def replay(self, assay_data, details):
+        """
+        Applies the journal to a freshly opened project, in the order
+        the records were written. Records that cannot be read or do not
+        fit the project get skipped.
+
+        Arguments:
+            assay_data -> pandas dataframe. Gets changed in place unless
+                          plates were added or removed.
+            details -> dictionary. Gets changed in place.
+
+        Returns assay_data (a new dataframe if the container was
+        replaced) and the number of records applied.
+        """
+        int_Applied = 0
+        for record in self.read()[1:]:
+            try:
+                data = decode(record["Data"])
+                if record["Kind"] == "Details":
+                    details.clear()
+                    details.update(data)
+                elif record["Kind"] == "Container":
+                    if not isinstance(data, pd.DataFrame):
+                        continue
+                    assay_data = data
+                elif record["Kind"] == "Plate":
+                    plate, dic_Plate = data
+                    for col, value in dic_Plate.items():
+                        assay_data.at[plate,col] = value
+                elif record["Kind"] == "Sample":
+                    plate, sample, ser_Row = data
+                    dfr_Processed = assay_data.loc[plate,"Processed"]
+                    for col in ser_Row.index:
+                        dfr_Processed.at[sample,col] = ser_Row[col]
+                else:
+                    continue
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                trace.event("journal record skipped", "autosave", error = str(error))
+                continue
+            int_Applied += 1
+        return assay_data, int_Applied
+
+    def clear(self, assay_data, details):
+        """
+        Deletes the journal after the project has been saved in full
+        and takes the saved state as new baseline.
+        """
+        self.discard()
+        self.baseline(assay_data, details)
+
+    def discard(self):
+        """
+        Deletes the journal file.
+        """
+        with self.lock:
+            self.int_Generation += 1
+            try:
+                os.remove(self.str_Path)
+            except OSError:
+                pass
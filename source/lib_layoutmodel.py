@@ -0,0 +1,412 @@
+"""
+Array backed model of plate layouts for the plate layout editor.
+
+A layout is held as integer numpy arrays with one row per plate and one
+column per well (in the order of pf.col_row_to_index): the well type and,
+for proteins, controls, references and samples, the numerical of the
+definition assigned to the well (-1 if none). Names, concentrations and
+Z prime flags of the definitions are kept in small lookup tables, one per
+plate and kind. The dataframes the rest of the program works with
+(dfr_Layout, see PlateLayout in lib_platelayoutmenus) are only assembled
+when they are needed.
+
+    Classes:
+        LayoutModel
+
+    Functions:
+        numerical_array
+        entry_table
+
+"""
+
+import io
+import zipfile as zf
+import numpy as np
+import pandas as pd
+
+# Well types. The code of a well type is its index in the lists.
+lst_WellTypes = ["na","s","r","c"]
+lst_WellTypesLong = ["not assigned","Sample","Reference well","Control"]
+lst_CellColours = ["white","yellow","red","blue"]
+lst_TextColours = ["black","black","white","white"]
+dic_WellTypeCodes = {"na":0, "s":1, "r":2, "c":3}
+
+# Kinds of definitions that get a numerical per well
+lst_Kinds = ["Protein","Control","Reference","Sample"]
+
+# Columns of each plate's layout dataframe
+lst_Columns = ["WellType",
+               "ProteinNumerical",
+               "ProteinID",
+               "ProteinConcentration",
+               "ControlNumerical",
+               "ControlID",
+               "ControlConcentration",
+               "ZPrime",
+               "ReferenceNumerical",
+               "ReferenceID",
+               "ReferenceConcentration",
+               "SampleNumerical",
+               "SampleID",
+               "SampleConcentration"]
+
+def numerical_array(ser_Numericals):
+    """
+    Turns a column of numericals as found in layout dataframes (integers,
+    floats, strings like "2" or "2.0", empty strings or np.nan) into an
+    integer array with -1 for wells without numerical.
+    """
+    arr_Numericals = pd.to_numeric(pd.Series(ser_Numericals, dtype = object).astype(str).str.strip(),
+                                   errors = "coerce").to_numpy(dtype = float, copy = True)
+    arr_Numericals[~np.isfinite(arr_Numericals)] = -1
+    return arr_Numericals.astype(np.int32)
+
+def entry_table(dfr_Plate, kind, arr_Numericals):
+    """
+    Builds the lookup table of one kind of definitions for one plate from
+    its layout dataframe. Each numerical gets the name and concentration
+    of the first well it was assigned to.
+
+    Arguments:
+        dfr_Plate -> pandas dataframe. Layout of one plate.
+        kind -> string. "Protein", "Control", "Reference" or "Sample".
+        arr_Numericals -> integer array. Numericals of the wells.
+
+    Returns list of dictionaries with keys "ID", "Concentration" and
+    "ZPrime".
+    """
+    if not (arr_Numericals >= 0).any():
+        return []
+    lst_Table = [{"ID":"", "Concentration":"", "ZPrime":False}
+                 for i in range(arr_Numericals.max() + 1)]
+    arr_Numbers, arr_First = np.unique(arr_Numericals, return_index = True)
+    for number, well in zip(arr_Numbers, arr_First):
+        if number < 0:
+            continue
+        name = dfr_Plate[kind + "ID"].iloc[well] if kind + "ID" in dfr_Plate.columns else ""
+        conc = (dfr_Plate[kind + "Concentration"].iloc[well]
+                if kind + "Concentration" in dfr_Plate.columns else "")
+        lst_Table[number]["ID"] = "" if pd.isna(name) else str(name)
+        lst_Table[number]["Concentration"] = "" if pd.isna(conc) else str(conc)
+        if kind == "Control" and "ZPrime" in dfr_Plate.columns:
+            lst_Table[number]["ZPrime"] = str(dfr_Plate["ZPrime"].iloc[well]) == "True"
+    return lst_Table
+
+class LayoutModel:
+    """
+    Plate layouts of one or more plates as integer arrays.
+
+    Attributes:
+        wells -> integer. Plate format.
+        plates -> integer. Number of plates.
+        arr_WellType -> integer array (plates, wells). Well type codes,
+                        see lst_WellTypes.
+        dic_Numericals -> dictionary of integer arrays (plates, wells),
+                          one per kind in lst_Kinds. -1 where no
+                          definition is assigned.
+        arr_SampleIDs -> object array (plates, wells) of sample IDs,
+                         "" where not defined.
+        lst_PlateIDs -> list of strings.
+        dic_Tables -> dictionary of lists (one per plate) of lookup
+                      tables, one per kind in lst_Kinds.
+
+    Methods:
+        add_plates
+        set_welltype
+        set_numerical
+        set_sampleids
+        set_table
+        remove_entry
+        clear
+        labels
+        to_layout
+        to_dataframe
+        from_dataframe
+        export_plf
+        import_plf
+    """
+
+    def __init__(self, wells, plates = 1, plateid = "X999A", tables = None):
+        """
+        Creates blank layouts.
+
+        Arguments:
+            wells -> integer. Plate format.
+            plates -> integer. Number of plates.
+            plateid -> string. Plate ID to start with.
+            tables -> dictionary of lookup tables to start every plate
+                      with (e.g. the default entries of the editor).
+        """
+        self.wells = wells
+        self.plates = 0
+        self.arr_WellType = np.zeros((0, wells), dtype = np.int8)
+        self.dic_Numericals = {kind: np.full((0, wells), -1, dtype = np.int32)
+                               for kind in lst_Kinds}
+        self.arr_SampleIDs = np.full((0, wells), "", dtype = object)
+        self.lst_PlateIDs = []
+        self.dic_Tables = {kind: [] for kind in lst_Kinds}
+        self.dic_Default = {} if tables is None else tables
+        self.add_plates(plates, plateid)
+
+    def add_plates(self, plates, plateid = "X999A", template = None):
+        """
+        Appends layouts.
+
+        Arguments:
+            plates -> integer. Number of layouts to add.
+            plateid -> string. Plate ID of the new layouts.
+            template -> integer. Optional. Index of a plate whose layout
+                        gets copied. Otherwise the new layouts are blank.
+        """
+        int_First = self.plates
+        self.arr_WellType = np.concatenate([self.arr_WellType,
+            np.zeros((plates, self.wells), dtype = np.int8)])
+        for kind in lst_Kinds:
+            self.dic_Numericals[kind] = np.concatenate([self.dic_Numericals[kind],
+                np.full((plates, self.wells), -1, dtype = np.int32)])
+            for plate in range(plates):
+                self.dic_Tables[kind].append([dict(entry) for entry in
+                                              self.dic_Default.get(kind, [])])
+        self.arr_SampleIDs = np.concatenate([self.arr_SampleIDs,
+            np.full((plates, self.wells), "", dtype = object)])
+        self.lst_PlateIDs.extend([plateid] * plates)
+        self.plates += plates
+        if not template is None:
+            arr_New = np.arange(int_First, self.plates)
+            self.arr_WellType[arr_New] = self.arr_WellType[template]
+            self.arr_SampleIDs[arr_New] = self.arr_SampleIDs[template]
+            for kind in lst_Kinds:
+                self.dic_Numericals[kind][arr_New] = self.dic_Numericals[kind][template]
+                for plate in arr_New:
+                    self.set_table(plate, kind, self.dic_Tables[kind][template])
+
+    def set_welltype(self, plate, wells, welltype, numerical = -1):
+        """
+        Sets the type of wells and clears definitions that do not apply
+        to the new type.
+
+        Arguments:
+            plate -> integer. Index of the plate.
+            wells -> list of well indices.
+            welltype -> string. "na", "s", "r" or "c".
+            numerical -> integer. Reference or control numerical.
+
+        Returns array of wells whose contents changed.
+        """
+        wells = np.unique(np.asarray(wells, dtype = int))
+        arr_Before = self._state(plate, wells)
+        self.arr_WellType[plate, wells] = dic_WellTypeCodes[welltype]
+        if welltype == "na":
+            for kind in lst_Kinds:
+                self.dic_Numericals[kind][plate, wells] = -1
+            self.arr_SampleIDs[plate, wells] = ""
+        elif welltype == "s":
+            self.dic_Numericals["Control"][plate, wells] = -1
+            self.dic_Numericals["Reference"][plate, wells] = -1
+        elif welltype == "r":
+            self.dic_Numericals["Control"][plate, wells] = -1
+            self.dic_Numericals["Reference"][plate, wells] = numerical
+            if len(self.dic_Tables["Reference"][plate]) <= numerical:
+                self.dic_Tables["Reference"][plate].append({"ID":"DMSO",
+                    "Concentration":"", "ZPrime":False})
+        elif welltype == "c":
+            self.dic_Numericals["Reference"][plate, wells] = -1
+            self.dic_Numericals["Control"][plate, wells] = numerical
+        return wells[(self._state(plate, wells) != arr_Before).any(axis = 1)]
+
+    def set_numerical(self, plate, wells, kind, numerical):
+        """
+        Assigns a definition (e.g. a protein) to wells without changing
+        their type. Returns array of wells whose contents changed.
+        """
+        wells = np.unique(np.asarray(wells, dtype = int))
+        arr_Changed = wells[self.dic_Numericals[kind][plate, wells] != numerical]
+        self.dic_Numericals[kind][plate, wells] = numerical
+        return arr_Changed
+
+    def set_sampleids(self, plate, wells, sampleids):
+        """
+        Writes sample IDs. Wells not in the list lose their sample ID.
+        """
+        self.arr_SampleIDs[plate,:] = ""
+        if len(wells) > 0:
+            self.arr_SampleIDs[plate, np.asarray(wells, dtype = int)] = sampleids
+
+    def set_table(self, plate, kind, entries):
+        """
+        Replaces the lookup table of one kind of definitions on a plate.
+
+        Arguments:
+            entries -> list of dictionaries with keys "ID",
+                       "Concentration" and "ZPrime".
+        """
+        self.dic_Tables[kind][plate] = [dict(entry) for entry in entries]
+
+    def remove_entry(self, plate, kind, index):
+        """
+        Removes a definition from a plate's lookup table. Wells it was
+        assigned to lose it (control wells become unassigned), the
+        numericals of all following definitions move down by one.
+
+        Returns array of wells whose contents changed.
+        """
+        arr_Numericals = self.dic_Numericals[kind][plate]
+        arr_Removed = np.flatnonzero(arr_Numericals == index)
+        arr_Changed = np.flatnonzero(arr_Numericals >= index)
+        if kind == "Control":
+            self.arr_WellType[plate, arr_Removed] = dic_WellTypeCodes["na"]
+        arr_Numericals[arr_Removed] = -1
+        arr_Numericals[arr_Numericals > index] -= 1
+        if index < len(self.dic_Tables[kind][plate]):
+            self.dic_Tables[kind][plate].pop(index)
+        return arr_Changed
+
+    def clear(self, plate):
+        """
+        Clears the layout of a plate. Returns array of changed wells.
+        """
+        return self.set_welltype(plate, np.arange(self.wells), "na")
+
+    def labels(self, plate, kind):
+        """
+        Returns array of cell labels for the plate layout grid: the
+        numerical (starting at 1) of the definition of the given kind or
+        an empty string.
+        """
+        if not kind in self.dic_Numericals:
+            return np.full(self.wells, "", dtype = object)
+        arr_Numericals = self.dic_Numericals[kind][plate]
+        return np.where(arr_Numericals >= 0, (arr_Numericals + 1).astype(str), "").astype(object)
+
+    def _state(self, plate, wells):
+        # Everything that is stored for the wells, as one array for comparisons
+        return np.column_stack([self.arr_WellType[plate, wells]] +
+                               [self.dic_Numericals[kind][plate, wells] for kind in lst_Kinds] +
+                               [self.arr_SampleIDs[plate, wells] != ""])
+
+    def to_layout(self, plate):
+        """
+        Assembles the layout dataframe of one plate (columns in
+        lst_Columns). Unassigned definitions are empty strings, wells
+        without sample ID have np.nan in "SampleID".
+        """
+        dic_Columns = {"WellType": np.array(lst_WellTypes, dtype = object)[self.arr_WellType[plate]]}
+        for kind in lst_Kinds:
+            arr_Numericals = self.dic_Numericals[kind][plate]
+            lst_Table = self.dic_Tables[kind][plate]
+            # Numericals without entry and -1 both look up the blank entry at the end
+            arr_Lookup = np.where((arr_Numericals >= 0) & (arr_Numericals < len(lst_Table)),
+                                  arr_Numericals, len(lst_Table))
+            arr_Names = np.array([entry["ID"] for entry in lst_Table] + [""], dtype = object)
+            arr_Concs = np.array([entry["Concentration"] for entry in lst_Table] + [""], dtype = object)
+            arr_Numbers = arr_Numericals.astype(object)
+            arr_Numbers[arr_Numericals < 0] = ""
+            dic_Columns[kind + "Numerical"] = arr_Numbers
+            dic_Columns[kind + "ID"] = arr_Names[arr_Lookup]
+            dic_Columns[kind + "Concentration"] = arr_Concs[arr_Lookup]
+            if kind == "Control":
+                dic_Columns["ZPrime"] = np.array([entry["ZPrime"] for entry in lst_Table] + [""],
+                                                 dtype = object)[arr_Lookup]
+        arr_SampleIDs = self.arr_SampleIDs[plate].copy()
+        arr_SampleIDs[arr_SampleIDs == ""] = np.nan
+        dic_Columns["SampleID"] = arr_SampleIDs
+        return pd.DataFrame(index = range(self.wells),
+                            data = {col: dic_Columns[col] for col in lst_Columns})
+
+    def to_dataframe(self):
+        """
+        Assembles dfr_Layout: one row per plate with columns "PlateID"
+        and "Layout" (see to_layout).
+        """
+        dfr_Layout = pd.DataFrame(index = range(self.plates),
+                                  columns = ["PlateID","Layout"])
+        for plate in range(self.plates):
+            dfr_Layout.at[plate,"PlateID"] = self.lst_PlateIDs[plate]
+            dfr_Layout.at[plate,"Layout"] = self.to_layout(plate)
+        return dfr_Layout
+
+    @classmethod
+    def from_dataframe(cls, dfr_Layout, wells, tables = None):
+        """
+        Creates a model from dfr_Layout.
+
+        Arguments:
+            dfr_Layout -> pandas dataframe with columns "PlateID" and
+                          "Layout".
+            wells -> integer. Plate format.
+            tables -> dictionary of default lookup tables for plates
+                      that get added later.
+        """
+        model = cls(wells, plates = dfr_Layout.shape[0], tables = tables)
+        for plate, idx in enumerate(dfr_Layout.index):
+            if not pd.isna(dfr_Layout.loc[idx,"PlateID"]):
+                model.lst_PlateIDs[plate] = str(dfr_Layout.loc[idx,"PlateID"])
+            dfr_Plate = dfr_Layout.loc[idx,"Layout"]
+            model.arr_WellType[plate] = (dfr_Plate["WellType"].map(dic_WellTypeCodes)
+                                         .fillna(0).to_numpy(dtype = np.int8))
+            for kind in lst_Kinds:
+                if kind + "Numerical" in dfr_Plate.columns:
+                    arr_Numericals = numerical_array(dfr_Plate[kind + "Numerical"])
+                else:
+                    arr_Numericals = np.full(wells, -1, dtype = np.int32)
+                model.dic_Numericals[kind][plate] = arr_Numericals
+                model.dic_Tables[kind][plate] = entry_table(dfr_Plate, kind, arr_Numericals)
+            ser_SampleIDs = dfr_Plate["SampleID"]
+            model.arr_SampleIDs[plate] = np.where(ser_SampleIDs.isna(), "",
+                ser_SampleIDs.astype(str)).astype(object)
+        return model
+
+    def export_plf(self, str_FilePath):
+        """
+        Writes the layouts to a plate layout file (.plf): a zip archive
+        with the plate IDs in "plates.csv" and the layout of each plate in
+        "<plate>\\layout.csv". The files are written straight into the
+        archive.
+
+        Returns True on success.
+        """
+        try:
+            with zf.ZipFile(str_FilePath, "w", compression = zf.ZIP_DEFLATED) as zip_PLF:
+                zip_PLF.writestr("plates.csv",
+                    pd.Series(self.lst_PlateIDs, name = "PlateID").to_csv())
+                for plate in range(self.plates):
+                    zip_PLF.writestr(str(plate) + "\\layout.csv",
+                                     self.to_layout(plate).to_csv())
+        except:
+            return False
+        return True
+
+    @classmethod
+    def import_plf(cls, str_FilePath, wells, tables = None):
+        """
+        Reads a plate layout file (.plf) straight from the archive.
+
+        Arguments:
+            str_FilePath -> string. Path of the file.
+            wells -> integer. Expected plate format.
+            tables -> dictionary of default lookup tables.
+
+        Returns LayoutModel or None if the file could not be read or has
+        a different plate format.
+        """
+        try:
+            with zf.ZipFile(str_FilePath, "r") as zip_PLF:
+                # Older files were written with the layouts in
+                # sub-directories, accept either path separator.
+                dic_Members = {name.replace("\\", "/"): name for name in zip_PLF.namelist()}
+                dfr_Layout = pd.read_csv(io.BytesIO(zip_PLF.read(dic_Members["plates.csv"])),
+                                         sep = ",", header = 0, index_col = 0)
+                dfr_Layout.insert(1, "Layout", None)
+                dfr_Layout["Layout"] = dfr_Layout["Layout"].astype(object)
+                for plate in dfr_Layout.index:
+                    str_Member = dic_Members[str(plate) + "/layout.csv"]
+                    dfr_Layout.at[plate,"Layout"] = pd.read_csv(
+                        io.BytesIO(zip_PLF.read(str_Member)), sep = ",", header = 0,
+                        index_col = 0, dtype = object, keep_default_na = False,
+                        na_values = [""])
+        except:
+            return None
+        for plate in dfr_Layout.index:
+            if dfr_Layout.at[plate,"Layout"].shape[0] != wells:
+                return None
+        return cls.from_dataframe(dfr_Layout, wells, tables)
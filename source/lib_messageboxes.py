@@ -10,6 +10,7 @@ Functions:
     warn_missing_datafile
     warn_not_transferfile
     warn_not_datafile
+    warn_directory_not_found
     warn_no_layout
     warn_no_transfer
     warn_clipboard_error
@@ -21,7 +22,10 @@ Functions:
     query_change_sample_source
     query_discard_changes
     query_close_program
+    query_recover_autosave
+    query_split_by_plate
     warn_permission_denied
+    warn_export_failure
     query_connect_db
     info_all_verified
 
@@ -106,6 +110,16 @@ def warn_not_datafile(*args):
                             caption = u"File error",
                             style = wx.OK|wx.ICON_WARNING)
 
+def warn_directory_not_found(*args):
+    """
+    Displays message box if the raw data directory is not set or does
+    not exist.
+    """
+    message = wx.MessageBox(u"The raw data directory could not be found."
+                            + u"\nSelect an existing directory and try again.",
+                            caption = u"Directory not found",
+                            style = wx.OK|wx.ICON_WARNING)
+
 def warn_no_layout(*args):
     """
     Displays message box if user tries to perform analysis without a plate layout.
@@ -245,6 +259,37 @@ def query_close_program(*args):
     elif message == 8:
         return False
 
+def query_recover_autosave(*args):
+    """
+    Displays message box asking user whether changes recorded by
+    autosave since the project was last saved should be restored.
+
+    Returns True if user confirms, False if not.
+    """
+    message = wx.MessageBox(u"This project has changes that were not saved, e.g. because the program closed unexpectedly."
+                            + u"\nDo you want to restore them?",
+                            caption = u"Restore unsaved changes?",
+                            style = wx.YES_NO|wx.ICON_QUESTION)
+    if message == 2:
+        return True
+    elif message == 8:
+        return False
+
+def query_split_by_plate(*args):
+    """
+    Displays message box asking user whether the export should get one
+    worksheet per plate.
+
+    Returns True if user confirms, False if not.
+    """
+    message = wx.MessageBox(u"Do you want to write each plate to its own worksheet?",
+                            caption = u"One worksheet per plate?",
+                            style = wx.YES_NO|wx.ICON_QUESTION)
+    if message == 2:
+        return True
+    elif message == 8:
+        return False
+
 def warn_permission_denied(*args):
     """
     Displays message box if file could not be saved due to insufficient
@@ -257,6 +302,16 @@ def warn_permission_denied(*args):
                             caption = u"Permission denied!",
                             style = wx.OK|wx.ICON_WARNING)
 
+def warn_export_failure(failure):
+    """
+    Displays message box if the results table could not be exported.
+    """
+    message = wx.MessageBox(u"The following error occurred while trying to export the results: "
+                            + u"\n\n " + str(failure)
+                            + u"\n\nThe file has not been written.",
+                            caption = u"Export failed",
+                            style = wx.OK|wx.ICON_WARNING)
+
 def warn_files_not_loaded(*args):
     """
     Displays message box if one of more data files could not be found
@@ -13,17 +13,15 @@ import wx
 import wx.xrc
 import wx.grid
 import os
-import shutil
 
 import lib_colourscheme as cs
 import lib_platefunctions as pf
 import lib_datafunctions as df
 import lib_custombuttons as btn
+import lib_layoutmodel as lm
 import pandas as pd
 import numpy as np
 
-import zipfile as zf
-
 ######  ##  ##  ##  ##   #####  ######  ##   ####   ##  ##   #####
 ##      ##  ##  ### ##  ##        ##    ##  ##  ##  ### ##  ##
 ####    ##  ##  ######  ##        ##    ##  ##  ##  ######   ####
@@ -337,7 +335,7 @@ class ListEntry(wx.Panel):
                 if not self.parent.family[key].index == self.index:
                     self.parent.family[key].rad_ZPrime.SetValue(False)
                     self.parent.family[key].zprime = False
-        self.plm.update_dataframe()
+        self.plm.update_definitions()
 
     def update_name(self, event):
         """
@@ -345,7 +343,7 @@ class ListEntry(wx.Panel):
         layout dataframe.
         """
         self.name = self.txt_Name.GetValue()
-        self.plm.update_dataframe()
+        self.plm.update_definitions()
 
     def update_conc(self, event):
         """
@@ -353,7 +351,7 @@ class ListEntry(wx.Panel):
         layout dataframe.
         """
         self.conc = self.txt_Conc.GetValue()
-        self.plm.update_dataframe()
+        self.plm.update_definitions()
             
 
 class PlateLayout(wx.Dialog):
@@ -390,17 +388,21 @@ class PlateLayout(wx.Dialog):
         context_menu_plate
         get_selection_plate
         on_mouseover_plate
+        selected_wells
         paint_sample
         paint_control
         paint_reference
         paint_blank
+        check_samples
         clear_plate
-        paint_cells
         write_protein
-        get_well_type
-        get_well_colour
-        get_text_colour
-        create_dataframe
+        get_plate
+        get_plate_for_editing
+        cell_kind
+        list_entries
+        refresh_grid
+        update_definitions
+        update_sampleids
         update_dataframe
         update_display
         update_plateid
@@ -882,32 +884,25 @@ class PlateLayout(wx.Dialog):
         self.Centre( wx.BOTH )
 
         # Populate:
+        # The grid is a view of the layout model. Keep track of what it
+        # currently shows so that only changed cells get redrawn.
+        self.arr_ShownTypes = np.zeros(self.plateformat, dtype = np.int8)
+        self.arr_ShownLabels = np.full(self.plateformat, "", dtype = object)
+        # New plates start with the default entries of the lists
+        self.dic_DefaultTables = {"Protein": self.list_entries(self.scr_ProteinList),
+                                  "Control": self.list_entries(self.scr_ControlList)}
         if len(dfr_Layout) == 0:
-            self.dfr_Layout = pd.DataFrame(index=range(int_Plates),
-                                           columns=["PlateID",
-                                                    "Layout"])
-
-            for plate in range(int_Plates):
-                if self.PlateID == True:
-                    self.dfr_Layout.loc[plate,"PlateID"] = self.txt_PlateID.GetValue()
-                else:
-                    self.dfr_Layout.loc[plate,"PlateID"] = "X999A"
-                self.dfr_Layout.at[plate,"Layout"] = pd.DataFrame(index=range(self.plateformat),
-                                                columns = ["WellType",
-                                                           "ProteinNumerical",
-                                                           "ProteinID",
-                                                           "ProteinConcentration",
-                                                           "ControlNumerical",
-                                                           "ControlID",
-                                                           "ControlConcentration",
-                                                           "ZPrime",
-                                                           "ReferenceNumerical",
-                                                           "ReferenceID",
-                                                           "ReferenceConcentration",
-                                                           "SampleNumerical",
-                                                           "SampleID",
-                                                           "SampleConcentration"])
+            if self.PlateID == True:
+                str_PlateID = self.txt_PlateID.GetValue()
+            else:
+                str_PlateID = "X999A"
+            self.layout = lm.LayoutModel(self.plateformat, plates = int_Plates,
+                                         plateid = str_PlateID,
+                                         tables = self.dic_DefaultTables)
+            self.dfr_Layout = self.layout.to_dataframe()
         else:
+            self.layout = lm.LayoutModel.from_dataframe(dfr_Layout, self.plateformat,
+                                                        tables = self.dic_DefaultTables)
             self.dfr_Layout = dfr_Layout
             self.update_display()
 
@@ -958,22 +953,8 @@ class PlateLayout(wx.Dialog):
         """
         event.Skip()
         self.Freeze()
-        # Get plate index
-        if self.bol_MultiplePlates == True and self.dfr_Layout.shape[0] > 1:
-            plate = self.lbx_PlateList.GetSelection()
-        else:
-            plate = 0
-
-        prows = pf.plate_rows(self.plateformat)
-        pcols = pf.plate_columns(self.plateformat)
-        
-        notebook = event.GetEventObject()
-        page = notebook.GetSelection()
-        page_text = notebook.GetPageText(page)
-
-        self.rewrite_all_cell_contents(page_text, plate, prows, pcols)
-        self.lbl_Cells.SetLabel(f"Cell labels: {page_text}s")
-
+        self.refresh_grid()
+        self.lbl_Cells.SetLabel(f"Cell labels: {self.cell_kind()}s")
         self.Thaw()
 
     # The following three function are taken from a tutorial on the wxPython Wiki: https://wiki.wxpython.org/How%20to%20create%20a%20customized%20frame%20-%20Part%201%20%28Phoenix%29
@@ -1015,24 +996,23 @@ class PlateLayout(wx.Dialog):
 
     def add_protein(self, event):
         """
-        Adds a protein to the list and updates dataframe.
+        Adds a protein to the list and updates the layout.
         Selecting wells on plate layout is required.
         """
         self.scr_ProteinList.add_entry(f"Protein {self.scr_ProteinList.entries+1}",
                                        conc = "10",
                                        use_zprime = False)
+        self.update_definitions()
 
         # Only if the proteins tab is currently shown (i.e. the button is "Current")
-        # and wells are indeed selected do we want to write the numerical ID onto
-        # the plate layout.
+        # and wells are indeed selected do we want to assign the new protein to
+        # wells on the plate layout.
         if self.btn_Proteins.Current == True:
-            lst_Selection = self.get_selection_plate()
-            if len(lst_Selection) > 0:
-                for i in range(len(lst_Selection)):
-                    self.grd_Plate.SetCellValue(lst_Selection[i][0],
-                                                lst_Selection[i][1],
-                                                str(self.scr_ProteinList.entries))
-                    self.write_protein(None, None, self.scr_ProteinList.entries, False)
+            lst_Wells = self.selected_wells(None)
+            if len(lst_Wells) > 0:
+                self.layout.set_numerical(self.get_plate_for_editing(), lst_Wells,
+                                          "Protein", self.scr_ProteinList.entries - 1)
+                self.refresh_grid()
             else:
                 wx.MessageBox("You have not selected any wells, could not assign protein to wells.\nSelect wells and try again.",
                     "No wells", wx.OK|wx.ICON_INFORMATION)
@@ -1040,27 +1020,20 @@ class PlateLayout(wx.Dialog):
     def remove_protein(self, event):
         """
         Removes selected protein from protein list and
-        clears all corresponding wells on plate layout,
-        updates dataframe.
+        from all corresponding wells on plate layout.
         """
         prot = self.scr_ProteinList.highlit
+        int_Entries = self.scr_ProteinList.entries
         self.scr_ProteinList.delete_entry(prot)
-        self.update_dataframe()
-
-        # Only if the proteins tab is currently shown (i.e. the button is "Current")
-        # do we want to remove the numerical ID from the plate layout.
-        if self.btn_Proteins.Current == True:
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    if self.grd_Plate.GetCellValue(row,col) == str(prot+1):
-                        self.grd_Plate.SetCellValue(row,col,"")
-                        self.grd_Plate.SetCellBackgroundColour(row,col,cs.White)
-                    elif self.grd_Plate.GetCellValue(row,col) != "" and int(self.grd_Plate.GetCellValue(row,col)) > prot+1:
-                        self.grd_Plate.SetCellValue(row,col,str(int(self.grd_Plate.GetCellValue(row,col))-1))
+        if self.scr_ProteinList.entries == int_Entries:
+            return None
+        self.layout.remove_entry(self.get_plate_for_editing(), "Protein", prot)
+        self.update_definitions()
+        self.refresh_grid()
 
     def add_control(self, event):
         """
-        Adds a control to the list and updates dataframe.
+        Adds a control to the list and updates the layout.
         """
         if self.scr_ControlList.entries == 0:
             zprime = True
@@ -1069,18 +1042,19 @@ class PlateLayout(wx.Dialog):
         self.scr_ControlList.add_entry(f"Control {self.scr_ControlList.entries+1}",
                                        conc = "10",
                                        zprime = zprime)
+        self.update_definitions()
         
         # Only if the controls tab is currently shown (i.e. the button is "Current")
-        # and wells are indeed selected do we want to write the numerical ID onto
-        # the plate layout.
+        # and wells are indeed selected do we want to assign the new control to
+        # wells on the plate layout.
         if self.btn_Controls.Current == True:
-            selection = self.get_selection_plate()
-            if len(selection) > 0:
-                for i in range(len(selection)):
-                    self.grd_Plate.SetCellValue(selection[i][0],
-                                                selection[i][1],
-                                                str(self.scr_ControlList.entries))
-                    self.paint_control(None, None, self.scr_ControlList.entries, 0)
+            lst_Wells = self.selected_wells(None)
+            if len(lst_Wells) > 0:
+                if self.check_samples(lst_Wells) == False:
+                    return None
+                self.layout.set_welltype(self.get_plate_for_editing(), lst_Wells,
+                                         "c", self.scr_ControlList.entries - 1)
+                self.refresh_grid()
             else:
                 wx.MessageBox("You have not selected any wells, could not assign control to wells.\nSelect wells and try again.",
                     "No wells", wx.OK|wx.ICON_INFORMATION)
@@ -1088,23 +1062,16 @@ class PlateLayout(wx.Dialog):
     def remove_control(self, event):
         """
         Removes selected control from control list and
-        clears all corresponding wells on plate layout,
-        updates dataframe.
+        clears all corresponding wells on plate layout.
         """
         ctrl = self.scr_ControlList.highlit
+        int_Entries = self.scr_ControlList.entries
         self.scr_ControlList.delete_entry(ctrl)
-        self.update_dataframe()
-
-        # Only if the controls tab is currently shown (i.e. the button is "Current")
-        # do we want to remove the numerical ID from the plate layout.
-        if self.btn_Controls.Current == True:
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    if self.grd_Plate.GetCellValue(row,col) == str(ctrl+1):
-                        self.grd_Plate.SetCellValue(row,col,"")
-                        self.grd_Plate.SetCellBackgroundColour(row,col,cs.White)
-                    elif self.grd_Plate.GetCellValue(row,col) != "" and int(self.grd_Plate.GetCellValue(row,col)) > ctrl+1:
-                        self.grd_Plate.SetCellValue(row,col,str(int(self.grd_Plate.GetCellValue(row,col))-1))
+        if self.scr_ControlList.entries == int_Entries:
+            return None
+        self.layout.remove_entry(self.get_plate_for_editing(), "Control", ctrl)
+        self.update_definitions()
+        self.refresh_grid()
 
     def test_for_control(self):
         """
@@ -1133,8 +1100,8 @@ class PlateLayout(wx.Dialog):
 
     def export_layout(self, event):
         """
-        Exports layout dataframe to csv file with the file
-        extension ".plf" (plate layout file)
+        Exports layouts to a plate layout file with the file
+        extension ".plf" (see lm.LayoutModel.export_plf)
         """
         # Test if there are any controls and if so, whether one is selected for ZPrime:
         if self.test_for_control() == False:
@@ -1148,35 +1115,13 @@ class PlateLayout(wx.Dialog):
             str_SaveFilePath = fileDialog.GetPath()
             if str_SaveFilePath.find(".plf") == -1:
                 str_SaveFilePath = str_SaveFilePath + ".plf"
-            try:
-                zip_PLF = zf.ZipFile(str_SaveFilePath, "w")
-            except:
-                return False
-            HomePath = os.path.expanduser("~")
-            str_TempDir = os.path.join(HomePath,"bbqtempdir")
-            # Check whether temporary directory exists. if so, delete and make fresh
-            if os.path.isdir(str_TempDir) == True:
-                shutil.rmtree(str_TempDir)
-            os.mkdir(str_TempDir)
-
-            # Save Plate IDs
-            self.dfr_Layout["PlateID"].to_csv(str_TempDir + r"\plates.csv")
-            zip_PLF.write(str_TempDir + r"\plates.csv",
-                          arcname="plates.csv")
-            # Save individual layouts
-            for plate in self.dfr_Layout.index:
-                self.dfr_Layout.loc[plate,"Layout"].to_csv(str_TempDir + r"\layout.csv")
-                zip_PLF.write(str_TempDir + r"\layout.csv",
-                              arcname=str(plate) + r"\layout.csv")
-                os.remove(os.path.join(str_TempDir, "layout.csv"))
-            zip_PLF.close()
-            # Remove all the temporary files
-            shutil.rmtree(str_TempDir)
+            self.update_dataframe()
+            return self.layout.export_plf(str_SaveFilePath)
 
     def import_layout(self, event):
         """
-        Imports a plate layout file. Reads contents to dataframe
-        and updates all relevent widgets on dialog window.
+        Imports a plate layout file. Reads contents into the layout
+        model and updates all relevent widgets on dialog window.
         """
         with wx.FileDialog(self, "Open plate layout file", wildcard="Plate layout files (*.plf)|*.plf",
             style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
@@ -1185,46 +1130,19 @@ class PlateLayout(wx.Dialog):
                 return     # the user changed their mind
             str_FilePath = fileDialog.GetPath()
 
-            # Check whether temporary directory exists. if so, delete and make fresh
-            HomePath = os.path.expanduser("~")
-            str_TempDir = os.path.join(HomePath,"bbqtempdir")
-            if os.path.isdir(str_TempDir) == True:
-                shutil.rmtree(str_TempDir)
-            os.mkdir(str_TempDir)
-            # Extract saved file to temporary directory
-            with zf.ZipFile(str_FilePath, "r") as zip:
-                zip.extractall(str_TempDir)
-
-            self.clear_plate(event = None)
-
-            self.dfr_Layout = pd.read_csv(str_TempDir+r"\plates.csv",
-                                          sep=",",
-                                          header=0,
-                                          index_col=0,
-                                          engine="python")
-            # Insert a column with contents, otherwise sub-dataframes cannot
-            # be loaded,
-            self.dfr_Layout.insert(1,"Layout","")
-
-            for plate in self.dfr_Layout.index:
-                layout = os.path.join(str_TempDir, str(plate), "layout.csv")
-                self.dfr_Layout.at[plate,"Layout"] = pd.read_csv(layout,
-                                                                 sep=",",
-                                                                 header=0,
-                                                                 index_col=0,
-                                                                 engine="python")
-                for col in self.dfr_Layout.loc[plate,"Layout"].columns:
-                    if "Numerical" in col:
-                        self.dfr_Layout.loc[plate,"Layout"][col] = self.dfr_Layout.loc[plate,"Layout"][col].apply(nodecimal)
- 
-            # Check whether the file is of the correct format (compare list length in dfr_Layout with number of wells on grid)
-            if self.dfr_Layout.loc[0,"Layout"].shape[0] != self.plateformat:
-                wx.MessageBox("The layout file you selected does not have the same plate format (number of wells) as the assay you have selected. Select a new file and try again.",
+            # Returns None if the file cannot be read or the number of wells
+            # does not match the grid.
+            layout = lm.LayoutModel.import_plf(str_FilePath, self.plateformat,
+                                               self.dic_DefaultTables)
+            if layout is None:
+                wx.MessageBox("The layout file you selected could not be read or does not have the same plate format (number of wells) as the assay you have selected. Select a new file and try again.",
                     "Wrong plate format", wx.OK|wx.ICON_INFORMATION)
-                return None # Easier to use this to skip all the rest of the function than to use if then else type wrapper around instructions.
+                return None
+            self.layout = layout
+            self.dfr_Layout = self.layout.to_dataframe()
             self.update_display()
 
-            if self.bol_MultiplePlates == False and len(self.dfr_Layout) > 1:
+            if self.bol_MultiplePlates == False and self.layout.plates > 1:
                 wx.MessageBox("You have imported a file with layouts for two plates or more," + "\n" +
                     "but have selected a global layout for all plates." + "\n" + "\n" +
                     "The first layout in the layout file will be applied to all plates.",
@@ -1244,11 +1162,10 @@ class PlateLayout(wx.Dialog):
         # Test if there are any controls and if so, whether one is selected for ZPrime:
         if self.test_for_control() == False:
             return None
+        self.update_dataframe()
         # Check whether there is a plate without reference wells:
-        lst_PlatesWithoutReferences = []
-        for plate in self.dfr_Layout.index:
-            if not "r" in self.dfr_Layout.loc[plate,"Layout"]["WellType"].tolist():
-                lst_PlatesWithoutReferences.append(plate + 1)
+        arr_References = (self.layout.arr_WellType == lm.dic_WellTypeCodes["r"]).any(axis = 1)
+        lst_PlatesWithoutReferences = (np.flatnonzero(~arr_References) + 1).tolist()
         if len(lst_PlatesWithoutReferences) == 0:
             parent.dfr_Layout = self.dfr_Layout
             parent.bol_LayoutDefined = True
@@ -1289,8 +1206,9 @@ class PlateLayout(wx.Dialog):
 
         row = event.GetRow()
         col = event.GetCol()
-        welltype = self.get_well_type(self.grd_Plate.GetCellBackgroundColour(row,col),True)
         if col >= 0 and col < self.grd_Plate.GetNumberCols() and row >= 0 and row < self.grd_Plate.GetNumberRows():
+            idx_Well = pf.col_row_to_index(row, col, self.plateformat)
+            welltype = lm.lst_WellTypesLong[self.layout.arr_WellType[self.get_plate(),idx_Well]]
             self.PopupMenu(PlateContextMenu(self, event, welltype))
 
     def get_selection_plate(self):
@@ -1328,125 +1246,116 @@ class PlateLayout(wx.Dialog):
         row = coords[0]
         col = coords[1]
         # Get plate
-        plate = 0
+        plate = self.get_plate()
         if (
             col >= 0 and col < self.grd_Plate.GetNumberCols()
             and row >= 0 and row < self.grd_Plate.GetNumberRows()
             ):
             # Get well coordiante:
             str_Well = pf.sortable_well(chr(row+65)+str(col+1),self.plateformat)
-            idx_Well = pf.well_to_index(str_Well, self.plateformat)
+            idx_Well = pf.col_row_to_index(row, col, self.plateformat)
             tooltip = str_Well + ": "
             # Get well type:
-            welltype = self.get_well_type(self.grd_Plate.GetCellBackgroundColour(row,col),True)
+            welltype = lm.lst_WellTypesLong[self.layout.arr_WellType[plate,idx_Well]]
             if not welltype == u"not assigned":
                 # Add welltype to string:
                 tooltip += u"\n" + welltype
                 # Get sample ID if used:
                 if self.bol_sampleids == True:
                     if welltype == "Sample":
-                        sample = self.dfr_Layout.loc[plate,"Layout"].loc[idx_Well,"SampleID"]
-                        tooltip += ": " + str(sample)
+                        tooltip += ": " + str(self.layout.arr_SampleIDs[plate,idx_Well])
                 # Get control ID if used
                 if self.bol_controls == True:
                     if welltype == "Control":
-                        control = self.dfr_Layout.loc[plate,"Layout"].loc[idx_Well,"ControlNumerical"]
-                        if not control == "" and not pd.isna(control):
-                            control = int(control)
-                            tooltip += ": " + self.scr_ControlList.family[control].name
-                            #self.grd_ControlList.GetCellValue(control,0)
+                        control = self.layout.dic_Numericals["Control"][plate,idx_Well]
+                        if control >= 0 and control < len(self.layout.dic_Tables["Control"][plate]):
+                            tooltip += ": " + self.layout.dic_Tables["Control"][plate][control]["ID"]
                 # Get protein ID if used:
                 if self.bol_proteins == True:
-                    protein = self.dfr_Layout.loc[plate,"Layout"].loc[idx_Well,"ProteinNumerical"]
-                    if not protein == "" and not pd.isna(protein):
-                        protein = int(protein)
-                        tooltip += u"\nProtein: " + self.scr_ProteinList.family[protein].name
+                    protein = self.layout.dic_Numericals["Protein"][plate,idx_Well]
+                    if protein >= 0 and protein < len(self.layout.dic_Tables["Protein"][plate]):
+                        tooltip += u"\nProtein: " + self.layout.dic_Tables["Protein"][plate][protein]["ID"]
             else:
                 tooltip += " Blank well"
             event.GetEventObject().SetToolTip(tooltip)
         event.Skip()
 
+    def selected_wells(self, rightclick):
+        """
+        Returns list of indices of all selected wells on plate
+        layout grid and, if given, the right-clicked well.
+
+        Arguments:
+            rightclick -> list of grid coordinates [row, column] or None.
+        """
+        lst_Selection = self.get_selection_plate()
+        if rightclick != None:
+            lst_Selection.append(rightclick)
+        return [pf.col_row_to_index(cell[0], cell[1], self.plateformat) for cell in lst_Selection]
+
     def paint_sample(self, event, rightclick, update = True):
         """
         Event handler.
-        Paints selected grid cell(s) and grid cells at rightclick
-        coordinates yellow and sets cell type to "Sample".
+        Sets selected wells and the well at rightclick
+        coordinates to "Sample".
         """
-        selection = self.get_selection_plate()
-        if rightclick != None:
-            selection.append(rightclick)
-        self.paint_cells(selection,"yellow")#,"s")
-        if self.btn_Controls.Current == True:
-            for i in range(len(selection)):
-                self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],"")
+        self.layout.set_welltype(self.get_plate_for_editing(),
+                                 self.selected_wells(rightclick), "s")
         if update == True:
-            self.update_dataframe()
+            self.refresh_grid()
 
     def paint_control(self, event, rightclick, control, update = True):
         """
         Event handler.
-        Paints selected grid cell(s) and grid cells at rightclick
-        coordinates blue and sets cell type to "Control".
+        Sets selected wells and the well at rightclick
+        coordinates to "Control".
         """
-        selection = self.get_selection_plate()
-        if rightclick != None:
-            selection.append(rightclick)
-        if self.check_samples(selection) == False:
+        lst_Wells = self.selected_wells(rightclick)
+        if self.check_samples(lst_Wells) == False:
             return None
-        self.paint_cells(selection,"blue")
-        if self.btn_Controls.Current == True:
-            for i in range(len(selection)):
-                self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],str(control))
-        self.update_from_menu(selection, "control", control)
+        self.layout.set_welltype(self.get_plate_for_editing(), lst_Wells, "c", control)
+        if update == True:
+            self.refresh_grid()
 
     def paint_reference(self, event, rightclick, name, update = True):
         """
         Event handler.
-        Paints selected grid cell(s) and grid cells at rightclick
-        coordinates red and sets cell type to "Reference".
+        Sets selected wells and the well at rightclick
+        coordinates to "Reference".
         """
-        selection = self.get_selection_plate()
-        if rightclick != None:
-            selection.append(rightclick)
-        if self.check_samples(selection) == False:
+        lst_Wells = self.selected_wells(rightclick)
+        if self.check_samples(lst_Wells) == False:
             return None
-        self.paint_cells(selection,"red")
-        for i in range(len(selection)):
-                self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],"")
-        self.update_from_menu(selection, "reference", 0)
+        self.layout.set_welltype(self.get_plate_for_editing(), lst_Wells, "r", 0)
+        if update == True:
+            self.refresh_grid()
 
     def paint_blank(self, event, rightclick, update = True):
         """
         Event handler.
-        Paints selected grid cell(s) and grid cells at rightclick
-        coordinates white and sets cell type to "not assigned".
+        Sets selected wells and the well at rightclick
+        coordinates to "not assigned".
         """
-        selection = self.get_selection_plate()
-        selection.append(rightclick)
-        self.paint_cells(selection,"white")
-        for i in range(len(selection)):
-                self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],"")
-        self.update_from_menu(selection, "blank", 0)
+        self.layout.set_welltype(self.get_plate_for_editing(),
+                                 self.selected_wells(rightclick), "na")
+        if update == True:
+            self.refresh_grid()
 
     def check_samples(self, wells):
         """
         Checks if the wells in the list have a sample ID associated with them.
         Returns true or false.
+
+        Arguments:
+            wells -> list of well indices.
         """
         proceed = wx.YES
-        wells = [pf.col_row_to_index(w[0],w[1],self.plateformat) for w in wells]
-        if self.bol_MultiplePlates == True:
-            plate = self.lbx_PlateList.GetSelection()
-        else:
-            plate = 0
-        for well in wells:
-            if not pd.isna(self.dfr_Layout.loc[plate,"Layout"].loc[well,"SampleID"]) == True:
-                proceed = wx.MessageBox(
-                    "One or more of the selected cells have sample IDs associated with them."
-                    + "\nDo you want to overwrite them?",
-                    caption = "Sample IDs found",
-                    style = wx.YES_NO|wx.ICON_WARNING)
-                break
+        if (self.layout.arr_SampleIDs[self.get_plate(), wells] != "").any():
+            proceed = wx.MessageBox(
+                "One or more of the selected cells have sample IDs associated with them."
+                + "\nDo you want to overwrite them?",
+                caption = "Sample IDs found",
+                style = wx.YES_NO|wx.ICON_WARNING)
         if proceed == wx.NO:
             return False
         else:
@@ -1456,514 +1365,170 @@ class PlateLayout(wx.Dialog):
         """
         Clears contents of entire plate layout.
         """
-        lst_Selection = []
-        for y in range(24):
-            for x in range(16):
-                lst_Selection.append([x,y])
-        self.grd_Plate.ClearGrid()
-        self.paint_cells(lst_Selection,"white")#,"")
-        self.update_from_menu(lst_Selection, "blank", 0)
-
-    def paint_cells(self,selection,colour):
-        """
-        Changes background colour of selected cells and, if
-        required, changes text colour for readability.
-        """
-        for i in range(len(selection)):
-            self.grd_Plate.SetCellBackgroundColour(selection[i][0],selection[i][1],colour)
-            if colour == "blue":
-                self.grd_Plate.SetCellTextColour(selection[i][0],selection[i][1],"white")
-            else:
-                self.grd_Plate.SetCellTextColour(selection[i][0],selection[i][1],"black")
-                #self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],"")
-        self.grd_Plate.ForceRefresh()
-    
-    def write_protein(self, event, rightclick, numerical, update = True):
-        """
-        writes number corresponding to protein's position
-        in list into selected and clicked-on cells.
-        """
-        selection = self.get_selection_plate()
-        selection.append(rightclick)
-        if self.btn_Proteins.Current == True:
-            for i in range(len(selection)):
-                self.grd_Plate.SetCellValue(selection[i][0],selection[i][1],str(numerical + 1))
-        self.update_from_menu(selection, "protein", numerical)
-
-    def get_well_type(self, colour, long):
-        """
-        Takes background colour of cell and returns well type
-        in short or long form.
+        self.layout.clear(self.get_plate_for_editing())
+        self.refresh_grid()
 
-        Arguments:
-            colour -> list of RGBA values in integers.
-            long -> boolean. Whether to return long or short
-                    form well type, e.g. "Sample" or "s".
-        """
-        #if colour[0] == 255 and colour[1] == 255 and colour[2] == 255:
-        #    # 255,255,255 = white
-        #    str_WellType = "not assigned"
-        if colour[0] == 255 and colour[1] == 255 and colour[2] == 0:
-            # 255,255,0 = yellow
-            if long == True:
-                return "Sample"
-            else:
-                return "s"
-        elif colour[0] == 255 and colour[1] == 0 and colour[2] == 0:
-            # 255,0,0 = red
-            if long == True:
-                return "Reference well"
-            else:
-                return "r"
-        elif colour[0] == 0 and colour[1] == 0 and colour[2] == 255:
-            # 0,0,255 = blue
-            if long == True:
-                return "Control"
-            else:
-                return "c"
-        else:
-            if long == True:
-                return "not assigned"
-            else:
-                return "na"
-
-    def get_well_colour(self, well):
+    def write_protein(self, event, rightclick, numerical, update = True):
         """
-        Takes the type of a well and returns the
-        appropriate background colour for the cell/well.
+        Assigns protein to selected and clicked-on wells.
         """
-        if well == "r" or well == "Reference well":
-            return "red"
-        elif well == "s" or well == "Sample":
-            return "yellow"
-        elif well == "c" or well == "Control":
-            return "blue"
-        else:
-            return "white"
+        self.layout.set_numerical(self.get_plate_for_editing(),
+                                  self.selected_wells(rightclick), "Protein", numerical)
+        if update == True:
+            self.refresh_grid()
 
-    def get_text_colour(self, well):
+    def get_plate(self):
         """
-        Takes the type of a well and returns the
-        appropriate text colour for the cell/well.
+        Returns index of the plate whose layout is shown. If one layout
+        is used for all plates, this is always 0.
         """
-        if well == "r" or well == "Reference well":
-            return "white"
-        elif well == "s" or well == "Sample":
-            return "black"
-        elif well == "c" or well == "Control":
-            return "white"
+        if self.bol_MultiplePlates == True and self.layout.plates > 1:
+            return self.lbx_PlateList.GetSelection()
         else:
-            return "black"
+            return 0
 
-    def create_dataframe(self, event = None):
+    def get_plate_for_editing(self):
         """
-        Creates the plate dataframe with the current contents
-        of the selected plate. Allows for dataframe expansion
-        if there was previously only one entry (i.e. the user
-        originally selected one layout for all plates but then
-        later changed their mind)
+        Returns index of the plate whose layout is being edited. Expands
+        the layouts if there was previously only one for all plates (i.e.
+        the user originally selected one layout for all plates but then
+        later changed their mind), the existing layout gets copied.
         """
-        # Get plate index
         if self.bol_MultiplePlates == True:
-            plate = self.lbx_PlateList.GetSelection()
-            # If neccessary, expand dataframe to reflect actual number of plates.
-            if len(self.dfr_Layout) < self.lbx_PlateList.GetCount():
-                int_Difference = self.lbx_PlateList.GetCount() - len(self.dfr_Layout)
-                dfr_Addition = pd.DataFrame(index=range(int_Difference),
-                                            columns=["PlateID",
-                                                    "Layout"])
-                for add in dfr_Addition.index:
-                    if self.PlateID == True:
-                        dfr_Addition.loc[add,"PlateID"] = self.txt_PlateID.GetValue()
-                    else:
-                        dfr_Addition.loc[add,"PlateID"] = "X999A"
-                    self.dfr_Layout.at[add,"Layout"] = pd.DataFrame(index=range(self.plateformat),
-                                            columns = ["WellType",
-                                                       "ProteinNumerical",
-                                                       "ProteinID",
-                                                       "ProteinConcentration",
-                                                       "ControlNumerical",
-                                                       "ControlID",
-                                                       "ControlConcentration",
-                                                       "ZPrime",
-                                                       "ReferenceNumerical",
-                                                       "ReferenceID",
-                                                       "ReferenceConcentration",
-                                                       "SampleNumerical",
-                                                       "SampleID",
-                                                       "SampleConcentration"])
-                self.dfr_Layout = self.dfr_Layout.append(dfr_Addition, ignore_index=True)
+            if self.layout.plates < self.lbx_PlateList.GetCount():
+                self.layout.add_plates(self.lbx_PlateList.GetCount() - self.layout.plates,
+                                       plateid = self.layout.lst_PlateIDs[0],
+                                       template = 0)
                 wx.MessageBox("You have previously chosen to use one layout for all plates."
                               + "\nThe list of layouts has now been expanded."
                               + "\n\nCheck all plate entries to ensure correct layout.",
                               caption = "Layout expanded",
                               style = wx.OK|wx.ICON_INFORMATION)
+            return self.lbx_PlateList.GetSelection()
         else:
-            plate = 0
-
-        # Update plate ID
-        if self.PlateID == True:
-            self.dfr_Layout.at[plate,"PlateID"] = self.txt_PlateID.GetValue()
-        else:
-            self.dfr_Layout.at[plate,"PlateID"] = "X999A"
+            return 0
 
-        # Update well types
-        lst_WellType = []
-        for row in range(self.grd_Plate.GetNumberRows()):
-            for col in range(self.grd_Plate.GetNumberCols()):
-                lst_WellType.append(self.get_well_type(
-                    self.grd_Plate.GetCellBackgroundColour(row,col),False))
-        self.dfr_Layout.at[plate,"Layout"]["WellType"] = lst_WellType
+    def cell_kind(self):
+        """
+        Returns the kind of definition whose numericals are written into
+        the cells of the plate layout grid ("Protein" or "Control"),
+        depending on which definition tab is active.
+        """
+        return self.sbk_Definitions.GetPageText(self.sbk_Definitions.GetSelection())
 
-        # Update proteins
-        if self.bol_proteins == True:
-            lst_ProteinIDs = []
-            lst_ProtConcs = []
-            lst_ProteinNumericals = []
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    numerical = self.grd_Plate.GetCellValue(row,col) # GetCellValue returns string
-                    if numerical != "":
-                        lst_ProteinNumericals.append(int(numerical))
-                        key = int(numerical) -1
-                        lst_ProteinIDs.append(
-                            self.scr_ProteinList.family[key].name)
-                        lst_ProtConcs.append(
-                            self.scr_ProteinList.family[key].conc)
-                    else:
-                        lst_ProteinIDs.append("")
-                        lst_ProtConcs.append("")
-                        lst_ProteinNumericals.append("")
-            # Write lists into dfr_Layout:
-            self.dfr_Layout.at[plate,"Layout"]["ProteinNumerical"] = lst_ProteinNumericals
-            self.dfr_Layout.at[plate,"Layout"]["ProteinID"] = lst_ProteinIDs
-            self.dfr_Layout.at[plate,"Layout"]["ProteinConcentration"] = lst_ProtConcs
-        else:
-            self.dfr_Layout.at[plate,"Layout"]["ProteinNumerical"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ProteinID"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ProteinConcentration"] = [""] * self.plateformat
-
-        # Update controls
-        if self.bol_controls == True and self.scr_ControlList.entries > 0:
-            lst_ControlIDs = []
-            lst_ControlNumericals = []
-            lst_ControlConcs = []
-            lst_ZPrimes = []
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    numerical = self.grd_Plate.GetCellValue(row,col)
-                    lst_ControlNumericals.append(numerical)
-                    if numerical != "":
-                        key = int(numerical) -1
-                        lst_ControlIDs.append(
-                            self.scr_ControlList.family[key].name)
-                        lst_ControlConcs.append(
-                            self.scr_ControlList.family[key].conc)
-                        lst_ZPrimes.append(
-                            self.scr_ControlList.family[key].zprime)
-                    else:
-                        lst_ControlIDs.append("")
-                        lst_ControlConcs.append("")
-                        lst_ZPrimes.append("")
-            # Write lists into dfr_Layout:
-            self.dfr_Layout.at[plate,"Layout"]["ControlNumerical"] = lst_ControlNumericals
-            self.dfr_Layout.at[plate,"Layout"]["ControlID"] = lst_ControlIDs
-            self.dfr_Layout.at[plate,"Layout"]["ControlConcentration"] = lst_ControlConcs
-            self.dfr_Layout.at[plate,"Layout"]["ZPrime"] = lst_ZPrimes
-        else:
-            self.dfr_Layout.at[plate,"Layout"]["ControlNumerical"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ControlID"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ControlConcentration"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ZPrime"] = [False] * self.plateformat
+    def list_entries(self, scrolllist):
+        """
+        Returns the entries of a ScrollList as lookup table for the
+        layout model.
+        """
+        return [{"ID": scrolllist.family[key].name,
+                 "Concentration": scrolllist.family[key].conc,
+                 "ZPrime": scrolllist.family[key].zprime}
+                for key in sorted(scrolllist.family.keys())]
 
-        # Write sample IDs to layout
-        if self.bol_sampleids == True:
-            for lrow in range(self.grd_SampleIDs.GetNumberRows()):
-                if not self.grd_SampleIDs.GetCellValue(lrow,0) == "":
-                    idx_Well = pf.well_to_index(self.grd_SampleIDs.GetCellValue(lrow,0), self.plateformat)
-                    self.dfr_Layout.loc[plate,"Layout"].loc[idx_Well,"SampleID"] = self.grd_SampleIDs.GetCellValue(lrow,1)
+    def refresh_grid(self):
+        """
+        Brings the plate layout grid in line with the layout model. The
+        grid is only a view: the currently shown well types and labels
+        are kept and only cells that differ from the model get redrawn.
+        """
+        plate = self.get_plate()
+        arr_Types = self.layout.arr_WellType[plate]
+        arr_Labels = self.layout.labels(plate, self.cell_kind())
+        arr_Changed = np.flatnonzero((arr_Types != self.arr_ShownTypes)
+                                     | (arr_Labels != self.arr_ShownLabels))
+        if len(arr_Changed) == 0:
+            return None
+        int_Columns = self.grd_Plate.GetNumberCols()
+        for well in arr_Changed:
+            row, col = divmod(int(well), int_Columns)
+            self.grd_Plate.SetCellBackgroundColour(row, col, lm.lst_CellColours[arr_Types[well]])
+            self.grd_Plate.SetCellTextColour(row, col, lm.lst_TextColours[arr_Types[well]])
+            self.grd_Plate.SetCellValue(row, col, arr_Labels[well])
+        self.arr_ShownTypes[arr_Changed] = arr_Types[arr_Changed]
+        self.arr_ShownLabels[arr_Changed] = arr_Labels[arr_Changed]
+        self.grd_Plate.ForceRefresh()
 
-    def update_from_menu(self, coords, welltype, typeindex):
+    def update_definitions(self, event = None):
+        """
+        Writes the entries of the protein and control lists (names,
+        concentrations, Z prime) into the lookup tables of the layout
+        model.
         """
-        Updates dataframe from context menu
+        plate = self.get_plate()
+        self.layout.set_table(plate, "Protein", self.list_entries(self.scr_ProteinList))
+        self.layout.set_table(plate, "Control", self.list_entries(self.scr_ControlList))
 
-        Arguments:
-            coords -> collection. Coordinates of the wells to be updated
-            welltype -> string. The type of well (sample, control, reference,
-                        blank)
-            typeindex -> integer. Index of the control 
+    def update_sampleids(self, event = None):
         """
-        indices = [pf.col_row_to_index(w[0],w[1],self.plateformat) for w in coords]
-        if self.bol_MultiplePlates == True:
-            plate = self.lbx_PlateList.GetSelection()
-        else:
-            plate = 0
-        if welltype == "blank":
-            for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                if well in indices:
-                    for col in self.dfr_Layout.loc[plate,"Layout"].columns:
-                        self.dfr_Layout.loc[plate,"Layout"].loc[well,col] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"WellType"] = "na"
-        if welltype == "control":
-            for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                if well in indices:
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"WellType"] = "c"
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlID"] = self.scr_ControlList.family[typeindex].name
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlNumerical"] = typeindex
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlConcentration"] = self.scr_ControlList.family[typeindex].conc
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ZPrime"] = self.scr_ControlList.family[typeindex].zprime
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceID"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceNumerical"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceConcentration"] = ""
-        elif welltype == "reference":
-            for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                if well in indices:
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"WellType"] = "r"
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceID"] = "DMSO"
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceNumerical"] = typeindex
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ReferenceConcentration"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlID"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlNumerical"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ControlConcentration"] = ""
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ZPrime"] = ""
-        elif welltype == "protein":
-            for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                if well in indices:
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ProteinID"] = self.scr_ProteinList.family[typeindex].name
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ProteinNumerical"] = typeindex
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"ProteinConcentration"] = self.scr_ProteinList.family[typeindex].conc
+        Writes the contents of the sample IDs grid into the layout model.
+        """
+        if self.bol_sampleids == False:
+            return None
+        lst_Wells = []
+        lst_SampleIDs = []
+        for lrow in range(self.grd_SampleIDs.GetNumberRows()):
+            if not self.grd_SampleIDs.GetCellValue(lrow,0) == "":
+                lst_Wells.append(pf.well_to_index(self.grd_SampleIDs.GetCellValue(lrow,0), self.plateformat))
+                lst_SampleIDs.append(self.grd_SampleIDs.GetCellValue(lrow,1))
+        self.layout.set_sampleids(self.get_plate_for_editing(), lst_Wells, lst_SampleIDs)
 
     def update_dataframe(self, event = None):
         """
-        Updates the plate dataframe with the current contents
-        of the selected plate. Allows for dataframe expansion
-        if there was previously only one entry (i.e. the user
-        originally selected one layout for all plates but then
-        later changed their mind)
+        Brings the layout model in line with the widgets that are not
+        views of it (definition lists, sample IDs, plate ID) and assembles
+        the layout dataframe from it.
         """
-        # Get plate index
-        if self.bol_MultiplePlates == True:
-            plate = self.lbx_PlateList.GetSelection()
-            # If neccessary, expand dataframe to reflect actual number of plates.
-            if len(self.dfr_Layout) < self.lbx_PlateList.GetCount():
-                int_Difference = self.lbx_PlateList.GetCount() - len(self.dfr_Layout)
-                dfr_Addition = pd.DataFrame(index=range(int_Difference),
-                                            columns=["PlateID",
-                                                    "Layout"])
-                for add in dfr_Addition.index:
-                    if self.PlateID == True:
-                        dfr_Addition.loc[add,"PlateID"] = self.txt_PlateID.GetValue()
-                    else:
-                        dfr_Addition.loc[add,"PlateID"] = "X999A"
-                    self.dfr_Layout.at[add,"Layout"] = pd.DataFrame(index=range(self.plateformat),
-                                            columns = ["WellType",
-                                                       "ProteinNumerical",
-                                                       "ProteinID",
-                                                       "ProteinConcentration",
-                                                       "ControlNumerical",
-                                                       "ControlID",
-                                                       "ControlConcentration",
-                                                       "ZPrime",
-                                                       "ReferenceNumerical",
-                                                       "ReferenceID",
-                                                       "ReferenceConcentration",
-                                                       "SampleNumerical",
-                                                       "SampleID",
-                                                       "SampleConcentration"])
-                self.dfr_Layout = self.dfr_Layout.append(dfr_Addition, ignore_index=True)
-                wx.MessageBox("You have previously chosen to use one layout for all plates."
-                              + "\nThe list of layouts has now been expanded."
-                              + "\n\nCheck all plate entries to ensure correct layout.",
-                              caption = "Layout expanded",
-                              style = wx.OK|wx.ICON_INFORMATION)
-        else:
-            plate = 0
-
-        # Update plate ID
-        if self.PlateID == True:
-            self.dfr_Layout.at[plate,"PlateID"] = self.txt_PlateID.GetValue()
-        else:
-            self.dfr_Layout.at[plate,"PlateID"] = "X999A"
-
-        # Update well types
-        lst_WellType = []
-        for row in range(self.grd_Plate.GetNumberRows()):
-            for col in range(self.grd_Plate.GetNumberCols()):
-                lst_WellType.append(self.get_well_type(
-                    self.grd_Plate.GetCellBackgroundColour(row,col),False))
-        self.dfr_Layout.at[plate,"Layout"]["WellType"] = lst_WellType
-
-        # Update proteins
-        if self.bol_proteins == True:
-            lst_ProteinIDs = []
-            lst_ProtConcs = []
-            lst_ProteinNumericals = []
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    cell = self.grd_Plate.GetCellValue(row,col)
-                    if not cell == "":
-                        cell = int(self.grd_Plate.GetCellValue(row,col)) - 1
-                        lst_ProteinNumericals.append(cell)
-                        lst_ProteinIDs.append(
-                            self.scr_ProteinList.family[cell].name)
-                        lst_ProtConcs.append(
-                            self.scr_ProteinList.family[cell].conc)
-                    else:
-                        lst_ProteinIDs.append("")
-                        lst_ProtConcs.append("")
-                        lst_ProteinNumericals.append("")
-            # Write lists into dfr_Layout:
-            self.dfr_Layout.at[plate,"Layout"]["ProteinNumerical"] = lst_ProteinNumericals
-            self.dfr_Layout.at[plate,"Layout"]["ProteinID"] = lst_ProteinIDs
-            self.dfr_Layout.at[plate,"Layout"]["ProteinConcentration"] = lst_ProtConcs
-        else:
-            self.dfr_Layout.at[plate,"Layout"]["ProteinNumerical"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ProteinID"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ProteinConcentration"] = [""] * self.plateformat
-
-        # Update controls
-        if self.bol_controls == True and self.scr_ControlList.entries > 0:
-            lst_ControlIDs = []
-            lst_ControlNumericals = []
-            lst_ControlConcs = []
-            lst_ZPrimes = []
-            for row in range(self.grd_Plate.GetNumberRows()):
-                for col in range(self.grd_Plate.GetNumberCols()):
-                    cell = self.grd_Plate.GetCellValue(row,col)
-                    if cell != "":
-                        cell = int(self.grd_Plate.GetCellValue(row,col))-1
-                        lst_ControlIDs.append(
-                            self.scr_ControlList.family[cell].name)
-                        lst_ControlConcs.append(
-                            self.scr_ControlList.family[cell].conc)
-                        lst_ZPrimes.append(
-                            self.scr_ControlList.family[cell].zprime)
-                    else:
-                        lst_ControlIDs.append("")
-                        lst_ControlConcs.append("")
-                        lst_ZPrimes.append("")
-                    lst_ControlNumericals.append(cell)
-            # Write lists into dfr_Layout:
-            self.dfr_Layout.at[plate,"Layout"]["ControlNumerical"] = lst_ControlNumericals
-            self.dfr_Layout.at[plate,"Layout"]["ControlID"] = lst_ControlIDs
-            self.dfr_Layout.at[plate,"Layout"]["ControlConcentration"] = lst_ControlConcs
-            self.dfr_Layout.at[plate,"Layout"]["ZPrime"] = lst_ZPrimes
-        else:
-            self.dfr_Layout.at[plate,"Layout"]["ControlNumerical"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ControlID"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ControlConcentration"] = [""] * self.plateformat
-            self.dfr_Layout.at[plate,"Layout"]["ZPrime"] = [False] * self.plateformat
-
-        # Write sample IDs to layout
-        if self.bol_sampleids == True:
-            for lrow in range(self.grd_SampleIDs.GetNumberRows()):
-                if not self.grd_SampleIDs.GetCellValue(lrow,0) == "":
-                    well = pf.well_to_index(self.grd_SampleIDs.GetCellValue(lrow,0), self.plateformat)
-                    sample = self.grd_SampleIDs.GetCellValue(lrow,1)
-                    self.dfr_Layout.loc[plate,"Layout"].loc[well,"SampleID"] = sample
+        self.update_definitions()
+        self.update_sampleids()
+        self.update_plateid(None)
+        self.dfr_Layout = self.layout.to_dataframe()
+        return self.dfr_Layout
 
     def update_display(self, event = None):
         """
-        Updates the dialog box with the information from dfr_Layout.
+        Updates the dialog box with the information from the layout
+        model.
         """
-        # Take into consideration that the user might have previously selected
-        # to use one layout for all, so the dataframe may have a length of 1,
-        # as it has been previously been created. Getting the index from the
-        # seleted item in lbx_PlateList could create indexing errors.
-
         self.Freeze()
-        # Get plate index
-        if self.bol_MultiplePlates == True and self.dfr_Layout.shape[0] > 1:
-            plate = self.lbx_PlateList.GetSelection()
-        else:
-            plate = 0
-
-        # Update well colours/types:
-        for row in range(self.grd_Plate.GetNumberRows()):
-            for col in range(self.grd_Plate.GetNumberCols()):
-                idx_Well = col + row*self.grd_Plate.GetNumberCols()
-                well = self.dfr_Layout.loc[plate,"Layout"].loc[idx_Well,"WellType"]
-                self.grd_Plate.SetCellBackgroundColour(row,col,self.get_well_colour(well))
-                self.grd_Plate.SetCellTextColour(row,col,self.get_text_colour(well))
-
-        prows = pf.plate_rows(self.plateformat)
-        pcols = pf.plate_columns(self.plateformat)
+        plate = self.get_plate()
 
         # Update protein list
         if self.bol_proteins == True:
-            # Before repopulating, first delete all but the first entry and set this one to blank.
             self.scr_ProteinList.delete_all_entries()
-            if self.btn_Proteins.Current == True:
-                for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                    numerical = self.dfr_Layout.loc[plate,"Layout"].loc[well,"ProteinNumerical"]
-                    if self.display_this(numerical):
-                        r, c = pf.index_to_row_col(int(well), prows, pcols)
-                        self.grd_Plate.SetCellValue(r,c,
-                                                    self.numbertext(numerical+1))
-            dfr_Proteins = self.dfr_Layout.loc[plate,"Layout"][["ProteinNumerical","ProteinID","ProteinConcentration"]].dropna().drop_duplicates()
-            if dfr_Proteins.shape[0] > 0:
-                for prot in dfr_Proteins.index:
-                    self.scr_ProteinList.add_entry(name = dfr_Proteins.loc[prot,"ProteinID"],
-                                                   conc = dfr_Proteins.loc[prot,"ProteinConcentration"],
-                                                   use_zprime = False)
+            for entry in self.layout.dic_Tables["Protein"][plate]:
+                self.scr_ProteinList.add_entry(name = entry["ID"],
+                                               conc = entry["Concentration"],
+                                               use_zprime = False)
         
         # Update control list
         if self.bol_controls == True:
-            # Before repopulating, first delete all but the first entry and set this one to blank.
             self.scr_ControlList.delete_all_entries()
-            dfr_Controls = self.dfr_Layout.loc[plate,"Layout"][["ControlNumerical","ControlID","ControlConcentration","ZPrime"]].dropna().drop_duplicates()
-            if dfr_Controls.shape[0] > 0:
-                for ctrl in dfr_Controls.index:
-                    self.scr_ControlList.add_entry(name = dfr_Controls.loc[ctrl,"ControlID"],
-                                                   conc = dfr_Controls.loc[ctrl,"ControlConcentration"],
-                                                   zprime = dfr_Controls.loc[ctrl,"ZPrime"])
-
-        # Populate grid with numerical IDs:
-        page = self.sbk_Definitions.GetSelection()
-        page_text = self.sbk_Definitions.GetPageText(page)
-        self.rewrite_all_cell_contents(page_text, plate, prows, pcols)
-        self.lbl_Cells.SetLabel(f"Cell labels: {page_text}s")
-        self.grd_Plate.ForceRefresh()
+            for entry in self.layout.dic_Tables["Control"][plate]:
+                self.scr_ControlList.add_entry(name = entry["ID"],
+                                               conc = entry["Concentration"],
+                                               zprime = entry["ZPrime"])
 
-        # Update Plate ID field:
+        # Well types and numerical IDs:
+        self.refresh_grid()
+        self.lbl_Cells.SetLabel(f"Cell labels: {self.cell_kind()}s")
+
+        # Update Plate ID field without triggering update_plateid:
         if self.PlateID == True:
-            self.txt_PlateID.SetValue(self.dfr_Layout.at[plate,"PlateID"])
+            self.txt_PlateID.ChangeValue(self.layout.lst_PlateIDs[plate])
 
         # Update sample IDs:
         if self.bol_sampleids == True:
-            # Initialise with empty cells:
+            arr_Wells = np.flatnonzero(self.layout.arr_SampleIDs[plate] != "")
             for lrow in range(self.grd_SampleIDs.GetNumberRows()):
-                self.grd_SampleIDs.SetCellValue(lrow,0,"")
-                self.grd_SampleIDs.SetCellValue(lrow,1,"")
-            # Update with entries from dataframe:
-            lrow = 0
-            for well in self.dfr_Layout.loc[plate,"Layout"].index:
-                if self.display_this(self.dfr_Layout.loc[plate,"Layout"].loc[well,"SampleID"]):
-                    self.grd_SampleIDs.SetCellValue(lrow,0,pf.index_to_well(well+1,self.plateformat))
-                    self.grd_SampleIDs.SetCellValue(lrow,1,self.numbertext(self.dfr_Layout.loc[plate,"Layout"].loc[well,"SampleID"]))
-                    lrow += 1
+                if lrow < len(arr_Wells):
+                    self.grd_SampleIDs.SetCellValue(lrow,0,pf.index_to_well(arr_Wells[lrow]+1,self.plateformat))
+                    self.grd_SampleIDs.SetCellValue(lrow,1,self.numbertext(self.layout.arr_SampleIDs[plate,arr_Wells[lrow]]))
+                else:
+                    self.grd_SampleIDs.SetCellValue(lrow,0,"")
+                    self.grd_SampleIDs.SetCellValue(lrow,1,"")
         self.Thaw()
 
-    def rewrite_all_cell_contents(self, with_what, plate, prows, pcols):
-        """
-        Rewrites the contents of all cells with what is defined.
-
-        Argument:
-            with_what -> str. Either "Protein" or "Control
-            plate -> int. Index of plate in layout dataframe
-            prows -> int. Number of rows on plate
-            pcols -> int. Number of columns on plate
-        """
-        for well in self.dfr_Layout.loc[plate,"Layout"].index:
-            numerical = self.dfr_Layout.loc[plate,"Layout"].loc[well,f"{with_what}Numerical"]
-            r, c = pf.index_to_row_col(int(well), prows, pcols)
-            if self.display_this(numerical):
-                cell_value = self.numbertext(numerical+1)
-            else:
-                cell_value = ""
-            self.grd_Plate.SetCellValue(r,c, cell_value)
-
-
     def display_this(self, this):
         """
         Wrapping function to check that an element to be written on the plate
@@ -1992,10 +1557,8 @@ class PlateLayout(wx.Dialog):
         Event handler. Updates plate ID after value in text control
         has been changed.
         """
-        if self.bol_MultiplePlates == True:
-            self.dfr_Layout.at[self.lbx_PlateList.GetSelection(),"PlateID"] = self.txt_PlateID.GetValue()
-        else:
-            self.dfr_Layout.at[0,"PlateID"] = self.txt_PlateID.GetValue()
+        if self.PlateID == True:
+            self.layout.lst_PlateIDs[self.get_plate()] = self.txt_PlateID.GetValue()
 
     def show_samples_context( self, event ):
         """
@@ -2038,7 +1601,7 @@ class PlateLayout(wx.Dialog):
             self.grd_SampleIDs.SetCellValue(row,col,pf.sortable_well(str(self.grd_SampleIDs.GetCellValue(row,col)),self.plateformat))
         except:
             self.grd_SampleIDs.SetCellValue(row,col,"")
-        self.update_dataframe()
+        self.update_sampleids()
 
     def on_keypress_samples(self, event):
         """
@@ -2162,7 +1725,7 @@ class PlateLayout(wx.Dialog):
                 else:
                     self.grd_SampleIDs.SetCellValue(i+row,j+col,"")
         self.CheckWellAddressWholeColumn()
-        self.update_dataframe()
+        self.update_sampleids()
 
     def SingleSelectionSamples(self, event):
         """
@@ -2441,8 +2004,8 @@ class SampleContextMenu(wx.Menu):
                     self.grid.SetCellValue(i+row,j+col,str(dfr_Paste.iloc[i,j]))
                 else:
                     self.grid.SetCellValue(i+row,j+col,"")
-        self.parent.update_dataframe()
         self.parent.CheckWellAddressWholeColumn()
+        self.parent.update_sampleids()
 
     def clear(self, event, row, col):
         """
@@ -0,0 +1,347 @@
+"""
+Plate store: struct-of-arrays storage for the per sample lists in the
+processed data of endpoint (dose response, single dose) plates.
+
+create_dataframe_EPDR and create_dataframe_EPSD write one python list (or
+list of lists) per sample into columns like RawData (concentrations x
+replicates) and the fitted curves. Every number in there is a python
+float of 24 bytes plus an 8 byte pointer, spread over the heap.
+
+pack_frame moves such a column into one contiguous, typed numpy array per
+plate (a Block: samples x values, or samples x values x replicates,
+padded, with the length of each list) and puts a Row into each cell. A
+Row behaves like the list it replaces for reading: it has a length, can
+be indexed, sliced and iterated over, converted with np.array() and
+prints like the list (so saving projects to csv is unchanged). Pickling
+gives the list back (checkpoints, worker processes), and so does
+tolist().
+
+Rows are read-only. Only columns that are replaced, never changed in
+place, get packed (see lst_Packed); writing to a Row raises a TypeError
+rather than losing the change. Lists that are not all numbers (e.g.
+booleans or strings) stay as they are.
+
+Nothing in here depends on wx.
+
+    Classes
+        Block
+        Row
+
+    Functions
+        is_number
+        numeric_dtype
+        pack_column
+        pack_frame
+        pack_container
+        synthetic_processed
+        measure_memory
+        benchmark_memory
+"""
+
+import itertools
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Columns of the processed data of endpoint plates that only ever get
+# replaced as a whole: raw replicate readings and the fitted curves.
+# Raw, Norm and the exclusion lists get changed in place and stay lists.
+lst_Packed = ["RawData","RawFit","NormFitFree","NormFitConst"]
+
+# Keys of blocks, so that a new block never gets the key of an old one
+# (see lib_journal.cell_token).
+_keys = itertools.count()
+
+def is_number(value):
+    """
+    Returns True for ints and floats (python or numpy), not for
+    booleans.
+    """
+    return (isinstance(value, (int, float, np.integer, np.floating))
+            and not isinstance(value, (bool, np.bool_)))
+
+def numeric_dtype(lst_Numbers):
+    """
+    Returns np.int64 if all numbers are integers, else np.float64, so
+    that packed values come back as the same python type.
+    """
+    if all(isinstance(value, (int, np.integer)) for value in lst_Numbers):
+        return np.int64
+    return np.float64
+
+class Block:
+    """
+    One column of a plate's processed data as contiguous numpy array.
+    Values are padded with zeros, lengths keeps how long each list was.
+
+    Attributes:
+        key -> int. Unique for the program's run.
+        values -> numpy array. Samples x values (x replicates).
+        lengths -> numpy array of int32. Samples (x values): length of
+                   each (inner) list.
+        depth -> int. 1 for lists of numbers, 2 for lists of lists.
+    """
+
+    __slots__ = ("key", "values", "lengths", "depth")
+
+    def __init__(self, values, lengths, depth):
+        self.key = next(_keys)
+        self.values = values
+        self.values.setflags(write = False)
+        self.lengths = lengths
+        self.lengths.setflags(write = False)
+        self.depth = depth
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.lengths.nbytes
+
+class Row:
+    """
+    One sample's list in a Block. Read-only; to change it, put a new
+    list into the cell.
+
+    Methods:
+        array
+        tolist
+    """
+
+    __slots__ = ("block", "pos")
+
+    def __init__(self, block, pos):
+        self.block = block
+        self.pos = pos
+
+    def array(self):
+        """
+        Returns the list as read-only numpy array. Lists of lists come
+        back as object array of (read-only) arrays if they are ragged.
+        """
+        block = self.block
+        if block.depth == 1:
+            return block.values[self.pos,:block.lengths[self.pos]]
+        arr_Lengths = block.lengths[self.pos]
+        int_Items = int((arr_Lengths >= 0).sum())
+        if int_Items == 0:
+            return block.values[self.pos,:0,:0]
+        if (arr_Lengths[:int_Items] == arr_Lengths[0]).all():
+            return block.values[self.pos,:int_Items,:arr_Lengths[0]]
+        arr_Items = np.empty(int_Items, dtype = object)
+        for item in range(int_Items):
+            arr_Items[item] = block.values[self.pos,item,:arr_Lengths[item]]
+        return arr_Items
+
+    def tolist(self):
+        """
+        Returns the list (of lists) of python numbers.
+        """
+        block = self.block
+        if block.depth == 1:
+            return block.values[self.pos,:block.lengths[self.pos]].tolist()
+        arr_Lengths = block.lengths[self.pos]
+        return [block.values[self.pos,item,:arr_Lengths[item]].tolist()
+                for item in range(int((arr_Lengths >= 0).sum()))]
+
+    def __array__(self, dtype = None, copy = None):
+        arr_Values = self.array()
+        if not dtype is None:
+            return arr_Values.astype(dtype)
+        if copy == True:
+            return arr_Values.copy()
+        return arr_Values
+
+    def __len__(self):
+        if self.block.depth == 1:
+            return int(self.block.lengths[self.pos])
+        return int((self.block.lengths[self.pos] >= 0).sum())
+
+    def __getitem__(self, item):
+        return self.array()[item]
+
+    def __iter__(self):
+        return iter(self.array())
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            other = other.tolist()
+        return self.tolist() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __str__(self):
+        return str(self.tolist())
+
+    def __reduce__(self):
+        # Blocks belong to the running program: pickle the values instead.
+        return (list, (self.tolist(),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def pack_column(lst_Values):
+    """
+    Packs the lists of one column into a Block.
+
+    Arguments:
+        lst_Values -> list of the column's values, one per sample.
+
+    Returns list of Rows, or None if the column cannot be packed (not
+    all values are lists of numbers or lists of lists of numbers).
+    """
+    if len(lst_Values) == 0 or not all(isinstance(value, (list, tuple)) for value in lst_Values):
+        return None
+    if all(all(is_number(item) for item in value) for value in lst_Values):
+        lst_Numbers = [item for value in lst_Values for item in value]
+        arr_Lengths = np.array([len(value) for value in lst_Values], dtype = np.int32)
+        arr_Values = np.zeros((len(lst_Values), max(arr_Lengths)), dtype = numeric_dtype(lst_Numbers))
+        for pos, value in enumerate(lst_Values):
+            arr_Values[pos,:len(value)] = value
+        block = Block(arr_Values, arr_Lengths, 1)
+    elif all(all(isinstance(item, (list, tuple)) and all(is_number(number) for number in item)
+                 for item in value) for value in lst_Values):
+        lst_Numbers = [number for value in lst_Values for item in value for number in item]
+        int_Items = max(len(value) for value in lst_Values)
+        int_Numbers = max([len(item) for value in lst_Values for item in value], default = 0)
+        # -1 marks items a sample does not have
+        arr_Lengths = np.full((len(lst_Values), int_Items), -1, dtype = np.int32)
+        arr_Values = np.zeros((len(lst_Values), int_Items, int_Numbers), dtype = numeric_dtype(lst_Numbers))
+        for pos, value in enumerate(lst_Values):
+            for item, lst_Item in enumerate(value):
+                arr_Lengths[pos,item] = len(lst_Item)
+                arr_Values[pos,item,:len(lst_Item)] = lst_Item
+        block = Block(arr_Values, arr_Lengths, 2)
+    else:
+        return None
+    return [Row(block, pos) for pos in range(len(lst_Values))]
+
+def pack_frame(dfr_Frame, lst_Columns = None):
+    """
+    Packs the listed columns of a dataframe (see pack_column).
+
+    The packed dataframe gets built anew rather than changed in place:
+    replacing columns of a dataframe can leave its old values referenced
+    from the remaining (consolidated) blocks, so the lists would not be
+    freed.
+
+    Arguments:
+        dfr_Frame -> pandas dataframe.
+        lst_Columns -> list of column names or None for lst_Packed.
+
+    Returns dataframe with Rows in the cells of the packed columns, or
+    dfr_Frame itself if nothing got packed.
+    """
+    if not isinstance(dfr_Frame, pd.DataFrame):
+        return dfr_Frame
+    if lst_Columns is None:
+        lst_Columns = lst_Packed
+    dic_Packed = {}
+    for col in lst_Columns:
+        if not col in dfr_Frame.columns or not dfr_Frame[col].dtype == object:
+            continue
+        lst_Values = dfr_Frame[col].tolist()
+        if any(isinstance(value, Row) for value in lst_Values):
+            # Packed already. Cells changed since hold lists again.
+            if all(isinstance(value, Row) for value in lst_Values):
+                continue
+            lst_Values = [value.tolist() if isinstance(value, Row) else value
+                          for value in lst_Values]
+        lst_Rows = pack_column(lst_Values)
+        if lst_Rows is None:
+            continue
+        # Fill an object array one by one, otherwise numpy would unpack
+        # the rows into a 2D array
+        arr_Cells = np.empty(len(lst_Rows), dtype = object)
+        for pos, row in enumerate(lst_Rows):
+            arr_Cells[pos] = row
+        dic_Packed[col] = arr_Cells
+    if len(dic_Packed) == 0:
+        return dfr_Frame
+    dfr_Packed = pd.DataFrame({col: (pd.Series(dic_Packed[col], index = dfr_Frame.index, dtype = object)
+                                     if col in dic_Packed else dfr_Frame[col].copy(deep = True))
+                               for col in dfr_Frame.columns})
+    dfr_Packed.attrs = dfr_Frame.attrs
+    return dfr_Packed
+
+def pack_container(assay_data):
+    """
+    Packs the processed data of each plate of an endpoint container.
+    Changes assay_data in place.
+    """
+    if not isinstance(assay_data, pd.DataFrame) or not "Processed" in assay_data.columns:
+        return None
+    for plate in assay_data.index:
+        assay_data.at[plate,"Processed"] = pack_frame(assay_data.at[plate,"Processed"])
+
+def synthetic_processed(int_Samples = 96, int_Concentrations = 8, int_Replicates = 2, seed = 0):
+    """
+    Returns a dataframe shaped like the processed data of a dose response
+    plate (see lib_datafunctions.create_dataframe_EPDR): per sample lists
+    of means, SEMs, exclusions, replicate readings and fitted curves.
+    """
+    rng = np.random.default_rng(seed)
+    dfr_Processed = pd.DataFrame(index = range(int_Samples),
+                                 columns = ["SampleID","Concentrations","RawData","Raw","RawSEM",
+                                            "RawExcluded","Norm","NormSEM","NormExcluded",
+                                            "RawFit","NormFitFree","NormFitConst"], dtype = object)
+    for smpl in range(int_Samples):
+        arr_Raw = rng.normal(10000, 500, (int_Concentrations, int_Replicates))
+        dfr_Processed.at[smpl,"SampleID"] = f"BBQ-{seed:03d}-{smpl:05d}"
+        dfr_Processed.at[smpl,"Concentrations"] = np.logspace(-9, -4, int_Concentrations).tolist()
+        dfr_Processed.at[smpl,"RawData"] = arr_Raw.tolist()
+        dfr_Processed.at[smpl,"Raw"] = arr_Raw.mean(axis = 1).tolist()
+        dfr_Processed.at[smpl,"RawSEM"] = arr_Raw.std(axis = 1).tolist()
+        dfr_Processed.at[smpl,"RawExcluded"] = [np.nan] * int_Concentrations
+        dfr_Processed.at[smpl,"Norm"] = (arr_Raw.mean(axis = 1) / 100).tolist()
+        dfr_Processed.at[smpl,"NormSEM"] = (arr_Raw.std(axis = 1) / 100).tolist()
+        dfr_Processed.at[smpl,"NormExcluded"] = [np.nan] * int_Concentrations
+        for col in ["RawFit","NormFitFree","NormFitConst"]:
+            dfr_Processed.at[smpl,col] = rng.normal(50, 20, int_Concentrations).tolist()
+    return dfr_Processed
+
+def measure_memory(function):
+    """
+    Calls function and returns its result with the bytes it left
+    allocated and the peak allocated while it ran (tracemalloc).
+    """
+    bol_Tracing = tracemalloc.is_tracing()
+    if bol_Tracing == False:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    int_Start = tracemalloc.get_traced_memory()[0]
+    result = function()
+    int_Current, int_Peak = tracemalloc.get_traced_memory()
+    if bol_Tracing == False:
+        tracemalloc.stop()
+    return result, int_Current - int_Start, int_Peak - int_Start
+
+def benchmark_memory(plates = 20, samples = 96, concentrations = 8, replicates = 2):
+    """
+    Compares the memory taken up by the processed data of a synthetic
+    multi-plate dose response project with lists in the cells and with
+    the packed columns (see synthetic_processed).
+
+    Returns dictionary with bytes held and peak bytes for "Lists" (building
+    the plates) and "Packed" (building and packing the plates, one after
+    the other as complete_plate does).
+    """
+    def build(bol_Pack):
+        lst_Plates = []
+        for plate in range(plates):
+            dfr_Processed = synthetic_processed(samples, concentrations, replicates, plate)
+            if bol_Pack == True:
+                dfr_Processed = pack_frame(dfr_Processed)
+            lst_Plates.append(dfr_Processed)
+        return lst_Plates
+    dic_Memory = {}
+    for str_Name, bol_Pack in [("Lists", False), ("Packed", True)]:
+        lst_Plates, int_Held, int_Peak = measure_memory(lambda: build(bol_Pack))
+        dic_Memory[str_Name] = {"Held":int_Held, "Peak":int_Peak}
+        del lst_Plates
+    return dic_Memory
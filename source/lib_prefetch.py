@@ -0,0 +1,117 @@
+"""
+Prefetching loader: reads the next few items (e.g. raw data files) on a
+small thread pool while the caller works on the current one.
+
+Results come back in the order of the items, no matter which read
+finishes first. At most "depth" items are read ahead, so a slow consumer
+does not end up with every file in memory at once.
+
+Nothing in here depends on wx.
+
+    Classes
+        Prefetcher
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+class Prefetcher:
+    """
+    Iterates over (item, result) pairs, where result is function(item),
+    computed ahead of time on worker threads:
+
+        with Prefetcher(read_file, lst_Files) as prefetcher:
+            for file, data in prefetcher:
+                process(data)
+        print(prefetcher.timing())
+
+    Leaving the with block (also via return, break or an exception)
+    cancels reads that have not started yet and waits for the ones that
+    are running, so whatever they read from can be closed afterwards.
+
+    Methods:
+        timing
+        close
+    """
+
+    def __init__(self, function, items, workers = 4, depth = 4):
+        """
+        Arguments:
+            function -> function. Gets called with each item on a worker
+                        thread. Must not touch the GUI.
+            items -> iterable of items, in the order they are wanted.
+            workers -> integer. Number of reads at the same time.
+            depth -> integer. Maximum number of items read ahead of the
+                     one the caller is working on.
+        """
+        self.function = function
+        self.items = list(items)
+        self.workers = max(1, min(workers, len(self.items)))
+        self.depth = max(1, depth)
+        self.pool = None
+        self.pending = deque()
+        # Seconds spent reading (summed over workers), seconds the caller
+        # had to wait for a result, seconds the caller spent between
+        # results.
+        self.read = 0.0
+        self.wait = 0.0
+        self.compute = 0.0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def timed(self, item):
+        """
+        Calls function on item and adds the time it took to self.read.
+        """
+        flt_Start = perf_counter()
+        try:
+            return self.function(item)
+        finally:
+            with self.lock:
+                self.read += perf_counter() - flt_Start
+
+    def __iter__(self):
+        self.pool = ThreadPoolExecutor(max_workers = self.workers)
+        try:
+            int_Next = 0
+            for int_Current in range(len(self.items)):
+                # Back-pressure: only keep "depth" items in flight
+                while int_Next < len(self.items) and len(self.pending) < self.depth:
+                    self.pending.append(self.pool.submit(self.timed, self.items[int_Next]))
+                    int_Next += 1
+                flt_Start = perf_counter()
+                result = self.pending.popleft().result()
+                self.wait += perf_counter() - flt_Start
+                flt_Start = perf_counter()
+                yield self.items[int_Current], result
+                self.compute += perf_counter() - flt_Start
+        finally:
+            self.close()
+
+    def timing(self):
+        """
+        Returns dictionary with time spent reading, time the caller waited
+        for reads (I/O wait) and time the caller spent processing, in
+        seconds.
+        """
+        return {"Read":self.read, "Wait":self.wait, "Compute":self.compute}
+
+    def close(self):
+        """
+        Cancels outstanding reads, waits for running ones and shuts down
+        the worker threads.
+        """
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        if not self.pool is None:
+            self.pool.shutdown(wait = True)
+            self.pool = None
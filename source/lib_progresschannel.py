@@ -0,0 +1,244 @@
+"""
+Library of classes and functions to report the progress of data processing
+without touching the GUI from within the processing code.
+
+Processing functions post typed events (stage started, n of m done,
+warning, plain message) to a ProgressChannel. The channel is backed by a
+queue that is safe to use across threads or, if requested, processes.
+Consumers drain the channel:
+    - the progress dialog (lib_progressdialog.ProgressDialog) on a wx.Timer
+      at a fixed frame rate, drawing only the latest count of each run of
+      count events,
+    - LogConsumer writes all events to a python logger for headless runs.
+
+Classes:
+    ProgressEvent
+    ProgressChannel
+    LogConsumer
+
+Functions:
+    gauge
+    format_event
+    coalesce
+    get_channel
+
+"""
+
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import namedtuple
+from time import time
+
+# Event types
+STAGE = "stage"
+COUNT = "count"
+WARNING = "warning"
+MESSAGE = "message"
+
+# Frames per second at which GUI consumers should redraw
+FRAMERATE = 20
+
+ProgressEvent = namedtuple("ProgressEvent",
+                           ["kind", "text", "current", "total", "time"])
+ProgressEvent.__doc__ = """
+    Single progress event. Named tuple so that it can be pickled and sent
+    between processes.
+
+    Fields:
+        kind -> string. One of STAGE, COUNT, WARNING, MESSAGE.
+        text -> string. Message, or for COUNT what is being counted
+                (e.g. "samples").
+        current -> int. Items done (COUNT only).
+        total -> int. Items to do (COUNT only).
+        time -> float. Time stamp of the event.
+    """
+
+class ProgressChannel:
+    """
+    Queue based channel that processing code posts progress events to.
+    Posting never blocks and never touches the GUI.
+    """
+
+    def __init__(self, processes = False):
+        """
+        Arguments:
+            processes -> boolean. If True, a multiprocessing queue is
+                         used so that events can be posted from worker
+                         processes. Otherwise a (faster) thread safe
+                         queue is used.
+        """
+        if processes == True:
+            self.queue = multiprocessing.Queue()
+        else:
+            self.queue = queue.SimpleQueue()
+
+    def post(self, kind, text = "", current = 0, total = 0):
+        """
+        Posts an event to the channel.
+
+        Arguments:
+            kind -> string. Event type.
+            text -> string. Text of the event.
+            current -> int. Items done.
+            total -> int. Items to do.
+        """
+        self.queue.put(ProgressEvent(kind, text, current, total, time()))
+
+    def stage(self, text):
+        """
+        Posts that a new stage of processing has started.
+        """
+        self.post(STAGE, text)
+
+    def message(self, text):
+        """
+        Posts a plain line of text.
+        """
+        self.post(MESSAGE, text)
+
+    def warning(self, text):
+        """
+        Posts a warning, e.g. missing control wells.
+        """
+        self.post(WARNING, text)
+
+    def count(self, current, total, text = "samples"):
+        """
+        Posts that current out of total items have been done.
+
+        Arguments:
+            current -> int. Items done.
+            total -> int. Items to do.
+            text -> string. What is being counted, e.g. "samples".
+        """
+        self.post(COUNT, text, current, total)
+
+    def drain(self):
+        """
+        Takes all events currently in the queue without blocking.
+
+        Returns list of ProgressEvents in the order they were posted.
+        """
+        lst_Events = []
+        while True:
+            try:
+                lst_Events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return lst_Events
+
+class LogConsumer(threading.Thread):
+    """
+    Headless consumer. Drains a ProgressChannel in the background and
+    writes the events to a python logger.
+    """
+
+    def __init__(self, channel, logger = None, interval = 0.5):
+        """
+        Arguments:
+            channel -> ProgressChannel to drain.
+            logger -> logging.Logger. Defaults to the "bbq" logger.
+            interval -> float. Seconds between draining the channel.
+        """
+        threading.Thread.__init__(self, daemon = True)
+        self.channel = channel
+        self.logger = logger if logger is not None else logging.getLogger("bbq")
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Writes all waiting events to the log. Only the last of a run
+        of count events is written.
+        """
+        for event in coalesce(self.channel.drain()):
+            if event.kind == WARNING:
+                self.logger.warning(event.text)
+            else:
+                self.logger.info(format_event(event))
+
+    def stop(self):
+        """
+        Stops the consumer after writing any remaining events.
+        """
+        self.stopped.set()
+
+def gauge(current, total):
+    """
+    Returns a text based progress bar, e.g. "[▮▮▮▮▯▯▯▯]"
+
+    Arguments:
+        current -> int. Items done.
+        total -> int. Items to do.
+    """
+    int_Length = 20
+    if total > 0:
+        int_Full = int(round(current/total * int_Length,0))
+    else:
+        int_Full = int_Length
+    int_Blank = int_Length - int_Full
+    str_Full = chr(9646)
+    str_Blank = chr(9647)
+    return "[" + int_Full*str_Full + int_Blank*str_Blank + "]"
+
+def format_event(event):
+    """
+    Turns a ProgressEvent into the line shown in the progress log.
+    """
+    if event.kind == COUNT:
+        return f"{gauge(event.current,event.total)} {event.current} out of {event.total} {event.text}."
+    elif event.kind == WARNING:
+        return "Note: " + event.text
+    else:
+        return event.text
+
+def coalesce(lst_Events):
+    """
+    Drops count events that are immediately followed by a count event
+    for the same thing. Consumers then only draw the latest state.
+
+    Arguments:
+        lst_Events -> list of ProgressEvents.
+
+    Returns list of ProgressEvents.
+    """
+    lst_Coalesced = []
+    for event in lst_Events:
+        if (event.kind == COUNT and len(lst_Coalesced) > 0
+            and lst_Coalesced[-1].kind == COUNT
+            and lst_Coalesced[-1].text == event.text):
+            lst_Coalesced[-1] = event
+        else:
+            lst_Coalesced.append(event)
+    return lst_Coalesced
+
+# Channel for processing without a progress dialog, e.g. scripts.
+# Created on first use.
+_headless = None
+
+def get_channel(dlg_progress):
+    """
+    Returns the channel to post progress events to.
+
+    Arguments:
+        dlg_progress -> progress dialog (or other object) with a
+                        "channel" attribute, or None for headless
+                        processing.
+
+    Returns the dialog's channel, if it has one, otherwise a module wide
+    channel that is written to the log by a LogConsumer.
+    """
+    global _headless
+    if dlg_progress is not None and hasattr(dlg_progress, "channel"):
+        return dlg_progress.channel
+    if _headless is None:
+        _headless = ProgressChannel()
+        LogConsumer(_headless).start()
+    return _headless
@@ -11,6 +11,7 @@ Classes:
 
 import wx
 import lib_colourscheme as cs
+import lib_progresschannel as pch
 from lib_custombuttons import CustomBitmapButton
 from os import path
 
@@ -18,6 +19,10 @@ class ProgressDialog(wx.Dialog):
 	"""
 	Progress dialog for data analysis.
 	Mini-log of analysis prcgress gets shown here.
+
+	Processing code does not write to the log directly. It posts events
+	to self.channel (lib_progresschannel.ProgressChannel), which gets
+	drained on a timer at a fixed frame rate.
 	"""
 
 	def __init__(self, parent):
@@ -110,6 +115,13 @@ class ProgressDialog(wx.Dialog):
 		self.Bind(wx.EVT_MOTION, self.on_mouse_move)
 		self.dragging = False
 
+		# Progress channel and timer to draw its events
+		self.channel = pch.ProgressChannel()
+		self.str_CountLine = None
+		self.tmr_Channel = wx.Timer(self)
+		self.Bind(wx.EVT_TIMER, self.on_channel_timer, self.tmr_Channel)
+		self.tmr_Channel.Start(int(1000/pch.FRAMERATE))
+
 	def __del__(self):
 		pass
 
@@ -122,9 +134,37 @@ class ProgressDialog(wx.Dialog):
 			parent -> parent object that needs to be thawed
 		
 		"""
+		self.tmr_Channel.Stop()
 		parent.Thaw()
 		self.Destroy()
 
+	def on_channel_timer(self, event):
+		"""
+		Event handler. Draws all events posted to the progress channel
+		since the last frame. Lines get added in one go; runs of count
+		events only update the last line of the log.
+		"""
+		lst_Events = pch.coalesce(self.channel.drain())
+		if len(lst_Events) == 0:
+			return None
+		lst_Lines = []
+		for evt in lst_Events:
+			str_Line = pch.format_event(evt)
+			if evt.kind == pch.COUNT and self.str_CountLine == evt.text:
+				# Update counter line in place
+				if len(lst_Lines) > 0:
+					lst_Lines[-1] = str_Line
+				else:
+					self.lbx_Log.SetString(self.lbx_Log.Count - 1, str_Line)
+			else:
+				lst_Lines.append(str_Line)
+			if evt.kind == pch.COUNT:
+				self.str_CountLine = evt.text
+			else:
+				self.str_CountLine = None
+		if len(lst_Lines) > 0:
+			self.lbx_Log.InsertItems(lst_Lines, self.lbx_Log.Count)
+
 	# The following three function are taken from a tutorial on the wxPython Wiki: https://wiki.wxpython.org/How%20to%20create%20a%20customized%20frame%20-%20Part%201%20%28Phoenix%29
 	# They have been modified if and where appropriate.
 
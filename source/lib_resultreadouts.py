@@ -8,16 +8,21 @@ Functions:
     get_lightcycler_readout
     get_mxp_readout
     get_bmg_timecourse_readout
+    get_DRTC_flavour
+    get_DRTC_readout
     get_bmg_DRTC_readout
     get_FLIPR_DRTC_readout
     get_prometheus_readout
     get_prometheus_capillaries
+    get_operetta_flavour
     get_operetta_readout
 
 """
 import pandas as pd
 import numpy as np
 import lib_platefunctions as pf
+import lib_excelfunctions as ef
+import lib_tracing as trace
 import os
 
 def get_bmg_list_readout(datafile: str, wells: int):
@@ -119,23 +124,24 @@ def get_bmg_plate_readout(datapath: str, datafile: str, wells: int, assaytype: s
     # Get proper encoding by opening the file first with basic tools and
     # accessing the encoding
     dfpath = os.path.join(datapath, datafile)
+    # Exported text files sometimes get re-saved as actual Excel files.
+    # Check which one it is instead of trying both.
     try:
-        dfr_Direct = pd.read_csv(dfpath,
-                                 sep="\t",
-                                 header=None,
-                                 index_col=False,
-                                 engine="python", 
-                                 names=lst_Columns,
-                                 encoding = open(dfpath).encoding)
-    except:
-        try:
-            dfr_Direct = pd.read_excel(dfpath,
+        if ef.sniff_filetype(dfpath) in ["xlsx","xls"]:
+            dfr_Direct = ef.read_sheet(dfpath,
                                        header=None,
-                                       index_col=False,
-                                       engine="openpyxl",
+                                       index_col=None,
                                        names=lst_Columns)
-        except:
-            return None
+        else:
+            dfr_Direct = pd.read_csv(dfpath,
+                                     sep="\t",
+                                     header=None,
+                                     index_col=False,
+                                     engine="python", 
+                                     names=lst_Columns,
+                                     encoding = open(dfpath).encoding)
+    except:
+        return None
 
     if dfr_Direct.iloc[0,0].find("Testname") == -1:
         return None
@@ -226,9 +232,8 @@ def get_quantstudio_readout(datafile: str, wells: int):
     """
     # Open Datafile
     try:
-        direct = pd.read_excel(datafile, 
+        direct = ef.read_sheet(datafile,
                                header=None,
-                               engine="openpyxl",
                                sheet_name="Melt Curve Raw Data")
     except Exception:
         return None
@@ -267,7 +272,7 @@ def get_mxp_readout(datafile: str, start: int):
     Returns pandas dataframe with columns "Well","Name","Temp","Fluo"
     """
     try:
-        dfr_Direct = pd.read_excel(datafile, header=None, engine="openpyxl")
+        dfr_Direct = ef.read_sheet(datafile, header=None)
     except:
         return None
     # Test to see if we have the right file type:
@@ -361,10 +366,9 @@ def get_bmg_timecourse_readout(datafile: str):
                                      encoding = open(datafile).encoding)
         except:
             try:
-                dfr_Direct = pd.read_excel(datafile,
+                dfr_Direct = ef.read_sheet(datafile,
                                            header=None,
                                            index_col=False,
-                                           engine="openpyxl",
                                            names=lst_ReadoutColumns)
             except:
                 return None
@@ -415,12 +419,70 @@ def get_bmg_timecourse_readout(datafile: str):
 
     return dfr_Timecourse
 
+def get_DRTC_flavour(datafile: str, lines: int = 100):
+    """
+    Detects which instrument a dose response time course file comes
+    from, reading only the first lines of the file.
+
+    BMG exports (text or Excel) have a "Cycle: n" line followed by a
+    "Time [s]: t" line for each timepoint. FLIPR exports are tab
+    separated tables with a "Well" column header followed by one column
+    per timepoint.
+
+    Arguments:
+        datafile -> string. Path to datafile
+        lines -> integer. Number of lines to search.
+
+    Returns "BMG", "FLIPR" or None if the format is not recognised.
+    """
+    str_FileType = ef.sniff_filetype(datafile)
+    if str_FileType is None:
+        return None
+    if str_FileType in ["xlsx","xls"]:
+        # Only BMG files come as Excel workbooks
+        return "BMG"
+    try:
+        with open(datafile, "r", encoding="utf-8-sig", errors="replace") as file:
+            for line in range(lines):
+                str_Line = file.readline()
+                if str_Line == "":
+                    break
+                if "Cycle:" in str_Line:
+                    return "BMG"
+                if "Well" in [cell.strip() for cell in str_Line.split("\t")]:
+                    return "FLIPR"
+    except Exception:
+        return None
+    return None
+
+def get_DRTC_readout(datafile: str):
+    """
+    Parses a dose response time course file with the reader for the
+    instrument it comes from (see get_DRTC_flavour).
+
+    Arguments:
+        datafile -> string. Path of datafile
+
+    Returns pandas dataframe with wells as indices and timepoints as
+    columns or None if the file could not be read.
+    """
+    str_Flavour = get_DRTC_flavour(datafile)
+    if str_Flavour == "BMG":
+        return get_bmg_DRTC_readout(datafile)
+    elif str_Flavour == "FLIPR":
+        return get_FLIPR_DRTC_readout(datafile)
+    return None
+
 def get_bmg_DRTC_readout(datafile: str):
     '''
     Parses BMG files for dose response time course experiments.
     This output format is slightly different from the other time 
     course files and requires a separate parser.
 
+    The file is read once as text. The plate-shaped blocks of all cycles
+    are then taken out in one indexing step and reshaped to wells x
+    timepoints.
+
     Arguments:
         datafile -> string. Path of datafile
 
@@ -433,42 +495,49 @@ def get_bmg_DRTC_readout(datafile: str):
     lst_ReadoutColumns = range(int_Columns+1)
     # Read file. Cells in PheraStar output are tab stop separated (Symbol: \t)
     try:
-        dfr_Direct = pd.read_csv(datafile, sep="\s+", header=None,
-                                 index_col=False, engine="python",
-                                 names=lst_ReadoutColumns)
-    except:
-        try:
-             dfr_Direct = pd.read_excel(datafile, header=None, index_col=False,
-                                        engine="openpyxl", names=lst_ReadoutColumns)
-        except:
-            return None
+        with trace.span("read", "readout", datafile = datafile, filetype = "bmg_drtc"):
+            if ef.sniff_filetype(datafile) in ["xlsx","xls"]:
+                dfr_Direct = ef.read_sheet(datafile, 0, header=None, dtype=str)
+                dfr_Direct = dfr_Direct.reindex(columns=lst_ReadoutColumns)
+            else:
+                dfr_Direct = pd.read_csv(datafile, sep=r"\s+", header=None,
+                                         index_col=False, names=lst_ReadoutColumns,
+                                         dtype=str)
+    except Exception:
+        return None
     # Get location of "Cycle" and ensure there is a corresponding time stamp
-    lst_CycleTimes = []
-    lst_CyclesLines = []
-    for line in range(len(dfr_Direct)):
-        if (dfr_Direct.iloc[line,0].find("Cycle:") != -1 and
-            dfr_Direct.iloc[line+1,0].find("Time") != -1):
-            lst_CycleTimes.append(float(dfr_Direct.iloc[line+1,2]))
-            lst_CyclesLines.append(line)
+    ser_First = dfr_Direct[0].fillna("")
+    arr_Cycle = ser_First.str.contains("Cycle:", regex=False).to_numpy()
+    arr_Time = ser_First.str.contains("Time", regex=False).to_numpy()
+    arr_CycleLines = np.flatnonzero(arr_Cycle[:-1] & arr_Time[1:])
+    # Plate blocks start three lines below "Cycle:". Cycles whose block
+    # is cut off (e.g. an aborted run) are dropped.
+    arr_CycleLines = arr_CycleLines[arr_CycleLines + 3 + int_Rows <= dfr_Direct.shape[0]]
     # Check if any cycles have actually been found. If not, return None and
     # next checks in the process will flag that raw data file was not the
     # right type
-    if len(lst_CycleTimes) == 0:
+    if len(arr_CycleLines) == 0:
         return None
-    # Time of cycle is given in file
-    dfr_Timecourse = pd.DataFrame(index=range(int_PlateFormat),
-                                  columns=lst_CycleTimes)
-    # Initialise timecourse
-    for row in range(int_Rows):
-        for col in range(int_Columns):
-            for cycle in range(dfr_Timecourse.shape[1]):
-                dfr_Timecourse.iloc[pf.col_row_to_index(row,col,int_PlateFormat),cycle] = float(dfr_Direct.iloc[lst_CyclesLines[cycle]+3+row,1+col])
-    return dfr_Timecourse
+    # Time of cycle is given in file, e.g. "Time [s]: 1234"
+    arr_CycleTimes = pd.to_numeric(dfr_Direct[2].to_numpy()[arr_CycleLines + 1],
+                                   errors="coerce").astype(float)
+    # (cycles x rows) line numbers -> (cycles x rows x columns) block
+    arr_Lines = arr_CycleLines[:,np.newaxis] + 3 + np.arange(int_Rows)
+    arr_Block = dfr_Direct.iloc[:,1:int_Columns+1].to_numpy()[arr_Lines]
+    arr_Block = pd.to_numeric(arr_Block.ravel(), errors="coerce").astype(float)
+    # Wells are numbered row by row (see pf.col_row_to_index)
+    arr_Block = arr_Block.reshape(len(arr_CycleLines), int_PlateFormat).T
+    return pd.DataFrame(arr_Block, index=range(int_PlateFormat),
+                        columns=arr_CycleTimes)
 
 def get_FLIPR_DRTC_readout(datafile: str):
     '''
     Parses FLIPR output for dose response time course experiments.
 
+    The table is read in one go. Columns after "Well" are timepoints,
+    their headers become the (numerical, where possible) time axis.
+    Empty columns, e.g. from trailing tab stops, are dropped.
+
     Arguments:
         datafile -> string. Path of datafile
 
@@ -476,20 +545,27 @@ def get_FLIPR_DRTC_readout(datafile: str):
     '''
     # Read file. Cells in FLIPR output are tab stop separated (Symbol: \t)
     try:
-        dfr_Direct = pd.read_csv(datafile, sep="\t", header=None, index_col=False,
-                                 engine="python")
-    except:
+        with trace.span("read", "readout", datafile = datafile, filetype = "flipr_drtc"):
+            dfr_Direct = pd.read_csv(datafile, sep="\t", header=0, index_col=False,
+                                     dtype=str, encoding="utf-8-sig")
+    except Exception:
         return None
     # Get location of cycles
-    int_WellColumn = 0
-    for col in range(dfr_Direct.shape[1]):
-        if dfr_Direct.iloc[0,col] == "Well":
-            int_WellColumn = col
-    dfr_Timecourse = dfr_Direct.iloc[1:,int_WellColumn+1:dfr_Direct.shape[1]-1].reset_index(drop=True)
-    new_columns = dfr_Direct.iloc[0,int_WellColumn+1:dfr_Direct.shape[1]-1].tolist()
-    dfr_Timecourse.columns = new_columns
-
-    return dfr_Timecourse
+    lst_Header = [str(column).strip() for column in dfr_Direct.columns]
+    if not "Well" in lst_Header:
+        return None
+    int_WellColumn = len(lst_Header) - 1 - lst_Header[::-1].index("Well")
+    dfr_Direct = dfr_Direct.iloc[:,int_WellColumn+1:].dropna(axis=1, how="all")
+    arr_Signal = pd.to_numeric(dfr_Direct.to_numpy().ravel(),
+                               errors="coerce").astype(float).reshape(dfr_Direct.shape)
+    lst_Times = []
+    for column in dfr_Direct.columns:
+        try:
+            lst_Times.append(float(column))
+        except ValueError:
+            lst_Times.append(column)
+    return pd.DataFrame(arr_Signal, index=range(arr_Signal.shape[0]),
+                        columns=lst_Times)
         
 def get_prometheus_readout(datafile: str):
     """
@@ -505,26 +581,22 @@ def get_prometheus_readout(datafile: str):
     # If it fails the first time, return None because it's
     # not the correct file type.
     try:
-        dfr_Ratio = pd.read_excel(datafile, sheet_name="Ratio", header=None,
-                                  engine="openpyxl")
+        dfr_Ratio = ef.read_sheet(datafile, sheet_name="Ratio", header=None)
     except Exception:
         return None
-    dfr_330nm = pd.read_excel(datafile, sheet_name="330nm", header=None,
-                              engine="openpyxl")
-    dfr_350nm = pd.read_excel(datafile, sheet_name="350nm", header=None,
-                              engine="openpyxl")
-    dfr_Scattering = pd.read_excel(datafile, sheet_name="Scattering", header=None,
-                                   engine="openpyxl")
+    dfr_330nm = ef.read_sheet(datafile, sheet_name="330nm", header=None)
+    dfr_350nm = ef.read_sheet(datafile, sheet_name="350nm", header=None)
+    dfr_Scattering = ef.read_sheet(datafile, sheet_name="Scattering", header=None)
     # Check whether we have a derivative already determined
     try:
-        dfr_RatioDeriv = pd.read_excel(datafile, sheet_name="Ratio (1st deriv.)",
-                                       header=None, engine="openpyxl")
-        dfr_330nmDeriv = pd.read_excel(datafile, sheet_name="330nm (1st deriv.)",
-                                       header=None, engine="openpyxl")
-        dfr_350nmDeriv = pd.read_excel(datafile, sheet_name="350nm (1st deriv.)",
-                                       header=None, engine="openpyxl")
-        dfr_ScatteringDeriv = pd.read_excel(datafile, sheet_name="Scattering (1st deriv.)",
-                                            header=None, engine="openpyxl")
+        dfr_RatioDeriv = ef.read_sheet(datafile, sheet_name="Ratio (1st deriv.)",
+                                       header=None)
+        dfr_330nmDeriv = ef.read_sheet(datafile, sheet_name="330nm (1st deriv.)",
+                                       header=None)
+        dfr_350nmDeriv = ef.read_sheet(datafile, sheet_name="350nm (1st deriv.)",
+                                       header=None)
+        dfr_ScatteringDeriv = ef.read_sheet(datafile, sheet_name="Scattering (1st deriv.)",
+                                            header=None)
         bol_Derivative = True
     except Exception:
         bol_Derivative = False
@@ -584,8 +656,7 @@ def get_prometheus_capillaries(datafile: int):
     "SampleID","SampleConc","Buffer","CapillaryType"
     """
     try:
-        dfr_Ratio = pd.read_excel(datafile, sheet_name="Ratio", header=None,
-                                  engine="openpyxl")
+        dfr_Ratio = ef.read_sheet(datafile, sheet_name="Ratio", header=None)
     except:
         return None
 
@@ -618,54 +689,90 @@ def get_prometheus_capillaries(datafile: int):
     
     return dfr_Capillaries
 
-def get_operetta_readout(datafile: str, processor: str):
+def get_operetta_flavour(datafile: str, lines: int = 200):
+    """
+    Detects whether an Operetta Phoenix result file has been exported by
+    Columbus or Harmony, reading only the first lines of the file.
+
+    Columbus exports start with the column header. Harmony exports start
+    with a block of metadata, the column header follows the line "[Data]".
+
+    Arguments:
+        datafile -> string. Path to datafile
+        lines -> integer. Number of lines to search for the header.
+
+    Returns data processor ("Columbus" or "Harmony") and number of lines
+    before the column header, or None, None if the file is not an
+    Operetta export.
+    """
+    try:
+        with open(datafile, "r", encoding="utf-8-sig", errors="replace") as file:
+            for line in range(lines):
+                str_Line = file.readline()
+                if str_Line == "":
+                    break
+                str_Line = str_Line.strip()
+                if str_Line == "[Data]":
+                    return "Harmony", line + 1
+                lst_Header = str_Line.split("\t")
+                if line == 0 and "Row" in lst_Header and "Column" in lst_Header:
+                    return "Columbus", 0
+    except Exception:
+        return None, None
+    return None, None
+
+def get_operetta_readout(datafile: str, processor: str = None,
+                         feature: str = "Nuclei Selected - Number of Objects",
+                         wells: int = 384):
     """
     Parses processed readout of PerkinElmer Operetta Phoenix.
 
+    The export flavour is detected from the file header. Only the well
+    coordinates and the requested feature are read from the file,
+    everything else a high content export carries is skipped.
+
     Arguments:
         datafile -> string. Path to datafile
         processor -> string. Software/platform that has been used
                      to process raw images. Permitted values:
-                     "Columbus", "Harmony"
+                     "Columbus", "Harmony". Optional, only used if the
+                     flavour cannot be detected from the file.
+        feature -> string. Name of the column to use as readout.
+        wells -> integer. Plate format.
     """
-    # Choose direct read strategy based on data processor
-    if processor == "Columbus":
-        try:
-            dfr_Direct = pd.read_csv(datafile, sep="\t", header=0, index_col=False,
-                                     engine="python")
-        except Exception:
-            return None
-    elif processor == "Harmony":
-        try:
-            # Read file, but only first column to find desired header row.
-            dfr_Direct = pd.read_csv(datafile, sep="\t", usecols=[0], header=None,
-                                     index_col=False, engine="python")
-            # Find header row
-            headerrow = dfr_Direct.index[dfr_Direct[0] == "[Data]"].tolist()[0]+1
-            # Re-read file because we now know how many columns we need.
-            dfr_Direct = pd.read_csv(datafile, sep="\t", header=headerrow,
-                                     index_col=False, engine="python")
-
-        except Exception:
+    str_Flavour, int_SkipRows = get_operetta_flavour(datafile)
+    if str_Flavour is None:
+        if processor == "Columbus":
+            int_SkipRows = 0
+        else:
             return None
-    else:
-        return None
-
-    # Reduce columns to the ones we need and simplify column names
-    dfr_Direct = dfr_Direct[["Row","Column","Nuclei Selected - Number of Objects"]].rename(
-                        columns={"Nuclei Selected - Number of Objects":"Readout"})
+    elif not processor is None and processor != str_Flavour:
+        trace.event("Data processor does not match export", "readout",
+                    datafile = datafile, expected = processor, found = str_Flavour)
 
-    int_PlateFormat = 384
-    dfr_Output = pd.DataFrame(index=range(int_PlateFormat),
-                                columns=["Row","Column","Readout","Normalised"])
+    try:
+        with trace.span("read", "readout", datafile = datafile, filetype = "operetta"):
+            dfr_Direct = pd.read_csv(datafile, sep="\t", header=0, index_col=False,
+                                     skiprows=int_SkipRows, encoding="utf-8-sig",
+                                     usecols=["Row","Column",feature],
+                                     dtype={"Row":float, "Column":float, feature:float})
+    except Exception:
+        return None
 
-    int_PlateColumns = pf.plate_columns(int_PlateFormat)
-    for line in range(dfr_Direct.shape[0]):
-        # Transform from "human indexed" well to index base 0 well numbering
-        int_Well = dfr_Direct.loc[line,"Column"] + (dfr_Direct.loc[line,"Row"]-1) * int_PlateColumns - 1
-        dfr_Output.loc[int_Well,"Readout"] = dfr_Direct.loc[line,"Readout"]
-        dfr_Output.loc[int_Well,"Row"] = dfr_Direct.loc[line,"Row"]
-        dfr_Output.loc[int_Well,"Column"] = dfr_Direct.loc[line,"Column"]
+    # Rows without well coordinates (e.g. footer lines) cannot be mapped
+    dfr_Direct = dfr_Direct.dropna(subset=["Row","Column"])
+    arr_Row = dfr_Direct["Row"].to_numpy(dtype=int)
+    arr_Column = dfr_Direct["Column"].to_numpy(dtype=int)
+    int_PlateColumns = pf.plate_columns(wells)
+    # Transform from "human indexed" well to index base 0 well numbering
+    arr_Well = arr_Column + (arr_Row - 1) * int_PlateColumns - 1
+    arr_Keep = (arr_Well >= 0) & (arr_Well < wells) & (arr_Column <= int_PlateColumns)
+
+    dfr_Output = pd.DataFrame(index=range(wells),
+                              columns=["Row","Column","Readout","Normalised"])
+    dfr_Output.loc[arr_Well[arr_Keep],"Row"] = arr_Row[arr_Keep]
+    dfr_Output.loc[arr_Well[arr_Keep],"Column"] = arr_Column[arr_Keep]
+    dfr_Output.loc[arr_Well[arr_Keep],"Readout"] = dfr_Direct[feature].to_numpy()[arr_Keep]
     return dfr_Output
 
 
@@ -700,38 +807,36 @@ def get_readout(file_path, plate_name, data_rules):
 
     # Get the first read ############################################################################################################################
     if str_FileType == "csv" or str_FileType == "txt":
-        print("Trying to parse CSV or TXT file.")
         try:
-            dfr_ParsedDataFile = pd.read_csv(openthis,
-                                             sep=None,
-                                             header=None,
-                                             index_col=False,
-                                             engine=str_Engine)
-            print("Successfully parsed a CSV or TXT file.")
+            with trace.span("read", "readout", plate = plate_name, filetype = str_FileType):
+                dfr_ParsedDataFile = pd.read_csv(openthis,
+                                                 sep=None,
+                                                 header=None,
+                                                 index_col=False,
+                                                 engine=str_Engine)
         except:
             try: 
-                print("Couldn't parse, return empty dataframe and no success.")
-                dfr_ParsedDataFile = pd.read_excel(openthis,
-                                                  sep=None,
-                                                  header=None,
-                                                  index_col=False,
-                                                  engine=str_Engine)
+                trace.event("Could not parse as CSV or TXT, trying XLS", "readout", plate = plate_name)
+                dfr_ParsedDataFile = ef.read_sheet(openthis,
+                                                   header=None,
+                                                   index_col=False)
             except:
-                print("Successfully parsed a XLS file.")
+                trace.event("Could not parse file", "readout", plate = plate_name)
                 return pd.DataFrame(), False
     elif str_FileType[0:3] == "xls":
-        print("Trying to parse XLS or XLSX file.")
         try:
-            dfr_ParsedDataFile = pd.read_excel(openthis,
-                                               sheet_name=str_Worksheet,
-                                               header=None,
-                                               index_col=None,
-                                               engine=str_Engine)
+            with trace.span("read", "readout", plate = plate_name, filetype = str_FileType):
+                # The engine is chosen from the file's actual type
+                dfr_ParsedDataFile = ef.read_sheet(openthis,
+                                                   sheet_name=str_Worksheet,
+                                                   header=None,
+                                                   index_col=None)
         except:
             # Couldn't parse, return empty dataframe and no success
+            trace.event("Could not parse file", "readout", plate = plate_name)
             return pd.DataFrame(), False
-        print("Successfully parsed a XLS or XLSX file")
-    print(f"Shape: {dfr_ParsedDataFile.shape[0]} by {dfr_ParsedDataFile.shape[1]}")
+    trace.event("Parsed data file", "readout", plate = plate_name,
+                rows = dfr_ParsedDataFile.shape[0], columns = dfr_ParsedDataFile.shape[1])
 
     # Verify whether we're dealing with a valid data file ###########################################################################################
     if bool_Verification == True:
@@ -753,7 +858,7 @@ def get_readout(file_path, plate_name, data_rules):
                     break
         # If keyword is NOT found:
         if bool_Verified == False:
-            print("could not verify file")
+            trace.event("Could not verify file", "readout", plate = plate_name)
             # Couldn't parse, return empty dataframe and no success
             return pd.DataFrame(), False
 
@@ -805,7 +910,7 @@ def get_readout(file_path, plate_name, data_rules):
     # Start looking at files ########################################################################################################################
     dfr_DatasetCoordinates = pd.DataFrame(index=[0],columns=[0])
     # First step: Identify datasets and sub-datasets
-    print(f"Dataset axis: {int_DatasetAxis}")
+    trace.event("Dataset axis", "readout", axis = int_DatasetAxis)
     lst_Coordinates = []
     # Find index of first dataset
     # First case: Keywords
@@ -818,10 +923,10 @@ def get_readout(file_path, plate_name, data_rules):
                                 bool_ExactDatasetKeyword))
     # Continue if we have multiple datasets:
     if bool_MultipleDatasets == True:
-        print("Multiple datasets")
+        trace.event("Multiple datasets", "readout")
         # Branch for different separators:
         if str_NewDatasetSeparator == "Keyword" or (str_NewDatasetSeparator == "SameAsMain" and bool_DatasetKeyword == True):
-            print("First dataset: by keyword")
+            trace.event("Further datasets: by keyword", "readout")
             if int_DatasetAxis == 0:
                 lst_Coordinates += FindKeywordsVertically(dfr_ParsedDataFile, dfr_DatasetCoordinates.iloc[0,0]+1, int_DatasetKeywordColumn,
                                                     str_NewDatasetKeyword, bool_ExactDatasetKeyword,dfr_ParsedDataFile.shape[int_DatasetAxis]-1)
@@ -829,32 +934,29 @@ def get_readout(file_path, plate_name, data_rules):
                 lst_Coordinates += FindKeywordsHorizontally(dfr_ParsedDataFile, dfr_DatasetCoordinates.iloc[0,0]+1, int_DatasetKeywordRow,
                                                     str_NewDatasetKeyword, bool_ExactDatasetKeyword,dfr_ParsedDataFile.shape[int_DatasetAxis]-1)
         elif str_NewDatasetSeparator == "SetDistance":
-            print("Further dataset: by fixed offset")
+            trace.event("Further datasets: by fixed offset", "readout")
             # For this one, we create a completely new dataframe instead of merging with the old one.
             if int_DatasetAxis == 0:
                 int_NewRow = lst_Coordinates[0] + tpl_NewDatasetOffset[int_DatasetAxis]
                 while int_NewRow < dfr_ParsedDataFile.shape[int_DatasetAxis]:                    
-                    print(int_NewRow)
                     lst_Coordinates.append(int_NewRow)
                     int_NewRow += tpl_NewDatasetOffset[0]
             elif int_DatasetAxis == 1:
                 int_NewCol = lst_Coordinates[0] + tpl_NewDatasetOffset[int_DatasetAxis]
                 while int_NewCol < dfr_ParsedDataFile.shape[int_DatasetAxis]:                    
-                    print(int_NewCol)
                     lst_Coordinates.append(int_NewCol)
                     int_NewCol += tpl_NewDatasetOffset[int_DatasetAxis]
     dfr_DatasetCoordinates = pd.DataFrame(index=range(len(lst_Coordinates)),columns=[0],data=lst_Coordinates)
     
     # Do we have sub-datasets?
     if bool_SubDatasets == True:
-        print("Sub-datasets")
-        print(f"Sub-dataset axis: {int_SubDatasetAxis}")
+        trace.event("Sub-datasets", "readout", axis = int_SubDatasetAxis)
         dfr_SubDatasetCoordinates = pd.DataFrame(index=dfr_DatasetCoordinates.index)
         # Branch for different separators:
         # Keyword separator
-        print(f"Sub-dataset separator: {str_SubDatasetSeparator}")
+        trace.event("Sub-dataset separator", "readout", separator = str_SubDatasetSeparator)
         if str_SubDatasetSeparator == "Keyword" or (str_SubDatasetSeparator == "SameAsMain" and bool_DatasetKeyword == True):
-            print(f"Sub-dataset keyword: {str_SubDatasetKeyword}")
+            trace.event("Sub-dataset keyword", "readout", keyword = str_SubDatasetKeyword)
             # Branch for axis:
             if int_SubDatasetAxis == 0:
                 for idx in dfr_DatasetCoordinates.index:
@@ -880,28 +982,24 @@ def get_readout(file_path, plate_name, data_rules):
                     dfr_SubDatasetCoordinates.loc[idx] = lst_SubDatasetCoordinates
         # Offset separator
         elif str_SubDatasetSeparator == "SetDistance":
-            print("Sub-dataset separator: keyword.")
             int_NewRow = lst_SubDatasetCoordinates[0]
             while int_NewRow in dfr_ParsedDataFile.index:
-                print(int_NewRow)
                 lst_SubDatasetCoordinates.append(int_NewRow)
                 int_NewRow += tpl_NewDatasetOffset[int_SubDatasetAxis]
         # Create dataframe to merge
-        print(dfr_SubDatasetCoordinates)
         dfr_DatasetCoordinates = pd.concat([dfr_DatasetCoordinates, dfr_SubDatasetCoordinates], axis=1, join="inner")
         dfr_DatasetCoordinates.columns = range(len(dfr_DatasetCoordinates.columns))
         # Convert all values to integers:
         for col in dfr_DatasetCoordinates.columns:
             dfr_DatasetCoordinates[col] = dfr_DatasetCoordinates[col].astype(int)
-        print(dfr_DatasetCoordinates)
 
-    # Print info for sanity check
-    print(f"Datasets: {dfr_DatasetCoordinates.shape[0]}")
-    print(u"Dataset start rows: \n" + str(dfr_DatasetCoordinates.iloc[:,0]))
+    # Record info for sanity check
+    trace.event("Datasets", "readout", plate = plate_name,
+                datasets = dfr_DatasetCoordinates.shape[0],
+                startrows = dfr_DatasetCoordinates.iloc[:,0].to_list())
 
     # Branching: Plate or samples?
     if str_PlateOrSample == "Plate":
-        print("We have a plate")
         # Brancking: Table or Grid?
         if str_GridOrTable == "Grid":
             # Create dataframe -> assuming one dataset for now
@@ -911,34 +1009,26 @@ def get_readout(file_path, plate_name, data_rules):
             lst_RowLetters = pf.plate_rows_letters(int_Wells)
             lst_ColumnNumbers = pf.plate_columns_numbers(int_Wells)
             for dfrrow in range(dfr_RawData.shape[0]):
-                print(f"Dataframe row: {dfrrow}")
                 for dfrcol in range(dfr_RawData.shape[1]):
-                    print(f"Dataframe column: {dfrcol}")
                     # remember dataframes are indexed from zero!
                     startrow = dfr_DatasetCoordinates.iloc[dfrrow,dfrcol] + tpl_DatasetKeywordOffset[0]
-                    print(f"Startrow: {startrow}")
                     startcol = int_DatasetKeywordColumn + tpl_DatasetKeywordOffset[1]
-                    print(f"Startcol: {startcol}")
                     dfr_RawData.iloc[dfrrow,dfrcol] = dfr_ParsedDataFile.iloc[startrow:startrow+int_PlateRows,
                                                                             startcol:startcol+int_PlateCols]
                     # Rename rows and columns:
                     dfr_RawData.iloc[dfrrow,dfrcol] = dfr_RawData.iloc[dfrrow,dfrcol].set_axis(lst_RowLetters, axis=0)
                     dfr_RawData.iloc[dfrrow,dfrcol] = dfr_RawData.iloc[dfrrow,dfrcol].set_axis(lst_ColumnNumbers, axis=1)
-                    print(dfr_RawData.iloc[dfrrow,dfrcol])
 
             # change for current setup:
             readouts = []
             for row in dfr_RawData.iloc[0,0].index:
                 readouts.extend(dfr_RawData.iloc[0,0].loc[row].to_list())
-            print(len(readouts))
             wells = [*range(0, int_Wells)]
             wells = [pf.index_to_well(w+1,int_Wells) for w in wells]
             dfr_RawData = pd.DataFrame(data={"Well":wells,plate_name:readouts})
 
 
-    print(dfr_RawData)
-
-    #print(dfr_ParsedDataFile)
+    trace.event("Raw data extracted", "readout", plate = plate_name, shape = dfr_RawData.shape)
 
     return dfr_RawData, True
 
@@ -0,0 +1,707 @@
+"""
+Synthetic assay data for scale testing.
+
+Writes complete, realistic input sets for the processing workflows:
+    - an Echo transfer file (same layout as an Echo Dose-Response export),
+    - raw data files in the formats lib_resultreadouts reads:
+        dose_response   BMG PheraStar plate format, one file per plate
+        single_dose     BMG PheraStar list format, one file for all plates
+        thermal_shift   Roche LightCycler (96/384) or QuantStudio (384),
+                        one file per plate
+        rate            BMG time course (384 wells), one file per plate
+        nanoDSF         NanoTemper Prometheus, one file
+        high_content    Operetta/Columbus export, one file per plate
+    - a plate layout file (.plf) for the workflows that need one,
+    - the ground truth: curve parameters of every sample
+      ("GroundTruth.csv").
+
+Any number of plates in 96, 384 or 1536 well format can be made (the
+readers limit the time course to 384 and the LightCycler to 96/384 wells).
+Every plate has control wells (100 % effect) in the second to last column
+and solvent reference wells (0 % effect) in the last column. The other
+wells hold dilution series of samples with random, known parameters.
+Readings get gaussian noise, given as fraction of the assay window.
+
+The same seed always gives the same files, so throughput, memory use and
+fit accuracy can be compared between versions of the program:
+
+    dic_Files = generate("/tmp/screen", "dose_response", plates = 50,
+                         wells = 1536)
+
+The curves use the same equations and parameters as
+lib_fittingfunctions (eq_sigmoidal, eq_boltzmann, eq_logMM), so fitted
+parameters can be compared with the ground truth directly. They are
+repeated here so that data can be generated without the GUI libraries.
+
+Nothing in here depends on wx.
+
+    Functions
+        generate
+        row_label
+        echo_well
+        destination
+        well_names
+        dilution_series
+        plate_map
+        ground_truth
+        sigmoidal
+        boltzmann
+        logMM
+        inhibition
+        endpoint_readings
+        melt_curves
+        time_courses
+        capillary_scans
+        write_echo_transfer
+        write_bmg_plate
+        write_bmg_list
+        write_lightcycler
+        write_quantstudio
+        write_bmg_timecourse
+        write_prometheus
+        write_operetta
+        write_layout
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import lib_platefunctions as pf
+import lib_layoutmodel as lm
+
+# Sample stock concentration in M and assay volume in L, for the
+# transfer volumes in the transfer file
+SOURCECONC = 0.01
+ASSAYVOLUME = 20e-6
+# Readings of solvent (0 % inhibition) and control (100 % inhibition)
+# wells in endpoint assays
+SOLVENT = 50000.0
+CONTROL = 5000.0
+# Melting temperature of the protein without compound
+TM = 52.0
+# Seconds per cycle of BMG time courses, as assumed by the reader
+CYCLETIME = 36
+
+def row_label(row):
+    """
+    Returns row label as used by plate readers and the Echo: "A" to "Z",
+    then "AA" to "AF" on 1536 well plates.
+    """
+    if row < 26:
+        return chr(65 + row)
+    return "A" + chr(65 + row - 26)
+
+def echo_well(index, wells):
+    """
+    Returns well coordinate without leading zeros (e.g. "A1"), as
+    written by the Echo and the PheraStar, for a well index starting at 0.
+    """
+    int_Columns = pf.plate_columns(wells)
+    return row_label(index // int_Columns) + str(index % int_Columns + 1)
+
+def dilution_series(concentrations, top = 1e-5, factor = 3.0):
+    """
+    Returns numpy array of concentrations in M, highest first.
+    """
+    return top / factor ** np.arange(concentrations)
+
+def plate_map(wells, concentrations = 8, replicates = 1, samples = None):
+    """
+    Assigns the wells of a plate: controls in the second to last column,
+    solvent references in the last column, dilution series of samples in
+    the other wells, column by column.
+
+    Arguments:
+        wells -> integer. Plate format: 96, 384 or 1536.
+        concentrations -> integer. Concentrations per sample.
+        replicates -> integer. Wells per concentration.
+        samples -> integer or None. Samples per plate. None fills the
+                   plate.
+
+    Returns pandas dataframe with one row per well and columns Well,
+    WellType ("s", "c", "r" or "na"), Sample (position of the sample on
+    the plate, -1 for other wells) and Concentration (in M).
+    """
+    int_Rows = pf.plate_rows(wells)
+    int_Columns = pf.plate_columns(wells)
+    arr_Index = np.arange(wells)
+    arr_Row = arr_Index // int_Columns
+    arr_Column = arr_Index % int_Columns
+    arr_Type = np.full(wells, "na", dtype = object)
+    arr_Type[arr_Column == int_Columns - 2] = "c"
+    arr_Type[arr_Column == int_Columns - 1] = "r"
+    # Sample wells column by column, so that a dilution series runs down
+    # the plate
+    arr_SampleWells = np.lexsort((arr_Row, arr_Column))
+    arr_SampleWells = arr_SampleWells[arr_Column[arr_SampleWells] < int_Columns - 2]
+    int_PerSample = concentrations * replicates
+    int_Samples = len(arr_SampleWells) // int_PerSample
+    if not samples is None:
+        int_Samples = min(int_Samples, samples)
+    arr_SampleWells = arr_SampleWells[:int_Samples * int_PerSample]
+    arr_Sample = np.full(wells, -1)
+    arr_Sample[arr_SampleWells] = np.repeat(np.arange(int_Samples), int_PerSample)
+    arr_Conc = np.full(wells, np.nan)
+    arr_Conc[arr_SampleWells] = np.tile(np.repeat(dilution_series(concentrations), replicates),
+                                        int_Samples)
+    arr_Type[arr_SampleWells] = "s"
+    return pd.DataFrame({"Well":[echo_well(idx, wells) for idx in arr_Index],
+                         "WellType":arr_Type,
+                         "Sample":arr_Sample,
+                         "Concentration":arr_Conc})
+
+def ground_truth(dfr_Map, plate, rng, first = 0):
+    """
+    Draws random curve parameters for the samples of one plate.
+
+    Arguments:
+        dfr_Map -> pandas dataframe. See plate_map.
+        plate -> integer. Index of the plate, starting at 0.
+        rng -> numpy random generator.
+        first -> integer. Number of samples on the plates before this
+                 one, for unique sample IDs.
+
+    Returns pandas dataframe with one row per sample.
+    """
+    int_Samples = int(dfr_Map["Sample"].max()) + 1
+    return pd.DataFrame({"Destination":destination(plate),
+        "Sample":np.arange(int_Samples),
+        "SampleID":[f"BBQ-{first + smpl + 1:06d}" for smpl in range(int_Samples)],
+        # Dose response
+        "IC50":10.0 ** rng.uniform(-9, -5, int_Samples),
+        "Hill":rng.uniform(0.7, 1.5, int_Samples),
+        "Top":rng.uniform(90, 105, int_Samples),
+        "Bottom":rng.uniform(-5, 10, int_Samples),
+        # Thermal shift
+        "Tm":TM + rng.uniform(-2, 8, int_Samples),
+        "Slope":rng.uniform(1.2, 2.5, int_Samples),
+        # Rate: signal = y0 + b * ln(1 + t/t0), b lowered by inhibition
+        "y0":rng.uniform(4000, 6000, int_Samples),
+        "b":rng.uniform(8000, 12000, int_Samples),
+        "t0":rng.uniform(300, 900, int_Samples)})
+
+def destination(plate):
+    """
+    Returns name of a destination plate, starting at index 0.
+    """
+    return f"Destination Plate[{plate+1}]"
+
+def well_names(dfr_Map, dfr_Truth):
+    """
+    Returns list of unique names for the wells of a plate, as entered in
+    the software of qPCR machines: the sample ID (with a suffix for
+    replicates), "Control" or "DMSO" and a number, or "Empty" and a
+    number.
+    """
+    lst_Names = []
+    dic_Count = {}
+    arr_IDs = dfr_Truth["SampleID"].to_numpy()
+    for str_Type, smpl in zip(dfr_Map["WellType"], dfr_Map["Sample"]):
+        if smpl >= 0:
+            str_Name = arr_IDs[smpl]
+        else:
+            str_Name = {"c":"Control", "r":"DMSO"}.get(str_Type, "Empty")
+        dic_Count[str_Name] = dic_Count.get(str_Name, 0) + 1
+        if smpl >= 0 and dic_Count[str_Name] == 1:
+            lst_Names.append(str_Name)
+        else:
+            lst_Names.append(str_Name + "_" + str(dic_Count[str_Name]))
+    return lst_Names
+
+def sigmoidal(x, ytop, ybot, h, i):
+    """
+    Sigmoidal dose response curve, see lib_fittingfunctions.eq_sigmoidal.
+    """
+    return ybot + (ytop - ybot)/(1 + (i/x)**h)
+
+def boltzmann(T, Tm, LL, UL, a):
+    """
+    Thermal unfolding, see lib_fittingfunctions.eq_boltzmann.
+    """
+    return LL + (UL - LL)/(1+np.exp((Tm - T)/a))
+
+def logMM(t, y0, b, t0):
+    """
+    Reaction progress, see lib_fittingfunctions.eq_logMM.
+    """
+    return y0 + b * np.log(1 + t/t0)
+
+def inhibition(dfr_Map, dfr_Truth):
+    """
+    Returns numpy array with % inhibition of each well: from the sample's
+    dose response curve for samples, 100 for controls, 0 for everything
+    else.
+    """
+    arr_Inhibition = np.zeros(dfr_Map.shape[0])
+    arr_Inhibition[(dfr_Map["WellType"] == "c").to_numpy()] = 100.0
+    arr_Samples = (dfr_Map["Sample"] >= 0).to_numpy()
+    dfr_Wells = dfr_Truth.set_index("Sample").loc[dfr_Map["Sample"][arr_Samples]]
+    arr_Inhibition[arr_Samples] = sigmoidal(dfr_Map["Concentration"].to_numpy()[arr_Samples],
+                                            dfr_Wells["Top"].to_numpy(),
+                                            dfr_Wells["Bottom"].to_numpy(),
+                                            dfr_Wells["Hill"].to_numpy(),
+                                            dfr_Wells["IC50"].to_numpy())
+    return arr_Inhibition
+
+def endpoint_readings(dfr_Map, dfr_Truth, rng, noise, solvent = SOLVENT, control = CONTROL):
+    """
+    Returns numpy array with one reading per well.
+
+    Arguments:
+        noise -> float. Standard deviation of the noise as fraction of
+                 the assay window (solvent - control).
+    """
+    arr_Readings = solvent + (control - solvent) * inhibition(dfr_Map, dfr_Truth) / 100
+    return arr_Readings + rng.normal(0, noise * abs(solvent - control), dfr_Map.shape[0])
+
+def melt_curves(dfr_Map, dfr_Truth, rng, noise, arr_Temp):
+    """
+    Returns numpy array (wells, temperatures) with DSF fluorescence.
+    Samples unfold at their Tm, solvent references at TM and controls
+    (a known binder) 5 degrees higher.
+    """
+    int_Wells = dfr_Map.shape[0]
+    arr_Tm = np.full(int_Wells, TM)
+    arr_Slope = np.full(int_Wells, 1.8)
+    arr_Tm[(dfr_Map["WellType"] == "c").to_numpy()] = TM + 5
+    arr_Samples = (dfr_Map["Sample"] >= 0).to_numpy()
+    dfr_Wells = dfr_Truth.set_index("Sample").loc[dfr_Map["Sample"][arr_Samples]]
+    arr_Tm[arr_Samples] = dfr_Wells["Tm"].to_numpy()
+    arr_Slope[arr_Samples] = dfr_Wells["Slope"].to_numpy()
+    flt_Lower, flt_Upper = 2.0, 12.0
+    arr_Fluo = boltzmann(arr_Temp[np.newaxis,:], arr_Tm[:,np.newaxis], flt_Lower, flt_Upper,
+                         arr_Slope[:,np.newaxis])
+    # Aggregation after unfolding quenches the dye
+    arr_Fluo = arr_Fluo - 0.08 * np.clip(arr_Temp[np.newaxis,:] - arr_Tm[:,np.newaxis] - 5, 0, None)
+    return arr_Fluo + rng.normal(0, noise * (flt_Upper - flt_Lower), arr_Fluo.shape)
+
+def time_courses(dfr_Map, dfr_Truth, rng, noise, arr_Time):
+    """
+    Returns numpy array (wells, time points) with signals of a rate
+    assay. The amplitude b of each well is lowered by the inhibition.
+    """
+    int_Wells = dfr_Map.shape[0]
+    arr_y0 = np.full(int_Wells, 5000.0)
+    arr_b = np.full(int_Wells, 10000.0)
+    arr_t0 = np.full(int_Wells, 600.0)
+    arr_Samples = (dfr_Map["Sample"] >= 0).to_numpy()
+    dfr_Wells = dfr_Truth.set_index("Sample").loc[dfr_Map["Sample"][arr_Samples]]
+    arr_y0[arr_Samples] = dfr_Wells["y0"].to_numpy()
+    arr_b[arr_Samples] = dfr_Wells["b"].to_numpy()
+    arr_t0[arr_Samples] = dfr_Wells["t0"].to_numpy()
+    arr_b = arr_b * (1 - inhibition(dfr_Map, dfr_Truth) / 100)
+    arr_Signal = logMM(arr_Time[np.newaxis,:], arr_y0[:,np.newaxis], arr_b[:,np.newaxis],
+                       arr_t0[:,np.newaxis])
+    return arr_Signal + rng.normal(0, noise * 10000.0, arr_Signal.shape)
+
+def capillary_scans(dfr_Truth, rng, noise, arr_Temp):
+    """
+    Returns dictionary of numpy arrays (capillaries, temperatures) for
+    the readouts of a Prometheus: "Ratio", "330nm", "350nm" and
+    "Scattering". One capillary per sample.
+    """
+    arr_Tm = dfr_Truth["Tm"].to_numpy()[:,np.newaxis]
+    arr_Slope = dfr_Truth["Slope"].to_numpy()[:,np.newaxis]
+    arr_T = arr_Temp[np.newaxis,:]
+    dic_Scans = {"330nm":boltzmann(arr_T, arr_Tm, 9000, 7000, arr_Slope),
+                 "350nm":boltzmann(arr_T, arr_Tm, 5200, 5600, arr_Slope)}
+    dic_Scans["Ratio"] = dic_Scans["350nm"] / dic_Scans["330nm"]
+    # Aggregation some degrees after unfolding
+    dic_Scans["Scattering"] = boltzmann(arr_T, arr_Tm + 4, 100, 1500, arr_Slope)
+    for str_Scan in dic_Scans.keys():
+        flt_Window = np.ptp(dic_Scans[str_Scan])
+        dic_Scans[str_Scan] = dic_Scans[str_Scan] + rng.normal(0, noise * flt_Window,
+                                                               dic_Scans[str_Scan].shape)
+    return dic_Scans
+
+##########################################################################
+##                                                                      ##
+##    Writers                                                           ##
+##                                                                      ##
+##########################################################################
+
+def write_echo_transfer(lst_Maps, lst_Truths, wells, str_Path):
+    """
+    Writes an Echo transfer file for all plates. Controls have "Control"
+    as sample ID and name, solvent references have neither.
+
+    Arguments:
+        lst_Maps -> list of pandas dataframes, one per plate. See
+                    plate_map.
+        lst_Truths -> list of pandas dataframes, one per plate. See
+                      ground_truth.
+        wells -> integer. Plate format.
+        str_Path -> string. Path of the file.
+    """
+    lst_Columns = ["Source Plate Name","Source Plate Barcode","Source Plate Type","Source Well",
+                   "Source Concentration","Source Concentration Units","Destination Plate Name",
+                   "Destination Plate Barcode","Destination Plate Type","Destination Well",
+                   "Destination Concentration","Destination Concentration Units","Sample ID",
+                   "Sample Name","Transfer Volume","Actual Volume","Current Fluid Volume",
+                   "Fluid Composition","Fluid Units","Fluid Type","Transfer Status"]
+    str_Type = {96:"Greiner_96PP", 384:"Proxiplate_384PS", 1536:"Corning_1536"}[wells]
+    lst_Frames = []
+    for plate, (dfr_Map, dfr_Truth) in enumerate(zip(lst_Maps, lst_Truths)):
+        dfr_Wells = dfr_Map[dfr_Map["WellType"] != "na"]
+        arr_Samples = dfr_Wells["Sample"].to_numpy()
+        arr_IDs = np.where(arr_Samples >= 0,
+                           dfr_Truth["SampleID"].to_numpy()[np.clip(arr_Samples, 0, None)],
+                           "").astype(object)
+        arr_IDs[(dfr_Wells["WellType"] == "c").to_numpy()] = "Control"
+        arr_IDs[(dfr_Wells["WellType"] == "r").to_numpy()] = np.nan
+        arr_Conc = dfr_Wells["Concentration"].to_numpy()
+        # Controls get the highest concentration, solvent wells the
+        # same volume of DMSO
+        arr_Volume = np.where(np.isnan(arr_Conc), np.nanmax(arr_Conc),
+                              arr_Conc) * ASSAYVOLUME / SOURCECONC * 1e9
+        lst_Frames.append(pd.DataFrame({"Source Plate Name":"Source Plate[1]",
+            "Source Plate Barcode":"Barcode",
+            "Source Plate Type":"384LDV_DMSO",
+            "Source Well":[echo_well(smpl % 384, 384) if smpl >= 0 else "P24"
+                           for smpl in arr_Samples],
+            "Source Concentration":SOURCECONC,
+            "Source Concentration Units":"M",
+            "Destination Plate Name":destination(plate),
+            "Destination Plate Barcode":"",
+            "Destination Plate Type":str_Type,
+            "Destination Well":dfr_Wells["Well"].to_numpy(),
+            "Destination Concentration":arr_Conc,
+            "Destination Concentration Units":"M",
+            "Sample ID":arr_IDs,
+            "Sample Name":arr_IDs,
+            "Transfer Volume":np.round(arr_Volume, 2),
+            "Actual Volume":np.round(arr_Volume, 2),
+            "Current Fluid Volume":8.5,
+            "Fluid Composition":74.51,
+            "Fluid Units":"Percent",
+            "Fluid Type":"DMSO",
+            "Transfer Status":""}, columns = lst_Columns))
+    str_Padding = "," * (len(lst_Columns) - 2)
+    with open(str_Path, "w", newline = "") as file:
+        for str_Key, str_Value in [("Run ID","1"),
+                                   ("Run Date/Time",datetime.now().strftime("%d.%m.%Y %H:%M")),
+                                   ("Application Name","Labcyte Echo Dose-Response"),
+                                   ("Application Version","01.05.2007"),
+                                   ("Protocol Name","Synthetic.edr"),
+                                   ("User Name","BBQ")]:
+            file.write(str_Key + "," + str_Value + str_Padding + "\n")
+        file.write("," + str_Padding + "\n")
+        file.write("[DETAILS]," + str_Padding + "\n")
+        pd.concat(lst_Frames, ignore_index = True).to_csv(file, index = False)
+
+def write_bmg_plate(arr_Readings, wells, str_Path, assaytype = "HTRF"):
+    """
+    Writes one plate in BMG PheraStar plate format (tab delimited text
+    with .xls extension). For HTRF, channels A and B are written as well
+    as the ratio the reader uses.
+
+    Arguments:
+        arr_Readings -> numpy array with one reading per well.
+        wells -> integer. Plate format.
+        str_Path -> string. Path of the file.
+        assaytype -> string. "HTRF" or "AlphaScreen".
+    """
+    int_Columns = pf.plate_columns(wells)
+    arr_Plate = np.asarray(arr_Readings).reshape(pf.plate_rows(wells), int_Columns)
+    lst_Lines = [f"Testname: {assaytype} Plate",
+                 "Date: " + datetime.now().strftime("%d/%m/%Y  Time: %H:%M:%S"),
+                 "ID1: SYNTHETIC  ID2: 1  ID3: "]
+    def block(arr_Values):
+        lst_Block = ["\t".join(str(col+1) for col in range(int_Columns))]
+        for row in range(arr_Values.shape[0]):
+            lst_Block.append(row_label(row) + "\t" + "\t".join(str(int(round(value)))
+                                                              for value in arr_Values[row]))
+        return lst_Block
+    if assaytype == "HTRF":
+        lst_Lines += ["No. of Channels / Multichromatics: 3", "No. of Cycles: 1", ""]
+        # Acceptor channel carries the signal, donor channel is constant
+        arr_Donor = np.full(arr_Plate.shape, 20000.0)
+        lst_Lines += ["Chromatic / Channel: 1A", "Cycle: 1"] + block(arr_Plate * 2)
+        lst_Lines += ["", "Chromatic / Channel: 1B", "Cycle: 1"] + block(arr_Donor)
+        lst_Lines += ["", "Chromatic / Channel: 1/Ratio channel A / B", "Cycle: 1"] + block(arr_Plate)
+    else:
+        lst_Lines += ["No. of Channels / Multichromatics: 1", "No. of Cycles: 1", ""]
+        lst_Lines += block(arr_Plate)[1:]
+    with open(str_Path, "w") as file:
+        file.write("\n".join(lst_Lines) + "\n")
+
+def write_bmg_list(lst_Readings, wells, str_Path):
+    """
+    Writes several plates in BMG PheraStar list format: one line per
+    well, "<plate>: <well>" and the reading, tab delimited.
+
+    Arguments:
+        lst_Readings -> list of numpy arrays, one per plate, with one
+                        reading per well.
+    """
+    lst_Wells = [echo_well(idx, wells) for idx in range(wells)]
+    with open(str_Path, "w") as file:
+        for plate, arr_Readings in enumerate(lst_Readings):
+            file.write("".join(f"{destination(plate)}: {well}\t{int(round(value))}\n"
+                               for well, value in zip(lst_Wells, arr_Readings)))
+
+def write_lightcycler(dfr_Map, lst_Names, arr_Temp, arr_Fluo, str_Path):
+    """
+    Writes one plate in Roche LightCycler 480 text export format.
+
+    Arguments:
+        dfr_Map -> pandas dataframe. See plate_map.
+        lst_Names -> list of unique well names. See well_names.
+        arr_Temp -> numpy array of temperatures.
+        arr_Fluo -> numpy array (wells, temperatures).
+        str_Path -> string. Path of the file.
+    """
+    arr_Time = 11240 + np.arange(len(arr_Temp)) * 1270
+    with open(str_Path, "w") as file:
+        file.write("Raw Data \t\tExperiment - Synthetic (Run on LCS480 1.5.1.62)\n")
+        file.write("SamplePos\tSampleName\tProg#\tSeg#\tCycle#\tTime\tTemp\t465-580\t\n")
+        for well in dfr_Map.index:
+            str_Well = dfr_Map.loc[well,"Well"]
+            str_Name = lst_Names[well]
+            file.write("".join(f"{str_Well}\t{str_Name}\t1\t2\t1\t{time}\t{temp:.2f}\t{fluo:.2f}\n"
+                               for time, temp, fluo in zip(arr_Time, arr_Temp, arr_Fluo[well])))
+
+def write_quantstudio(dfr_Map, arr_Temp, arr_Fluo, str_Path):
+    """
+    Writes one plate in QuantStudio 7 melt curve export format (Excel
+    workbook with worksheet "Melt Curve Raw Data").
+    """
+    from openpyxl import Workbook
+    wbk_Export = Workbook(write_only = True)
+    wks_Raw = wbk_Export.create_sheet("Melt Curve Raw Data")
+    for str_Key, str_Value in [("Block Type","384-Well Block"),
+                               ("Chemistry","OTHER"),
+                               ("Date Created",datetime.now().strftime("%d-%m-%Y %H:%M:%S")),
+                               ("Experiment Name","Synthetic")]:
+        wks_Raw.append([str_Key, str_Value])
+    wks_Raw.append([])
+    wks_Raw.append(["Well Position","Temperature","Fluorescence","Derivative"])
+    for well in dfr_Map.index:
+        str_Well = dfr_Map.loc[well,"Well"]
+        arr_Deriv = np.gradient(arr_Fluo[well], arr_Temp)
+        for temp, fluo, deriv in zip(arr_Temp, arr_Fluo[well], arr_Deriv):
+            wks_Raw.append([str_Well, float(temp), float(fluo), float(deriv)])
+    wbk_Export.save(str_Path)
+
+def write_bmg_timecourse(arr_Signal, str_Path):
+    """
+    Writes one 384 well plate as BMG PheraStar time course: one plate
+    shaped table per cycle.
+
+    Arguments:
+        arr_Signal -> numpy array (384 wells, cycles).
+    """
+    int_Columns = pf.plate_columns(384)
+    int_Cycles = arr_Signal.shape[1]
+    lst_Lines = ["Testname: SYNTHETIC_RATE",
+                 "Date: " + datetime.now().strftime("%d/%m/%Y  Time: %H:%M:%S"),
+                 "ID1: SYNTHETIC  ID2: BBQ  ID3: ",
+                 "No. of Channels / Multichromatics: 1",
+                 f"No. of Cycles: {int_Cycles}",
+                 "Configuration: Fluorescence"]
+    str_Header = "\t".join(f"{col+1:>8}" for col in range(int_Columns))
+    for cycle in range(int_Cycles):
+        arr_Plate = arr_Signal[:,cycle].reshape(pf.plate_rows(384), int_Columns)
+        lst_Lines += ["", "Chromatic: 1", f"Cycle: {cycle+1}",
+                      f"Time [s]: {(cycle+1) * CYCLETIME}", str_Header]
+        for row in range(arr_Plate.shape[0]):
+            lst_Lines.append(row_label(row) + "\t" + "\t".join(f"{int(round(value)):>8}"
+                                                              for value in arr_Plate[row]))
+    with open(str_Path, "w") as file:
+        file.write("\n".join(lst_Lines) + "\n")
+
+def write_prometheus(dfr_Truth, arr_Temp, dic_Scans, str_Path):
+    """
+    Writes a NanoTemper Prometheus export (Excel workbook with worksheets
+    "Overview", "Ratio", "330nm", "350nm" and "Scattering"). Each
+    capillary has three columns per readout: time, temperature and
+    reading.
+    """
+    from openpyxl import Workbook
+    arr_Time = (arr_Temp - arr_Temp[0]) * 60
+    wbk_Export = Workbook(write_only = True)
+    wks_Overview = wbk_Export.create_sheet("Overview")
+    wks_Overview.append(["Capillary","Sample ID","Start Temperature","End Temperature",
+                         "Temperature Slope"])
+    for cap in dfr_Truth.index:
+        wks_Overview.append([cap+1, dfr_Truth.loc[cap,"SampleID"], float(arr_Temp[0]),
+                             float(arr_Temp[-1]), 1])
+    dic_Units = {"Ratio":"Ratio of Integrated Fluorescence at 350nm/330nm [-]",
+                 "330nm":"Integrated Fluorescence at 330nm [-]",
+                 "350nm":"Integrated Fluorescence at 350nm [-]",
+                 "Scattering":"Scattering [-]"}
+    for str_Scan in ["Ratio","330nm","350nm","Scattering"]:
+        wks_Scan = wbk_Export.create_sheet(str_Scan)
+        lst_Names = []
+        lst_Units = []
+        for cap in dfr_Truth.index:
+            lst_Names += [f"Capillary #{cap+1} ({dfr_Truth.loc[cap,'SampleID']})"] * 3
+            lst_Units += ["Time [s]", "Temperature [°C]", dic_Units[str_Scan]]
+        wks_Scan.append(lst_Names)
+        wks_Scan.append(lst_Units)
+        arr_Scan = dic_Scans[str_Scan]
+        for point in range(len(arr_Temp)):
+            lst_Row = []
+            for cap in range(arr_Scan.shape[0]):
+                lst_Row += [float(arr_Time[point]), float(arr_Temp[point]),
+                            float(arr_Scan[cap,point])]
+            wks_Scan.append(lst_Row)
+    wbk_Export.save(str_Path)
+
+def write_operetta(arr_Readings, wells, str_Path,
+                   feature = "Nuclei Selected - Number of Objects"):
+    """
+    Writes one plate as Columbus export of an Operetta: tab delimited,
+    one line per well.
+    """
+    arr_Index = np.arange(wells)
+    int_Columns = pf.plate_columns(wells)
+    pd.DataFrame({"Row":arr_Index // int_Columns + 1,
+                  "Column":arr_Index % int_Columns + 1,
+                  "Plane":1,
+                  "Timepoint":0,
+                  "Number of Analyzed Fields":9,
+                  feature:np.clip(np.round(arr_Readings), 0, None).astype(int)}).to_csv(
+                      str_Path, sep = "\t", index = False)
+
+def write_layout(lst_Maps, wells, str_Path, plateid = "X999A"):
+    """
+    Writes a plate layout file (.plf) matching the plate maps: one protein
+    in every used well, controls, solvent references and sample wells.
+
+    Returns True on success.
+    """
+    model = lm.LayoutModel(wells, plates = len(lst_Maps), plateid = plateid)
+    for plate, dfr_Map in enumerate(lst_Maps):
+        model.set_table(plate, "Protein", [{"ID":"Protein 1", "Concentration":"10", "ZPrime":False}])
+        model.set_table(plate, "Control", [{"ID":"Control 1", "Concentration":"10", "ZPrime":True}])
+        model.set_table(plate, "Reference", [{"ID":"DMSO", "Concentration":"", "ZPrime":False}])
+        for str_Type in ["s","c","r"]:
+            arr_Wells = np.flatnonzero((dfr_Map["WellType"] == str_Type).to_numpy())
+            model.set_welltype(plate, arr_Wells, str_Type, numerical = 0)
+        arr_Used = np.flatnonzero((dfr_Map["WellType"] != "na").to_numpy())
+        model.set_numerical(plate, arr_Used, "Protein", 0)
+    return model.export_plf(str_Path)
+
+##########################################################################
+##                                                                      ##
+##    Generator                                                         ##
+##                                                                      ##
+##########################################################################
+
+def generate(str_Directory, assay = "dose_response", plates = 1, wells = 384,
+             concentrations = 8, replicates = 1, samples = None, noise = 0.05,
+             reader = None, seed = 0):
+    """
+    Writes a complete synthetic data set into a directory.
+
+    Arguments:
+        str_Directory -> string. Gets created if it does not exist.
+        assay -> string. "dose_response", "single_dose", "thermal_shift",
+                 "rate", "nanoDSF" or "high_content".
+        plates -> integer. Number of plates (nanoDSF: capillary sets
+                  of up to 48 capillaries).
+        wells -> integer. Plate format: 96, 384 or 1536.
+        concentrations -> integer. Concentrations per sample. Single dose,
+                          thermal shift and nanoDSF use one.
+        replicates -> integer. Wells per concentration.
+        samples -> integer or None. Samples per plate, None fills the
+                   plates.
+        noise -> float. Standard deviation of the noise as fraction of
+                 the assay window.
+        reader -> string or None. Thermal shift only: "LightCycler" or
+                  "QuantStudio". None picks the LightCycler.
+        seed -> integer. Seed of the random number generator.
+
+    Returns dictionary with the paths of the files written: "Transfer",
+    "Layout" (or None), "Data" (list) and "GroundTruth".
+    """
+    if not wells in [96, 384, 1536]:
+        raise ValueError(f"Unsupported plate format: {wells}")
+    if assay == "rate" and not wells == 384:
+        raise ValueError("BMG time courses are read as 384 well plates")
+    if assay == "thermal_shift" and wells == 1536:
+        raise ValueError("Thermal shift readers take 96 or 384 well plates")
+    if not assay in ["dose_response","single_dose","thermal_shift","rate","nanoDSF","high_content"]:
+        raise ValueError(f"Unknown assay: {assay}")
+    if reader is None:
+        reader = "LightCycler"
+    if assay in ["single_dose","thermal_shift","nanoDSF"]:
+        concentrations = 1
+    os.makedirs(str_Directory, exist_ok = True)
+    rng = np.random.default_rng(seed)
+    dic_Files = {"Transfer":os.path.join(str_Directory, "TransferFile.csv"),
+                 "Layout":None, "Data":[],
+                 "GroundTruth":os.path.join(str_Directory, "GroundTruth.csv")}
+
+    if assay == "nanoDSF":
+        # No transfer file, capillaries are named after the samples
+        int_Capillaries = 48 if samples is None else min(samples, 48)
+        dic_Files["Transfer"] = None
+        arr_Temp = np.round(np.arange(20, 95.001, 0.1), 2)
+        lst_Truths = []
+        for plate in range(plates):
+            dfr_Truth = ground_truth(pd.DataFrame({"Sample":range(int_Capillaries)}), plate,
+                                     rng, plate * int_Capillaries)
+            str_Path = os.path.join(str_Directory, f"Prometheus_{plate+1:03d}.xlsx")
+            write_prometheus(dfr_Truth, arr_Temp, capillary_scans(dfr_Truth, rng, noise, arr_Temp),
+                             str_Path)
+            dic_Files["Data"].append(str_Path)
+            lst_Truths.append(dfr_Truth)
+        pd.concat(lst_Truths, ignore_index = True).to_csv(dic_Files["GroundTruth"], index = False)
+        return dic_Files
+
+    lst_Maps = []
+    lst_Truths = []
+    int_First = 0
+    for plate in range(plates):
+        dfr_Map = plate_map(wells, concentrations, replicates, samples)
+        dfr_Truth = ground_truth(dfr_Map, plate, rng, int_First)
+        int_First += dfr_Truth.shape[0]
+        lst_Maps.append(dfr_Map)
+        lst_Truths.append(dfr_Truth)
+    write_echo_transfer(lst_Maps, lst_Truths, wells, dic_Files["Transfer"])
+    pd.concat(lst_Truths, ignore_index = True).to_csv(dic_Files["GroundTruth"], index = False)
+
+    if assay == "single_dose":
+        str_Path = os.path.join(str_Directory, "RawData.txt")
+        write_bmg_list([endpoint_readings(dfr_Map, dfr_Truth, rng, noise)
+                        for dfr_Map, dfr_Truth in zip(lst_Maps, lst_Truths)], wells, str_Path)
+        dic_Files["Data"].append(str_Path)
+        return dic_Files
+
+    if assay == "thermal_shift":
+        # LightCycler steps are about 0.3 degrees, the QuantStudio's finer
+        if reader == "QuantStudio":
+            arr_Temp = np.round(np.linspace(25, 95, 700), 3)
+        else:
+            arr_Temp = np.round(np.arange(25, 95.001, 0.3), 2)
+        dic_Files["Layout"] = os.path.join(str_Directory, "Layout.plf")
+        write_layout(lst_Maps, wells, dic_Files["Layout"])
+
+    for plate, (dfr_Map, dfr_Truth) in enumerate(zip(lst_Maps, lst_Truths)):
+        if assay == "dose_response":
+            str_Path = os.path.join(str_Directory, f"RawData_Plate_{plate+1:03d}.xls")
+            write_bmg_plate(endpoint_readings(dfr_Map, dfr_Truth, rng, noise), wells, str_Path)
+        elif assay == "high_content":
+            str_Path = os.path.join(str_Directory, f"Operetta_Plate_{plate+1:03d}.txt")
+            write_operetta(endpoint_readings(dfr_Map, dfr_Truth, rng, noise, 2000.0, 200.0),
+                           wells, str_Path)
+        elif assay == "thermal_shift":
+            arr_Fluo = melt_curves(dfr_Map, dfr_Truth, rng, noise, arr_Temp)
+            if reader == "QuantStudio":
+                str_Path = os.path.join(str_Directory, f"QuantStudio_Plate_{plate+1:03d}.xlsx")
+                write_quantstudio(dfr_Map, arr_Temp, arr_Fluo, str_Path)
+            else:
+                str_Path = os.path.join(str_Directory, f"LightCycler_Plate_{plate+1:03d}.txt")
+                write_lightcycler(dfr_Map, well_names(dfr_Map, dfr_Truth), arr_Temp, arr_Fluo,
+                                  str_Path)
+        elif assay == "rate":
+            arr_Time = np.arange(1, 121) * CYCLETIME
+            str_Path = os.path.join(str_Directory, f"RawData_Plate_{plate+1:03d}.xls")
+            write_bmg_timecourse(time_courses(dfr_Map, dfr_Truth, rng, noise, arr_Time), str_Path)
+        dic_Files["Data"].append(str_Path)
+    return dic_Files
@@ -34,6 +34,11 @@ import lib_customplots as cp
 import lib_custombuttons as btn
 import lib_platefunctions as pf
 import lib_platelayoutmenus as plm
+import lib_tracing as trace
+import lib_progresschannel as pch
+import lib_watchfolder as wf
+import lib_export as exp
+import lib_exporttemplates as et
 
 import wx
 import pandas as pd
@@ -1450,6 +1455,14 @@ class FileSelection(wx.Panel):
         self.lbc_Data.InsertColumn(1,"Wells")
         self.lbc_Data.SetColumnWidth(1, 50)
         self.szr_Data.Add(self.lbc_Data, 0, wx.ALL, 5)
+        self.watcher = None
+        if whattopick == "directory":
+            self.chk_Watch = wx.CheckBox(self.pnl_Data,
+                                         label = u"Watch directory: assign and process new data files as they arrive")
+            self.chk_Watch.SetValue(False)
+            self.szr_Data.Add(self.chk_Watch, 0, wx.ALL, 5)
+            self.chk_Watch.Bind(wx.EVT_CHECKBOX, self.toggle_watch)
+            self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
         self.pnl_Data.SetSizer(self.szr_Data)
         self.pnl_Data.Layout()
         self.szr_Assignment.Add(self.pnl_Data, 0, wx.ALL, 5)
@@ -1594,6 +1607,139 @@ class FileSelection(wx.Panel):
                 for i in range(len(lst_Plates)):
                     self.lbc_Data.InsertItem(i,str(lst_Plates[i]))
 
+    def toggle_watch(self, event):
+        """
+        Event handler. Starts or stops watching the raw data directory.
+        """
+        if self.chk_Watch.GetValue() == True:
+            if self.start_watch() == False:
+                self.chk_Watch.SetValue(False)
+        else:
+            self.stop_watch()
+
+    def start_watch(self):
+        """
+        Starts a lib_watchfolder.FolderWatcher on the raw data directory.
+        Files already in the directory are left to be assigned by hand.
+
+        Returns True if watching started.
+        """
+        datapath = self.tabname.paths.get("Data", "")
+        if datapath in ("", None) or not os.path.isdir(datapath):
+            msg.warn_directory_not_found()
+            return False
+        self.stop_watch()
+        self.watcher = wf.FolderWatcher(datapath,
+                                        self.tabname.details["DataFileExtension"],
+                                        self.on_watched_file,
+                                        ignore = os.listdir(datapath))
+        self.watcher.start()
+        return True
+
+    def stop_watch(self):
+        """
+        Stops watching the raw data directory.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def on_destroy(self, event):
+        """
+        Event handler. Stops watching the raw data directory when the
+        project gets closed.
+        """
+        if event.GetEventObject() is self:
+            self.stop_watch()
+        event.Skip()
+
+    def unassigned_entries(self):
+        """
+        Returns dictionary of transfer file entries without a data file
+        and their plate format.
+        """
+        dic_Entries = {}
+        for i in range(self.lbc_Transfer.GetItemCount()):
+            if self.lbc_Transfer.GetItemText(i,2) == "":
+                dic_Entries[self.lbc_Transfer.GetItemText(i,0)] = self.lbc_Transfer.GetItemText(i,1)
+        return dic_Entries
+
+    def on_watched_file(self, str_FilePath):
+        """
+        Gets called from the watcher thread for each new, complete data
+        file. Matching and list updates happen on the main thread, the
+        plate itself gets processed in the watcher thread so that plates
+        are processed one after the other and the GUI stays responsive.
+        """
+        str_File = os.path.basename(str_FilePath)
+        # List controls must only be read on the main thread, wait for it.
+        evt_Done = threading.Event()
+        dic_Result = {}
+        def assign():
+            try:
+                if not self:
+                    # Project has been closed
+                    return None
+                dic_Entries = self.unassigned_entries()
+                entry = wf.match_datafile(str_File, list(dic_Entries.keys()))
+                if entry is None:
+                    self.lbc_Data.InsertItem(self.lbc_Data.GetItemCount(), str_File)
+                else:
+                    self.assign_watched(entry, str_File)
+                    dic_Result["Entry"] = entry
+                    dic_Result["Wells"] = dic_Entries[entry]
+                    # Row of the plate in the plate assignment and layout
+                    dfr_Assignment = self.tabname.dfr_PlateAssignment
+                    dic_Result["Plate"] = dfr_Assignment[dfr_Assignment["TransferEntry"] == entry].index[0]
+            finally:
+                evt_Done.set()
+        wx.CallAfter(assign)
+        evt_Done.wait()
+        if not "Entry" in dic_Result:
+            return None
+        if not (self.tabname.bol_TransferLoaded == True and self.tabname.bol_LayoutDefined == True):
+            # Nothing to process against yet, the plate has been assigned.
+            return None
+        with trace.span("watch", plate = dic_Result["Entry"], datafile = str_File):
+            dic_Row = df.process_plate(self.tabname, dic_Result["Entry"], str_File,
+                                       int(dic_Result["Wells"]), dic_Result["Plate"], None)
+        if dic_Row is None:
+            # Message boxes must only be shown on the main thread
+            wx.CallAfter(msg.warn_not_datafile)
+        else:
+            wx.CallAfter(self.watched_plate_processed, dic_Row)
+
+    def assign_watched(self, entry, str_File):
+        """
+        Writes a data file into the transfer file list control for the
+        given entry, as assign_plate does for a manual assignment.
+        """
+        for i in range(self.lbc_Transfer.GetItemCount()):
+            if self.lbc_Transfer.GetItemText(i,0) == entry:
+                self.lbc_Transfer.SetItem(i,2,str_File)
+                break
+        self.tabname.bol_DataFilesAssigned = True
+        self.tabname.bol_DataFilesUpdated = True
+        self.update_plate_assignment()
+
+    def watched_plate_processed(self, dic_Row):
+        """
+        Adds a plate from watch mode to the container and updates tabs.
+        The project's layout stays as it is: new plates find their
+        layout by their row in the plate assignment.
+        """
+        if not self:
+            # Project has been closed while the plate was processed.
+            return None
+        df.append_plate(self.tabname, dic_Row)
+        self.tabname.bol_DataAnalysed = True
+        if hasattr(self.tabname, "tab_Review") == True:
+            self.tabname.tab_Review.populate(noreturn = True)
+            self.tabname.bol_ReviewsDrawn = True
+        self.tabname.bol_ResultsDrawn = False
+        self.tabname.bol_ELNPlotsDrawn = False
+        self.tabname.bol_ExportPopulated = False
+
     def OnUpdateTransfer(self,event):
         """
         Event handler. Gets called when transfer file is updated. 
@@ -2547,11 +2693,14 @@ class ExportTable(wx.Panel):
             # Check if str_SavePath ends in .csv. If so, remove
             if str_SavePath[-1:-5] == ".xlsx":
                 str_SavePath = str_SavePath[:len(str_SavePath)]
-            try:
-                self.tabname.dfr_Database.to_excel(str_SavePath)
-                msg.info_save_success()
-            except PermissionError:
-                msg.warn_permission_denied()
+            # Offer one worksheet per plate if the table has a plate column
+            str_SplitBy = None
+            for col in self.tabname.dfr_Database.columns:
+                if "plate" in str(col).lower():
+                    if msg.query_split_by_plate() == True:
+                        str_SplitBy = col
+                    break
+            self.run_export(exp.write_excel, str_SavePath, str_SplitBy = str_SplitBy)
 
     def export_to_csv(self, event = None):
         """
@@ -2565,11 +2714,66 @@ class ExportTable(wx.Panel):
             # Check if str_SavePath ends in .csv. If so, remove
             if str_SavePath[-1:-5] == ".csv":
                 str_SavePath = str_SavePath[:len(str_SavePath)]
-            try:
-                self.tabname.dfr_Database.to_csv(str_SavePath)
-                msg.info_save_success()
-            except PermissionError:
+            self.run_export(exp.write_csv, str_SavePath)
+
+    def run_export(self, function, str_SavePath, **kwargs):
+        """
+        Writes dfr_Database to file on a worker thread while showing a
+        progress dialog that allows cancelling the export. The dialog
+        gets updated from the job's progress channel on a timer (see
+        on_export_timer), the job reports back through export_finished.
+
+        Arguments:
+            function -> function. lib_export.write_excel or write_csv.
+            str_SavePath -> string. Destination file.
+            kwargs -> further keyword arguments for function.
+        """
+        self.int_ExportRows = max(1, self.tabname.dfr_Database.shape[0])
+        self.int_ExportDone = 0
+        self.export_channel = pch.ProgressChannel()
+        self.export_job = exp.ExportJob(function, self.tabname.dfr_Database, str_SavePath,
+                                        self.export_channel,
+                                        on_finished = lambda job: wx.CallAfter(self.export_finished, job),
+                                        **kwargs)
+        self.dlg_Export = wx.ProgressDialog(title = u"Exporting",
+                                            message = u"Writing results table.",
+                                            maximum = self.int_ExportRows,
+                                            parent = self,
+                                            style = wx.PD_APP_MODAL|wx.PD_AUTO_HIDE|wx.PD_CAN_ABORT)
+        self.tmr_Export = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_export_timer, self.tmr_Export)
+        self.tmr_Export.Start(int(1000/pch.FRAMERATE))
+        self.export_job.start()
+
+    def on_export_timer(self, event):
+        """
+        Event handler. Draws the export's progress since the last frame
+        and passes "Cancel" on to the export job.
+        """
+        for evt in self.export_channel.drain():
+            if evt.kind == pch.COUNT:
+                self.int_ExportDone = evt.current
+        if self.dlg_Export.Update(min(self.int_ExportDone, self.int_ExportRows - 1))[0] == False:
+            self.export_job.cancel()
+
+    def export_finished(self, job):
+        """
+        Gets called on the main thread once the export job has finished.
+        Closes the progress dialog and reports the outcome.
+        """
+        if not self:
+            # Project has been closed during the export
+            return None
+        self.tmr_Export.Stop()
+        self.Unbind(wx.EVT_TIMER, handler = self.on_export_timer, source = self.tmr_Export)
+        self.dlg_Export.Destroy()
+        if job.status == "done":
+            msg.info_save_success()
+        elif job.status == "failed":
+            if isinstance(job.error, PermissionError):
                 msg.warn_permission_denied()
+            else:
+                msg.warn_export_failure(job.error)
 
     def upload_to_db(self,
                      event = None,
@@ -2626,7 +2830,7 @@ class ExportTable(wx.Panel):
         self.dlg_progress.Pulse()
         thd_verifying = threading.Thread(target = self.tabname.db_df_verify,
                                          args = (self,
-                                                 self.tabname.parent.db_connection.conn,
+                                                 self.tabname.parent.db_connection.pool,
                                                  db_table,
                                                  db_dependencies,
                                                  uploadafter,),
@@ -2668,7 +2872,7 @@ class ExportTable(wx.Panel):
             self.dlg_progress.Pulse()
             thd_uploading = threading.Thread(target = self.tabname.db_upload,
                                              args = (self,
-                                                     self.tabname.parent.db_connection.conn,
+                                                     self.tabname.parent.db_connection.pool,
                                                      db_table),
                                              daemon = True)
             thd_uploading.start()
@@ -2678,7 +2882,7 @@ class ExportTable(wx.Panel):
                                      newmsg = u"Uploading records into database. This may take a while.")
             self.dlg_progress.Pulse()
             self.tabname.db_upload(self,
-                                   self.tabname.parent.db_connection.conn,
+                                   self.tabname.parent.db_connection.pool,
                                    db_table)
 
     def uploaded(self, upload):
@@ -2708,68 +2912,7 @@ class ExportTable(wx.Panel):
         specific customer.
         """
 
-        Date = datetime.now()
-
-        lst_Minima = []
-        lst_Maxima = []
-        lst_pEC50 = []
-        lst_Span = []
-        lst_ZPrimeMean = []
-        lst_ZPrimeRobust = []
-        lst_BufferToControl = []
-        lst_DmsoToControl = []
-        lst_Concentration = []
-        lst_Empty = []
-        lst_Comment = []
-        lst_Validation = []
-        lst_Date = []
-        for smpl in self.tabname.dfr_Database.index:
-            lst_Inhibitions = [self.tabname.dfr_Database.iloc[smpl,28],
-                               self.tabname.dfr_Database.iloc[smpl,31],
-                               self.tabname.dfr_Database.iloc[smpl,34],
-                               self.tabname.dfr_Database.iloc[smpl,37],
-                               self.tabname.dfr_Database.iloc[smpl,40],
-                               self.tabname.dfr_Database.iloc[smpl,43],
-                               self.tabname.dfr_Database.iloc[smpl,46],
-                               self.tabname.dfr_Database.iloc[smpl,49],
-                               self.tabname.dfr_Database.iloc[smpl,52],
-                               self.tabname.dfr_Database.iloc[smpl,55],
-                               self.tabname.dfr_Database.iloc[smpl,58],
-                               self.tabname.dfr_Database.iloc[smpl,61],
-                               self.tabname.dfr_Database.iloc[smpl,64],
-                               self.tabname.dfr_Database.iloc[smpl,67],
-                               self.tabname.dfr_Database.iloc[smpl,70],
-                               self.tabname.dfr_Database.iloc[smpl,73]]
-            for inh in range(len(lst_Inhibitions)):
-                if lst_Inhibitions[inh] == "":
-                    lst_Inhibitions[inh] = np.nan
-            lst_Minima.append(np.nanmin(lst_Inhibitions))
-            lst_Maxima.append(np.nanmax(lst_Inhibitions))
-            lst_pEC50.append((-1)*self.tabname.dfr_Database.iloc[smpl,13])
-            lst_Span.append(float(self.tabname.dfr_Database.iloc[smpl,21]) - float(self.tabname.dfr_Database.iloc[smpl,20]))
-            lst_Concentration.append(self.tabname.dfr_Database.iloc[smpl,27])
-            lst_ZPrimeMean.append(self.tabname.dfr_Database.iloc[smpl,79])
-            lst_ZPrimeRobust.append(self.tabname.dfr_Database.iloc[smpl,80])
-            lst_BufferToControl.append(self.tabname.dfr_Database.iloc[smpl,81])
-            lst_DmsoToControl.append(self.tabname.dfr_Database.iloc[smpl,82])
-            lst_Empty.append("")
-            if lst_Maxima[smpl] >= 80:
-                lst_Comment.append("ACTMax >= 80%")
-                lst_Validation.append("A")
-            elif lst_Maxima[smpl] >= 50:
-                lst_Comment.append("50% =< ACTMax < 80%")
-                lst_Validation.append("A")
-            else:
-                lst_Comment.append("ACTMax < 50%")
-                lst_Validation.append("NA")
-            lst_Date.append(Date)
-
-        df = pd.DataFrame(data={"Global Compound ID":self.tabname.dfr_Database.iloc[:,4],"Purification ID":self.tabname.dfr_Database.iloc[:,1],
-            "Compound comments":lst_Concentration,"":lst_Empty,"Result_ID":lst_Empty,"Evotec Compound ID":lst_Empty,"Evotec Batch ID":lst_Empty,"Validation":lst_Validation,
-            "ACTMin":lst_Minima,"ACTMax":lst_Maxima,"Operator":lst_Empty,"EC50":self.tabname.dfr_Database.iloc[:,15],"CI-Lower":self.tabname.dfr_Database.iloc[:,17],
-            "CI-Upper":self.tabname.dfr_Database.iloc[:,16],"Operator negative":lst_Empty,"pEC50":lst_pEC50,"Bottom":self.tabname.dfr_Database.iloc[:,20],
-            "Top":self.tabname.dfr_Database.iloc[:,21],"Hill Slope":self.tabname.dfr_Database.iloc[:,18],"Span":lst_Span,"R2":self.tabname.dfr_Database.iloc[:,22],"Comment":lst_Comment,
-            "ZPrime":lst_ZPrimeMean,"ZPrimeRobust":lst_ZPrimeRobust,"BufferToControl":lst_BufferToControl,"DMSOToControl":lst_DmsoToControl,"DateOfReport":lst_Date})
+        df = et.apply_template(et.DOTMATICS, self.tabname.dfr_Database)
 
         fdlg = wx.FileDialog(self,
                              "Save results as",
@@ -2782,7 +2925,9 @@ class ExportTable(wx.Panel):
             if str_SavePath[-1:-5] == ".xlsx":
                 str_SavePath = str_SavePath[:len(str_SavePath)]
             try:
-                df.to_excel(str_SavePath)
+                with trace.span("export", "export", format = "dotmatics",
+                                rows = df.shape[0]):
+                    df.to_excel(str_SavePath)
                 bol_SaveSuccesful = True
             except PermissionError:
                 msg.warn_permission_denied()
@@ -3152,9 +3297,10 @@ def process_data(ProjectTab, dlg_progress):
     be saved to file.
     """
     time_start = perf_counter()
+    progress = pch.get_channel(dlg_progress)
     ProjectTab.details["Samples"] = 0
     ProjectTab.save_details(bol_FromTabChange=False)
-    dlg_progress.lbx_Log.InsertItems(["Assay details saved"], dlg_progress.lbx_Log.Count)
+    progress.message("Assay details saved")
     
     # Perform sequence of checks before beginning processing
     if ProjectTab.bol_TransferLoaded == False:
@@ -3177,14 +3323,14 @@ def process_data(ProjectTab, dlg_progress):
                                                   ProjectTab.paths["TransferPath"])
 
     # Build dataframe that holds everything
-    dlg_progress.lbx_Log.InsertItems(["Start creating complete container dataframe"], dlg_progress.lbx_Log.Count)
+    progress.message("Start creating complete container dataframe")
     ProjectTab.assay_data = df.complete_container(ProjectTab,
                                                   dlg_progress)
 
     # Catch any errors in processing -> df.complete_container() returns None on any errors:
     if ProjectTab.assay_data is None:
-        dlg_progress.lbx_Log.InsertItems(["==============================================================="], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems(["DATA PROCESSING CANCELLED"], dlg_progress.lbx_Log.Count)
+        progress.message("===============================================================")
+        progress.message("DATA PROCESSING CANCELLED")
         dlg_progress.btn_X.Enable(True)
         dlg_progress.btn_Close.Enable(True)
         return None
@@ -3209,25 +3355,25 @@ def process_data(ProjectTab, dlg_progress):
 
     # Populate tabs if existing and enable buttons:
     if hasattr(ProjectTab, "tab_Review") == True:
-        dlg_progress.lbx_Log.InsertItems(["Populating 'Review plates' tab"], dlg_progress.lbx_Log.Count)
+        progress.message("Populating 'Review plates' tab")
         ProjectTab.tab_Review.populate(noreturn = True)
         if hasattr(ProjectTab, "lbc_Plates") == True:
             ProjectTab.lbc_Plates.Select(0)
         ProjectTab.bol_ReviewsDrawn = True
     if hasattr(ProjectTab, "tab_Results") == True:
-        dlg_progress.lbx_Log.InsertItems(["Populating 'Results' tab"], dlg_progress.lbx_Log.Count)
+        progress.message("Populating 'Results' tab")
         ProjectTab.populate_results_tab()
         ProjectTab.bol_ResultsDrawn = True
     ProjectTab.tabs_Analysis.EnableAll(True)
     ProjectTab.tabs_Analysis.EnablePlateMap(ProjectTab.bol_PlateID)
 
     # Final entries in progress dialog:
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["==============================================================="], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems(["Data processing completed"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+    progress.message("")
+    progress.message("===============================================================")
+    progress.message("Data processing completed")
+    progress.message("")
     str_Duration = str(round(perf_counter()-time_start,0))
-    dlg_progress.lbx_Log.InsertItems(["Time elapsed: " + str_Duration + "s"], dlg_progress.lbx_Log.Count)
+    progress.message("Time elapsed: " + str_Duration + "s")
 
     # Pop up notification if neither main window nor progress dialog are active window:
     if ProjectTab.parent.IsActive() == False and dlg_progress.IsActive() == False:
@@ -0,0 +1,382 @@
+"""
+Trace store: keeps raw traces (melt curves, kinetic time courses) out of
+the python heap.
+
+Containers of the DSF, nanoDSF and rate workflows hold one or more traces
+per well or sample in cells of their dataframes. As lists of python
+floats, each value takes up more than 30 bytes and a multi-plate kinetic
+project quickly takes up all the memory of a normal workstation.
+
+The trace store keeps each trace as a numpy array. Up to a budget
+(BUDGET, in MB, or the environment variable BBQ_TRACE_BUDGET), traces stay
+in memory. Beyond that, the oldest traces get written to a memory-mapped
+file (np.memmap), one per project, and are read back from there as
+read-only array views. The operating system decides which parts of the
+file are actually held in memory, so projects larger than the available
+memory can still be processed and reviewed.
+
+Cells hold Trace objects in place of the lists. A Trace behaves like the
+list it replaces for reading: it has a length, can be indexed, sliced and
+iterated over, converted with np.array() and prints like the list (so
+saving projects to csv is unchanged). Pickling or deep-copying a Trace
+gives the list back.
+
+Nothing in here depends on wx.
+
+    Classes
+        Trace
+        TraceStore
+
+    Functions
+        get_store
+        budget
+        to_array
+        spill_frame
+        spill_container
+"""
+
+import os
+import weakref
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import lib_tracing as trace
+
+# In-memory budget in MB, per project
+BUDGET = 512
+# Shorter lists (e.g. a pair of fit window limits) stay lists
+MINLENGTH = 16
+# Offsets in the file get aligned to this many bytes
+ALIGN = 8
+
+def budget():
+    """
+    Returns in-memory budget in bytes: BBQ_TRACE_BUDGET (in MB), if set,
+    otherwise BUDGET.
+    """
+    try:
+        return int(float(os.environ.get("BBQ_TRACE_BUDGET", BUDGET)) * 1024 * 1024)
+    except ValueError:
+        return BUDGET * 1024 * 1024
+
+def get_store(ProjectTab):
+    """
+    Returns the trace store of a project, creating it if the project does
+    not have one yet.
+    """
+    store = getattr(ProjectTab, "TraceStore", None)
+    if store is None:
+        store = TraceStore()
+        ProjectTab.TraceStore = store
+    return store
+
+def to_array(value):
+    """
+    Returns value as numpy array if it is a numeric trace (list, tuple or
+    array of numbers, also nested, of at least MINLENGTH values), else
+    None.
+    """
+    if isinstance(value, Trace):
+        return None
+    if not isinstance(value, (list, tuple, np.ndarray)) or len(value) == 0:
+        return None
+    try:
+        arr_Values = np.asarray(value)
+    except (ValueError, TypeError):
+        # Ragged nested lists
+        return None
+    if not arr_Values.dtype.kind in "iuf" or arr_Values.size < MINLENGTH:
+        return None
+    return arr_Values
+
+def spill_frame(dfr_Frame, store, lst_Columns = None, dic_Seen = None):
+    """
+    Moves the numeric traces in the cells of a dataframe into the trace
+    store and replaces them with Trace objects. Changes dfr_Frame in
+    place.
+
+    Arguments:
+        dfr_Frame -> pandas dataframe.
+        store -> TraceStore.
+        lst_Columns -> list of column names or None for all columns.
+        dic_Seen -> dictionary or None. Traces already moved, by id() of
+                    the list. Cells that share one list (e.g. the time
+                    points of all samples of a plate) share one Trace.
+                    Hand the same dictionary to several calls to share
+                    traces between dataframes.
+
+    Returns number of traces moved.
+    """
+    if not isinstance(dfr_Frame, pd.DataFrame):
+        return 0
+    if lst_Columns is None:
+        lst_Columns = list(dfr_Frame.columns)
+    if dic_Seen is None:
+        dic_Seen = {}
+    int_Moved = 0
+    for col in lst_Columns:
+        if not col in dfr_Frame.columns or not dfr_Frame[col].dtype == object:
+            continue
+        lst_Values = dfr_Frame[col].tolist()
+        bol_Changed = False
+        for idx, value in enumerate(lst_Values):
+            if id(value) in dic_Seen:
+                lst_Values[idx] = dic_Seen[id(value)][1]
+                bol_Changed = True
+                continue
+            arr_Values = to_array(value)
+            if not arr_Values is None:
+                lst_Values[idx] = store.add(arr_Values)
+                # Keep the list alive, so its id() does not get reused
+                dic_Seen[id(value)] = (value, lst_Values[idx])
+                bol_Changed = True
+        if bol_Changed == True:
+            # Fill an object array one by one, otherwise numpy would
+            # unpack the traces into a 2D array
+            arr_Cells = np.empty(len(lst_Values), dtype = object)
+            for idx, value in enumerate(lst_Values):
+                arr_Cells[idx] = value
+            dfr_Frame[col] = pd.Series(arr_Cells, index = dfr_Frame.index, dtype = object)
+            int_Moved += sum(isinstance(value, Trace) for value in lst_Values)
+    return int_Moved
+
+def spill_container(assay_data, store):
+    """
+    Moves the traces of the raw and processed data of each plate of a
+    container into the trace store.
+
+    Returns number of traces moved.
+    """
+    if not isinstance(assay_data, pd.DataFrame):
+        return 0
+    int_Moved = 0
+    with trace.span("spill", "tracestore", plates = assay_data.shape[0]):
+        for plate in assay_data.index:
+            dic_Seen = {}
+            for col in ["RawData","Processed"]:
+                if col in assay_data.columns:
+                    int_Moved += spill_frame(assay_data.at[plate,col], store,
+                                             dic_Seen = dic_Seen)
+    return int_Moved
+
+class Trace:
+    """
+    Reference to one trace in a TraceStore. Read-only; to change a trace,
+    put a new list or array into the cell.
+
+    Methods:
+        array
+        tolist
+    """
+
+    __slots__ = ("store", "key", "dtype", "shape", "__weakref__")
+
+    def __init__(self, store, key, dtype, shape):
+        self.store = store
+        self.key = key
+        self.dtype = dtype
+        self.shape = shape
+
+    def array(self):
+        """
+        Returns the trace as read-only numpy array (a view into the
+        memory-mapped file, if the trace has been written to it).
+        """
+        return self.store.get(self.key)
+
+    def tolist(self):
+        """
+        Returns the trace as (nested) list of python numbers.
+        """
+        return self.array().tolist()
+
+    def __array__(self, dtype = None, copy = None):
+        arr_Values = self.array()
+        if not dtype is None:
+            return arr_Values.astype(dtype)
+        if copy == True:
+            return arr_Values.copy()
+        return arr_Values
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        return self.array()[item]
+
+    def __iter__(self):
+        return iter(self.array())
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __str__(self):
+        return str(self.tolist())
+
+    def __reduce__(self):
+        # The store belongs to the running program: pickle (autosave
+        # journal, worker processes) the values instead.
+        return (list, (self.tolist(),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+class TraceStore:
+    """
+    Numeric traces of one project, in memory up to a budget and in a
+    memory-mapped file beyond that.
+
+        store = TraceStore()
+        ref = store.add(arr_Fluorescence)   # -> Trace
+        arr_View = ref.array()              # read-only
+
+    Traces get moved to the file oldest first. The file is a temporary
+    file that gets deleted when the store is closed or garbage collected,
+    or the program exits.
+
+    Methods:
+        add
+        get
+        evict
+        write
+        view
+        usage
+        close
+    """
+
+    def __init__(self, int_Budget = None, str_Directory = None):
+        """
+        Arguments:
+            int_Budget -> integer. Bytes of traces to keep in memory. None
+                          for budget().
+            str_Directory -> string. Directory for the file, None for the
+                             system's temporary directory.
+        """
+        self.int_Budget = budget() if int_Budget is None else int_Budget
+        self.lock = threading.RLock()
+        int_Handle, self.str_Path = tempfile.mkstemp(prefix = "bbq_traces_", suffix = ".dat",
+                                                     dir = str_Directory)
+        self.file = os.fdopen(int_Handle, "w+b")
+        self.int_FileSize = 0
+        self.mmp_File = None
+        # key -> array, for traces still in memory, oldest first
+        self.dic_Memory = OrderedDict()
+        self.int_MemoryBytes = 0
+        # key -> (offset, number of bytes), for traces in the file
+        self.dic_File = {}
+        self.dic_Layout = {}
+        self.int_NextKey = 0
+        self.finalizer = weakref.finalize(self, TraceStore.remove, self.file, self.str_Path)
+
+    @staticmethod
+    def remove(file, str_Path):
+        """
+        Closes and deletes the file. Deleting fails as long as views of the
+        file are in use on Windows; the file then stays in the temporary
+        directory.
+        """
+        try:
+            file.close()
+            os.remove(str_Path)
+        except OSError:
+            pass
+
+    def add(self, arr_Values):
+        """
+        Adds a trace to the store.
+
+        Arguments:
+            arr_Values -> numpy array (or anything np.asarray takes).
+
+        Returns Trace.
+        """
+        arr_Values = np.array(arr_Values, copy = True)
+        arr_Values.setflags(write = False)
+        with self.lock:
+            key = self.int_NextKey
+            self.int_NextKey += 1
+            self.dic_Layout[key] = (arr_Values.dtype, arr_Values.shape)
+            self.dic_Memory[key] = arr_Values
+            self.int_MemoryBytes += arr_Values.nbytes
+            if self.int_MemoryBytes > self.int_Budget:
+                self.evict()
+        return Trace(self, key, arr_Values.dtype, arr_Values.shape)
+
+    def get(self, key):
+        """
+        Returns trace as read-only numpy array.
+        """
+        with self.lock:
+            arr_Values = self.dic_Memory.get(key)
+            if not arr_Values is None:
+                return arr_Values
+            int_Offset, int_Bytes = self.dic_File[key]
+            dtype, shape = self.dic_Layout[key]
+            return self.view()[int_Offset:int_Offset+int_Bytes].view(dtype).reshape(shape)
+
+    def evict(self):
+        """
+        Writes the oldest traces in memory to the file until the traces
+        left in memory fit the budget.
+        """
+        lst_Evicted = []
+        while self.int_MemoryBytes > self.int_Budget and len(self.dic_Memory) > 0:
+            key, arr_Values = self.dic_Memory.popitem(last = False)
+            self.int_MemoryBytes -= arr_Values.nbytes
+            lst_Evicted.append((key, arr_Values))
+        self.write(lst_Evicted)
+
+    def write(self, lst_Traces):
+        """
+        Appends traces to the file in one go.
+
+        Arguments:
+            lst_Traces -> list of (key, numpy array) tuples.
+        """
+        if len(lst_Traces) == 0:
+            return
+        self.file.seek(self.int_FileSize)
+        for key, arr_Values in lst_Traces:
+            bytes_Values = np.ascontiguousarray(arr_Values).tobytes()
+            int_Padding = -len(bytes_Values) % ALIGN
+            self.file.write(bytes_Values + b"\x00" * int_Padding)
+            self.dic_File[key] = (self.int_FileSize, len(bytes_Values))
+            self.int_FileSize += len(bytes_Values) + int_Padding
+        self.file.flush()
+
+    def view(self):
+        """
+        Returns the file as read-only memory-mapped array of bytes. The
+        file only ever grows, so it gets mapped again only once traces
+        have been added to it since it was last mapped.
+        """
+        if self.mmp_File is None or self.mmp_File.shape[0] < self.int_FileSize:
+            self.mmp_File = np.memmap(self.str_Path, dtype = np.uint8, mode = "r",
+                                      shape = (self.int_FileSize,))
+        return self.mmp_File
+
+    def usage(self):
+        """
+        Returns dictionary with number of traces and bytes in memory and in
+        the file.
+        """
+        with self.lock:
+            return {"Traces":len(self.dic_Layout),
+                    "MemoryBytes":self.int_MemoryBytes,
+                    "FileBytes":self.int_FileSize}
+
+    def close(self):
+        """
+        Deletes the file. Traces still in memory stay readable, traces in
+        the file do not.
+        """
+        with self.lock:
+            self.mmp_File = None
+            self.finalizer()
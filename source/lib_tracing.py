@@ -0,0 +1,307 @@
+"""
+Library of functions and classes to trace and time the stages of data
+processing (file read, parse, sample assembly, normalisation, fitting,
+export).
+
+Tracing is off by default. Switch it on with enable() or by setting the
+environment variable BBQ_TRACE to the path of a file the trace should be
+written to when BBQ closes. While tracing is off, span() hands back one
+shared do-nothing object, so instrumented code costs a function call and
+a flag check per span.
+
+Recorded spans can be written out as a Chrome trace event file (open in
+chrome://tracing or https://ui.perfetto.dev) or summarised per stage.
+
+Classes:
+    Span
+    NullSpan
+
+Functions:
+    enable
+    disable
+    is_enabled
+    span
+    traced
+    event
+    record
+    clear
+    get_events
+    json_safe
+    write_chrome_trace
+    write_on_exit
+    summary
+
+"""
+
+import os
+import json
+import threading
+from functools import wraps
+from time import perf_counter_ns
+
+# Module level state. Kept as plain module variables so that the check in
+# span() is as cheap as it can be.
+_enabled = False
+_events = []
+_lock = threading.Lock()
+_pid = os.getpid()
+_origin = perf_counter_ns()
+
+##############################################################
+##                                                          ##
+##     #####  #####    ####   ##  ##   #####                ##
+##    ##      ##  ##  ##  ##  ### ##  ##                    ##
+##     ####   #####   ######  ######   ####                 ##
+##        ##  ##      ##  ##  ## ###      ##                ##
+##    #####   ##      ##  ##  ##  ##  #####                 ##
+##                                                          ##
+##############################################################
+
+class Span:
+    """
+    Context manager timing one stage of processing. On exit, a
+    complete event ("ph":"X") is added to the module's event list.
+    """
+
+    __slots__ = ("name", "category", "attributes", "start")
+
+    def __init__(self, name, category, attributes):
+        """
+        Arguments:
+            name -> string. Name of the stage, e.g. "fit".
+            category -> string. Broader group, e.g. "processing".
+            attributes -> dictionary. Plate, sample or any other
+                          details to attach to the span.
+        """
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = perf_counter_ns()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        record({"name": self.name,
+                "cat": self.category,
+                "ph": "X",
+                "ts": (self.start - _origin) / 1000,
+                "dur": (end - self.start) / 1000,
+                "pid": _pid,
+                "tid": threading.get_ident(),
+                "args": self.attributes})
+        # Never swallow exceptions
+        return False
+
+    def set(self, **attributes):
+        """
+        Adds attributes to the span after it has been opened, e.g.
+        the outcome of a fit.
+        """
+        self.attributes.update(attributes)
+
+class NullSpan:
+    """
+    Stand-in for Span while tracing is disabled. Does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+_nullspan = NullSpan()
+
+##############################################################
+##                                                          ##
+##    ######  #####    ####    ####   ######                ##
+##      ##    ##  ##  ##  ##  ##      ##                    ##
+##      ##    #####   ######  ##      ####                  ##
+##      ##    ##  ##  ##  ##  ##      ##                    ##
+##      ##    ##  ##  ##  ##   ####   ######                ##
+##                                                          ##
+##############################################################
+
+def enable():
+    """
+    Switches tracing on.
+    """
+    global _enabled
+    _enabled = True
+
+def disable():
+    """
+    Switches tracing off. Already recorded events are kept.
+    """
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    """
+    Returns True if tracing is switched on.
+    """
+    return _enabled
+
+def span(name, category = "processing", **attributes):
+    """
+    Opens a span for a stage of processing. Use as context manager:
+
+        with trace.span("fit", plate = 1, sample = "BBQ-001"):
+            ...
+
+    Arguments:
+        name -> string. Name of the stage.
+        category -> string. Broader group of the stage.
+        attributes -> keyword arguments attached to the span.
+
+    Returns a Span if tracing is enabled, otherwise the shared NullSpan.
+    """
+    if not _enabled:
+        return _nullspan
+    return Span(name, category, attributes)
+
+def traced(name = None, category = "processing"):
+    """
+    Decorator that wraps every call of the decorated function in a span.
+
+    Arguments:
+        name -> string. Name of the span. Defaults to the function name.
+        category -> string. Broader group of the stage.
+    """
+    def decorator(function):
+        str_Name = name if name is not None else function.__name__
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(str_Name, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def event(name, category = "processing", **attributes):
+    """
+    Records an instant event ("ph":"i"), e.g. a diagnostic message
+    that used to be printed to the console.
+
+    Arguments:
+        name -> string. Short description of the event.
+        category -> string. Broader group of the event.
+        attributes -> keyword arguments attached to the event.
+    """
+    if not _enabled:
+        return None
+    record({"name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": (perf_counter_ns() - _origin) / 1000,
+            "pid": _pid,
+            "tid": threading.get_ident(),
+            "args": attributes})
+
+def record(dic_Event):
+    """
+    Adds a trace event to the list of events. Thread safe.
+    """
+    with _lock:
+        _events.append(dic_Event)
+
+def clear():
+    """
+    Deletes all recorded events.
+    """
+    with _lock:
+        _events.clear()
+
+def get_events():
+    """
+    Returns a copy of the list of recorded events.
+    """
+    with _lock:
+        return list(_events)
+
+def json_safe(value):
+    """
+    Turns attribute values that json cannot handle (numpy types,
+    dataframes, etc) into something that it can.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    # numpy scalars
+    if hasattr(value, "item"):
+        try:
+            return value.item()
+        except:
+            pass
+    return str(value)
+
+def write_chrome_trace(str_FilePath):
+    """
+    Writes all recorded events to a file in the Chrome trace event
+    format.
+
+    Arguments:
+        str_FilePath -> string. Path of the file to write.
+
+    Returns True if the file was written, False if not.
+    """
+    lst_Events = [dict(dic_Event, args = json_safe(dic_Event["args"]))
+                  for dic_Event in get_events()]
+    try:
+        with open(str_FilePath, "w") as file:
+            json.dump({"traceEvents": lst_Events,
+                       "displayTimeUnit": "ms"}, file)
+        return True
+    except:
+        return False
+
+def write_on_exit():
+    """
+    Writes the trace to the file given in the BBQ_TRACE environment
+    variable, if tracing was switched on through it.
+    """
+    str_FilePath = os.environ.get("BBQ_TRACE", "")
+    if str_FilePath != "" and len(_events) > 0:
+        write_chrome_trace(str_FilePath)
+
+def summary():
+    """
+    Summarises recorded spans by name.
+
+    Returns a dictionary of dictionaries keyed by span name with
+    count, total, mean and maximum duration (in milliseconds).
+    """
+    dic_Summary = {}
+    for dic_Event in get_events():
+        if not dic_Event["ph"] == "X":
+            continue
+        flt_Duration = dic_Event["dur"] / 1000
+        if not dic_Event["name"] in dic_Summary:
+            dic_Summary[dic_Event["name"]] = {"Count": 0, "Total": 0.0,
+                                              "Mean": 0.0, "Max": 0.0}
+        dic_Stage = dic_Summary[dic_Event["name"]]
+        dic_Stage["Count"] += 1
+        dic_Stage["Total"] += flt_Duration
+        if flt_Duration > dic_Stage["Max"]:
+            dic_Stage["Max"] = flt_Duration
+    for dic_Stage in dic_Summary.values():
+        dic_Stage["Mean"] = dic_Stage["Total"] / dic_Stage["Count"]
+    return dic_Summary
+
+if os.environ.get("BBQ_TRACE", "") != "":
+    enable()
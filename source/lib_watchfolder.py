@@ -0,0 +1,155 @@
+"""
+Watch mode: monitors a raw data directory for new data files, matches
+them to transfer file entries and hands them on for processing as soon as
+they have been written completely.
+
+Polls the directory instead of relying on file system notifications so it
+works the same on network shares, where plate reader exports usually end
+up.
+
+Classes:
+    FolderWatcher
+
+Functions:
+    normalise_name
+    match_datafile
+    file_signature
+
+"""
+
+import os
+import threading
+from time import time
+
+def normalise_name(name):
+    """
+    Lower case version of name with everything but letters and numbers
+    removed, e.g. "Plate_01 (Run 2).xlsx" -> "plate01run2xlsx".
+    """
+    return "".join([char for char in name.lower() if char.isalnum()])
+
+def match_datafile(str_FileName, lst_Entries):
+    """
+    Finds the transfer file entry (destination plate) a data file belongs
+    to. This is what the user does by hand in FileSelection.assign_plate:
+    data files are named after the destination plate (or its barcode).
+
+    The file name (without extension) matching an entry exactly takes
+    precedence. Otherwise the longest entry contained in the file name
+    wins, so that "Plate_10" is not matched to "Plate_1".
+
+    Arguments:
+        str_FileName -> string. Name of the data file.
+        lst_Entries -> list of strings. Unassigned transfer file entries.
+
+    Returns matching entry or None.
+    """
+    str_Stem = normalise_name(os.path.splitext(os.path.basename(str_FileName))[0])
+    if str_Stem == "":
+        return None
+    str_Best = None
+    int_Best = 0
+    for entry in lst_Entries:
+        str_Entry = normalise_name(str(entry))
+        if str_Entry == "":
+            continue
+        if str_Entry == str_Stem:
+            return entry
+        if str_Entry in str_Stem and len(str_Entry) > int_Best:
+            str_Best = entry
+            int_Best = len(str_Entry)
+    return str_Best
+
+def file_signature(str_FilePath):
+    """
+    Returns tuple of (size, modification time) of a file or None if the
+    file cannot be accessed (e.g. it is locked by the writing program).
+    """
+    try:
+        stat = os.stat(str_FilePath)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime)
+
+class FolderWatcher(threading.Thread):
+    """
+    Background thread that polls a directory. Each new file with the
+    right extension is reported once, after its size and modification
+    time have not changed for a settle period and it can be opened for
+    reading.
+    """
+
+    def __init__(self, directory, extension, callback, interval = 2.0,
+                 settle = 5.0, ignore = None):
+        """
+        Arguments:
+            directory -> string. Directory to watch.
+            extension -> string. Data file extension, e.g. ".xlsx".
+            callback -> function. Gets called from the watcher thread
+                        with the full path of each complete new file.
+            interval -> float. Seconds between polls.
+            settle -> float. Seconds a file must stay unchanged to be
+                      considered complete.
+            ignore -> list of file names to not report (e.g. files that
+                      were already there or assigned) or None.
+        """
+        threading.Thread.__init__(self, daemon = True)
+        self.directory = directory
+        self.extension = extension.lower()
+        self.callback = callback
+        self.interval = interval
+        self.settle = settle
+        self.reported = set() if ignore is None else set(ignore)
+        # File name -> (signature, time the signature was first seen)
+        self.pending = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.poll()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        """
+        Stops watching after the current poll.
+        """
+        self.stopped.set()
+
+    def poll(self):
+        """
+        Checks the directory once. Reports files that are complete.
+        """
+        try:
+            lst_Files = os.listdir(self.directory)
+        except OSError:
+            return None
+        flt_Now = time()
+        for str_File in lst_Files:
+            if str_File in self.reported:
+                continue
+            if not str_File.lower().endswith(self.extension):
+                continue
+            # Temporary lock files, e.g. from Excel
+            if str_File.startswith("~$"):
+                continue
+            str_Path = os.path.join(self.directory, str_File)
+            tpl_Signature = file_signature(str_Path)
+            if tpl_Signature is None:
+                self.pending.pop(str_File, None)
+                continue
+            if (not str_File in self.pending
+                or self.pending[str_File][0] != tpl_Signature):
+                # New or still being written
+                self.pending[str_File] = (tpl_Signature, flt_Now)
+                continue
+            if flt_Now - self.pending[str_File][1] < self.settle:
+                continue
+            # Unchanged long enough. Make sure the writer has let go of it.
+            try:
+                with open(str_Path, "rb"):
+                    pass
+            except OSError:
+                continue
+            del self.pending[str_File]
+            self.reported.add(str_File)
+            self.callback(str_Path)
@@ -16,6 +16,7 @@ Classes:
 import lib_colourscheme as cs
 import lib_messageboxes as msg
 import lib_custombuttons as btn
+import lib_catalogue as cat
 
 # Import libraries for GUI
 import wx
@@ -25,8 +26,6 @@ import wx.xrc
 import pandas as pd
 import numpy as np
 import os
-from pathlib import Path
-import datetime
 
 ####################################################################
 ##                                                                ##
@@ -625,18 +624,37 @@ class HomeScreen (wx.Panel):
 
         self.szr_RecentFiles = wx.FlexGridSizer(2,2,0,0)
         self.szr_RecentFiles.Add((40,-1),0,wx.ALL,0)
+        self.szr_RecentFilesLabel = wx.BoxSizer(wx.HORIZONTAL)
         self.lbl_RecentFiles = wx.StaticText(self, label = u" Recent projects")
         self.lbl_RecentFiles.SetFont(wx.Font(14, family = wx.FONTFAMILY_DEFAULT,
                                              style = wx.FONTSTYLE_NORMAL,
                                              weight = wx.FONTWEIGHT_BOLD,
                                              underline = False,
                                              faceName = wx.EmptyString))
-        self.szr_RecentFiles.Add(self.lbl_RecentFiles, 0, wx.ALL, 5)
+        self.szr_RecentFilesLabel.Add(self.lbl_RecentFiles, 0, wx.ALL, 5)
+        self.szr_RecentFilesLabel.Add((-1,-1),1,wx.EXPAND,0)
+        # Search the project catalogue
+        self.txt_Search = wx.TextCtrl(self, value = u"", size = wx.Size(300,-1))
+        self.txt_Search.SetHint(u"Search file name, ELN, date, plate or sample ID")
+        self.txt_Search.Bind(wx.EVT_TEXT, self.OnSearch)
+        self.szr_RecentFilesLabel.Add(self.txt_Search, 0, wx.ALL|wx.ALIGN_CENTER_VERTICAL, 5)
+        self.chc_Shorthand = wx.Choice(self, choices = [u"All assays"], size = wx.Size(100,-1))
+        self.chc_Shorthand.SetSelection(0)
+        self.chc_Shorthand.Bind(wx.EVT_CHOICE, self.OnSearch)
+        self.szr_RecentFilesLabel.Add(self.chc_Shorthand, 0, wx.ALL|wx.ALIGN_CENTER_VERTICAL, 5)
+        self.szr_RecentFilesLabel.SetMinSize(wx.Size(910,-1))
+        self.szr_RecentFiles.Add(self.szr_RecentFilesLabel, 0, wx.ALL, 0)
         self.szr_RecentFiles.Add((40,-1),0,wx.ALL,0)
         self.pnl_FileList = FileList(self)
         self.szr_RecentFiles.Add(self.pnl_FileList, 0, wx.ALL|wx.EXPAND, 0)
         self.szr_Surround.Add(self.szr_RecentFiles,0,wx.ALL,0)
 
+        # Project catalogue. Fall back to a throwaway one if the file in
+        # the home directory cannot be opened.
+        try:
+            self.catalogue = cat.connect()
+        except:
+            self.catalogue = cat.connect(":memory:")
         self.CheckForRecentFiles()
 
         self.SetSizer(self.szr_Surround)
@@ -648,44 +666,61 @@ class HomeScreen (wx.Panel):
     
     def CheckForRecentFiles(self):
         """
-        Checks whether the "recent projects" .csv exists.
-        If not, a new one gets created.
+        Fills the file list from the project catalogue: the most
+        recently used projects or, if there is a search text or assay
+        filter, the projects that match. Projects whose file cannot be
+        found are not shown but stay in the catalogue (e.g. files on a
+        network drive that is not connected).
         """
         self.Freeze()
         self.pnl_FileList.DeleteAllItems()
-        str_RecentPath = os.path.join(Path.home(),"bbq_recent.csv")
-        if not os.path.isfile(str_RecentPath) == True:
-            dfr_Recent = pd.DataFrame(columns=["FileName","AssayCategory",
-                                               "Shorthand","FullPath","DateTime"],
-                                               index=[0,1,2,3,4,5,6,7,8,9])
-            dfr_Recent.to_csv(str_RecentPath)
+        self.UpdateShorthandFilter()
+        str_Search = self.txt_Search.GetValue()
+        if self.chc_Shorthand.GetSelection() > 0:
+            str_Shorthand = self.chc_Shorthand.GetString(self.chc_Shorthand.GetSelection())
+        else:
+            str_Shorthand = None
+        if str_Search.strip() == "" and str_Shorthand is None:
+            int_Limit = 10
         else:
-            dfr_Recent = pd.read_csv(str_RecentPath, sep=",", header=0,
-                                     index_col=0, engine="python").sort_values(
-                                     by=["DateTime"],ascending=False)
-            idx_List = 0
-            for idx_File in range(len(dfr_Recent)):
-                # First, check there is an entry:
-                if pd.isna(dfr_Recent.loc[idx_File,"FileName"]) == False:
-                    # Second, check the entry is still valid:
-                    if os.path.isfile(dfr_Recent.loc[idx_File,"FullPath"]) == True:
-                        self.pnl_FileList.AddFileEntry(idx_List,dfr_Recent.loc[idx_File].tolist())
-                        idx_List += 1
-                    else:
-                        dfr_Recent.loc[idx_File,"FileName"] = np.nan
-                        dfr_Recent.loc[idx_File,"AssayCategory"] = np.nan
-                        dfr_Recent.loc[idx_File,"Shorthand"] = np.nan
-                        dfr_Recent.loc[idx_File,"FullPath"] = np.nan
-                        dfr_Recent.loc[idx_File,"DateTime"] = np.nan
+            int_Limit = 100
+        dfr_Recent = cat.search_projects(self.catalogue, str_Search, str_Shorthand, int_Limit)
+        idx_List = 0
+        for idx_File in dfr_Recent.index:
+            if os.path.isfile(dfr_Recent.loc[idx_File,"FullPath"]) == True:
+                self.pnl_FileList.AddFileEntry(idx_List,dfr_Recent.loc[idx_File].tolist())
+                idx_List += 1
         if len(self.pnl_FileList.family) > 0:
             self.pnl_FileList.family[0].Highlight(None)
         self.Layout()
         self.Thaw()
 
+    def UpdateShorthandFilter(self):
+        """
+        Makes sure the assay filter offers every assay in the catalogue.
+        Keeps the current selection.
+        """
+        lst_Choices = [u"All assays"] + cat.catalogue_shorthands(self.catalogue)
+        if lst_Choices == self.chc_Shorthand.GetItems():
+            return None
+        str_Selected = self.chc_Shorthand.GetString(self.chc_Shorthand.GetSelection())
+        self.chc_Shorthand.SetItems(lst_Choices)
+        if str_Selected in lst_Choices:
+            self.chc_Shorthand.SetSelection(lst_Choices.index(str_Selected))
+        else:
+            self.chc_Shorthand.SetSelection(0)
+
+    def OnSearch(self, event):
+        """
+        Event handler. Updates file list when search text or assay
+        filter change.
+        """
+        self.CheckForRecentFiles()
+
     def UpdateRecent(self, str_FilePath, str_FileName, str_AssayCategory, str_Shorthand):
         """
-        Updates csv file in user's home directory that holds
-        list of most recelty opened files.
+        Adds file to the project catalogue or updates the time it was
+        last used.
 
         Arguments:
             str_FilePath -> string. Complete path to the file.
@@ -694,86 +729,39 @@ class HomeScreen (wx.Panel):
             str_Shorthand -> string. Shorthand code for the assay.
 
         """
-        str_RecentPath = os.path.join(Path.home(),"bbq_recent.csv")
-        if not os.path.isfile(str_RecentPath) == True:
-            dfr_Recent = pd.DataFrame(columns=["FileName","AssayCategory",
-                                               "Shorthand","FullPath","DateTime"]
-                                               ,index=[0,1,2,3,4,5,6,7,8,9])
-            dfr_Recent.loc[0,"FileName"] = str_FileName
-            dfr_Recent.loc[0,"AssayCategory"] = str_AssayCategory
-            dfr_Recent.loc[0,"Shorthand"] = str_Shorthand
-            dfr_Recent.loc[0,"FullPath"] = str_FilePath
-            dfr_Recent.loc[0,"DateTime"] = str(datetime.datetime.now())
-            dfr_Recent.to_csv(str_RecentPath)
-        else:
-            dfr_Recent = pd.read_csv(str_RecentPath, sep=",", header=0, index_col=0,
-                                     engine="python").sort_values(by=["DateTime"],
-                                     ascending=False,ignore_index=True)
-            # See if this file had been added before. If so, update DateTime and save again.
-            bol_AlreadyThere = False
-            for idx_File in range(len(dfr_Recent)):
-                # First, check there is an entry:
-                if pd.isna(dfr_Recent.loc[idx_File,"FileName"]) == False:
-                    # Check if the file is still there
-                    if os.path.isfile(dfr_Recent.loc[idx_File,"FullPath"]) == True:
-                        # Second, compare entry to new file. If found, update
-                        if dfr_Recent.loc[idx_File,"FullPath"] == str_FilePath:
-                            dfr_Recent.loc[idx_File,"DateTime"] = str(datetime.datetime.now())
-                            bol_AlreadyThere = True
-                    else: # if the entry is gone, overwrite!
-                        dfr_Recent.iloc[idx_File,0] = np.nan
-                        dfr_Recent.iloc[idx_File,1] = np.nan
-                        dfr_Recent.iloc[idx_File,2] = np.nan
-                        dfr_Recent.iloc[idx_File,3] = np.nan
-                        dfr_Recent.iloc[idx_File,4] = np.nan
-            if bol_AlreadyThere == False:
-                # Write new file into the last row of the dataframe (oldest file),
-                # then re-sort.
-                dfr_Recent.iloc[-1,0] = str_FileName
-                dfr_Recent.iloc[-1,1] = str_AssayCategory
-                dfr_Recent.iloc[-1,2] = str_Shorthand
-                dfr_Recent.iloc[-1,3] = str_FilePath
-                dfr_Recent.iloc[-1,4] = str(datetime.datetime.now())
-            # Re-sort by last edit ("DateTime")
-            dfr_Recent = dfr_Recent.sort_values(by=["DateTime"],ascending=False,
-                                                ignore_index=True)
-            dfr_Recent.to_csv(str_RecentPath)
+        cat.touch_project(self.catalogue, str_FilePath, str_FileName,
+                          str_AssayCategory, str_Shorthand)
+        self.CheckForRecentFiles()
+
+    def IndexProject(self, str_FilePath, str_FileName, details, assay_data, bol_Saved = True):
+        """
+        Writes project details, plate IDs, sample IDs and summary
+        results into the project catalogue so the project can be found
+        by searching from the home screen.
+
+        Arguments:
+            str_FilePath -> string. Complete path to the file.
+            str_FileName -> string. File name to be displayed.
+            details -> dictionary. Meta data of experiment.
+            assay_data -> pandas dataframe holding all assay data.
+            bol_Saved -> boolean. False if the project was opened
+                         rather than saved.
+        """
+        cat.index_project(self.catalogue, str_FilePath, str_FileName,
+                          details, assay_data, bol_Saved)
         self.CheckForRecentFiles()
 
     def RemoveRecent(self, str_FilePath):
         """
-        Updates csv file in user's home directory that holds list of
-        most recelty opened files
+        Removes file from the project catalogue.
 
         Arguments:
             str_FilePath -> string. Complete path of the file to be
                             removed from the "recent files" list.
 
         """
-        self.Freeze()
-        str_RecentPath = os.path.join(Path.home(),"bbq_recent.csv")
-        if not os.path.isfile(str_RecentPath) == True:
-            print("Fnord")
-        else:
-            dfr_Recent = pd.read_csv(str_RecentPath, sep=",", header=0, index_col=0,
-                                     engine="python").sort_values(by=["DateTime"],
-                                     ascending=False,ignore_index=True)
-            # Find the entry by file path
-            bol_AlreadyThere = False
-            for idx_File in range(len(dfr_Recent)):
-                if str_FilePath == dfr_Recent.loc[idx_File,"FullPath"]:
-                    # Overwrite!
-                    dfr_Recent.iloc[idx_File,0] = np.nan
-                    dfr_Recent.iloc[idx_File,1] = np.nan
-                    dfr_Recent.iloc[idx_File,2] = np.nan
-                    dfr_Recent.iloc[idx_File,3] = np.nan
-                    dfr_Recent.iloc[idx_File,4] = np.nan
-            # Re-sort by last edit ("DateTime")
-            dfr_Recent = dfr_Recent.sort_values(by=["DateTime"],ascending=False,
-                                                ignore_index=True)
-            dfr_Recent.to_csv(str_RecentPath)
+        cat.remove_project(self.catalogue, str_FilePath)
         self.CheckForRecentFiles()
-        self.Thaw()
 
     def ChangePinnedAssays(self, event):
         """
@@ -0,0 +1,97 @@
+"""
+Regression tests for lib_batchfitting: batched sigmoidal fits of curves
+with the inflection point near the top of the dose range, where the
+batched fit used to drive the Hill slope negative and the inflection
+point onto its lower bound.
+"""
+
+import os
+import sys
+import warnings
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib_batchfitting as bf
+import lib_fitstatistics as fs
+
+def high_ic50_curves(curves, noise, seed):
+    """
+    Returns doses (M), responses and IC50s (uM) of dose response curves
+    with IC50s of 4 to 6 uM on a 1 nM to 10 uM dilution series.
+    """
+    rng = np.random.default_rng(seed)
+    arr_Doses = np.logspace(-9, -5, 8)
+    arr_IC50 = rng.uniform(4, 6, curves)
+    arr_Hill = rng.uniform(0.7, 1.5, curves)
+    arr_Top = rng.uniform(90, 105, curves)
+    arr_Bottom = rng.uniform(-5, 10, curves)
+    arr_Responses = fs.eq_sigmoidal(arr_Doses[None,:] * 1000000, arr_Top[:,None],
+                                    arr_Bottom[:,None], arr_Hill[:,None], arr_IC50[:,None])
+    arr_Responses = arr_Responses + rng.normal(0, noise, arr_Responses.shape)
+    return arr_Doses, arr_Responses, arr_IC50
+
+def curve_fit_ic50(arr_Doses, arr_Responses):
+    """
+    Returns IC50 (uM) of each row fitted with curve_fit from the
+    starting parameters of the batched fit, np.nan where it fails.
+    """
+    arr_X = arr_Doses * 1000000
+    arr_Guess = bf.guess_sigmoidal(arr_X, arr_Responses)
+    arr_IC50 = np.full(arr_Responses.shape[0], np.nan)
+    for row in range(arr_Responses.shape[0]):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                arr_IC50[row] = curve_fit(fs.eq_sigmoidal, arr_X, arr_Responses[row],
+                                          p0 = arr_Guess[row])[0][3]
+        except RuntimeError:
+            pass
+    return arr_IC50
+
+def test_high_ic50_noiseless():
+    arr_Doses, arr_Responses, arr_IC50 = high_ic50_curves(300, 0, 1)
+    dic_Fit = bf.fit_sigmoidal(arr_Doses, arr_Responses)
+    assert dic_Fit["Success"].all()
+    assert (dic_Fit["Pars"][:,2] > 0).all()
+    np.testing.assert_allclose(dic_Fit["Pars"][:,3], arr_IC50, rtol = 1e-6)
+
+def test_high_ic50_matches_curve_fit():
+    for curves, seed in [(300, 2), (30, 3)]:
+        arr_Doses, arr_Responses, arr_IC50 = high_ic50_curves(curves, 3, seed)
+        dic_Fit = bf.fit_sigmoidal(arr_Doses, arr_Responses)
+        arr_Reference = curve_fit_ic50(arr_Doses, arr_Responses)
+        arr_Both = np.isfinite(arr_Reference)
+        # Every curve curve_fit can fit, the batched fit (with its
+        # curve_fit fallback) fits as well.
+        assert dic_Fit["Success"][arr_Both].all()
+        arr_Difference = np.abs(dic_Fit["Pars"][arr_Both,3] - arr_Reference[arr_Both]) / arr_Reference[arr_Both]
+        assert np.median(arr_Difference) < 1e-4
+        assert arr_Difference.max() < 1e-2
+
+def test_hill_slope_keeps_sign():
+    arr_Doses, arr_Responses, arr_IC50 = high_ic50_curves(300, 3, 4)
+    arr_X = np.atleast_2d(arr_Doses * 1000000)
+    arr_Guess = bf.guess_sigmoidal(arr_X, arr_Responses)
+    arr_Guess[:,3] = np.log(arr_Guess[:,3])
+    dic_Fit = bf.least_squares(bf.eq_logsigmoidal, bf.jac_logsigmoidal, arr_X, arr_Responses,
+                               arr_Guess, arr_KeepSign = np.array([2]))
+    arr_Fitted = dic_Fit["Success"]
+    assert arr_Fitted.sum() > 250
+    assert (dic_Fit["Pars"][arr_Fitted,2] > 0).all()
+
+def test_extreme_values_without_warnings():
+    rng = np.random.default_rng(5)
+    arr_Doses = np.logspace(-9, -4, 8)
+    arr_Responses = rng.normal(50, 50, (100, 8)) * 1e300
+    arr_Responses[::7,2] = np.inf
+    arr_Responses[::11] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        dic_Fit = bf.fit_sigmoidal(arr_Doses, arr_Responses)
+    # Rows with non-finite results count as failed
+    assert not dic_Fit["Success"][::11].any()
+    assert np.isfinite(dic_Fit["Pars"][dic_Fit["Success"]]).all()
+    assert np.isnan(dic_Fit["Pars"][~dic_Fit["Success"]]).all()
@@ -2,11 +2,14 @@ import pandas as pd
 import workflows.wf_rawdatafunctions as rd
 import workflows.wf_rawdatafunctions as tf
 import lib_messageboxes as msg
+import lib_progresschannel as pch
 
 
 
 def complete_container(workflow, dlg_progress):
 
+    progress = pch.get_channel(dlg_progress)
+
     plate_assignment = workflow.dfr_PlateAssignment
     data_path = workflow.paths["Data"]
     transfer_file = workflow.dfr_TransferFile
@@ -24,21 +27,21 @@ def complete_container(workflow, dlg_progress):
 
     # Assay category is broad: single_dose, IC50 (or dose response), DSF_384...
     # Count how many rows we need:
-    dlg_progress.lbx_Log.InsertItems([f"Assay category: {assay_category}"], dlg_progress.lbx_Log.Count)
-    dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+    progress.message(f"Assay category: {assay_category}")
+    progress.message("")
     container = pd.DataFrame(columns=["Destination","Samples","Wells","DataFile",
         "RawData","Processed","PlateID","Layout","References"], index=range(plate_assignment.shape[0]))
     # Iterate through the plate_assignment frame
     for plate in plate_assignment.index:
         container.loc[plate,"Destination"] = plate_assignment.loc[plate,"TransferEntry"]
         dest = container.loc[plate,"Destination"]
-        dlg_progress.lbx_Log.InsertItems([f"Processing plate {plate+1}: {dest}"], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems(["==============================================================="], dlg_progress.lbx_Log.Count)
+        progress.stage(f"Processing plate {plate+1}: {dest}")
+        progress.message("===============================================================")
         container.loc[plate,"Wells"] = int(plate_assignment.loc[plate,"Wells"])
         container.loc[plate,"DataFile"] = plate_assignment.loc[plate,"DataFile"]
         # Get raw data
         datafile = container.loc[plate,"DataFile"]
-        dlg_progress.lbx_Log.InsertItems([F"Read raw data file: {datafile}"], dlg_progress.lbx_Log.Count)
+        progress.message(F"Read raw data file: {datafile}")
         if assay_category.find("dose_response") != -1:
             container.at[plate,"RawData"] = ro.get_bmg_plate_readout(data_path,
                                                                           container.loc[plate,"DataFile"],
@@ -71,12 +74,12 @@ def complete_container(workflow, dlg_progress):
             return None
         # Get samples
         if sample_source == "echo":
-            dlg_progress.lbx_Log.InsertItems(["Extract sample IDs from transfer file"], dlg_progress.lbx_Log.Count)
+            progress.message("Extract sample IDs from transfer file")
             container.at[plate,"Samples"] = get_samples(transfer_file,
                                                         container.loc[plate,"Destination"],
                                                         container.loc[plate,"Wells"])
         elif sample_source == "lightcycler":
-            dlg_progress.lbx_Log.InsertItems(["Extract sample IDs from raw data file"], dlg_progress.lbx_Log.Count)
+            progress.message("Extract sample IDs from raw data file")
             container.at[plate,"Samples"] = get_samples_lightcycler(container.loc[plate,"Destination"],
                                                                     container.at[plate,"RawData"],
                                                                     len(layout.loc[plate,"ProteinNumerical"]))
@@ -115,11 +118,11 @@ def complete_container(workflow, dlg_progress):
                                                               datafile,
                                                               container.loc[plate,"RawData"])
             if pd.isna(container.loc[plate,"References"].loc["SolventMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No Solvent wells"], dlg_progress.lbx_Log.Count)
+                progress.warning("No Solvent wells")
             if pd.isna(container.loc[plate,"References"].loc["ControlMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No control wells"], dlg_progress.lbx_Log.Count)
+                progress.warning("No control wells")
             if pd.isna(container.loc[plate,"References"].loc["BufferMean",0]) == True:
-                dlg_progress.lbx_Log.InsertItems(["Note: No buffer wells"], dlg_progress.lbx_Log.Count)
+                progress.warning("No buffer wells")
             # Create dataframe for data processing
             if assay_category.find("dose_response") != -1:
                 container.at[plate,"Processed"] = create_dataframe_EPDR(container.at[plate,"RawData"],
@@ -127,7 +130,7 @@ def complete_container(workflow, dlg_progress):
             elif assay_category.find("single_dose") != -1:
                 container.at[plate,"Processed"] = create_dataframe_EPSD(container.at[plate,"RawData"],
                     container.loc[plate,"Samples"],container.loc[plate,"References"],assay_name,assay_volume,dlg_progress)
-        dlg_progress.lbx_Log.InsertItems(["Plate "+ str(plate+1) + " completed"], dlg_progress.lbx_Log.Count)
-        dlg_progress.lbx_Log.InsertItems([""], dlg_progress.lbx_Log.Count)
+        progress.message("Plate "+ str(plate+1) + " completed")
+        progress.message("")
 
     return container
\ No newline at end of file
@@ -7,6 +7,7 @@ import lib_colourscheme as cs
 import lib_messageboxes as msg
 import lib_tabs as tab
 import lib_tooltip as tt
+import lib_dbpool as dbp
 from lib_custombuttons import CustomBitmapButton, IconTabButton
 
 # Import libraries for GUI
@@ -1973,31 +1974,65 @@ class pnl_Workflow (wx.Panel):
         if not noreturn == False:
             return populated
 
-    def db_df_verify(self, tab_export, conn, db_table, db_dependencies, uploadafter):
+    def db_df_verify(self, tab_export, pool, db_table, db_dependencies, uploadafter):
         """
-        Wrapper function to make db_df_verify accessible from
-        outside the module.
+        Verifies the export table (self.dfr_Database) against the
+        database before upload: all values in dependent columns have to
+        exist in the tables they refer to. Checks one block of values per
+        query (see lib_dbpool.missing_values) rather than row by row.
+        On success, the table to upload is kept in self.dfr_Upload.
         
         Arguments:
             tab_export -> instance of tab_Export
-            conn -> database connection
+            pool -> lib_dbpool.ConnectionPool.
             db_table => name of the database table
-            db_dependencies -> nested dictionary, contains information to verify
-                dependencies of database tables (e.g. how to retrieve FKEYS)
+            db_dependencies -> dictionary. Keys are columns of the
+                               database table, values are [table, column]
+                               in the database the values have to exist in.
             uploadafter -> boolean. Whether to trigger the
                            upload of the data after verification
         """
-        self.verified = db_df_verify(self, conn, db_table, db_dependencies)
+        dfr_Upload = self.upload_frame(db_table)
+        if db_dependencies is None:
+            db_dependencies = {}
+        try:
+            dic_Missing = dbp.missing_values(pool, dfr_Upload, db_dependencies)
+            self.verified = all(len(set_Missing) == 0 for set_Missing in dic_Missing.values())
+        except Exception:
+            self.verified = False
+        if self.verified == True:
+            self.dfr_Upload = dfr_Upload
+        else:
+            self.dfr_Upload = pd.DataFrame()
         if uploadafter == False:
             tab_export.dlg_progress.Destroy()
         tab_export.verified(self.verified, db_table, db_dependencies, uploadafter)
 
-    def db_upload(self, tab_export, conn, db_table):
+    def upload_frame(self, db_table):
+        """
+        Returns the export table (self.dfr_Database) with the database's
+        column names ("DB_NAME" in the assay definition's ColumnNames, if
+        given) instead of BBQ's.
+        """
+        dfr_Names = self.db_columnnames[db_table]
+        if not "DB_NAME" in dfr_Names.columns:
+            return self.dfr_Database.copy()
+        dfr_Names = dfr_Names.dropna(subset = ["BBQ_NAME","DB_NAME"])
+        return self.dfr_Database.rename(columns = dict(zip(dfr_Names["BBQ_NAME"],
+                                                           dfr_Names["DB_NAME"])))
+
+    def db_upload(self, tab_export, pool, db_table):
         """
-        Wrapper function to make db_upload accessible from
-        outside the module
+        Uploads the verified table (self.dfr_Upload) with batched inserts,
+        committing one transaction per plate (see
+        lib_dbpool.upload_dataframe). Rows whose key already exists in the
+        database are skipped. Plate and key columns come from the assay
+        definition ("PlateColumn", "KeyColumn"), if given.
         """
-        upload = db_upload(self, conn, db_table)
+        dic_Database = self.assay["Database"]
+        upload = dbp.upload_dataframe(pool, db_table, self.dfr_Upload,
+                                      plate_column = dic_Database.get("PlateColumn", None),
+                                      key_column = dic_Database.get("KeyColumn", None))
         if type(upload) == str:
             self.uploaded = False
         else:
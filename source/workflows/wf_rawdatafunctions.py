@@ -9,6 +9,7 @@ import os
 import pandas as pd
 
 import lib_platefunctions as pf
+import lib_excelfunctions as ef
 
 #####    ####   #####    #####  ######    ######  ##  ##      ######
 ##  ##  ##  ##  ##  ##  ##      ##        ##      ##  ##      ##
@@ -55,7 +56,7 @@ def parese_data_file(data_rules, str_FilePath):
     elif str_FileType[0:3] == "xls":
         print("Trying to parse XLS or XLSX file.")
         try:
-            dfr_ParsedDataFile = pd.read_excel(str_FilePath, sheet_name=str_Worksheet, header=None, index_col=None, engine=str_Engine)
+            dfr_ParsedDataFile = ef.read_sheet(str_FilePath, sheet_name=str_Worksheet, header=None, index_col=None)
         except:
             # Couldn't parse, return empty dataframe and no success
             return pd.DataFrame(), False
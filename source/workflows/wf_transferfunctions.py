@@ -8,6 +8,7 @@ Functions
 
 import pandas as pd
 import lib_platefunctions as pf
+import lib_excelfunctions as ef
 
 def transfer_to_layout(transfer_rules, str_FilePath):
     """
@@ -30,7 +31,7 @@ def transfer_to_layout(transfer_rules, str_FilePath):
             return pd.DataFrame(), False
     elif str_Extension[0:3] == "xls":
         try:
-            dfr_ParsedTransfer = pd.read_excel(str_FilePath, sheet_name=str_Worksheet, header=None, index_col=None, engine=str_Engine)
+            dfr_ParsedTransfer = ef.read_sheet(str_FilePath, sheet_name=str_Worksheet, header=None, index_col=None)
         except:
             # Couldn't parse, return empty dataframe and no success
             return pd.DataFrame(), False